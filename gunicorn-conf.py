@@ -2,3 +2,8 @@
 import gunicorn
 
 gunicorn.SERVER = ""
+
+# Load the application in the master process before forking workers, so that
+# anything loaded at startup (see ``tna_account_management.utils.startup``)
+# is shared between workers, rather than loaded separately in each one
+preload_app = True
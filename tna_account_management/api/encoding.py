@@ -0,0 +1,19 @@
+"""
+JSON encoding for API responses, using orjson when it is installed (it is
+several times faster than the standard library for the larger batch
+responses), and falling back to the standard library when not. Responses
+only contain JSON-native types, so the output is the same either way.
+"""
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
@@ -0,0 +1,133 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from tna_account_management.users import profile_cache
+from tna_account_management.users.models import User
+from tna_account_management.utils.fake_auth0 import make_user
+
+API_KEY = "test-key"
+
+
+@override_settings(ACCOUNT_API_KEYS=["other-key", API_KEY], ACCOUNT_API_BATCH_SIZE=3)
+class AccountAPITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = []
+        # Profiles are cached, so no requests are made to Auth0
+        for i in range(2):
+            profile = make_user(i)
+            self.users.append(
+                User.objects.create(
+                    username=profile["nickname"], auth0_id=profile["user_id"]
+                )
+            )
+            profile_cache.set_profile(profile["user_id"], profile)
+        self.detail_url = reverse("api_account_detail", args=[self.users[0].auth0_id])
+
+    def get(self, url, key=API_KEY, **kwargs):
+        if key is not None:
+            kwargs["HTTP_AUTHORIZATION"] = f"Bearer {key}"
+        return self.client.get(url, **kwargs)
+
+    def test_key_required(self):
+        for key in (None, "", "wrong-key", f"{API_KEY}x"):
+            with self.subTest(key=key):
+                response = self.get(self.detail_url, key=key)
+
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response["WWW-Authenticate"], "Bearer")
+                self.assertEqual(response.json(), {"error": "Authentication required"})
+
+    def test_basic_auth_rejected(self):
+        response = self.client.get(
+            self.detail_url, HTTP_AUTHORIZATION=f"Basic {API_KEY}"
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(ACCOUNT_API_KEYS=[])
+    def test_no_keys_configured(self):
+        self.assertEqual(self.get(self.detail_url, key="").status_code, 401)
+
+    def test_detail(self):
+        response = self.get(self.detail_url)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["id"], self.users[0].auth0_id)
+        self.assertEqual(data["email"], "user0@example.com")
+        self.assertEqual(data["address"]["postcode"], "TW9 4DU")
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_detail_not_found(self):
+        response = self.get(reverse("api_account_detail", args=["auth0|unknown"]))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_not_allowed(self):
+        response = self.client.post(
+            self.detail_url, HTTP_AUTHORIZATION=f"Bearer {API_KEY}"
+        )
+
+        self.assertEqual(response.status_code, 405)
+
+    def test_not_modified(self):
+        etag = self.get(self.detail_url)["ETag"]
+
+        response = self.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_etag_changes_with_profile(self):
+        etag = self.get(self.detail_url)["ETag"]
+        profile_cache.set_profile(
+            self.users[0].auth0_id, {**make_user(0), "name": "Changed"}
+        )
+
+        response = self.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["name"], "Changed")
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_error_responses_have_no_etag(self):
+        response = self.get(reverse("api_account_detail", args=["auth0|unknown"]))
+
+        self.assertNotIn("ETag", response)
+
+    def test_list(self):
+        ids = [self.users[1].auth0_id, "auth0|unknown", self.users[0].auth0_id]
+
+        response = self.get(
+            reverse("api_account_list") + "?" + "&".join(f"id={i}" for i in ids)
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            [account["id"] for account in data["accounts"]],
+            [self.users[1].auth0_id, self.users[0].auth0_id],
+        )
+        self.assertEqual(data["not_found"], ["auth0|unknown"])
+
+    def test_list_requires_ids(self):
+        response = self.get(reverse("api_account_list"))
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_batch_size_limited(self):
+        response = self.get(reverse("api_account_list") + "?id=1&id=2&id=3&id=4")
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_duplicates_ignored(self):
+        auth0_id = self.users[0].auth0_id
+
+        response = self.get(
+            reverse("api_account_list") + f"?id={auth0_id}&id={auth0_id}"
+        )
+
+        self.assertEqual(len(response.json()["accounts"]), 1)
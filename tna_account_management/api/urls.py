@@ -0,0 +1,8 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path("accounts/", views.account_list, name="api_account_list"),
+    path("accounts/<str:auth0_id>/", views.account_detail, name="api_account_detail"),
+]
@@ -0,0 +1,147 @@
+import hashlib
+import logging
+from functools import wraps
+from typing import Any, Dict, Iterable
+
+from auth0.v3.exceptions import Auth0Error
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from tna_account_management.users import profile_cache
+from tna_account_management.users.models import User
+
+from .encoding import dumps
+
+logger = logging.getLogger(__name__)
+
+
+def json_response(request, data: Any, status: int = 200) -> HttpResponse:
+    """
+    Return `data` as JSON. Successful responses are given an ETag derived
+    from their content, so that clients can revalidate them cheaply with
+    'If-None-Match'. They must always be revalidated, as account data can
+    change at any time.
+    """
+    content = dumps(data)
+    response = HttpResponse(content, content_type="application/json", status=status)
+    if status == 200:
+        etag = f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+        response["ETag"] = etag
+        response = get_conditional_response(request, etag=etag, response=response)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def error_response(request, message: str, status: int) -> HttpResponse:
+    return json_response(request, {"error": message}, status=status)
+
+
+def api_key_required(view_func):
+    """
+    Only allow requests that include one of the keys in ``ACCOUNT_API_KEYS``
+    as a bearer token in the 'Authorization' header.
+    """
+
+    @wraps(view_func)
+    def wrapped_view(request, *args, **kwargs):
+        scheme, _, key = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not any(
+            constant_time_compare(key, valid_key)
+            for valid_key in settings.ACCOUNT_API_KEYS
+        ):
+            response = error_response(request, "Authentication required", 401)
+            response["WWW-Authenticate"] = "Bearer"
+            return response
+        return view_func(request, *args, **kwargs)
+
+    return wrapped_view
+
+
+def serialize_account(user: User) -> Dict[str, Any]:
+    updated_at = user.profile_updated_at
+    return {
+        "id": user.auth0_id,
+        "username": user.username,
+        "email": user.email,
+        "email_verified": user.email_verified,
+        "name": user.name,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "address": user.address.get_form_data() if user.address else None,
+        "date_joined": user.date_joined.isoformat(),
+        "last_login": user.last_login.isoformat() if user.last_login else None,
+        "updated_at": updated_at.isoformat() if updated_at else None,
+    }
+
+
+def get_accounts(auth0_ids: Iterable[str]) -> Dict[str, User]:
+    """
+    Return a dict of users for the supplied `auth0_ids`, with their profiles
+    populated, keyed by `auth0_id`. Only users that have an account here are
+    included, so lookups for unknown IDs never reach Auth0.
+    """
+    users = {
+        user.auth0_id: user
+        for user in User.objects.filter(auth0_id__in=auth0_ids, is_active=True)
+    }
+    profiles = profile_cache.get_profiles(users)
+    for auth0_id, user in list(users.items()):
+        try:
+            user.profile = profiles[auth0_id]
+        except KeyError:
+            # The user has been deleted from Auth0
+            del users[auth0_id]
+    return users
+
+
+@require_GET
+@api_key_required
+def account_detail(request, auth0_id):
+    try:
+        user = get_accounts([auth0_id])[auth0_id]
+    except KeyError:
+        return error_response(request, "Not found", 404)
+    except Auth0Error as e:
+        logger.warning(f"Unable to fetch profile for {auth0_id} from Auth0: {e}")
+        return error_response(request, "Account data is unavailable", 502)
+    return json_response(request, serialize_account(user))
+
+
+@require_GET
+@api_key_required
+def account_list(request):
+    """
+    Return data for the accounts with the IDs supplied as repeated 'id'
+    parameters (up to ``ACCOUNT_API_BATCH_SIZE`` of them), in the order
+    supplied, along with a list of any IDs that weren't found.
+    """
+    # Remove duplicates, preserving order
+    auth0_ids = list(dict.fromkeys(request.GET.getlist("id")))
+    if not auth0_ids:
+        return error_response(request, "At least one 'id' is required", 400)
+    if len(auth0_ids) > settings.ACCOUNT_API_BATCH_SIZE:
+        return error_response(
+            request,
+            f"No more than {settings.ACCOUNT_API_BATCH_SIZE} IDs can be requested "
+            "at once",
+            400,
+        )
+    try:
+        users = get_accounts(auth0_ids)
+    except Auth0Error as e:
+        logger.warning(f"Unable to fetch profiles from Auth0: {e}")
+        return error_response(request, "Account data is unavailable", 502)
+    return json_response(
+        request,
+        {
+            "accounts": [
+                serialize_account(users[auth0_id])
+                for auth0_id in auth0_ids
+                if auth0_id in users
+            ],
+            "not_found": [auth0_id for auth0_id in auth0_ids if auth0_id not in users],
+        },
+    )
@@ -0,0 +1,100 @@
+from typing import Any, Dict
+
+import requests
+from authlib.jose import JsonWebKey, jwt
+from authlib.jose.errors import JoseError
+from django.conf import settings
+from django.core.cache import cache
+
+JWKS_CACHE_KEY = "auth0-jwks"
+JWKS_FETCHED_CACHE_KEY = "auth0-jwks-fetched"
+
+# The minimum time (in seconds) between fetches of the key set, so that
+# tokens signed with unknown keys can't cause a fetch on every request
+JWKS_MIN_REFRESH_INTERVAL = 60
+
+BACKCHANNEL_LOGOUT_EVENT = "http://schemas.openid.net/event/backchannel-logout"
+
+
+class InvalidLogoutToken(Exception):
+    pass
+
+
+class JWKSUnavailable(Exception):
+    pass
+
+
+def get_jwks(refresh: bool = False) -> Dict[str, Any]:
+    """
+    Return the JSON Web Key Set for the Auth0 tenant, which is cached
+    (and shared between processes) for ``AUTH0_JWKS_CACHE_TIMEOUT``
+    seconds. Use ``refresh=True`` to bypass the cache, for example, if
+    a token is signed with a key that isn't in the cached set (which is
+    ignored if the set was fetched in the last JWKS_MIN_REFRESH_INTERVAL
+    seconds). Raises ``JWKSUnavailable`` if the set can't be fetched.
+    """
+    if refresh and not cache.add(
+        JWKS_FETCHED_CACHE_KEY, True, timeout=JWKS_MIN_REFRESH_INTERVAL
+    ):
+        refresh = False
+    jwks = None if refresh else cache.get(JWKS_CACHE_KEY)
+    if jwks is None:
+        try:
+            response = requests.get(
+                f"{settings.AUTH0_PROTOCOL}://{settings.AUTH0_DOMAIN}/.well-known/jwks.json",
+                timeout=5,
+            )
+            response.raise_for_status()
+            jwks = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise JWKSUnavailable(str(e)) from e
+        cache.set(JWKS_CACHE_KEY, jwks, timeout=settings.AUTH0_JWKS_CACHE_TIMEOUT)
+        cache.set(JWKS_FETCHED_CACHE_KEY, True, timeout=JWKS_MIN_REFRESH_INTERVAL)
+    return jwks
+
+
+def decode_logout_token(token: str, jwks: Dict[str, Any]):
+    claims = jwt.decode(
+        token,
+        JsonWebKey.import_key_set(jwks),
+        claims_options={
+            "iss": {"essential": True, "value": f"https://{settings.AUTH0_DOMAIN}/"},
+            "aud": {"essential": True, "value": settings.AUTH0_CLIENT_ID},
+            "iat": {"essential": True},
+        },
+    )
+    claims.validate(leeway=60)
+    return claims
+
+
+def validate_logout_token(token: str) -> Dict[str, Any]:
+    """
+    Validate a logout token sent to the OIDC back-channel logout endpoint,
+    and return its claims. Raises ``InvalidLogoutToken`` if the token is
+    not correctly signed, or does not meet the requirements in:
+    https://openid.net/specs/openid-connect-backchannel-1_0.html#Validation
+    Raises ``JWKSUnavailable`` if the signing keys can't be fetched.
+    """
+    try:
+        try:
+            claims = decode_logout_token(token, get_jwks())
+        except ValueError:
+            # The token was signed with a key we don't know about yet (the
+            # signing keys may have been rotated), so refresh and try again
+            claims = decode_logout_token(token, get_jwks(refresh=True))
+    except (JoseError, ValueError) as e:
+        raise InvalidLogoutToken(str(e)) from e
+
+    if not isinstance(claims.get("events", {}).get(BACKCHANNEL_LOGOUT_EVENT), dict):
+        raise InvalidLogoutToken("The 'events' claim is missing or invalid.")
+    if "nonce" in claims:
+        raise InvalidLogoutToken("Logout tokens must not contain a 'nonce' claim.")
+    if not claims.get("sub") and not claims.get("sid"):
+        raise InvalidLogoutToken("Logout tokens must contain a 'sub' or 'sid' claim.")
+
+    # Reject tokens that have already been used
+    if jti := claims.get("jti"):
+        if not cache.add(f"auth0-logout-jti:{jti}", True, timeout=60 * 10):
+            raise InvalidLogoutToken("The token has already been used.")
+
+    return dict(claims)
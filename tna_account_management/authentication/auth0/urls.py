@@ -8,4 +8,9 @@ urlpatterns = [
     path("logout/", views.logout, name="auth_logout"),
     path("logout/success/", views.logout_success, name="auth_logout_success"),
     path("authorize/", views.authorize, name="auth_authorize"),
+    path(
+        "backchannel-logout/",
+        views.backchannel_logout,
+        name="auth_backchannel_logout",
+    ),
 ]
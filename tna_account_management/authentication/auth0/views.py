@@ -1,3 +1,4 @@
+import logging
 from urllib.parse import quote_plus, urlencode, urlparse
 
 from authlib.integrations.django_client import OAuth
@@ -5,9 +6,20 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth import login as auth_login
 from django.contrib.auth import logout as auth_logout
-from django.http import HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseRedirect
 from django.shortcuts import redirect, render
 from django.urls import reverse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from tna_account_management.users import profile_cache
+from tna_account_management.users.middleware import PROFILE_SESSION_KEY
+from tna_account_management.users.models import UserEmail, UserSession
+
+from .tokens import InvalidLogoutToken, JWKSUnavailable, validate_logout_token
+
+logger = logging.getLogger(__name__)
 
 PROVIDER_NAME = "auth0"
 
@@ -21,7 +33,7 @@ oauth.register(
     client_kwargs={
         "scope": "openid profile email",
     },
-    server_metadata_url=f"https://{settings.AUTH0_DOMAIN}/.well-known/openid-configuration",
+    server_metadata_url=f"{settings.AUTH0_PROTOCOL}://{settings.AUTH0_DOMAIN}/.well-known/openid-configuration",
 )
 
 
@@ -67,19 +79,25 @@ def authorize(request):
         user.set_username(user_info.get("nickname"))
         user.set_unusable_password()
         user.save()
+    else:
+        # Ensure profile changes made elsewhere are reflected straight away
+        profile_cache.evict_profile(auth0_id)
 
     auth_login(
         request,
         user,
         backend="tna_account_management.authentication.auth0.backend.Auth0Backend",
     )
+    request.session[PROFILE_SESSION_KEY] = auth0_id
+    UserEmail.record(user, user_info.get("email"))
+    UserSession.record(request, user, auth0_sid=user_info.get("sid"))
     return HttpResponseRedirect(success_url)
 
 
 def logout(request):
     auth_logout(request)
     return redirect(
-        f"https://{settings.AUTH0_DOMAIN}/v2/logout?"
+        f"{settings.AUTH0_PROTOCOL}://{settings.AUTH0_DOMAIN}/v2/logout?"
         + urlencode(
             {
                 "returnTo": request.build_absolute_uri(settings.LOGOUT_REDIRECT_URL),
@@ -92,3 +110,34 @@ def logout(request):
 
 def logout_success(request):
     return render(request, "patterns/pages/auth/logout_success.html")
+
+
+@csrf_exempt
+@never_cache
+@require_POST
+def backchannel_logout(request):
+    """
+    Receives logout tokens from Auth0 when a user logs out of another
+    application sharing the tenant, and ends all of that user's sessions
+    here too. See: https://openid.net/specs/openid-connect-backchannel-1_0.html
+    """
+    try:
+        claims = validate_logout_token(request.POST.get("logout_token", ""))
+    except InvalidLogoutToken as e:
+        logger.warning(f"Rejected back-channel logout token: {e}")
+        return HttpResponseBadRequest()
+    except JWKSUnavailable as e:
+        logger.warning(f"Unable to fetch the Auth0 signing keys: {e}")
+        return HttpResponse(status=503)
+
+    if sub := claims.get("sub"):
+        sessions = UserSession.objects.filter(user__auth0_id=sub)
+        auth0_ids = {sub}
+    else:
+        sessions = UserSession.objects.filter(auth0_sid=claims["sid"])
+        auth0_ids = set(sessions.values_list("user__auth0_id", flat=True))
+
+    sessions.invalidate()
+    for auth0_id in auth0_ids:
+        profile_cache.evict_profile(auth0_id)
+    return HttpResponse()
@@ -1,12 +1,23 @@
 from django.contrib.auth.forms import AuthenticationForm
-from tbxforms.forms import BaseForm as HelperMixin
+from django.core.exceptions import ValidationError
 from tbxforms.layout import Button
 
+from tna_account_management.utils.forms import HelperMixin
+
+from . import throttling
+
 
 class CrispyAuthenticationForm(HelperMixin, AuthenticationForm):
-    @property
-    def helper(self):
-        fh = super().helper
+    error_messages = {
+        **AuthenticationForm.error_messages,
+        "throttled": (
+            "Too many sign in attempts have been made. Please wait a few minutes "
+            "and try again."
+        ),
+    }
+
+    def build_helper(self):
+        fh = super().build_helper()
         fh.layout.extend(
             [
                 Button.primary(
@@ -17,3 +28,19 @@ class CrispyAuthenticationForm(HelperMixin, AuthenticationForm):
             ]
         )
         return fh
+
+    def clean(self):
+        # Throttled attempts are rejected before authenticate() is called,
+        # so that they never incur the cost of hashing the password
+        username = self.cleaned_data.get("username")
+        if (
+            username is not None
+            and self.request is not None
+            and not throttling.allow_login_attempt(self.request, username)
+        ):
+            raise ValidationError(self.error_messages["throttled"], code="throttled")
+        return super().clean()
+
+    @property
+    def is_throttled(self) -> bool:
+        return self.has_error("__all__", "throttled")
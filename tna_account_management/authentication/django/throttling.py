@@ -0,0 +1,50 @@
+from django.conf import settings
+
+from tna_account_management.utils.ratelimit import SlidingWindowRateLimiter
+
+
+def get_ip_limiter() -> SlidingWindowRateLimiter:
+    return SlidingWindowRateLimiter(
+        "login-ip", settings.LOGIN_THROTTLE_IP_LIMIT, settings.LOGIN_THROTTLE_WINDOW
+    )
+
+
+def get_username_limiter() -> SlidingWindowRateLimiter:
+    return SlidingWindowRateLimiter(
+        "login-username",
+        settings.LOGIN_THROTTLE_USERNAME_LIMIT,
+        settings.LOGIN_THROTTLE_WINDOW,
+    )
+
+
+def get_client_ip(request) -> str:
+    if settings.LOGIN_THROTTLE_USE_X_FORWARDED_FOR:
+        # The last address is the one added by our own proxy, which can't be
+        # spoofed by the client
+        forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR", "")
+        addresses = [a.strip() for a in forwarded_for.split(",") if a.strip()]
+        if addresses:
+            return addresses[-1]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def normalize_username(username: str) -> str:
+    return username.strip().lower()
+
+
+def allow_login_attempt(request, username: str) -> bool:
+    """
+    Record a login attempt for the client and username, and return whether
+    it should be allowed to go ahead. Both limits apply, so that an attacker
+    spreading attempts across usernames is still limited by IP address (and
+    vice versa). The IP address is checked first, and attempts it refuses
+    aren't counted against the username, so that a client that has been
+    throttled can't go on to lock other people out of their accounts.
+    """
+    if not get_ip_limiter().hit(get_client_ip(request)):
+        return False
+    return get_username_limiter().hit(normalize_username(username))
+
+
+def reset_username_attempts(username: str) -> None:
+    get_username_limiter().reset(normalize_username(username))
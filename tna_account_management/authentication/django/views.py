@@ -6,14 +6,18 @@ from django.contrib.auth import logout as auth_logout
 from django.http import HttpResponse
 from django.shortcuts import redirect, render
 
+from . import throttling
 from .forms import CrispyAuthenticationForm
 
 
 def login(request):
     form = CrispyAuthenticationForm(
-        data=request.POST or None, initial={"next": request.GET.get("next", "")}
+        request,
+        data=request.POST or None,
+        initial={"next": request.GET.get("next", "")},
     )
     if request.POST and form.is_valid():
+        throttling.reset_username_attempts(form.cleaned_data["username"])
         auth_login(request, form.get_user())
         redirect_to = form.cleaned_data.get("next") or settings.LOGIN_REDIRECT_URL
         if redirect_to != settings.LOGIN_REDIRECT_URL:
@@ -21,7 +25,12 @@ def login(request):
             if parsed.netloc and parsed.netloc != request.META.get("HTTP_HOST"):
                 redirect_to = settings.LOGIN_REDIRECT_URL
         return redirect(redirect_to)
-    return render(request, "patterns/pages/auth/login.html", {"form": form})
+    return render(
+        request,
+        "patterns/pages/auth/login.html",
+        {"form": form},
+        status=429 if form.is_throttled else 200,
+    )
 
 
 def register(request):
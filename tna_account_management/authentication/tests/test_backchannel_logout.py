@@ -0,0 +1,179 @@
+from unittest import mock
+
+import requests
+from authlib.jose import JsonWebKey, jwt
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+
+from tna_account_management.authentication.auth0 import tokens, views
+from tna_account_management.users import profile_cache
+from tna_account_management.users.models import User, UserSession
+from tna_account_management.utils.fake_auth0 import FakeAuth0Server
+
+CLIENT_ID = "test-client"
+
+
+class BackchannelLogoutTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The fake server signs tokens with its own key, and serves the
+        # public half from its JWKS endpoint
+        cls.server = FakeAuth0Server(user_count=0).start()
+        cls.settings_override = override_settings(
+            AUTH0_DOMAIN=cls.server.domain,
+            AUTH0_PROTOCOL="http",
+            AUTH0_CLIENT_ID=CLIENT_ID,
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.server.reset_counts()
+        self.user = User.objects.create(username="user", auth0_id="auth0|user")
+        self.other_user = User.objects.create(username="other", auth0_id="auth0|other")
+        self.sessions = [
+            self.create_session(self.user, "sid-1"),
+            self.create_session(self.user, "sid-2"),
+            self.create_session(self.other_user, "sid-3"),
+        ]
+
+    def create_session(self, user, auth0_sid):
+        store = SessionStore()
+        store["user"] = user.pk
+        store.create()
+        return UserSession.objects.create(
+            user=user, session_key=store.session_key, auth0_sid=auth0_sid
+        )
+
+    def post(self, token):
+        request = RequestFactory().post("/", {"logout_token": token})
+        return views.backchannel_logout(request)
+
+    def assertRejected(self, token):
+        with self.assertLogs(views.logger, "WARNING"):
+            self.assertEqual(self.post(token).status_code, 400)
+
+    def remaining_sids(self):
+        return set(UserSession.objects.values_list("auth0_sid", flat=True))
+
+    def test_sub_ends_all_sessions_for_user(self):
+        profile_cache.set_profile(self.user.auth0_id, {"user_id": self.user.auth0_id})
+
+        response = self.post(
+            self.server.make_logout_token(CLIENT_ID, sub=self.user.auth0_id)
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.remaining_sids(), {"sid-3"})
+        self.assertFalse(SessionStore().exists(self.sessions[0].session_key))
+        self.assertTrue(SessionStore().exists(self.sessions[2].session_key))
+        self.assertIsNone(profile_cache.get_cached_profile(self.user.auth0_id))
+
+    def test_sid_ends_matching_session(self):
+        response = self.post(self.server.make_logout_token(CLIENT_ID, sid="sid-2"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.remaining_sids(), {"sid-1", "sid-3"})
+
+    def test_replayed_token_rejected(self):
+        token = self.server.make_logout_token(CLIENT_ID, sid="sid-1")
+        self.assertEqual(self.post(token).status_code, 200)
+
+        self.create_session(self.user, "sid-1")
+        self.assertRejected(token)
+        self.assertIn("sid-1", self.remaining_sids())
+
+    def test_bad_signature_rejected(self):
+        # Signed with a different key, claiming to be the server's
+        other_key = JsonWebKey.generate_key("RSA", 2048, is_private=True)
+        claims = jwt.decode(
+            self.server.make_logout_token(CLIENT_ID, sub=self.user.auth0_id),
+            self.server.signing_key,
+        )
+        header = {"alg": "RS256", "kid": self.server.signing_key.as_dict()["kid"]}
+        token = jwt.encode(header, dict(claims), other_key).decode()
+
+        self.assertRejected(token)
+        self.assertEqual(len(self.remaining_sids()), 3)
+
+    def test_wrong_audience_rejected(self):
+        token = self.server.make_logout_token("another-client", sub=self.user.auth0_id)
+
+        self.assertRejected(token)
+        self.assertEqual(len(self.remaining_sids()), 3)
+
+    def test_token_without_sub_or_sid_rejected(self):
+        self.assertRejected(self.server.make_logout_token(CLIENT_ID))
+
+    def test_token_without_logout_event_rejected(self):
+        claims = jwt.decode(
+            self.server.make_logout_token(CLIENT_ID, sub=self.user.auth0_id),
+            self.server.signing_key,
+        )
+        del claims["events"]
+
+        self.assertRejected(self.server.sign(dict(claims)))
+
+    def test_missing_token_rejected(self):
+        self.assertRejected("")
+
+    def test_jwks_cached(self):
+        for sid in ("sid-1", "sid-2"):
+            self.post(self.server.make_logout_token(CLIENT_ID, sid=sid))
+
+        self.assertEqual(self.server.reset_counts().get("jwks"), 1)
+
+    def test_jwks_refreshed_for_unknown_key(self):
+        # A key set from before the signing keys were rotated
+        old_key = JsonWebKey.generate_key(
+            "RSA", 2048, is_private=True, options={"kid": "old"}
+        )
+        cache.set(tokens.JWKS_CACHE_KEY, {"keys": [old_key.as_dict()]})
+
+        response = self.post(self.server.make_logout_token(CLIENT_ID, sid="sid-1"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.reset_counts().get("jwks"), 1)
+        self.assertEqual(
+            cache.get(tokens.JWKS_CACHE_KEY)["keys"][0]["kid"],
+            self.server.signing_key.as_dict()["kid"],
+        )
+
+    def test_jwks_refresh_limited(self):
+        # Signed with a key that isn't in the server's set
+        other_key = JsonWebKey.generate_key(
+            "RSA", 2048, is_private=True, options={"kid": "unknown"}
+        )
+        claims = jwt.decode(
+            self.server.make_logout_token(CLIENT_ID, sid="sid-1"),
+            self.server.signing_key,
+        )
+        token = jwt.encode({"alg": "RS256", "kid": "unknown"}, dict(claims), other_key)
+
+        for _ in range(3):
+            self.assertRejected(token.decode())
+
+        # The set was fetched once, and not refetched for each token
+        self.assertEqual(self.server.reset_counts().get("jwks"), 1)
+        self.assertEqual(len(self.remaining_sids()), 3)
+
+    def test_jwks_unavailable(self):
+        token = self.server.make_logout_token(CLIENT_ID, sid="sid-1")
+
+        with mock.patch.object(
+            tokens.requests, "get", side_effect=requests.ConnectionError("Refused")
+        ), self.assertLogs(views.logger, "WARNING"):
+            response = self.post(token)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.remaining_sids()), 3)
+        # The token can be used again once the keys are available
+        self.assertEqual(self.post(token).status_code, 200)
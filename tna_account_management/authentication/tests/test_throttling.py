@@ -0,0 +1,145 @@
+from unittest import mock
+
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import include, path
+
+from tna_account_management.authentication.django import throttling
+from tna_account_management.authentication.django.forms import CrispyAuthenticationForm
+from tna_account_management.users.models import User
+from tna_account_management.utils import ratelimit
+
+# The 'django' provider's views, whichever provider is configured
+urlpatterns = [
+    path("auth/", include("tna_account_management.authentication.django.urls")),
+    path("", include("tna_account_management.urls")),
+]
+
+
+class ThrottlingTestMixin:
+    def setUp(self):
+        settings_override = override_settings(
+            LOGIN_THROTTLE_IP_LIMIT=5,
+            LOGIN_THROTTLE_USERNAME_LIMIT=2,
+            LOGIN_THROTTLE_WINDOW=60,
+            LOGIN_THROTTLE_USE_X_FORWARDED_FOR=False,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Hits are tracked in this process, from a clean slate
+        for patcher in [
+            mock.patch.object(ratelimit, "get_redis_client", return_value=None),
+            mock.patch.object(ratelimit, "_local_windows", {}),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+
+    def make_request(self, ip="192.0.2.1"):
+        return self.factory.post("/auth/login/", REMOTE_ADDR=ip)
+
+
+class AllowLoginAttemptTestCase(ThrottlingTestMixin, TestCase):
+    def attempt(self, username, ip="192.0.2.1"):
+        return throttling.allow_login_attempt(self.make_request(ip), username)
+
+    def test_username_limit(self):
+        self.assertEqual([self.attempt("user") for _ in range(3)], [True, True, False])
+        # Usernames are compared case-insensitively
+        self.assertFalse(self.attempt(" USER "))
+        self.assertTrue(self.attempt("other"))
+
+    def test_ip_limit(self):
+        self.assertEqual(
+            [self.attempt(f"user{i}") for i in range(6)], [True] * 5 + [False]
+        )
+        self.assertTrue(self.attempt("user6", ip="192.0.2.2"))
+
+    def test_ip_refusal_not_counted_against_username(self):
+        for i in range(5):
+            self.attempt(f"user{i}", ip="192.0.2.1")
+        for _ in range(5):
+            self.assertFalse(self.attempt("victim", ip="192.0.2.1"))
+        # The owner of the account can still sign in from elsewhere
+        self.assertTrue(self.attempt("victim", ip="192.0.2.2"))
+
+    def test_reset_username_attempts(self):
+        self.attempt("user")
+        self.attempt("user")
+        throttling.reset_username_attempts("User")
+        self.assertTrue(self.attempt("user", ip="192.0.2.2"))
+
+    def test_get_client_ip(self):
+        request = self.factory.get(
+            "/", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="1.1.1.1, 192.0.2.1"
+        )
+        self.assertEqual(throttling.get_client_ip(request), "10.0.0.1")
+        with override_settings(LOGIN_THROTTLE_USE_X_FORWARDED_FOR=True):
+            # Only the address added by our own proxy is trusted
+            self.assertEqual(throttling.get_client_ip(request), "192.0.2.1")
+            request.META["HTTP_X_FORWARDED_FOR"] = ""
+            self.assertEqual(throttling.get_client_ip(request), "10.0.0.1")
+
+
+class ThrottledFormTestCase(ThrottlingTestMixin, TestCase):
+    def get_form(self, request=None):
+        return CrispyAuthenticationForm(
+            request or self.make_request(),
+            data={"username": "user", "password": "wrong"},
+        )
+
+    def test_throttled_before_authenticate(self):
+        with mock.patch(
+            "django.contrib.auth.forms.authenticate", return_value=None
+        ) as authenticate:
+            for _ in range(2):
+                form = self.get_form()
+                self.assertFalse(form.is_valid())
+                self.assertFalse(form.is_throttled)
+            form = self.get_form()
+            self.assertFalse(form.is_valid())
+        self.assertTrue(form.is_throttled)
+        self.assertEqual(authenticate.call_count, 2)
+
+    def test_not_throttled_without_request(self):
+        for _ in range(3):
+            form = CrispyAuthenticationForm(
+                data={"username": "user", "password": "wrong"}
+            )
+            self.assertFalse(form.is_valid())
+            self.assertFalse(form.is_throttled)
+
+
+@override_settings(
+    ROOT_URLCONF=__name__,
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+)
+class LoginViewTestCase(ThrottlingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username="user")
+        self.user.set_password("correct-password")
+        self.user.save()
+
+    def login(self, password):
+        return self.client.post(
+            "/auth/login/", {"username": "user", "password": password}
+        )
+
+    def test_throttled_response(self):
+        with self.assertLogs("django.request", "WARNING"):
+            self.assertEqual(
+                [self.login("wrong").status_code for _ in range(3)], [200, 200, 429]
+            )
+            # Even the correct password is refused while throttled
+            response = self.login("correct-password")
+        self.assertEqual(response.status_code, 429)
+        self.assertContains(response, "Too many sign in attempts", status_code=429)
+        self.assertNotIn("_auth_user_id", self.client.session)
+
+    def test_successful_login_resets_username_attempts(self):
+        self.login("wrong")
+        self.assertEqual(self.login("correct-password").status_code, 302)
+        self.client.logout()
+        self.assertEqual(
+            [self.login("wrong").status_code for _ in range(2)], [200, 200]
+        )
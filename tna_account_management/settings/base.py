@@ -50,6 +50,7 @@ INSTALLED_APPS = [
     "tbxforms",
     "tna_account_management.users",
     "tna_account_management.authentication",
+    "tna_account_management.utils",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -74,6 +75,7 @@ MIDDLEWARE = [
     # http://whitenoise.evans.io/en/stable/#quickstart-for-django-apps
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "tna_account_management.users.middleware.ProfilePrefetchMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -168,10 +170,22 @@ AUTH_PASSWORD_VALIDATORS = [
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"
     },
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
-    {"NAME": "django.contrib.auth.password_validation.CommonPasswordValidator"},
+    {
+        "NAME": "tna_account_management.utils.password_validation.CommonPasswordValidator"
+    },
     {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
 ]
 
+# Reject passwords found in a local index of breached password hashes, if one
+# has been built with the 'build_breached_password_index' command
+if "BREACHED_PASSWORD_INDEX_PATH" in env:
+    AUTH_PASSWORD_VALIDATORS.append(
+        {
+            "NAME": "tna_account_management.utils.password_validation.BreachedPasswordValidator",
+            "OPTIONS": {"index_path": env["BREACHED_PASSWORD_INDEX_PATH"]},
+        }
+    )
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/stable/topics/i18n/
@@ -469,6 +483,80 @@ AUTHENTICATION_BACKENDS = [
 # used by 'tna_account_management.authentication'
 AUTHENTICATION_PROVIDER = "django"
 
+# Login throttling for the 'django' authentication provider. Attempts over
+# either limit within the window (in seconds) are rejected without checking
+# the password.
+LOGIN_THROTTLE_WINDOW = int(env.get("LOGIN_THROTTLE_WINDOW", 300))
+LOGIN_THROTTLE_IP_LIMIT = int(env.get("LOGIN_THROTTLE_IP_LIMIT", 30))
+LOGIN_THROTTLE_USERNAME_LIMIT = int(env.get("LOGIN_THROTTLE_USERNAME_LIMIT", 10))
+# Only enable this when running behind a proxy that sets X-Forwarded-For
+# (such as Heroku's router), otherwise clients can choose their own address
+LOGIN_THROTTLE_USE_X_FORWARDED_FOR = (
+    env.get("LOGIN_THROTTLE_USE_X_FORWARDED_FOR", "false").lower() == "true"
+)
+
+# Read-only account API for other TNA systems. Requests must include one of
+# these comma-separated keys as a bearer token; the API is unusable without.
+ACCOUNT_API_KEYS = [
+    key.strip() for key in env.get("ACCOUNT_API_KEYS", "").split(",") if key.strip()
+]
+# The maximum number of accounts that can be requested at once
+ACCOUNT_API_BATCH_SIZE = int(env.get("ACCOUNT_API_BATCH_SIZE", 100))
+
+# Notifications of profile changes for other TNA systems (see users.outbox),
+# delivered by the 'dispatch_outbox' command. Endpoints are given as
+# comma-separated 'name=url' pairs, and nothing is recorded without any.
+OUTBOX_ENDPOINTS = dict(
+    item.strip().split("=", 1)
+    for item in env.get("OUTBOX_ENDPOINTS", "").split(",")
+    if "=" in item
+)
+# Required when OUTBOX_ENDPOINTS is set
+OUTBOX_SIGNING_SECRET = env.get("OUTBOX_SIGNING_SECRET", "")
+# The number of messages sent to an endpoint in each request, and the number
+# of requests each dispatcher makes to an endpoint at once
+OUTBOX_BATCH_SIZE = int(env.get("OUTBOX_BATCH_SIZE", 100))
+OUTBOX_ENDPOINT_CONCURRENCY = int(env.get("OUTBOX_ENDPOINT_CONCURRENCY", 2))
+OUTBOX_REQUEST_TIMEOUT = int(env.get("OUTBOX_REQUEST_TIMEOUT", 10))
+# Failed deliveries are retried after OUTBOX_RETRY_BASE_DELAY seconds, then
+# twice as long after each failure (up to OUTBOX_RETRY_MAX_DELAY seconds),
+# until OUTBOX_MAX_ATTEMPTS attempts have failed (2-3 days by default)
+OUTBOX_RETRY_BASE_DELAY = float(env.get("OUTBOX_RETRY_BASE_DELAY", 10))
+OUTBOX_RETRY_MAX_DELAY = float(env.get("OUTBOX_RETRY_MAX_DELAY", 60 * 60))
+OUTBOX_MAX_ATTEMPTS = int(env.get("OUTBOX_MAX_ATTEMPTS", 80))
+# How long (in seconds) a message can be held, waiting for its change to be
+# made in Auth0, before the dispatcher checks whether the change was made
+OUTBOX_HOLD_TIMEOUT = int(env.get("OUTBOX_HOLD_TIMEOUT", 5 * 60))
+# How long (in days) delivered messages are kept for (0 to keep them)
+OUTBOX_RETENTION_DAYS = int(env.get("OUTBOX_RETENTION_DAYS", 7))
+
+# Postcode lookup and street autocomplete on the address form, using a local
+# index built from OS Open Names with the 'build_address_index' command.
+# Both are disabled unless this is set.
+ADDRESS_LOOKUP_INDEX_PATH = env.get("ADDRESS_LOOKUP_INDEX_PATH")
+
+# Avatars are copied from users' profile pictures into the default file
+# storage, resized to each of these sizes (in pixels) when Pillow is installed
+AVATAR_SIZES = [32, 64, 128]
+# A function that takes a picture URL and returns its content, which can be
+# replaced with a stub in tests
+AVATAR_FETCHER = env.get(
+    "AVATAR_FETCHER", "tna_account_management.users.avatars.fetch_avatar"
+)
+# Pictures are only fetched over HTTPS from these hosts (as for ALLOWED_HOSTS,
+# a leading '.' also matches subdomains), as users choose their picture URLs
+AVATAR_ALLOWED_HOSTS = env.get(
+    "AVATAR_ALLOWED_HOSTS",
+    ".gravatar.com,.googleusercontent.com,.fbsbx.com,cdn.auth0.com",
+).split(",")
+AVATAR_FETCH_TIMEOUT = int(env.get("AVATAR_FETCH_TIMEOUT", 5))
+AVATAR_MAX_BYTES = 5 * 1024 * 1024
+# How long (in seconds) to use the default avatar before retrying a picture
+# that couldn't be fetched
+AVATAR_FAILURE_TIMEOUT = 60 * 60
+# The number of pictures each process fetches at once
+AVATAR_MAX_WORKERS = int(env.get("AVATAR_MAX_WORKERS", 2))
+
 # Styleguide
 PATTERN_LIBRARY_ENABLED = env.get("PATTERN_LIBRARY_ENABLED", "false").lower() == "true"
 PATTERN_LIBRARY = {
@@ -489,6 +577,10 @@ GOOGLE_TAG_MANAGER_ID = env.get("GOOGLE_TAG_MANAGER_ID")
 # Allows us to toggle search indexing via an environment variable.
 SEO_NOINDEX = env.get("SEO_NOINDEX", "false").lower() == "true"
 
+# Identifies the deployed release (using the same sources as Sentry), so that
+# ETags generated for pages change when templates do
+RELEASE_VERSION = get_default_release() or ""
+
 TESTING = "test" in sys.argv
 
 # By default, Django uses a computationally difficult algorithm for passwords hashing.
@@ -510,11 +602,79 @@ TBXFORMS_ALLOW_HTML_LABEL = False
 TBXFORMS_ALLOW_HTML_BUTTON = False
 
 
+# Audit log (see users.audit): the number of events each process buffers
+# before new ones are dropped, the number written to the database at once,
+# and how long (in seconds) a request waits for space in a full buffer
+AUDIT_LOG_BUFFER_SIZE = int(env.get("AUDIT_LOG_BUFFER_SIZE", 10000))
+AUDIT_LOG_BATCH_SIZE = int(env.get("AUDIT_LOG_BATCH_SIZE", 500))
+AUDIT_LOG_BLOCK_TIMEOUT = float(env.get("AUDIT_LOG_BLOCK_TIMEOUT", 0.1))
+# Write each event as it is recorded, in the current transaction, instead
+AUDIT_LOG_SYNCHRONOUS = env.get("AUDIT_LOG_SYNCHRONOUS", "false").lower() == "true"
+
+
 # Auth0 configuration
 # -----------------------------------------------------------------------------
 AUTH0_DOMAIN = env.get("AUTH0_DOMAIN")
 AUTH0_CLIENT_ID = env.get("AUTH0_CLIENT_ID")
 AUTH0_CLIENT_SECRET = env.get("AUTH0_CLIENT_SECRET")
+
+# Only change this when pointing AUTH0_DOMAIN at a local stand-in for Auth0,
+# such as the one started by the 'run_fake_auth0' management command
+AUTH0_PROTOCOL = env.get("AUTH0_PROTOCOL", "https")
+
+# How long (in seconds) Auth0 user profiles are cached for before being
+# fetched again from the Management API
+AUTH0_PROFILE_CACHE_TIMEOUT = int(env.get("AUTH0_PROFILE_CACHE_TIMEOUT", 300))
+# After that, how long (in seconds) the cached copy can still be used while
+# it is refreshed in the background by one of a few threads per process (set
+# to 0 to always fetch expired profiles during the request)
+AUTH0_PROFILE_CACHE_STALE_TIMEOUT = int(
+    env.get("AUTH0_PROFILE_CACHE_STALE_TIMEOUT", 60 * 60)
+)
+AUTH0_PROFILE_REFRESH_MAX_WORKERS = int(env.get("AUTH0_PROFILE_REFRESH_MAX_WORKERS", 2))
+# How long (in seconds) to keep using a stale profile after refreshing it fails
+AUTH0_PROFILE_REFRESH_RETRY_DELAY = 30
+# The number of uncached profiles each process can prefetch at once (see
+# users.middleware.ProfilePrefetchMiddleware), which should be at least the
+# number of requests it handles concurrently
+AUTH0_PROFILE_PREFETCH_MAX_WORKERS = int(
+    env.get("AUTH0_PROFILE_PREFETCH_MAX_WORKERS", 4)
+)
+
+# How long (in seconds) the result of checking with Auth0 whether an email
+# address is already in use is cached for (see users.email_availability).
+# Addresses found to be free are checked again sooner, as they may be taken.
+EMAIL_AVAILABILITY_CACHE_TIMEOUT = int(
+    env.get("EMAIL_AVAILABILITY_CACHE_TIMEOUT", 60 * 60)
+)
+EMAIL_AVAILABILITY_NEGATIVE_CACHE_TIMEOUT = int(
+    env.get("EMAIL_AVAILABILITY_NEGATIVE_CACHE_TIMEOUT", 60)
+)
+
+# How long (in seconds) the tenant's JSON Web Key Set is cached for, when
+# validating tokens sent to the back-channel logout endpoint
+AUTH0_JWKS_CACHE_TIMEOUT = int(env.get("AUTH0_JWKS_CACHE_TIMEOUT", 3600))
+
+# The number of Management API requests per second that bulk operations may
+# make between them, which should leave headroom below the tenant's own limit
+AUTH0_MANAGEMENT_API_RATE_LIMIT = int(env.get("AUTH0_MANAGEMENT_API_RATE_LIMIT", 5))
+
+# Admin bulk actions: the number of requests each process makes to Auth0
+# concurrently, and the number of selected users above which the action is
+# run in the background, rather than during the admin request
+BULK_ACTION_MAX_WORKERS = int(env.get("BULK_ACTION_MAX_WORKERS", 4))
+BULK_ACTION_BACKGROUND_THRESHOLD = int(env.get("BULK_ACTION_BACKGROUND_THRESHOLD", 20))
+
+# How long (in seconds) the list of roles defined in Auth0, and the roles
+# assigned to each user, are cached for. Changes made through this site
+# take effect straight away; changes made elsewhere take up to this long.
+AUTH0_ROLES_CACHE_TIMEOUT = int(env.get("AUTH0_ROLES_CACHE_TIMEOUT", 3600))
+AUTH0_USER_ROLES_CACHE_TIMEOUT = int(env.get("AUTH0_USER_ROLES_CACHE_TIMEOUT", 300))
+
+# The number of users whose roles each process fetches from Auth0 at once,
+# when roles for several users are needed (such as in admin listings)
+AUTH0_ROLE_LOOKUP_MAX_WORKERS = int(env.get("AUTH0_ROLE_LOOKUP_MAX_WORKERS", 4))
+
 if AUTH0_DOMAIN:
     AUTHENTICATION_PROVIDER = "auth0"
     AUTHENTICATION_BACKENDS.append(
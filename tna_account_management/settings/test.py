@@ -1,3 +1,6 @@
+import os
+import tempfile
+
 from .base import *  # noqa
 
 # #############
@@ -21,3 +24,23 @@ SECURE_HSTS_SECONDS = 0
 # By default, Django uses a computationally difficult algorithm for passwords hashing.
 # We don't need such a strong algorithm in tests, so use MD5
 PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+# Use a local memory cache, so that tests don't need a cache table and each
+# test process starts with an empty cache
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+
+# Write audit events in each test's transaction, rather than from a
+# background thread that would commit them outside it
+AUDIT_LOG_SYNCHRONOUS = True
+
+# Some tests write from background threads (like the outbox dispatcher's),
+# which an in-memory SQLite database would lock against each other, so use a
+# file instead
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":  # noqa: F405
+    DATABASES["default"]["TEST"] = {  # noqa: F405
+        "NAME": os.path.join(
+            tempfile.gettempdir(), "tna_account_management_test.sqlite3"
+        )
+    }
@@ -0,0 +1,112 @@
+const DEBOUNCE_DELAY = 150;
+
+class AddressLookup {
+    static selector() {
+        return '[data-address-lookup-postcode]';
+    }
+
+    constructor(node) {
+        this.postcode = node;
+        this.form = node.form;
+        this.street = this.form.querySelector('[data-address-lookup-streets]');
+        this.lastPostcode = '';
+        this.timeout = null;
+
+        if (this.street) {
+            this.suggestions = document.createElement('datalist');
+            this.suggestions.id = `${this.street.id}-suggestions`;
+            this.street.setAttribute('list', this.suggestions.id);
+            this.street.after(this.suggestions);
+        }
+        this.bindEvents();
+    }
+
+    field(name) {
+        return this.form.querySelector(`[name="${name}"]`);
+    }
+
+    fillIfEmpty(name, value) {
+        const field = this.field(name);
+        if (field && !field.value && value) {
+            field.value = value;
+        }
+    }
+
+    setSuggestions(items) {
+        if (!this.suggestions) {
+            return;
+        }
+        this.suggestions.replaceChildren(
+            ...items.map(({ value, label }) => {
+                const option = document.createElement('option');
+                option.value = value;
+                if (label) {
+                    option.label = label;
+                }
+                return option;
+            }),
+        );
+    }
+
+    async fetchJSON(url, params) {
+        const response = await fetch(`${url}?${new URLSearchParams(params)}`, {
+            headers: { Accept: 'application/json' },
+            credentials: 'same-origin',
+        });
+        return response.ok ? response.json() : null;
+    }
+
+    async lookupPostcode() {
+        const postcode = this.postcode.value.trim();
+        if (postcode === this.lastPostcode) {
+            return;
+        }
+        this.lastPostcode = postcode;
+        const result = await this.fetchJSON(
+            this.postcode.dataset.addressLookupPostcode,
+            { postcode },
+        );
+        if (!result) {
+            return;
+        }
+        this.postcode.value = result.postcode;
+        this.fillIfEmpty('town', result.town);
+        this.fillIfEmpty('county', result.county);
+        this.fillIfEmpty('country', 'United Kingdom');
+        this.setSuggestions(result.streets.map((street) => ({ value: street })));
+    }
+
+    async searchStreets() {
+        const q = this.street.value.trim();
+        if (q.length < 2) {
+            return;
+        }
+        const data = await this.fetchJSON(
+            this.street.dataset.addressLookupStreets,
+            { q, postcode: this.postcode.value.trim() },
+        );
+        if (data) {
+            this.setSuggestions(
+                data.results.map((result) => ({
+                    value: result.street,
+                    label: result.town,
+                })),
+            );
+        }
+    }
+
+    bindEvents() {
+        this.postcode.addEventListener('change', () => this.lookupPostcode());
+        if (this.street) {
+            this.street.addEventListener('input', () => {
+                clearTimeout(this.timeout);
+                this.timeout = setTimeout(
+                    () => this.searchStreets(),
+                    DEBOUNCE_DELAY,
+                );
+            });
+        }
+    }
+}
+
+export default AddressLookup;
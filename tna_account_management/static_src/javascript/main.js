@@ -5,6 +5,7 @@ import BulkEdit from './components/bulk-edit';
 import BulkAction from './components/bulk-action';
 import StagesRedirect from './components/stages-redirect';
 import ConditionalField from './components/conditional-field';
+import AddressLookup from './components/address-lookup';
 
 import './components/autocomplete';
 
@@ -33,6 +34,12 @@ document.addEventListener('DOMContentLoaded', () => {
         new ConditionalField(conditionalfield);
     }
 
+    for (const addresslookup of document.querySelectorAll(
+        AddressLookup.selector(),
+    )) {
+        new AddressLookup(addresslookup);
+    }
+
     for (const stagesredirect of document.querySelectorAll(
         StagesRedirect.selector(),
     )) {
@@ -21,6 +21,7 @@ from django.urls import include, path
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("auth/", include("tna_account_management.authentication.urls")),
+    path("api/", include("tna_account_management.api.urls")),
 ]
 
 
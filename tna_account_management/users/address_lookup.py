@@ -0,0 +1,378 @@
+"""
+Postcode lookup and street autocomplete for the address form, served from
+a local index built from OS Open Names (see the ``build_address_index``
+management command), so that no network requests are needed.
+
+OS Open Names includes every postcode and named road in Great Britain,
+but not individual addresses, so a postcode lookup returns the town,
+county and country for the postcode, along with the names of the roads
+nearest to it, and street autocomplete returns matching road names.
+
+The index is a ``StringIndex`` with three kinds of key:
+
+    p:<postcode>                the postcode, uppercase without spaces
+    s:<district> <street>       street names, within a postcode district
+    n:<street> <town>           street names, nationally
+
+Keys are normalised (see ``normalise()``), and values are fields separated
+by ``FIELD_SEPARATOR`` (with lists of streets separated by
+``LIST_SEPARATOR``).
+"""
+import csv
+import io
+import logging
+import math
+import os
+import re
+import zipfile
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from tna_account_management.utils.string_index import InvalidStringIndex, StringIndex
+
+logger = logging.getLogger(__name__)
+
+# The columns of the OS Open Names CSV files, which don't have a header row
+OPEN_NAMES_FIELDS = [
+    "ID",
+    "NAMES_URI",
+    "NAME1",
+    "NAME1_LANG",
+    "NAME2",
+    "NAME2_LANG",
+    "TYPE",
+    "LOCAL_TYPE",
+    "GEOMETRY_X",
+    "GEOMETRY_Y",
+    "MOST_DETAIL_VIEW_RES",
+    "LEAST_DETAIL_VIEW_RES",
+    "MBR_XMIN",
+    "MBR_YMIN",
+    "MBR_XMAX",
+    "MBR_YMAX",
+    "POSTCODE_DISTRICT",
+    "POSTCODE_DISTRICT_URI",
+    "POPULATED_PLACE",
+    "POPULATED_PLACE_URI",
+    "POPULATED_PLACE_TYPE",
+    "DISTRICT_BOROUGH",
+    "DISTRICT_BOROUGH_URI",
+    "DISTRICT_BOROUGH_TYPE",
+    "COUNTY_UNITARY",
+    "COUNTY_UNITARY_URI",
+    "COUNTY_UNITARY_TYPE",
+    "REGION",
+    "REGION_URI",
+    "COUNTRY",
+    "COUNTRY_URI",
+    "RELATED_SPATIAL_OBJECT",
+    "SAME_AS_DBPEDIA",
+    "SAME_AS_GEONAMES",
+]
+
+POSTCODE_TYPE = "Postcode"
+ROAD_TYPE = "Named Road"
+
+POSTCODE_KEY = b"p:"
+DISTRICT_STREET_KEY = b"s:"
+STREET_KEY = b"n:"
+
+FIELD_SEPARATOR = "\x1f"
+LIST_SEPARATOR = "\x1e"
+
+# A full postcode, once uppercased with spaces removed
+POSTCODE_RE = re.compile(r"^[A-Z]{1,2}[0-9][A-Z0-9]?[0-9][A-Z]{2}$")
+# The outward code (district) part of a postcode
+DISTRICT_RE = re.compile(r"^[A-Z]{1,2}[0-9][A-Z0-9]?$")
+NON_WORD_RE = re.compile(r"[^\w\s]+")
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Roads within this many metres of a postcode's centre are listed with it
+NEARBY_STREETS_RADIUS = 250
+NEARBY_STREETS_LIMIT = 10
+GRID_CELL_SIZE = 500
+
+MIN_QUERY_LENGTH = 2
+RESULTS_LIMIT = 10
+
+
+def normalise(value: str) -> str:
+    """
+    Return `value` lowercased, without punctuation, and with whitespace
+    collapsed, so that "St. John's  Road" matches "st johns road".
+    """
+    value = NON_WORD_RE.sub("", value.lower())
+    return WHITESPACE_RE.sub(" ", value).strip()
+
+
+def compact_postcode(value: str) -> str:
+    return WHITESPACE_RE.sub("", value).upper()
+
+
+def format_postcode(compact: str) -> str:
+    return f"{compact[:-3]} {compact[-3:]}"
+
+
+def get_district(value: str) -> str:
+    """
+    Return the postcode district (outward code) from a full or partial
+    postcode, or an empty string if one can't be identified.
+    """
+    compact = compact_postcode(value)
+    if POSTCODE_RE.match(compact):
+        return compact[:-3]
+    if DISTRICT_RE.match(compact):
+        return compact
+    return ""
+
+
+def encode_fields(*fields: str) -> bytes:
+    return FIELD_SEPARATOR.join(fields).encode()
+
+
+def decode_fields(value: bytes) -> List[str]:
+    return value.decode().split(FIELD_SEPARATOR)
+
+
+# Reading OS Open Names
+# -----------------------------------------------------------------------------
+
+
+def read_open_names(paths: Iterable[str]) -> Iterator[Dict[str, str]]:
+    """
+    Yield rows from OS Open Names CSV files, which can be supplied as paths
+    to the CSV files themselves, to directories containing them, or to the
+    zip file in which the dataset is distributed.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, filenames in sorted(os.walk(path)):
+                for filename in sorted(filenames):
+                    if filename.lower().endswith(".csv"):
+                        yield from read_open_names([os.path.join(root, filename)])
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for name in sorted(archive.namelist()):
+                    if name.lower().endswith(".csv"):
+                        with archive.open(name) as f:
+                            yield from read_csv(io.TextIOWrapper(f, encoding="utf-8"))
+        else:
+            with open(path, encoding="utf-8", newline="") as f:
+                yield from read_csv(f)
+
+
+def read_csv(f) -> Iterator[Dict[str, str]]:
+    for row in csv.reader(f):
+        if row and row[0] != "ID":
+            yield dict(zip(OPEN_NAMES_FIELDS, row))
+
+
+def get_place(row: Dict[str, str]) -> Tuple[str, str, str]:
+    """
+    Return the town, county and country for an OS Open Names row. London
+    boroughs and other unitary authorities have no county, so the district
+    or borough is used instead.
+    """
+    district = row.get("DISTRICT_BOROUGH", "")
+    town = row.get("POPULATED_PLACE", "") or district
+    county = row.get("COUNTY_UNITARY", "") or district
+    return town, county, row.get("COUNTRY", "")
+
+
+# Building the index
+# -----------------------------------------------------------------------------
+
+
+class RoadGrid:
+    """
+    Road names bucketed by the grid cells (in British National Grid
+    coordinates) that their bounding boxes, extended by `radius`, overlap.
+    """
+
+    def __init__(self, radius: int = NEARBY_STREETS_RADIUS):
+        self.radius = radius
+        self.cells = defaultdict(list)
+
+    def add(self, name: str, bounds: Tuple[float, float, float, float]) -> None:
+        xmin, ymin, xmax, ymax = bounds
+        for cx in range(
+            math.floor((xmin - self.radius) / GRID_CELL_SIZE),
+            math.floor((xmax + self.radius) / GRID_CELL_SIZE) + 1,
+        ):
+            for cy in range(
+                math.floor((ymin - self.radius) / GRID_CELL_SIZE),
+                math.floor((ymax + self.radius) / GRID_CELL_SIZE) + 1,
+            ):
+                self.cells[(cx, cy)].append((name, bounds))
+
+    def nearest(self, x: float, y: float, limit: int) -> List[str]:
+        cell = (math.floor(x / GRID_CELL_SIZE), math.floor(y / GRID_CELL_SIZE))
+        distances = {}
+        for name, (xmin, ymin, xmax, ymax) in self.cells.get(cell, ()):
+            dx = max(xmin - x, 0, x - xmax)
+            dy = max(ymin - y, 0, y - ymax)
+            distance = math.hypot(dx, dy)
+            if distance <= self.radius and distance < distances.get(name, math.inf):
+                distances[name] = distance
+        return sorted(distances, key=lambda name: (distances[name], name))[:limit]
+
+
+def get_bounds(row: Dict[str, str]) -> Optional[Tuple[float, float, float, float]]:
+    try:
+        return (
+            float(row["MBR_XMIN"] or row["GEOMETRY_X"]),
+            float(row["MBR_YMIN"] or row["GEOMETRY_Y"]),
+            float(row["MBR_XMAX"] or row["GEOMETRY_X"]),
+            float(row["MBR_YMAX"] or row["GEOMETRY_Y"]),
+        )
+    except (KeyError, ValueError):
+        return None
+
+
+def get_road_items(
+    rows: Iterable[Dict[str, str]], grid: RoadGrid
+) -> Iterator[Tuple[bytes, bytes]]:
+    """
+    Yield index items for the named roads in `rows`, adding each one to
+    `grid`. Roads are split into many sections in OS Open Names, so items
+    are only yielded for the first section of each road in each place.
+    """
+    seen = set()
+    for row in rows:
+        if row.get("LOCAL_TYPE") != ROAD_TYPE:
+            continue
+        town, county, _ = get_place(row)
+        district = row.get("POSTCODE_DISTRICT", "")
+        bounds = get_bounds(row)
+        for name in (row.get("NAME1", ""), row.get("NAME2", "")):
+            if not name:
+                continue
+            if bounds is not None:
+                grid.add(name, bounds)
+            if (name, town, district) in seen:
+                continue
+            seen.add((name, town, district))
+            value = encode_fields(name, town, county, district)
+            yield STREET_KEY + normalise(f"{name} {town}").encode(), value
+            if district:
+                key = f"{district.lower()} {normalise(name)}"
+                yield DISTRICT_STREET_KEY + key.encode(), value
+
+
+def get_postcode_items(
+    rows: Iterable[Dict[str, str]], grid: RoadGrid
+) -> Iterator[Tuple[bytes, bytes]]:
+    for row in rows:
+        if row.get("LOCAL_TYPE") != POSTCODE_TYPE:
+            continue
+        compact = compact_postcode(row.get("NAME1", ""))
+        if not POSTCODE_RE.match(compact):
+            continue
+        try:
+            x, y = float(row["GEOMETRY_X"]), float(row["GEOMETRY_Y"])
+        except (KeyError, ValueError):
+            streets = []
+        else:
+            streets = grid.nearest(x, y, NEARBY_STREETS_LIMIT)
+        yield POSTCODE_KEY + compact.encode(), encode_fields(
+            *get_place(row), LIST_SEPARATOR.join(streets)
+        )
+
+
+def build_items(paths: List[str]) -> Iterator[Tuple[bytes, bytes]]:
+    """
+    Yield unsorted index items for the OS Open Names files at `paths`. The
+    files are read twice: once for roads, and once for postcodes (which need
+    to know where all of the roads are).
+    """
+    grid = RoadGrid()
+    yield from get_road_items(read_open_names(paths), grid)
+    yield from get_postcode_items(read_open_names(paths), grid)
+
+
+# Lookups
+# -----------------------------------------------------------------------------
+
+
+@lru_cache(maxsize=None)
+def open_index(path: str) -> Optional[StringIndex]:
+    try:
+        return StringIndex.open(path)
+    except (OSError, InvalidStringIndex):
+        logger.warning(
+            f"Address lookup index could not be loaded from {path}. "
+            "Run the 'build_address_index' command to create it."
+        )
+        return None
+
+
+def get_index() -> Optional[StringIndex]:
+    """
+    Return the address lookup index, or `None` if one hasn't been configured
+    (with ADDRESS_LOOKUP_INDEX_PATH) or it can't be loaded. The index is
+    memory-mapped once per process, on first use.
+    """
+    path = getattr(settings, "ADDRESS_LOOKUP_INDEX_PATH", None)
+    if not path:
+        return None
+    return open_index(str(path))
+
+
+def is_available() -> bool:
+    return get_index() is not None
+
+
+def lookup_postcode(postcode: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the place and nearby streets for a full `postcode`, or `None`
+    if it isn't a known postcode.
+    """
+    index = get_index()
+    compact = compact_postcode(postcode)
+    if index is None or not POSTCODE_RE.match(compact):
+        return None
+    values = index.get(POSTCODE_KEY + compact.encode())
+    if not values:
+        return None
+    town, county, country, streets = decode_fields(values[0])
+    return {
+        "postcode": format_postcode(compact),
+        "town": town,
+        "county": county,
+        "country": country,
+        "streets": streets.split(LIST_SEPARATOR) if streets else [],
+    }
+
+
+def search_streets(
+    query: str, postcode: str = "", limit: int = RESULTS_LIMIT
+) -> List[Dict[str, str]]:
+    """
+    Return streets with names starting with `query`, within the district
+    of `postcode` (a full postcode or just the outward code) if supplied.
+    Searches without a postcode can include the town after the street name.
+    """
+    index = get_index()
+    query = normalise(query)
+    if index is None or len(query) < MIN_QUERY_LENGTH:
+        return []
+    district = get_district(postcode)
+    if district:
+        prefix = DISTRICT_STREET_KEY + f"{district.lower()} {query}".encode()
+    else:
+        prefix = STREET_KEY + query.encode()
+    results = []
+    for _, value in index.iter_prefix(prefix, limit):
+        street, town, county, district = decode_fields(value)
+        results.append(
+            {
+                "street": street,
+                "town": town,
+                "county": county,
+                "postcode_district": district,
+            }
+        )
+    return results
@@ -1,6 +1,316 @@
-from django.contrib import admin
-from django.contrib.auth.admin import UserAdmin
+import json
 
-from .models import User
+import requests
+from auth0.v3.exceptions import Auth0Error
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
 
-admin.site.register(User, UserAdmin)
+from . import profile_cache
+from .bulk import expire_stale_bulk_actions, start_bulk_action
+from .export import EXPORT_FORMATS, iter_export
+from .models import AuditEvent, BulkAction, OutboxDelivery, User
+from .roles import get_many_user_roles, get_role_choices
+
+
+def export_response(queryset, export_format: str) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(
+        iter_export(queryset, export_format),
+        content_type=EXPORT_FORMATS[export_format],
+    )
+    filename = f"accounts-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def get_role_field_choices():
+    return [("", "---------"), *get_role_choices()]
+
+
+class UserActionForm(ActionForm):
+    role = forms.ChoiceField(
+        choices=get_role_field_choices,
+        required=False,
+        help_text="For the 'assign role' and 'remove role' actions",
+    )
+
+
+class UserChangeList(ChangeList):
+    def get_results(self, request):
+        """
+        Fetch the Auth0 profiles and roles for the page of users being listed
+        in bulk, rather than one user at a time as each row is rendered.
+        """
+        super().get_results(request)
+        auth0_ids = [user.auth0_id for user in self.result_list if user.auth0_id]
+        if not auth0_ids:
+            return
+        profiles = profile_cache.get_profiles(auth0_ids)
+        user_roles = get_many_user_roles(auth0_ids)
+        for user in self.result_list:
+            if user.auth0_id:
+                # Users deleted from Auth0 are listed without profile data
+                user.profile = profiles.get(user.auth0_id, {})
+                if user_roles.get(user.auth0_id) is not None:
+                    user.roles = [role["name"] for role in user_roles[user.auth0_id]]
+
+
+# Actions that act on the connected Auth0 user
+AUTH0_ACTIONS = ["resend_verification_email", "assign_role", "remove_role"]
+
+
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    action_form = UserActionForm
+    actions = [
+        "export_csv",
+        "export_ndjson",
+        "resend_verification_email",
+        "assign_role",
+        "remove_role",
+    ]
+
+    def get_changelist(self, request, **kwargs):
+        return UserChangeList
+
+    def get_list_display(self, request):
+        list_display = super().get_list_display(request)
+        if settings.AUTHENTICATION_PROVIDER == "auth0":
+            return [*list_display, "role_names"]
+        return list_display
+
+    @admin.display(description="Roles")
+    def role_names(self, obj):
+        try:
+            return ", ".join(obj.roles)
+        except (Auth0Error, requests.RequestException):
+            return "Unavailable"
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        if settings.AUTHENTICATION_PROVIDER != "auth0":
+            for name in AUTH0_ACTIONS:
+                actions.pop(name, None)
+        return actions
+
+    def has_export_permission(self, request):
+        # Exports include every user's personal details, so viewing users in
+        # the admin isn't enough
+        return request.user.has_perm("users.export_user")
+
+    @admin.action(description="Export selected users as CSV", permissions=["export"])
+    def export_csv(self, request, queryset):
+        return export_response(queryset, "csv")
+
+    @admin.action(description="Export selected users as NDJSON", permissions=["export"])
+    def export_ndjson(self, request, queryset):
+        return export_response(queryset, "ndjson")
+
+    @admin.action(
+        description="Resend verification email to selected users",
+        permissions=["change"],
+    )
+    def resend_verification_email(self, request, queryset):
+        self.start_bulk_action(request, BulkAction.RESEND_VERIFICATION_EMAIL, queryset)
+
+    @admin.action(description="Assign role to selected users", permissions=["change"])
+    def assign_role(self, request, queryset):
+        self.start_bulk_action(request, BulkAction.ASSIGN_ROLE, queryset, role=True)
+
+    @admin.action(description="Remove role from selected users", permissions=["change"])
+    def remove_role(self, request, queryset):
+        self.start_bulk_action(request, BulkAction.REMOVE_ROLE, queryset, role=True)
+
+    def start_bulk_action(self, request, action, queryset, role=False):
+        role_id = ""
+        if role:
+            role_id = request.POST.get("role", "")
+            if role_id not in dict(get_role_choices()):
+                self.message_user(request, "Please select a role.", messages.ERROR)
+                return
+
+        bulk_action = start_bulk_action(action, queryset, request.user, role_id)
+        if bulk_action is None:
+            self.message_user(
+                request,
+                "None of the selected users are connected to Auth0.",
+                messages.WARNING,
+            )
+            return
+
+        url = reverse("admin:users_bulkaction_change", args=[bulk_action.pk])
+        if bulk_action.completed_at is None:
+            self.message_user(
+                request,
+                format_html(
+                    '"{}" is running in the background for {} users. '
+                    '<a href="{}">View progress</a>.',
+                    bulk_action,
+                    len(bulk_action.results),
+                    url,
+                ),
+            )
+            return
+
+        level = messages.WARNING if bulk_action.failed_count else messages.SUCCESS
+        self.message_user(
+            request,
+            format_html(
+                '"{}" succeeded for {} users and failed for {}. '
+                '<a href="{}">View results</a>.',
+                bulk_action,
+                bulk_action.succeeded_count,
+                bulk_action.failed_count,
+                url,
+            ),
+            level,
+        )
+
+
+@admin.register(BulkAction)
+class BulkActionAdmin(admin.ModelAdmin):
+    list_display = [
+        "__str__",
+        "created_by",
+        "created_at",
+        "completed_at",
+        "succeeded_count",
+        "failed_count",
+        "pending_count",
+    ]
+    list_filter = ["action"]
+    date_hierarchy = "created_at"
+    fields = [
+        "action",
+        "role_name",
+        "created_by",
+        "created_at",
+        "completed_at",
+        "heartbeat_at",
+        "succeeded_count",
+        "failed_count",
+        "pending_count",
+        "results_table",
+    ]
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        expire_stale_bulk_actions()
+        return super().changelist_view(request, extra_context)
+
+    def change_view(self, request, object_id, form_url="", extra_context=None):
+        expire_stale_bulk_actions()
+        return super().change_view(request, object_id, form_url, extra_context)
+
+    @admin.display(description="Results")
+    def results_table(self, obj):
+        # Failures are listed first, as they're the ones that need attention
+        results = sorted(obj.results, key=lambda r: r["status"] != BulkAction.FAILED)
+        return format_html(
+            "<table><thead><tr><th>User</th><th>Auth0 ID</th><th>Status</th>"
+            "<th>Error</th></tr></thead><tbody>{}</tbody></table>",
+            format_html_join(
+                "",
+                "<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>",
+                (
+                    (r["username"], r["auth0_id"], r["status"], r["error"])
+                    for r in results
+                ),
+            ),
+        )
+
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    list_display = [
+        "created_at",
+        "action",
+        "user",
+        "auth0_id",
+        "actor",
+        "changed_fields",
+        "ip_address",
+    ]
+    list_filter = ["action"]
+    list_select_related = ["user", "actor"]
+    # Exact matches only, so that searches use the indexes
+    search_fields = ["=auth0_id", "=user__username"]
+    # The log can be very large, so avoid counting every event on each page
+    show_full_result_count = False
+    fields = list_display
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Fields")
+    def changed_fields(self, obj):
+        return ", ".join(obj.fields)
+
+
+@admin.register(OutboxDelivery)
+class OutboxDeliveryAdmin(admin.ModelAdmin):
+    list_display = [
+        "message_id",
+        "message",
+        "endpoint",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "delivered_at",
+    ]
+    list_filter = ["status", "endpoint"]
+    list_select_related = ["message"]
+    search_fields = ["=message__auth0_id"]
+    show_full_result_count = False
+    actions = ["retry_now"]
+    fields = [
+        "message",
+        "payload",
+        "endpoint",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "delivered_at",
+        "last_error",
+    ]
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description="Payload")
+    def payload(self, obj):
+        return format_html("<pre>{}</pre>", json.dumps(obj.message.to_json(), indent=2))
+
+    @admin.action(description="Retry selected deliveries now", permissions=["change"])
+    def retry_now(self, request, queryset):
+        # Failed deliveries are given a fresh set of attempts. Held ones are
+        # left for the dispatcher to check against Auth0.
+        count = queryset.exclude(
+            status__in=[OutboxDelivery.DELIVERED, OutboxDelivery.HELD]
+        ).update(
+            status=OutboxDelivery.PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+        )
+        self.message_user(request, f"{count} deliveries will be retried.")
@@ -5,3 +5,8 @@ class UsersConfig(AppConfig):
     default_auto_field = "django.db.models.AutoField"
     name = "tna_account_management.users"
     label = "users"
+
+    def ready(self):
+        from .signal_handlers import register_signal_handlers
+
+        register_signal_handlers()
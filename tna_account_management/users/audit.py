@@ -0,0 +1,183 @@
+"""
+An audit trail of changes to users' accounts, and of them logging in and
+out (see ``models.AuditEvent``).
+
+Recording an event doesn't touch the database. Events are added to a
+bounded buffer in the current process, and a background thread writes them
+in batches with ``bulk_create()``, so requests don't wait for an insert per
+change. If the buffer is full (because the database is slow or
+unavailable), the request waits for up to AUDIT_LOG_BLOCK_TIMEOUT seconds
+for space (0 to never wait), after which the event is dropped and logged
+rather than failing the request. Events still buffered when the process
+exits are written on the way out.
+
+With AUDIT_LOG_SYNCHRONOUS (as in tests), events are instead written as
+they are recorded, in the current transaction.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+# Imported as a module, as models records events with this one
+from . import models
+
+logger = logging.getLogger(__name__)
+
+# How long (in seconds) the writer waits for more events before writing
+# a batch that is smaller than AUDIT_LOG_BATCH_SIZE
+FLUSH_INTERVAL = 1
+
+# How often (in seconds) dropped events are logged, to avoid flooding logs
+DROP_LOG_INTERVAL = 60
+
+_queue: Optional[queue.Queue] = None
+_writer: Optional[threading.Thread] = None
+_writer_pid: Optional[int] = None
+_writer_lock = threading.Lock()
+
+dropped_count = 0
+_drop_logged_at = None
+
+
+def get_queue() -> queue.Queue:
+    """
+    Return the buffer for the current process, starting the thread that
+    writes its events if it isn't running (it won't be in a process forked
+    after it started, such as a gunicorn worker of a preloaded app). If the
+    writer has stopped, a new one carries on with the events it left.
+    """
+    global _queue, _writer, _writer_pid
+    with _writer_lock:
+        if _writer_pid != os.getpid():
+            # Events inherited from the parent process are its to write
+            _queue = queue.Queue(maxsize=settings.AUDIT_LOG_BUFFER_SIZE)
+            _writer = None
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(
+                target=write_events, args=(_queue,), name="audit-log", daemon=True
+            )
+            _writer.start()
+            _writer_pid = os.getpid()
+        return _queue
+
+
+def record(
+    action: str,
+    user_id: Optional[int],
+    auth0_id: Optional[str] = "",
+    actor_id: Optional[int] = None,
+    fields: Iterable[str] = (),
+    ip_address: Optional[str] = None,
+) -> bool:
+    """
+    Add an event to the buffer, to be written in the background. Returns
+    `False` if it was dropped, because the buffer stayed full.
+    """
+    global dropped_count, _drop_logged_at
+    event = models.AuditEvent(
+        action=action,
+        user_id=user_id,
+        auth0_id=auth0_id or "",
+        actor_id=actor_id,
+        fields=list(fields),
+        ip_address=ip_address or None,
+    )
+    if settings.AUDIT_LOG_SYNCHRONOUS:
+        event.save()
+        return True
+    events = get_queue()
+    try:
+        if settings.AUDIT_LOG_BLOCK_TIMEOUT > 0:
+            events.put(event, timeout=settings.AUDIT_LOG_BLOCK_TIMEOUT)
+        else:
+            events.put_nowait(event)
+    except queue.Full:
+        now = time.monotonic()
+        with _writer_lock:
+            dropped_count += 1
+            count = dropped_count
+            should_log = (
+                _drop_logged_at is None or now - _drop_logged_at >= DROP_LOG_INTERVAL
+            )
+            if should_log:
+                _drop_logged_at = now
+        if should_log:
+            logger.error(
+                f"The audit log buffer is full. {count} event(s) dropped so far."
+            )
+        return False
+    return True
+
+
+def take_batch(
+    events: queue.Queue, timeout: Optional[float], wait: float = FLUSH_INTERVAL
+) -> List["models.AuditEvent"]:
+    """
+    Wait for up to `timeout` seconds (or indefinitely) for an event, then
+    return it along with any others added within `wait` seconds, up to
+    AUDIT_LOG_BATCH_SIZE events in total.
+    """
+    try:
+        batch = [events.get(timeout=timeout)]
+    except queue.Empty:
+        return []
+    deadline = time.monotonic() + wait
+    while len(batch) < settings.AUDIT_LOG_BATCH_SIZE:
+        try:
+            batch.append(events.get(timeout=max(deadline - time.monotonic(), 0)))
+        except queue.Empty:
+            break
+    return batch
+
+
+def write_batch(batch: List["models.AuditEvent"]) -> None:
+    # Connections may have timed out while waiting for events
+    close_old_connections()
+    try:
+        models.AuditEvent.objects.bulk_create(batch)
+    except Exception:
+        logger.exception(f"Unable to write {len(batch)} audit events.")
+        # Don't reuse a connection that may be broken
+        connection.close()
+
+
+def write_events(events: queue.Queue) -> None:
+    while True:
+        batch = take_batch(events, timeout=None)
+        try:
+            write_batch(batch)
+        finally:
+            for _ in batch:
+                events.task_done()
+
+
+def flush() -> None:
+    """
+    Block until every event recorded by this process so far has been
+    written (or failed to be).
+    """
+    with _writer_lock:
+        events = _queue if _writer_pid == os.getpid() else None
+    if events is not None:
+        events.join()
+
+
+@atexit.register
+def write_remaining() -> None:
+    # The writer is a daemon thread, so is stopped without warning at exit
+    with _writer_lock:
+        events = _queue if _writer_pid == os.getpid() else None
+    while events is not None:
+        batch = take_batch(events, timeout=0, wait=0)
+        if not batch:
+            break
+        write_batch(batch)
+        for _ in batch:
+            events.task_done()
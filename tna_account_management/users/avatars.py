@@ -0,0 +1,238 @@
+"""
+Avatars for users whose Auth0 profile has a `picture` (typically hosted by
+a social login provider, or Gravatar). Rather than hotlinking the picture,
+it is fetched once, resized to each of ``AVATAR_SIZES``, and saved to the
+default file storage, from where ``views.AvatarView`` serves it with
+long-lived cache headers.
+
+Pictures are fetched in the background, and until they're ready (or if
+fetching fails), one of the bundled default avatars is used instead, so
+requests are never held up by a slow third-party host.
+
+Resizing needs Pillow, which is optional. Without it, the original image
+is stored once and served for every size.
+"""
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection
+from django.http.request import validate_host
+from django.templatetags.static import static
+from django.utils.module_loading import import_string
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AVATARS = [f"images/avatar_{i}.jpg" for i in range(1, 5)]
+
+# Only images in these formats are stored, so nothing else can ever be
+# served from this site's domain
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": "image/jpeg",
+    b"\x89PNG\r\n\x1a\n": "image/png",
+    b"GIF87a": "image/gif",
+    b"GIF89a": "image/gif",
+}
+
+READY_CACHE_KEY = "avatar-ready:{key}"
+FETCH_LOCK_CACHE_KEY = "avatar-fetch:{key}"
+
+THUMBNAIL_QUALITY = 85
+
+
+class AvatarError(Exception):
+    pass
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.AVATAR_MAX_WORKERS,
+                thread_name_prefix="avatar",
+            )
+        return _executor
+
+
+def get_avatar_key(picture_url: str) -> str:
+    """
+    Return a key identifying the avatar for `picture_url`. A new picture
+    always gets a new key, so stored avatars never change.
+    """
+    return hashlib.blake2b(picture_url.encode(), digest_size=16).hexdigest()
+
+
+def get_avatar_path(key: str, size: int) -> str:
+    if Image is None:
+        return f"avatars/{key}/original"
+    return f"avatars/{key}/{size}.jpg"
+
+
+def get_default_avatar_url(user) -> str:
+    """
+    Return the URL of one of the bundled default avatars, chosen
+    consistently for each user.
+    """
+    seed = (user.auth0_id or str(user.pk)).encode()
+    index = int.from_bytes(hashlib.blake2b(seed, digest_size=4).digest(), "big")
+    return static(DEFAULT_AVATARS[index % len(DEFAULT_AVATARS)])
+
+
+def get_image_type(data: bytes) -> Optional[str]:
+    for signature, content_type in IMAGE_SIGNATURES.items():
+        if data.startswith(signature):
+            return content_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def is_allowed_url(url: str) -> bool:
+    """
+    Return whether `url` is an HTTPS URL on one of AVATAR_ALLOWED_HOSTS, so
+    that users can't make this site request arbitrary (e.g. internal) URLs.
+    """
+    try:
+        parsed = urlsplit(url)
+        port = parsed.port
+    except ValueError:
+        return False
+    return (
+        parsed.scheme == "https"
+        and parsed.hostname is not None
+        and parsed.username is None
+        and port in (None, 443)
+        and validate_host(parsed.hostname, settings.AVATAR_ALLOWED_HOSTS)
+    )
+
+
+def fetch_avatar(url: str) -> bytes:
+    """
+    The default AVATAR_FETCHER: download `url` if it's allowed (see
+    `is_allowed_url()`), without following redirects, giving up if it takes
+    longer than AVATAR_FETCH_TIMEOUT or is larger than AVATAR_MAX_BYTES.
+    Replacement fetchers take the same argument, and raise an exception if
+    the image can't be fetched.
+    """
+    if not is_allowed_url(url):
+        raise AvatarError(f"Picture URL is not allowed: {url}")
+    with requests.get(
+        url,
+        timeout=settings.AVATAR_FETCH_TIMEOUT,
+        stream=True,
+        allow_redirects=False,
+    ) as r:
+        if r.status_code != 200:
+            raise AvatarError(f"Picture at {url} returned {r.status_code}.")
+        try:
+            length = int(r.headers.get("Content-Length", 0))
+        except ValueError:
+            length = 0
+        if length > settings.AVATAR_MAX_BYTES:
+            raise AvatarError(f"Picture at {url} is too large.")
+        data = bytearray()
+        for chunk in r.iter_content(chunk_size=64 * 1024):
+            data.extend(chunk)
+            if len(data) > settings.AVATAR_MAX_BYTES:
+                raise AvatarError(f"Picture at {url} is too large.")
+    return bytes(data)
+
+
+def make_thumbnails(data: bytes) -> Dict[int, bytes]:
+    """
+    Return a square JPEG of `data` (cropped from the centre) for each of
+    AVATAR_SIZES, or just the original image if Pillow isn't installed.
+    """
+    if get_image_type(data) is None:
+        raise AvatarError("Picture is not a supported image type.")
+    if Image is None:
+        return {0: data}
+    try:
+        image = Image.open(io.BytesIO(data))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise AvatarError(f"Picture could not be read: {e}")
+    thumbnails = {}
+    for size in settings.AVATAR_SIZES:
+        thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        output = io.BytesIO()
+        thumbnail.save(output, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+        thumbnails[size] = output.getvalue()
+    return thumbnails
+
+
+def store_avatar(picture_url: str) -> bool:
+    """
+    Fetch the picture at `picture_url` and store it at each size, unless
+    that has already been done. Returns whether the avatar is available.
+    """
+    key = get_avatar_key(picture_url)
+    paths = {size: get_avatar_path(key, size) for size in settings.AVATAR_SIZES}
+    if all(default_storage.exists(path) for path in set(paths.values())):
+        cache.set(READY_CACHE_KEY.format(key=key), True, None)
+        return True
+    try:
+        fetcher = import_string(settings.AVATAR_FETCHER)
+        thumbnails = make_thumbnails(fetcher(picture_url))
+    except Exception:
+        logger.warning(f"Unable to fetch avatar from {picture_url}.", exc_info=True)
+        cache.set(
+            READY_CACHE_KEY.format(key=key), False, settings.AVATAR_FAILURE_TIMEOUT
+        )
+        return False
+    for size, path in paths.items():
+        data = thumbnails[size] if size in thumbnails else thumbnails[0]
+        if not default_storage.exists(path):
+            default_storage.save(path, ContentFile(data))
+    cache.set(READY_CACHE_KEY.format(key=key), True, None)
+    return True
+
+
+def is_ready(key: str) -> Optional[bool]:
+    """
+    Return `True` if the avatar with `key` has been stored, `False` if it
+    recently couldn't be, or `None` if it hasn't been attempted.
+    """
+    return cache.get(READY_CACHE_KEY.format(key=key))
+
+
+def request_avatar(picture_url: str) -> None:
+    """
+    Store the avatar for `picture_url` in the background, unless it's already
+    being stored (by any process).
+    """
+    lock_key = FETCH_LOCK_CACHE_KEY.format(key=get_avatar_key(picture_url))
+    if not cache.add(lock_key, True, settings.AVATAR_FETCH_TIMEOUT * 4):
+        return None
+
+    def store():
+        # The cache may be database-backed
+        close_old_connections()
+        try:
+            store_avatar(picture_url)
+        except Exception:
+            logger.exception(f"Unable to store avatar from {picture_url}.")
+        finally:
+            cache.delete(lock_key)
+            connection.close()
+
+    get_executor().submit(store)
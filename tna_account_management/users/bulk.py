@@ -0,0 +1,235 @@
+"""
+Applies Auth0 operations (such as resending verification emails) to many
+users at once. Requests are made concurrently by a small thread pool shared
+by all bulk actions in the process, and paced by a rate limiter shared by
+all processes, so that a large selection can't use up the tenant's
+Management API rate limit and cause requests from other users to fail.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from typing import Optional
+
+import requests
+from auth0.v3.exceptions import Auth0Error, RateLimitError
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from tna_account_management.utils import auth0
+
+from . import audit, roles
+from .models import AuditEvent, BulkAction, User
+
+logger = logging.getLogger(__name__)
+
+# The number of times a request rejected by Auth0's own rate limiting is
+# retried, and the longest time to wait before retrying
+RATE_LIMIT_RETRIES = 3
+MAX_RATE_LIMIT_BACKOFF = 10
+
+# How long to wait for a turn from the shared rate limiter before failing
+RATE_LIMIT_WAIT_TIMEOUT = 60
+
+# How often (in results, or at least in seconds) the progress of a running
+# action is saved
+PROGRESS_INTERVAL = 50
+HEARTBEAT_INTERVAL = 30
+
+# How long (in seconds) after its progress was last saved a running action is
+# assumed to have stopped, along with the process running it
+STALE_AFTER = 5 * 60
+
+INTERRUPTED_ERROR = "The action was interrupted before this user was processed"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BULK_ACTION_MAX_WORKERS,
+                thread_name_prefix="bulk-action",
+            )
+        return _executor
+
+
+def perform(action: str, auth0_id: str, role_id: str) -> None:
+    if action == BulkAction.RESEND_VERIFICATION_EMAIL:
+        auth0.jobs_client.send_verification_email(user_id=auth0_id)
+    elif action == BulkAction.ASSIGN_ROLE:
+        roles.assign_role(auth0_id, role_id)
+    elif action == BulkAction.REMOVE_ROLE:
+        roles.remove_role(auth0_id, role_id)
+    else:
+        raise ValueError(f"Unknown action: {action}")
+
+
+def perform_for_user(action: str, auth0_id: str, role_id: str) -> str:
+    """
+    Apply `action` to the Auth0 user with the supplied `auth0_id`, waiting
+    for a turn from the shared rate limiter first. Returns an error message
+    if the action failed, or an empty string if it succeeded.
+    """
+    limiter = auth0.get_management_api_limiter()
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        if not limiter.wait("bulk-action", timeout=RATE_LIMIT_WAIT_TIMEOUT):
+            return "Timed out waiting to make a request to Auth0"
+        try:
+            perform(action, auth0_id, role_id)
+        except RateLimitError as e:
+            if attempt == RATE_LIMIT_RETRIES:
+                return str(e)
+            # Other clients have used up the tenant's limit, so wait until
+            # Auth0 says it will be reset (a reset time of -1 means unknown)
+            delay = e.reset_at - time.time() if e.reset_at > 0 else 1
+            time.sleep(min(max(delay, 1), MAX_RATE_LIMIT_BACKOFF))
+        except (Auth0Error, requests.RequestException) as e:
+            return str(e)
+        else:
+            return ""
+
+
+def create_bulk_action(
+    action: str, queryset: QuerySet, created_by: User, role_id: str = ""
+) -> BulkAction:
+    """
+    Create a pending ``BulkAction`` for the users in `queryset` that are
+    connected to Auth0.
+    """
+    return BulkAction.objects.create(
+        action=action,
+        role_id=role_id,
+        role_name=roles.get_role_name(role_id) if role_id else "",
+        created_by=created_by,
+        results=[
+            {
+                "user_id": pk,
+                "username": username,
+                "auth0_id": auth0_id,
+                "status": BulkAction.PENDING,
+                "error": "",
+            }
+            for pk, username, auth0_id in queryset.filter(
+                auth0_id__isnull=False
+            ).values_list("pk", "username", "auth0_id")
+        ],
+    )
+
+
+def run_bulk_action(bulk_action: BulkAction) -> BulkAction:
+    """
+    Apply the action to each pending user in `bulk_action`, recording the
+    result for each user as it completes.
+    """
+    bulk_action.heartbeat_at = timezone.now()
+    bulk_action.save(update_fields=["heartbeat_at"])
+    executor = get_executor()
+    futures = {
+        executor.submit(
+            perform_for_user,
+            bulk_action.action,
+            result["auth0_id"],
+            bulk_action.role_id,
+        ): result
+        for result in bulk_action.results
+        if result["status"] == BulkAction.PENDING
+    }
+    for i, future in enumerate(as_completed(futures), 1):
+        result = futures[future]
+        result["error"] = future.result()
+        result["status"] = (
+            BulkAction.FAILED if result["error"] else BulkAction.SUCCEEDED
+        )
+        if (
+            bulk_action.action == BulkAction.RESEND_VERIFICATION_EMAIL
+            and result["status"] == BulkAction.SUCCEEDED
+        ):
+            audit.record(
+                AuditEvent.SEND_VERIFICATION_EMAIL,
+                result["user_id"],
+                result["auth0_id"],
+                actor_id=bulk_action.created_by_id,
+            )
+        now = timezone.now()
+        if (
+            i % PROGRESS_INTERVAL == 0
+            or (now - bulk_action.heartbeat_at).total_seconds() >= HEARTBEAT_INTERVAL
+        ):
+            bulk_action.heartbeat_at = now
+            bulk_action.save(update_fields=["results", "heartbeat_at"])
+    bulk_action.completed_at = bulk_action.heartbeat_at = timezone.now()
+    bulk_action.save(update_fields=["results", "completed_at", "heartbeat_at"])
+    return bulk_action
+
+
+def expire_stale_bulk_actions() -> int:
+    """
+    Complete actions whose progress hasn't been saved for STALE_AFTER
+    seconds (because the process running them stopped), marking the users
+    that hadn't been processed as failed, so that they aren't left 'pending'
+    forever. Returns the number of actions expired.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=STALE_AFTER)
+    stale = BulkAction.objects.filter(completed_at__isnull=True).filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, created_at__lt=cutoff)
+    )
+    count = 0
+    for bulk_action in stale:
+        for result in bulk_action.results:
+            if result["status"] == BulkAction.PENDING:
+                result["status"] = BulkAction.FAILED
+                result["error"] = INTERRUPTED_ERROR
+        bulk_action.completed_at = now
+        bulk_action.save(update_fields=["results", "completed_at"])
+        logger.warning(f"Bulk action {bulk_action.pk} was interrupted.")
+        count += 1
+    return count
+
+
+def run_in_background(bulk_action: BulkAction) -> threading.Thread:
+    """
+    Run `bulk_action` in a new thread, so that the request that started it
+    can return straight away. If the process is stopped before the action
+    completes, users that hadn't been processed remain 'pending' until the
+    action is expired by ``expire_stale_bulk_actions()``.
+    """
+
+    def run():
+        close_old_connections()
+        try:
+            run_bulk_action(bulk_action)
+        except Exception:
+            logger.exception(f"Bulk action {bulk_action.pk} failed.")
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=run, name=f"bulk-action-{bulk_action.pk}")
+    thread.start()
+    return thread
+
+
+def start_bulk_action(
+    action: str, queryset: QuerySet, created_by: User, role_id: str = ""
+) -> Optional[BulkAction]:
+    """
+    Create and run a ``BulkAction`` for the users in `queryset`, in the
+    background if there are more than ``BULK_ACTION_BACKGROUND_THRESHOLD``
+    of them. Returns `None` if none of the users are connected to Auth0.
+    """
+    bulk_action = create_bulk_action(action, queryset, created_by, role_id)
+    if not bulk_action.results:
+        bulk_action.delete()
+        return None
+    if len(bulk_action.results) > settings.BULK_ACTION_BACKGROUND_THRESHOLD:
+        run_in_background(bulk_action)
+    else:
+        run_bulk_action(bulk_action)
+    return bulk_action
@@ -0,0 +1,191 @@
+"""
+Fills the profile cache for recently active users, so that their next
+visit after a deploy (or after the cache has been flushed) doesn't have to
+wait for the Management API.
+
+Profiles are fetched with the user search endpoint, one request per
+``profile_cache.SEARCH_CHUNK_SIZE`` uncached users, by a few threads at
+once. Every request waits for a turn from the Management API rate limiter
+shared by all processes, and the whole run stops at a deadline, so warming
+the cache can't hold up a release or starve requests from real users.
+"""
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Iterable, List, Optional
+
+import requests
+from auth0.v3.exceptions import Auth0Error, RateLimitError
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from tna_account_management.utils import auth0
+
+from . import profile_cache
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+# The number of cache keys checked at once when looking for uncached profiles
+CACHE_LOOKUP_CHUNK_SIZE = 1000
+
+# The identifier used with the shared Management API rate limiter
+RATE_LIMIT_IDENTIFIER = "profile-cache-warming"
+
+# The number of times a request rejected by Auth0's own rate limiting is
+# retried, and the longest time to wait before retrying
+RATE_LIMIT_RETRIES = 3
+MAX_RATE_LIMIT_BACKOFF = 10
+
+
+@dataclass
+class WarmingProgress:
+    total: int = 0
+    already_cached: int = 0
+    warmed: int = 0
+    not_found: int = 0
+    failed: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def done(self) -> int:
+        return (
+            self.already_cached
+            + self.warmed
+            + self.not_found
+            + self.failed
+            + self.skipped
+        )
+
+
+def get_recent_auth0_ids(days: int, limit: Optional[int] = None) -> List[str]:
+    """
+    Return the `auth0_id` of active users who have logged in within the
+    last `days` days, most recent first.
+    """
+    queryset = (
+        User.objects.filter(
+            is_active=True,
+            auth0_id__isnull=False,
+            last_login__gte=timezone.now() - timedelta(days=days),
+        )
+        .order_by("-last_login")
+        .values_list("auth0_id", flat=True)
+    )
+    if limit is not None:
+        queryset = queryset[:limit]
+    return list(queryset)
+
+
+def get_uncached(auth0_ids: List[str]) -> List[str]:
+    """
+    Return the IDs from `auth0_ids` that don't have a profile in the cache
+    (whether fresh or stale, as stale ones are refreshed in the background).
+    """
+    uncached = []
+    for i in range(0, len(auth0_ids), CACHE_LOOKUP_CHUNK_SIZE):
+        chunk = auth0_ids[i : i + CACHE_LOOKUP_CHUNK_SIZE]
+        cached = cache.get_many([profile_cache.get_cache_key(a) for a in chunk])
+        uncached.extend(
+            auth0_id
+            for auth0_id in chunk
+            if profile_cache.get_cache_key(auth0_id) not in cached
+        )
+    return uncached
+
+
+def warm_batch(auth0_ids: List[str], deadline: float) -> Optional[int]:
+    """
+    Fetch and cache the profiles for `auth0_ids` (up to ``SEARCH_CHUNK_SIZE``
+    of them) in a single request. Returns the number of profiles found, or
+    `None` if there wasn't a turn from the rate limiter before `deadline`.
+    """
+    # The cache may be database-backed
+    close_old_connections()
+    try:
+        limiter = auth0.get_management_api_limiter()
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            timeout = deadline - time.monotonic()
+            if not limiter.wait(RATE_LIMIT_IDENTIFIER, timeout=timeout):
+                return None
+            try:
+                return len(profile_cache.get_profiles(auth0_ids))
+            except RateLimitError as e:
+                if attempt == RATE_LIMIT_RETRIES:
+                    raise
+                # Other clients have used up the tenant's limit, so wait until
+                # Auth0 says it will be reset (a reset time of -1 means unknown)
+                delay = e.reset_at - time.time() if e.reset_at > 0 else 1
+                delay = min(max(delay, 1), MAX_RATE_LIMIT_BACKOFF)
+                if time.monotonic() + delay >= deadline:
+                    return None
+                time.sleep(delay)
+    finally:
+        connection.close()
+
+
+def warm_profiles(
+    auth0_ids: Iterable[str],
+    max_time: float,
+    max_workers: int = 4,
+    progress_callback: Optional[Callable[[WarmingProgress], None]] = None,
+) -> WarmingProgress:
+    """
+    Cache the profiles for `auth0_ids` that aren't already cached, in that
+    order, stopping after `max_time` seconds. `progress_callback` is called
+    with the progress so far after each batch completes.
+
+    Users whose profiles weren't fetched in time are counted as skipped.
+    Failed batches are logged and counted, but don't stop the run.
+    """
+    start = time.monotonic()
+    deadline = start + max_time
+    auth0_ids = list(auth0_ids)
+    uncached = get_uncached(auth0_ids)
+    progress = WarmingProgress(
+        total=len(auth0_ids), already_cached=len(auth0_ids) - len(uncached)
+    )
+    size = profile_cache.SEARCH_CHUNK_SIZE
+    batches = [uncached[i : i + size] for i in range(0, len(uncached), size)]
+    batches.reverse()
+
+    # Only a few batches are submitted at a time, so that nothing is left
+    # queued (and holding up the process) once the deadline passes
+    with ThreadPoolExecutor(max_workers, thread_name_prefix="profile-warming") as ex:
+        pending = {}
+        while batches or pending:
+            while batches and len(pending) < max_workers:
+                if time.monotonic() >= deadline:
+                    progress.skipped += sum(len(batch) for batch in batches)
+                    batches = []
+                    break
+                batch = batches.pop()
+                pending[ex.submit(warm_batch, batch, deadline)] = batch
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = pending.pop(future)
+                try:
+                    found = future.result()
+                except (Auth0Error, requests.RequestException) as e:
+                    logger.warning(f"Unable to warm {len(batch)} profiles: {e}")
+                    progress.failed += len(batch)
+                except Exception:
+                    logger.exception(f"Unable to warm {len(batch)} profiles.")
+                    progress.failed += len(batch)
+                else:
+                    if found is None:
+                        progress.skipped += len(batch)
+                    else:
+                        progress.warmed += found
+                        progress.not_found += len(batch) - found
+                progress.elapsed = time.monotonic() - start
+                if progress_callback is not None:
+                    progress_callback(progress)
+    progress.elapsed = time.monotonic() - start
+    return progress
@@ -0,0 +1,158 @@
+"""
+Checks whether an email address is already used by another account before
+``ChangeEmailView`` asks Auth0 to change a user's email, so that the user
+gets a specific validation error straight away rather than a generic one
+after a failed update.
+
+Addresses are first looked up in the local ``UserEmail`` index, which
+covers everyone who has logged in here, and is trusted where the owner's
+cached profile confirms it. Others are looked up with the Management API's
+users-by-email endpoint. Results are cached (including
+for addresses that aren't in use, for a shorter time), concurrent lookups
+of the same address in a process share one request, and requests are paced
+by the shared Management API rate limiter. If Auth0 can't be asked in good
+time, the address is treated as unknown and left for the update to reject.
+"""
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, Optional, Tuple
+
+import requests
+from auth0.v3.exceptions import Auth0Error
+from django.conf import settings
+from django.core.cache import cache
+
+from tna_account_management.utils import auth0
+
+from . import profile_cache
+from .models import User, UserEmail, normalize_email
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "email-taken"
+
+# The identifier used with the shared Management API rate limiter, and how
+# long (in seconds) to wait for a turn before giving up on the check
+RATE_LIMIT_IDENTIFIER = "email-availability"
+RATE_LIMIT_WAIT_TIMEOUT = 2
+
+# Auth0's message when an update fails because the email is in use
+EMAIL_EXISTS_MESSAGE = "The specified new email already exists"
+
+# Lookups in progress in this process, keyed by connection and email
+_lookups: Dict[Tuple[str, str], Future] = {}
+_lookups_lock = threading.Lock()
+
+
+def get_cache_key(email: str, connection: Optional[str]) -> str:
+    value = f"{connection or ''}:{normalize_email(email)}".encode()
+    return f"{CACHE_KEY_PREFIX}:{hashlib.blake2b(value, digest_size=16).hexdigest()}"
+
+
+def is_email_taken(user: User, email: str) -> Optional[bool]:
+    """
+    Return `True` if `email` is used by an account other than `user`'s in
+    the same Auth0 database connection, `False` if it isn't, or `None` if
+    that couldn't be found out.
+    """
+    email = normalize_email(email)
+    if email == normalize_email(user.email):
+        return False
+    connection = user.auth0_db
+    if is_indexed(user, email):
+        return True
+    taken = cache.get(get_cache_key(email, connection))
+    if taken is not None:
+        return taken
+    return lookup(email, connection)
+
+
+def is_indexed(user: User, email: str) -> bool:
+    """
+    Return whether another database user has `email`, according to the
+    ``UserEmail`` index, as confirmed by the owner's cached profile. Entries
+    contradicted by it (because they changed their email elsewhere) are
+    corrected and ignored. Entries for owners whose profile isn't cached
+    could be just as stale, so are left for Auth0 to confirm.
+    """
+    entries = (
+        UserEmail.objects.filter(email=email, user__auth0_id__startswith="auth0|")
+        .exclude(user=user)
+        .select_related("user")
+    )
+    for entry in entries:
+        profile = cache.get(profile_cache.get_cache_key(entry.user.auth0_id))
+        if profile is None:
+            continue
+        if normalize_email(profile.get("email")) == email:
+            return True
+        UserEmail.record(entry.user, profile.get("email"))
+    return False
+
+
+def lookup(email: str, connection: Optional[str]) -> Optional[bool]:
+    """
+    Look `email` up with Auth0, or wait for the result of a lookup of the
+    same address that another thread has already started.
+    """
+    key = (connection or "", email)
+    with _lookups_lock:
+        future = _lookups.get(key)
+        started = future is None
+        if started:
+            future = _lookups[key] = Future()
+    if not started:
+        return future.result()
+    taken = None
+    try:
+        taken = search_auth0(email, connection)
+    finally:
+        with _lookups_lock:
+            del _lookups[key]
+        future.set_result(taken)
+    return taken
+
+
+def search_auth0(email: str, connection: Optional[str]) -> Optional[bool]:
+    limiter = auth0.get_management_api_limiter()
+    if not limiter.wait(RATE_LIMIT_IDENTIFIER, timeout=RATE_LIMIT_WAIT_TIMEOUT):
+        logger.warning("Timed out waiting to check an email address with Auth0.")
+        return None
+    try:
+        users = auth0.users_by_email_client.search_users_by_email(
+            email, fields=["user_id", "identities"]
+        )
+    except (Auth0Error, requests.RequestException) as e:
+        logger.warning(f"Unable to check an email address with Auth0: {e}")
+        return None
+    taken = any(
+        connection is None or identity.get("connection") == connection
+        for user in users
+        for identity in user.get("identities", ())
+    )
+    set_taken(email, connection, taken)
+    return taken
+
+
+def set_taken(email: str, connection: Optional[str], taken: bool) -> None:
+    cache.set(
+        get_cache_key(email, connection),
+        taken,
+        timeout=settings.EMAIL_AVAILABILITY_CACHE_TIMEOUT
+        if taken
+        else settings.EMAIL_AVAILABILITY_NEGATIVE_CACHE_TIMEOUT,
+    )
+
+
+def evict(email: str, connection: Optional[str]) -> None:
+    cache.delete(get_cache_key(email, connection))
+
+
+def is_email_exists_error(error: Exception) -> bool:
+    return (
+        isinstance(error, Auth0Error)
+        and error.status_code == 400
+        and EMAIL_EXISTS_MESSAGE in error.message
+    )
@@ -0,0 +1,137 @@
+"""
+Streaming exports of user accounts, combining local ``User`` data with each
+user's Auth0 profile. Users are read from the database in chunks (using a
+server-side cursor where the database supports one), and the profiles for
+each chunk are fetched together, so memory use doesn't grow with the number
+of users exported.
+"""
+import csv
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator
+
+from django.db.models import QuerySet
+
+from tna_account_management.api.encoding import dumps
+
+from . import profile_cache
+from .models import User
+
+# The number of users read from the database and matched with their
+# profiles at a time
+EXPORT_CHUNK_SIZE = 500
+
+ADDRESS_FIELDS = [
+    "recipient_name",
+    "house_name_no",
+    "street",
+    "town",
+    "county",
+    "country",
+    "postcode",
+    "telephone",
+]
+
+EXPORT_FIELDS = [
+    "id",
+    "username",
+    "auth0_id",
+    "email",
+    "email_verified",
+    "name",
+    "is_active",
+    "is_staff",
+    "date_joined",
+    "last_login",
+    *(f"address_{field}" for field in ADDRESS_FIELDS),
+]
+
+# Spreadsheet software treats CSV values starting with these as formulas
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def get_export_row(user: User) -> Dict[str, Any]:
+    address = user.address.get_form_data() if user.address else {}
+    row = {
+        "id": user.pk,
+        "username": user.username,
+        "auth0_id": user.auth0_id or "",
+        "email": user.email,
+        "email_verified": user.email_verified,
+        "name": user.name,
+        "is_active": user.is_active,
+        "is_staff": user.is_staff,
+        "date_joined": user.date_joined.isoformat(),
+        "last_login": user.last_login.isoformat() if user.last_login else "",
+    }
+    for field in ADDRESS_FIELDS:
+        row[f"address_{field}"] = address.get(field, "")
+    return row
+
+
+def iter_export_rows(
+    queryset: QuerySet, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield a row for each user in `queryset`. Profiles that aren't already
+    cached are fetched from Auth0 in bulk for each chunk of users, and not
+    cached, so that large exports don't flood the cache.
+    """
+    users = queryset.order_by("pk").iterator(chunk_size=chunk_size)
+    while chunk := list(islice(users, chunk_size)):
+        profiles = profile_cache.get_profiles(
+            [user.auth0_id for user in chunk if user.auth0_id], cache_misses=False
+        )
+        for user in chunk:
+            # Users deleted from Auth0 are still exported, without profile data
+            user.profile = profiles.get(user.auth0_id, {})
+            yield get_export_row(user)
+
+
+class Echo:
+    """
+    A file-like object that returns what is written to it, allowing
+    ``csv.writer`` to be used to generate lines for a streaming response.
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def escape_csv_value(value: Any) -> Any:
+    """
+    Prefix user-supplied values that would be treated as formulas when the
+    export is opened in a spreadsheet with a quote, so they're shown as text.
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([escape_csv_value(row[field]) for field in EXPORT_FIELDS])
+
+
+def iter_ndjson(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for row in rows:
+        yield dumps(row).decode() + "\n"
+
+
+def iter_export(
+    queryset: QuerySet, export_format: str, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> Iterator[str]:
+    """
+    Yield the lines of an export of the users in `queryset`, in the supplied
+    format (one of ``EXPORT_FORMATS``).
+    """
+    rows = iter_export_rows(queryset, chunk_size)
+    if export_format == "csv":
+        return iter_csv(rows)
+    return iter_ndjson(rows)
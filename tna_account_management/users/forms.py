@@ -1,9 +1,12 @@
 from django import forms
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from tbxforms.forms import BaseForm as HelperMixin
+from django.urls import reverse
 from tbxforms.layout import HTML, Button
 
+from tna_account_management.users import address_lookup
+from tna_account_management.utils.forms import HelperMixin
+
 CANCEL_LINK = HTML('<a href="/" class="cancel-action">Cancel</a>')
 
 
@@ -12,9 +15,8 @@ class VerifyEmailForm(HelperMixin, forms.Form):
         self.user_email = kwargs.pop("user_email", None)
         super().__init__(*args, **kwargs)
 
-    @property
-    def helper(self):
-        fh = super().helper
+    def build_helper(self):
+        fh = super().build_helper()
         fh.layout.extend(
             [
                 Button.primary(
@@ -30,9 +32,8 @@ class VerifyEmailForm(HelperMixin, forms.Form):
 class NameForm(HelperMixin, forms.Form):
     name = forms.CharField(max_length=200, required=False)
 
-    @property
-    def helper(self):
-        fh = super().helper
+    def build_helper(self):
+        fh = super().build_helper()
         fh.layout.extend(
             [
                 Button.primary(
@@ -58,9 +59,22 @@ class AddressForm(HelperMixin, forms.Form):
     postcode = forms.CharField(max_length=15)
     telephone = forms.CharField(max_length=100, required=False)
 
-    @property
-    def helper(self):
-        fh = super().helper
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if address_lookup.is_available():
+            # Picked up by the 'address-lookup' JavaScript component
+            self.fields["postcode"].widget.attrs[
+                "data-address-lookup-postcode"
+            ] = reverse("address_lookup_postcode")
+            self.fields["street"].widget.attrs.update(
+                {
+                    "data-address-lookup-streets": reverse("address_lookup_streets"),
+                    "autocomplete": "off",
+                }
+            )
+
+    def build_helper(self):
+        fh = super().build_helper()
         fh.layout.extend(
             [
                 Button.primary(
@@ -96,9 +110,8 @@ class EmailForm(HelperMixin, forms.Form):
             )
         return email2
 
-    @property
-    def helper(self):
-        fh = super().helper
+    def build_helper(self):
+        fh = super().build_helper()
         fh.layout.extend(
             [
                 Button.primary(
@@ -117,7 +130,6 @@ class ChangePasswordForm(HelperMixin, forms.Form):
         label="New Password",
         help_text="A minimum of 8 characters including an uppercase character and a symbol.",
         widget=forms.PasswordInput(),
-        validators=[validate_password],
     )
     confirm_password = forms.CharField(
         label="Confirm new password", widget=forms.PasswordInput()
@@ -142,9 +154,8 @@ class ChangePasswordForm(HelperMixin, forms.Form):
             )
         return password2
 
-    @property
-    def helper(self):
-        fh = super().helper
+    def build_helper(self):
+        fh = super().build_helper()
         fh.layout.extend(
             [
                 Button.primary(
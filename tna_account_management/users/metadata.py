@@ -0,0 +1,101 @@
+"""
+Helpers for updating Auth0 ``user_metadata``, which other TNA services
+write to as well.
+
+Auth0 merges ``user_metadata`` updates at the top level only, so sending
+a key replaces its whole value (lists included), and it has no conditional
+updates. To avoid overwriting changes made elsewhere, updates only include
+the keys that have changed, and the current values are read back first.
+If someone else has changed them since the profile was read (detected
+using a version number stored alongside the metadata), the two sets of
+changes are merged once before writing.
+"""
+from typing import Any, Dict
+
+# Incremented with each update of 'user_metadata' made by this site. Other
+# services that increment it too will have their changes detected sooner.
+VERSION_KEY = "metadata_version"
+
+# Items in lists of dicts with this key are matched by it when merging
+LIST_ITEM_ID_KEY = "Id"
+
+
+class Missing:
+    def __repr__(self):
+        return "MISSING"
+
+
+MISSING = Missing()
+
+
+def get_changes(base: Dict[str, Any], new_values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the items in `new_values` that differ from those in `base`.
+    """
+    return {key: value for key, value in new_values.items() if base.get(key) != value}
+
+
+def is_conflict(
+    base: Dict[str, Any], current: Dict[str, Any], changes: Dict[str, Any]
+) -> bool:
+    """
+    Return whether `current` metadata has been modified since `base` was read,
+    in a way that could affect the supplied `changes`.
+    """
+    if current.get(VERSION_KEY, 0) != base.get(VERSION_KEY, 0):
+        return True
+    # Services that don't increment the version can still be caught out
+    return any(current.get(key) != base.get(key) for key in changes)
+
+
+def merge(base: Any, ours: Any, theirs: Any) -> Any:
+    """
+    Three-way merge `ours` and `theirs`, which are both modified versions of
+    `base`. Dicts are merged key by key, and lists of dicts with an 'Id' are
+    merged item by item (keeping the order of `theirs`). Where both sides
+    have changed the same value, `ours` wins. Any of the arguments can be
+    ``MISSING``, to represent a key or item that doesn't exist on that side.
+    """
+    if ours == base:
+        return theirs
+    if theirs == base or theirs == ours:
+        return ours
+    if all(isinstance(value, dict) for value in (base, ours, theirs)):
+        return merge_dicts(base, ours, theirs)
+    if all(is_id_list(value) for value in (base, ours, theirs)):
+        return merge_id_lists(base, ours, theirs)
+    return ours
+
+
+def merge_dicts(base: dict, ours: dict, theirs: dict) -> dict:
+    result = {}
+    for key in {**theirs, **ours}:
+        value = merge(
+            base.get(key, MISSING), ours.get(key, MISSING), theirs.get(key, MISSING)
+        )
+        if value is not MISSING:
+            result[key] = value
+    return result
+
+
+def is_id_list(value: Any) -> bool:
+    return isinstance(value, list) and all(
+        isinstance(item, dict) and LIST_ITEM_ID_KEY in item for item in value
+    )
+
+
+def merge_id_lists(base: list, ours: list, theirs: list) -> list:
+    def by_id(items):
+        return {item[LIST_ITEM_ID_KEY]: item for item in items}
+
+    base_items, our_items, their_items = by_id(base), by_id(ours), by_id(theirs)
+    result = []
+    for item_id in {**their_items, **our_items}:
+        item = merge(
+            base_items.get(item_id, MISSING),
+            our_items.get(item_id, MISSING),
+            their_items.get(item_id, MISSING),
+        )
+        if item is not MISSING:
+            result.append(item)
+    return result
@@ -0,0 +1,51 @@
+from django.urls import Resolver404, resolve
+
+from tna_account_management.users import profile_cache
+
+# Set on login, so that the user's profile can be prefetched before the
+# user itself has been loaded
+PROFILE_SESSION_KEY = "_auth0_id"
+
+
+class ProfilePrefetchMiddleware:
+    """
+    For views with a truthy `prefetch_profile` attribute, starts loading the
+    logged-in user's Auth0 profile as soon as the session has been loaded,
+    so that fetching an uncached profile overlaps with the rest of the
+    request (loading the user, CSRF checks, form construction, template
+    rendering and so on), rather than starting when the profile is first
+    used. ``User.profile`` waits for the result.
+
+    Must come after ``SessionMiddleware``, and as early as possible after it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        auth0_id = request.session.get(PROFILE_SESSION_KEY)
+        if auth0_id and self.should_prefetch(request):
+            request.profile_future = profile_cache.prefetch_profile(auth0_id)
+        return self.get_response(request)
+
+    def should_prefetch(self, request) -> bool:
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        view = getattr(match.func, "view_class", match.func)
+        return getattr(view, "prefetch_profile", False)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        future = getattr(request, "profile_future", None)
+        user = request.user
+        if not user.is_authenticated or not user.auth0_id:
+            return None
+        if future is not None:
+            if request.session.get(PROFILE_SESSION_KEY) == user.auth0_id:
+                user.prefetch_profile(future)
+        elif self.should_prefetch(request):
+            # Sessions from before this middleware was added
+            user.prefetch_profile()
+            request.session[PROFILE_SESSION_KEY] = user.auth0_id
+        return None
@@ -0,0 +1,63 @@
+# Generated by Django 3.2.14 on 2026-10-19 15:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0008_usersession"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BulkAction",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("resend_verification_email", "Resend verification email"),
+                            ("assign_role", "Assign role"),
+                            ("remove_role", "Remove role"),
+                        ],
+                        max_length=50,
+                    ),
+                ),
+                ("role_id", models.CharField(blank=True, max_length=50)),
+                ("role_name", models.CharField(blank=True, max_length=255)),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+                ("completed_at", models.DateTimeField(null=True)),
+                ("results", models.JSONField(default=list)),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
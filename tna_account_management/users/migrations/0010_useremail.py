@@ -0,0 +1,32 @@
+# Generated by Django 3.2.14 on 2026-10-19 16:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0009_bulkaction"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserEmail",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="users.user",
+                    ),
+                ),
+                ("email", models.CharField(db_index=True, max_length=254)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.14 on 2026-10-19 16:28
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0012_outbox"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="user",
+            options={
+                "permissions": [("export_user", "Can export user data")],
+                "verbose_name": "user",
+                "verbose_name_plural": "users",
+            },
+        ),
+    ]
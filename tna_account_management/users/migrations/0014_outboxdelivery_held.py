@@ -0,0 +1,27 @@
+# Generated by Django 3.2.14 on 2026-10-19 16:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0013_user_export_permission"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="outboxdelivery",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("held", "Held"),
+                    ("pending", "Pending"),
+                    ("delivered", "Delivered"),
+                    ("failed", "Failed"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.14 on 2026-10-19 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0014_outboxdelivery_held"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bulkaction",
+            name="heartbeat_at",
+            field=models.DateTimeField(null=True, verbose_name="last progress at"),
+        ),
+    ]
@@ -1,13 +1,25 @@
 import re
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Union
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from importlib import import_module
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
 
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.utils.functional import cached_property
 
 from tna_account_management.utils import auth0
 
+from . import audit, metadata, profile_cache
+from .roles import get_user_roles
+
+# Matches values such as '12', '12a' and '12 AB'
+HOUSE_NUMBER_RE = re.compile(r"^[0-9]+\s{0,2}[a-zA-Z]{0,2}$")
+
 
 class UnsupportedForUser(Exception):
     pass
@@ -16,6 +28,9 @@ class UnsupportedForUser(Exception):
 class User(AbstractUser):
     auth0_id = models.CharField(max_length=36, blank=True, null=True, unique=True)
 
+    class Meta(AbstractUser.Meta):
+        permissions = [("export_user", "Can export user data")]
+
     @cached_property
     def profile(self) -> Dict[str, Any]:
         """
@@ -26,9 +41,108 @@ class User(AbstractUser):
         to set dummy profile data and avoid calls to Auth0.
         """
         if self.auth0_id:
-            return auth0.users_client.get(id=self.auth0_id)
+            future = self.__dict__.pop("_profile_future", None)
+            if future is not None:
+                return future.result()
+            return profile_cache.get_profile(self.auth0_id)
         return {}
 
+    def prefetch_profile(self, future: Optional[Future] = None) -> None:
+        """
+        Start loading `profile` in the background (if it isn't cached), so
+        that less time is spent waiting for it when it's first used. Or use
+        the supplied `future`, if the fetch has already been started.
+        """
+        if self.auth0_id and "profile" not in self.__dict__:
+            if future is None:
+                future = profile_cache.prefetch_profile(self.auth0_id)
+            self._profile_future = future
+
+    @cached_property
+    def profile_view(self) -> "Profile":
+        """
+        Returns a compact view of the parts of `profile` used by this
+        project, so that values derived from it are only worked out once.
+        """
+        return Profile.from_auth0_json(self.profile)
+
+    @cached_property
+    def profile_version(self) -> str:
+        """
+        Returns a value that identifies the current version of this user's
+        data (from both Auth0 and the local database), which changes whenever
+        the profile is updated.
+
+        The version of the cached profile is stored alongside it, so (unlike
+        `profile`) this doesn't usually need the profile to be fetched.
+        """
+        version = None
+        if self.auth0_id and "profile" not in self.__dict__:
+            version = profile_cache.get_cached_profile_version(self.auth0_id)
+        if version is None:
+            version = profile_cache.get_profile_version(self.profile)
+        return ":".join((str(self.pk), self.username, version))
+
+    @property
+    def profile_updated_at(self) -> Optional[datetime]:
+        """
+        Returns the most recent time that this user's data is known to have
+        changed, or `None` if that isn't known.
+        """
+        candidates = [self.last_login]
+        if updated_at := self.profile_view.updated_at:
+            candidates.append(parse_datetime(str(updated_at)))
+        candidates = [value for value in candidates if value is not None]
+        return max(candidates) if candidates else None
+
+    def _update_auth0_user(self, data: Dict[str, Any]) -> None:
+        """
+        Apply the supplied changes to the connected Auth0 user, and replace
+        the cached profile (and any template fragments rendered from it) with
+        the updated version returned by Auth0.
+        """
+        profile = auth0.users_client.update(self.auth0_id, data)
+        profile_cache.evict_profile_fragments(self.auth0_id, self.profile_version)
+        profile_cache.set_profile(self.auth0_id, profile)
+        if "email" in data:
+            UserEmail.record(self, profile.get("email"))
+        self.profile = profile
+        self.__dict__.pop("profile_version", None)
+        self.__dict__.pop("profile_view", None)
+
+    def _update_user_metadata(self, new_values: Dict[str, Any]) -> None:
+        """
+        Set the supplied top-level `user_metadata` keys for the connected
+        Auth0 user, sending only those that differ from the profile that was
+        read. If the current metadata in Auth0 has been changed by someone
+        else since then, the changes are merged with theirs (see
+        ``users.metadata``) rather than overwriting them.
+        """
+        base = self.profile.get("user_metadata") or {}
+        changes = metadata.get_changes(base, new_values)
+        if not changes:
+            return None
+        current = (
+            auth0.users_client.get(self.auth0_id, fields=["user_metadata"]).get(
+                "user_metadata"
+            )
+            or {}
+        )
+        if metadata.is_conflict(base, current, changes):
+            merged = {
+                key: metadata.merge(base.get(key), value, current.get(key))
+                for key, value in changes.items()
+            }
+            changes = metadata.get_changes(current, merged)
+        changes[metadata.VERSION_KEY] = current.get(metadata.VERSION_KEY, 0) + 1
+        self._update_auth0_user({"user_metadata": changes})
+
+    def record_event(self, action: str, fields: Iterable[str] = (), **kwargs) -> bool:
+        """
+        Add an entry to the audit log for this user (see ``users.audit``).
+        """
+        return audit.record(action, self.pk, self.auth0_id, fields=fields, **kwargs)
+
     def set_username(self, base: Optional[str] = None) -> None:
         """
         Set the 'username' model field value to a unique value, using the
@@ -58,16 +172,11 @@ class User(AbstractUser):
 
     @cached_property
     def email(self) -> str:
-        return self.profile.get("email", "")
+        return self.profile_view.email
 
     @cached_property
     def name(self) -> str:
-        name = self.profile.get("name", "")
-        if name == self.email:
-            # Auth0 uses email as a placeholder when there is no name
-            # specified, but we don't want that substitution here
-            return ""
-        return name
+        return self.profile_view.name
 
     @cached_property
     def name_segments(self) -> str:
@@ -75,7 +184,7 @@ class User(AbstractUser):
 
     @property
     def first_name(self) -> str:
-        if given_name := self.profile.get("given_name"):
+        if given_name := self.profile_view.given_name:
             return given_name
         if self.name:
             return self.name_segments[0]
@@ -83,7 +192,7 @@ class User(AbstractUser):
 
     @property
     def last_name(self) -> str:
-        if family_name := self.profile.get("family_name"):
+        if family_name := self.profile_view.family_name:
             return family_name
         try:
             return " ".join(self.name_segments[1:])
@@ -92,7 +201,23 @@ class User(AbstractUser):
 
     @property
     def email_verified(self):
-        return self.profile.get("email_verified", False)
+        return self.profile_view.email_verified
+
+    @cached_property
+    def roles(self) -> List[str]:
+        """
+        Returns the names of the Auth0 roles assigned to this user. Or, if the
+        user is not connected to an Auth0 user, an empty list.
+
+        NOTE: This is a cached_property, so is 'setable', allowing roles for
+        several users to be fetched at once with `get_many_user_roles()`.
+        """
+        if self.auth0_id:
+            return [role["name"] for role in get_user_roles(self.auth0_id)]
+        return []
+
+    def has_role(self, name: str) -> bool:
+        return name in self.roles
 
     @property
     def is_social(self):
@@ -100,17 +225,11 @@ class User(AbstractUser):
 
     @property
     def auth0_db(self) -> Union[str, None]:
-        for item in self.profile.get("identities", ()):
-            if not item.get("isSocial", True):
-                return item.get("connection")
+        return self.profile_view.db_connection
 
     @cached_property
     def address(self) -> Union["Address", None]:
-        addresses = self.profile.get("user_metadata", {}).get("addresses", ())
-        try:
-            return Address.from_auth0_json(addresses[0])
-        except IndexError:
-            return None
+        return self.profile_view.address
 
     def check_password(self, raw_password: str) -> bool:
         if self.has_usable_password():
@@ -123,83 +242,253 @@ class User(AbstractUser):
         if not self.auth0_id:
             raise UnsupportedForUser
         auth0.jobs_client.send_verification_email(user_id=self.auth0_id)
+        self.record_event(AuditEvent.SEND_VERIFICATION_EMAIL)
 
     def update_name(self, new_name: str) -> None:
         if not self.auth0_id:
             raise UnsupportedForUser
         if self.name == new_name:
             return None
-        auth0.users_client.update(self.auth0_id, {"name": new_name or self.email})
+        with OutboxMessage.hold(
+            OutboxMessage.NAME_CHANGED, self.auth0_id, {"name": new_name}
+        ):
+            self._update_auth0_user({"name": new_name or self.email})
         self.name = new_name
+        self.record_event(AuditEvent.UPDATE_NAME, ["name"])
 
     def update_email(self, new_email: str):
         if not self.auth0_id:
             raise UnsupportedForUser
         if self.email == new_email:
             return None
-        auth0.users_client.update(self.auth0_id, {"email": new_email})
+        with OutboxMessage.hold(
+            OutboxMessage.EMAIL_CHANGED, self.auth0_id, {"email": new_email}
+        ):
+            self._update_auth0_user({"email": new_email})
         self.email = new_email
+        self.record_event(AuditEvent.UPDATE_EMAIL, ["email"])
 
     def update_password(self, raw_password: str):
         if self.auth0_id:
-            auth0.users_client.update(self.auth0_id, {"password": raw_password})
+            self._update_auth0_user({"password": raw_password})
         else:
             self.set_password(raw_password)
             self.save(update_fields=["password"])
+        self.record_event(AuditEvent.UPDATE_PASSWORD, ["password"])
 
     def update_address(self, data: Dict[str, str]):
         if not self.auth0_id:
             return UnsupportedForUser
         if self.address is None:
             self.address = Address()
+            original = None
+        else:
+            original = self.address.to_auth0_json()
         self.address.update(**data)
-        auth0.users_client.update(
-            self.auth0_id, {"user_metadata": {"addresses": [self.address.to_json()]}}
+        updated = self.address.to_auth0_json()
+        if updated == original:
+            return None
+        with OutboxMessage.hold(
+            OutboxMessage.ADDRESS_CHANGED, self.auth0_id, {"address": updated}
+        ):
+            self._update_user_metadata({"addresses": [updated]})
+        self.record_event(
+            AuditEvent.UPDATE_ADDRESS,
+            [
+                f"address.{key}"
+                for key, value in updated.items()
+                if value != (original or {}).get(key, "")
+            ],
         )
 
     def delete_address(self):
         if not self.auth0_id or not self.address:
             return None
         self.address = None
-        auth0.users_client.update(self.auth0_id, {"user_metadata": {"addresses": []}})
+        with OutboxMessage.hold(
+            OutboxMessage.ADDRESS_CHANGED, self.auth0_id, {"address": None}
+        ):
+            self._update_user_metadata({"addresses": []})
+        self.record_event(AuditEvent.DELETE_ADDRESS, ["address"])
+
+
+class UserSessionQuerySet(models.QuerySet):
+    def invalidate(self) -> int:
+        """
+        Delete the sessions referenced by the records in this queryset from
+        the session store, then delete the records themselves. Returns the
+        number of sessions that were invalidated.
+        """
+        store_class = import_module(settings.SESSION_ENGINE).SessionStore
+        session_keys = list(self.values_list("session_key", flat=True))
+        for session_key in session_keys:
+            store_class(session_key=session_key).delete()
+        UserSession.objects.filter(session_key__in=session_keys).delete()
+        return len(session_keys)
+
+
+class UserSession(models.Model):
+    """
+    An index of the sessions created for each user when they log in, allowing
+    all sessions for a specific user (or Auth0 session) to be found and ended
+    without scanning the session store.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="sessions")
+    session_key = models.CharField(max_length=40, unique=True)
+    auth0_sid = models.CharField(max_length=255, blank=True, db_index=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = UserSessionQuerySet.as_manager()
+
+    def __str__(self):
+        return self.session_key
+
+    @classmethod
+    def record(cls, request, user: User, auth0_sid: str = "") -> "UserSession":
+        """
+        Create a record for the current session of the supplied `request`,
+        which `user` has just been logged in to. Records for the same user
+        that are older than the session cookie age are removed at the same
+        time, so that the index doesn't grow indefinitely.
+        """
+        if not request.session.session_key:
+            request.session.save()
+        cls.objects.filter(
+            user=user,
+            created_at__lt=timezone.now()
+            - timedelta(seconds=settings.SESSION_COOKIE_AGE),
+        ).delete()
+        obj, _ = cls.objects.update_or_create(
+            session_key=request.session.session_key,
+            defaults={"user": user, "auth0_sid": auth0_sid or ""},
+        )
+        return obj
+
+
+def normalize_email(email: str) -> str:
+    # Auth0 stores email addresses in lower case
+    return (email or "").strip().lower()
+
+
+class UserEmail(models.Model):
+    """
+    A copy of the email address of each user's Auth0 account, updated when
+    they log in or change it here, so that whether an address is already in
+    use can usually be checked without asking Auth0 (see
+    ``users.email_availability``).
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+    email = models.CharField(max_length=254, db_index=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.email
+
+    @classmethod
+    def record(cls, user: User, email: str) -> None:
+        email = normalize_email(email)
+        if not email:
+            cls.objects.filter(user=user).delete()
+            return None
+        cls.objects.update_or_create(
+            user=user, defaults={"email": email, "updated_at": timezone.now()}
+        )
 
 
-@dataclass
 class Address:
-    house_name_no: str
-    street: str
-    town: str
-    country: str
-    postcode: str
-    id: int = 1
-    address_type: int = 1
-    county: str = ""
-    recipient_name: str = ""
-    title: str = ""
-    first_name: str = ""
-    last_name: str = ""
-    telephone: str = ""
+    """
+    A postal address, stored in Auth0 as the first item in the user's
+    'addresses' metadata.
+
+    Uses ``__slots__`` to keep instances small when many are held at once,
+    such as during exports (``@dataclass(slots=True)`` needs Python 3.10).
+    """
+
+    __slots__ = (
+        "house_name_no",
+        "street",
+        "town",
+        "country",
+        "postcode",
+        "id",
+        "address_type",
+        "county",
+        "recipient_name",
+        "title",
+        "first_name",
+        "last_name",
+        "telephone",
+    )
+
+    def __init__(
+        self,
+        house_name_no: str = "",
+        street: str = "",
+        town: str = "",
+        country: str = "",
+        postcode: str = "",
+        id: int = 1,
+        address_type: int = 1,
+        county: str = "",
+        recipient_name: str = "",
+        title: str = "",
+        first_name: str = "",
+        last_name: str = "",
+        telephone: str = "",
+    ):
+        self.house_name_no = house_name_no
+        self.street = street
+        self.town = town
+        self.country = country
+        self.postcode = postcode
+        self.id = id
+        self.address_type = address_type
+        self.county = county
+        self.recipient_name = recipient_name
+        self.title = title
+        self.first_name = first_name
+        self.last_name = last_name
+        self.telephone = telephone
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"Address({values})"
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    # Addresses are mutable, so shouldn't be hashable (as with dataclasses)
+    __hash__ = None
 
     @classmethod
-    def from_auth0_json(cls, data: Dict[str, Union[str, int]]):
-        kwargs = {
-            "id": data.get("Id", 1),
-            "address_type": data.get("AddressType", 1),
-            "telephone": data.get("Telephone", "").strip(),
-            "title": data.get("Title", "").strip(),
-            "first_name": data.get("Firstname", "").strip(),
-            "last_name": data.get("Lastname", "").strip(),
-            "recipient_name": data.get("RecipientName", "").strip(),
-            "house_name_no": data.get("HouseNameNo", "").strip(),
-            "street": data.get("Street", "").strip(),
-            "town": data.get("Town", "").strip(),
-            "county": data.get("County", "").strip(),
-            "country": data.get("Country", "").strip(),
-            "postcode": data.get("Postcode", "").strip(),
-        }
-        return cls(**kwargs)
+    def from_auth0_json(cls, data: Dict[str, Union[str, int]]) -> "Address":
+        get = data.get
+        # Arguments are positional, in the order of __init__'s parameters
+        return cls(
+            get("HouseNameNo", "").strip(),
+            get("Street", "").strip(),
+            get("Town", "").strip(),
+            get("Country", "").strip(),
+            get("Postcode", "").strip(),
+            get("Id", 1),
+            get("AddressType", 1),
+            get("County", "").strip(),
+            get("RecipientName", "").strip(),
+            get("Title", "").strip(),
+            get("Firstname", "").strip(),
+            get("Lastname", "").strip(),
+            get("Telephone", "").strip(),
+        )
 
-    def to_auth0_json(self):
+    def to_auth0_json(self) -> Dict[str, Union[str, int]]:
         return {
             "Id": self.id,
             "AddressType": self.address_type,
@@ -233,7 +522,7 @@ class Address:
 
     @staticmethod
     def looks_like_house_number(value: str) -> bool:
-        return bool(re.match(r"^[0-9]+\s{0,2}[a-zA-z]{0,2}$", value))
+        return HOUSE_NUMBER_RE.match(value) is not None
 
     @property
     def lines(self) -> List[str]:
@@ -266,5 +555,364 @@ class Address:
 
     def update(self, **kwargs):
         for key, value in kwargs.items():
-            if hasattr(self, key):
+            if key in self.__slots__:
                 setattr(self, key, value)
+
+
+class Profile:
+    """
+    A compact, read-only view of the parts of an Auth0 user profile that
+    this project uses, which are extracted from the raw profile JSON (with
+    its identities, metadata and login history) once, rather than each
+    time they're needed.
+    """
+
+    __slots__ = (
+        "user_id",
+        "email",
+        "email_verified",
+        "name",
+        "given_name",
+        "family_name",
+        "nickname",
+        "updated_at",
+        "db_connection",
+        "address",
+        "picture",
+    )
+
+    def __init__(
+        self,
+        user_id: str = "",
+        email: str = "",
+        email_verified: bool = False,
+        name: str = "",
+        given_name: str = "",
+        family_name: str = "",
+        nickname: str = "",
+        updated_at: Optional[str] = None,
+        db_connection: Optional[str] = None,
+        address: Optional[Address] = None,
+        picture: str = "",
+    ):
+        self.user_id = user_id
+        self.email = email
+        self.email_verified = email_verified
+        self.name = name
+        self.given_name = given_name
+        self.family_name = family_name
+        self.nickname = nickname
+        self.updated_at = updated_at
+        self.db_connection = db_connection
+        self.address = address
+        self.picture = picture
+
+    def __repr__(self):
+        return f"Profile(user_id={self.user_id!r})"
+
+    @classmethod
+    def from_auth0_json(cls, data: Dict[str, Any]) -> "Profile":
+        get = data.get
+        email = get("email", "")
+        name = get("name", "")
+        if name == email:
+            # Auth0 uses email as a placeholder when there is no name
+            # specified, but we don't want that substitution here
+            name = ""
+        db_connection = None
+        for item in get("identities", ()):
+            if not item.get("isSocial", True):
+                db_connection = item.get("connection")
+                break
+        addresses = get("user_metadata", {}).get("addresses", ())
+        return cls(
+            get("user_id", ""),
+            email,
+            get("email_verified", False),
+            name,
+            get("given_name", ""),
+            get("family_name", ""),
+            get("nickname", ""),
+            get("updated_at"),
+            db_connection,
+            Address.from_auth0_json(addresses[0]) if addresses else None,
+            get("picture", ""),
+        )
+
+
+class BulkAction(models.Model):
+    """
+    A record of an action applied to many users at once from the admin
+    (see ``users.bulk``), with the result for each user.
+    """
+
+    RESEND_VERIFICATION_EMAIL = "resend_verification_email"
+    ASSIGN_ROLE = "assign_role"
+    REMOVE_ROLE = "remove_role"
+    ACTION_CHOICES = [
+        (RESEND_VERIFICATION_EMAIL, "Resend verification email"),
+        (ASSIGN_ROLE, "Assign role"),
+        (REMOVE_ROLE, "Remove role"),
+    ]
+
+    PENDING = "pending"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    action = models.CharField(max_length=50, choices=ACTION_CHOICES)
+    role_id = models.CharField(max_length=50, blank=True)
+    role_name = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(
+        User, null=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    completed_at = models.DateTimeField(null=True)
+    # Updated as progress is saved, so that actions whose process has
+    # stopped can be recognised (see ``users.bulk.expire_stale_bulk_actions``)
+    heartbeat_at = models.DateTimeField("last progress at", null=True)
+    # A dict for each selected user, with their 'user_id', 'username',
+    # 'auth0_id', 'status' and 'error' (if any)
+    results = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        label = self.get_action_display()
+        if self.role_name:
+            label = f"{label}: {self.role_name}"
+        return f"{label} ({self.created_at:%Y-%m-%d %H:%M})"
+
+    def count(self, status: str) -> int:
+        return sum(1 for result in self.results if result["status"] == status)
+
+    @property
+    def succeeded_count(self) -> int:
+        return self.count(self.SUCCEEDED)
+
+    @property
+    def failed_count(self) -> int:
+        return self.count(self.FAILED)
+
+    @property
+    def pending_count(self) -> int:
+        return self.count(self.PENDING)
+
+
+class AuditEvent(models.Model):
+    """
+    A record of a change made to a user's account (or of them logging in or
+    out), written in batches in the background by ``users.audit``.
+    """
+
+    LOGIN = "login"
+    LOGOUT = "logout"
+    UPDATE_NAME = "update_name"
+    UPDATE_EMAIL = "update_email"
+    UPDATE_PASSWORD = "update_password"
+    UPDATE_ADDRESS = "update_address"
+    DELETE_ADDRESS = "delete_address"
+    SEND_VERIFICATION_EMAIL = "send_verification_email"
+    ACTION_CHOICES = [
+        (LOGIN, "Logged in"),
+        (LOGOUT, "Logged out"),
+        (UPDATE_NAME, "Changed name"),
+        (UPDATE_EMAIL, "Changed email"),
+        (UPDATE_PASSWORD, "Changed password"),
+        (UPDATE_ADDRESS, "Changed address"),
+        (DELETE_ADDRESS, "Deleted address"),
+        (SEND_VERIFICATION_EMAIL, "Sent verification email"),
+    ]
+
+    # Without database constraints, so that writing events never needs to
+    # check (or lock) users, and events outlive the users they're about
+    user = models.ForeignKey(
+        User,
+        null=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name="+",
+    )
+    auth0_id = models.CharField(max_length=36, blank=True)
+    # The user who made the change, if not the user themselves (such as an
+    # admin using a bulk action)
+    actor = models.ForeignKey(
+        User,
+        null=True,
+        blank=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name="+",
+    )
+    action = models.CharField(max_length=50, choices=ACTION_CHOICES)
+    # The names of the profile fields that were changed (never their values)
+    fields = models.JSONField(default=list, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at"], name="audit_created_at_idx"),
+            models.Index(fields=["user", "-created_at"], name="audit_user_idx"),
+            models.Index(fields=["auth0_id", "-created_at"], name="audit_auth0_id_idx"),
+            models.Index(fields=["action", "-created_at"], name="audit_action_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} ({self.created_at:%Y-%m-%d %H:%M})"
+
+
+class OutboxMessage(models.Model):
+    """
+    A notification of a change to a user's profile, to be delivered to each
+    of ``OUTBOX_ENDPOINTS`` (as an ``OutboxDelivery``) by the
+    'dispatch_outbox' command (see ``users.outbox``).
+    """
+
+    NAME_CHANGED = "name_changed"
+    EMAIL_CHANGED = "email_changed"
+    ADDRESS_CHANGED = "address_changed"
+    EVENT_CHOICES = [
+        (NAME_CHANGED, "Name changed"),
+        (EMAIL_CHANGED, "Email changed"),
+        (ADDRESS_CHANGED, "Address changed"),
+    ]
+
+    event = models.CharField(max_length=50, choices=EVENT_CHOICES)
+    auth0_id = models.CharField(max_length=36)
+    # The new values of the changed fields
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.get_event_display()} ({self.created_at:%Y-%m-%d %H:%M})"
+
+    @classmethod
+    def enqueue(
+        cls, event: str, auth0_id: str, data: Dict[str, Any], held: bool = False
+    ) -> Optional["OutboxMessage"]:
+        """
+        Create a message, along with a delivery of it to each configured
+        endpoint, in a single transaction. The deliveries are pending, or
+        (when `held` is `True`) held until ``release()`` is called. Returns
+        `None` if no endpoints are configured.
+        """
+        if not settings.OUTBOX_ENDPOINTS:
+            return None
+        status = OutboxDelivery.HELD if held else OutboxDelivery.PENDING
+        with transaction.atomic():
+            message = cls.objects.create(event=event, auth0_id=auth0_id, data=data)
+            OutboxDelivery.objects.bulk_create(
+                OutboxDelivery(message=message, endpoint=endpoint, status=status)
+                for endpoint in settings.OUTBOX_ENDPOINTS
+            )
+        return message
+
+    @classmethod
+    @contextmanager
+    def hold(
+        cls, event: str, auth0_id: str, data: Dict[str, Any]
+    ) -> Iterator[Optional["OutboxMessage"]]:
+        """
+        Record a held message before the block (which should make the change
+        in Auth0) is run, then release it for delivery if the block succeeds,
+        or delete it if the block raises an exception.
+
+        Because the message is committed first, a change can't be made
+        without a message being recorded, even if this process dies part way
+        through. Messages left held that way are checked against Auth0 by
+        the dispatcher (see ``users.outbox.resolve_held``).
+        """
+        message = cls.enqueue(event, auth0_id, data, held=True)
+        try:
+            yield message
+        except BaseException:
+            if message is not None:
+                message.delete()
+            raise
+        if message is not None:
+            message.release()
+
+    def release(self) -> None:
+        """
+        Make held deliveries of this message due for delivery.
+        """
+        self.deliveries.filter(status=OutboxDelivery.HELD).update(
+            status=OutboxDelivery.PENDING, next_attempt_at=timezone.now()
+        )
+
+    def is_applied(self, profile: Dict[str, Any]) -> bool:
+        """
+        Return whether the change described by this message is reflected in
+        the supplied Auth0 profile.
+        """
+        if self.event == self.NAME_CHANGED:
+            return Profile.from_auth0_json(profile).name == self.data["name"]
+        if self.event == self.EMAIL_CHANGED:
+            return normalize_email(profile.get("email")) == normalize_email(
+                self.data["email"]
+            )
+        address = Profile.from_auth0_json(profile).address
+        if address is None:
+            return self.data["address"] is None
+        return address.to_auth0_json() == self.data["address"]
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "id": self.pk,
+            "event": self.event,
+            "auth0_id": self.auth0_id,
+            "data": self.data,
+            "created_at": self.created_at.isoformat(),
+        }
+
+
+class OutboxDelivery(models.Model):
+    """
+    The delivery of an ``OutboxMessage`` to one endpoint, which is retried
+    (with exponential backoff) until the endpoint accepts it, or until
+    OUTBOX_MAX_ATTEMPTS attempts have failed.
+    """
+
+    # Held until the change has been made in Auth0 (see OutboxMessage.hold)
+    HELD = "held"
+    PENDING = "pending"
+    DELIVERED = "delivered"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (HELD, "Held"),
+        (PENDING, "Pending"),
+        (DELIVERED, "Delivered"),
+        (FAILED, "Failed"),
+    ]
+
+    message = models.ForeignKey(
+        OutboxMessage, on_delete=models.CASCADE, related_name="deliveries"
+    )
+    # A key of OUTBOX_ENDPOINTS
+    endpoint = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # When the delivery is next due to be attempted. Also pushed back while
+    # an attempt is in progress, so that no other dispatcher picks it up.
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["message_id"]
+        indexes = [
+            models.Index(
+                fields=["endpoint", "status", "next_attempt_at"],
+                name="outbox_due_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.message} to {self.endpoint}"
@@ -0,0 +1,336 @@
+"""
+Delivers notifications of profile changes (``OutboxMessage``s, created when
+users change their name, email or address here) to downstream TNA systems,
+so that they don't need to poll Auth0 for changes.
+
+Each message is delivered to every endpoint in ``OUTBOX_ENDPOINTS`` by the
+'dispatch_outbox' command, which POSTs JSON batches of up to
+OUTBOX_BATCH_SIZE messages:
+
+    {"messages": [{"id": 1, "event": "name_changed", "auth0_id": "...",
+                   "data": {"name": "..."}, "created_at": "..."}, ...]}
+
+signed with an HMAC-SHA256 of the body (using OUTBOX_SIGNING_SECRET) in
+the ``X-Account-Signature`` header. A batch is delivered once the endpoint
+responds with a 2xx status. Otherwise it is retried with exponential
+backoff, up to OUTBOX_MAX_ATTEMPTS times. Delivery is at least once: if a
+dispatcher stops mid-request, the batch is sent again, so endpoints should
+ignore message IDs they have already seen. Messages may arrive out of
+order when batches are retried, so should be applied in ID order.
+
+Messages are recorded (held) before the change is made in Auth0, and
+released once Auth0 has accepted it (see ``OutboxMessage.hold``). Any left
+held for longer than OUTBOX_HOLD_TIMEOUT, because the process making the
+change stopped part way through, are released or deleted by the dispatcher
+depending on whether the change reached Auth0.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import random
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from auth0.v3.exceptions import Auth0Error
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from tna_account_management.utils import auth0
+
+from .models import OutboxDelivery, OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-Account-Signature"
+
+# How long (in seconds) after the request timeout a claimed batch is left
+# before another dispatcher may assume this one has stopped, and retry it
+LEASE_MARGIN = 30
+
+# How often (in seconds) a long-running dispatcher purges old messages
+PURGE_INTERVAL = 60 * 60
+
+# How often (in seconds) a long-running dispatcher checks for messages that
+# have been held for too long
+RESOLVE_INTERVAL = 60
+
+_sessions = threading.local()
+
+
+def get_session() -> requests.Session:
+    # Connections to each endpoint are kept alive between batches
+    if not hasattr(_sessions, "session"):
+        _sessions.session = requests.Session()
+    return _sessions.session
+
+
+def sign(body: bytes) -> str:
+    secret = settings.OUTBOX_SIGNING_SECRET.encode()
+    return hmac.new(secret, body, hashlib.sha256).hexdigest()
+
+
+def get_retry_delay(attempts: int) -> float:
+    """
+    Return how long (in seconds) to wait before the next attempt, after
+    `attempts` attempts have failed.
+    """
+    return min(
+        settings.OUTBOX_RETRY_BASE_DELAY * 2 ** (attempts - 1),
+        settings.OUTBOX_RETRY_MAX_DELAY,
+    )
+
+
+def claim_batch(endpoint: str) -> List[OutboxDelivery]:
+    """
+    Return the oldest due deliveries for `endpoint` (up to OUTBOX_BATCH_SIZE
+    of them), pushing back their next attempt so that no other dispatcher
+    claims them while they are being delivered.
+    """
+    now = timezone.now()
+    queryset = (
+        OutboxDelivery.objects.filter(
+            endpoint=endpoint,
+            status=OutboxDelivery.PENDING,
+            next_attempt_at__lte=now,
+        )
+        .select_related("message")
+        .order_by("message_id")
+    )
+    features = connection.features
+    # Without row locks (on SQLite), the transaction wouldn't stop another
+    # dispatcher claiming the same batch, and would fail if one tried to
+    if features.has_select_for_update_skip_locked:
+        queryset = queryset.select_for_update(
+            skip_locked=True,
+            of=("self",) if features.has_select_for_update_of else (),
+        )
+        atomic = transaction.atomic()
+    else:
+        atomic = nullcontext()
+    with atomic:
+        batch = list(queryset[: settings.OUTBOX_BATCH_SIZE])
+        if batch:
+            lease = settings.OUTBOX_REQUEST_TIMEOUT + LEASE_MARGIN
+            OutboxDelivery.objects.filter(pk__in=[d.pk for d in batch]).update(
+                next_attempt_at=now + timedelta(seconds=lease)
+            )
+    return batch
+
+
+def deliver_batch(endpoint: str, batch: List[OutboxDelivery]) -> bool:
+    """
+    POST the messages for `batch` to `endpoint`, and record the outcome.
+    Returns whether the endpoint accepted them.
+    """
+    body = json.dumps(
+        {"messages": [delivery.message.to_json() for delivery in batch]},
+        separators=(",", ":"),
+    ).encode()
+    try:
+        response = get_session().post(
+            settings.OUTBOX_ENDPOINTS[endpoint],
+            data=body,
+            headers={"Content-Type": "application/json", SIGNATURE_HEADER: sign(body)},
+            timeout=settings.OUTBOX_REQUEST_TIMEOUT,
+        )
+        response.raise_for_status()
+    except requests.RequestException as e:
+        record_failure(batch, str(e))
+        logger.warning(f"Unable to deliver {len(batch)} messages to {endpoint}: {e}")
+        return False
+    OutboxDelivery.objects.filter(pk__in=[d.pk for d in batch]).update(
+        status=OutboxDelivery.DELIVERED,
+        delivered_at=timezone.now(),
+        attempts=F("attempts") + 1,
+        last_error="",
+    )
+    return True
+
+
+def record_failure(batch: List[OutboxDelivery], error: str) -> None:
+    now = timezone.now()
+    # Spread retries out, so that they don't all arrive at once when an
+    # endpoint recovers. The whole batch is delayed by the same proportion,
+    # so that it is retried as one batch, rather than a message at a time.
+    jitter = random.uniform(0.5, 1)
+    for delivery in batch:
+        delivery.attempts += 1
+        delivery.last_error = error[:1000]
+        if delivery.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            delivery.status = OutboxDelivery.FAILED
+        else:
+            delay = get_retry_delay(delivery.attempts) * jitter
+            delivery.next_attempt_at = now + timedelta(seconds=delay)
+    OutboxDelivery.objects.bulk_update(
+        batch, ["attempts", "last_error", "status", "next_attempt_at"]
+    )
+
+
+def resolve_held() -> Tuple[int, int]:
+    """
+    Release messages that have been held for longer than OUTBOX_HOLD_TIMEOUT
+    seconds if their change is reflected in Auth0, or delete them if it
+    isn't. Returns the numbers of messages released and deleted.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.OUTBOX_HOLD_TIMEOUT)
+    messages = OutboxMessage.objects.filter(
+        created_at__lt=cutoff, deliveries__status=OutboxDelivery.HELD
+    ).distinct()
+    released = deleted = 0
+    for message in messages:
+        try:
+            profile = auth0.users_client.get(message.auth0_id)
+        except Auth0Error as e:
+            if e.status_code != 404:
+                logger.warning(f"Unable to check held message {message.pk}: {e}")
+                continue
+            profile = None
+        except requests.RequestException as e:
+            logger.warning(f"Unable to check held message {message.pk}: {e}")
+            continue
+        if profile is not None and message.is_applied(profile):
+            message.release()
+            released += 1
+        else:
+            message.delete()
+            deleted += 1
+    return released, deleted
+
+
+def purge_delivered(days: int) -> int:
+    """
+    Delete messages older than `days` days that have been delivered to
+    every endpoint. Returns the number of messages deleted.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, counts = (
+        OutboxMessage.objects.filter(created_at__lt=cutoff)
+        .exclude(
+            deliveries__status__in=[
+                OutboxDelivery.HELD,
+                OutboxDelivery.PENDING,
+                OutboxDelivery.FAILED,
+            ]
+        )
+        .delete()
+    )
+    return counts.get(OutboxMessage._meta.label, 0)
+
+
+class Dispatcher:
+    """
+    Claims due deliveries for each configured endpoint and delivers them on
+    a thread pool, with at most OUTBOX_ENDPOINT_CONCURRENCY batches in
+    flight to any one endpoint (per dispatcher), so a slow or failing
+    endpoint can't hold up the others.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = 1,
+        progress_callback: Optional[Callable[[str, int, bool], None]] = None,
+    ):
+        self.endpoints = list(settings.OUTBOX_ENDPOINTS)
+        self.concurrency = settings.OUTBOX_ENDPOINT_CONCURRENCY
+        self.poll_interval = poll_interval
+        self.progress_callback = progress_callback
+        self.stopping = False
+        self.delivered = 0
+        self.failed_batches = 0
+        self.purged_at = None
+        self.resolved_at = None
+
+    def stop(self, *args) -> None:
+        """
+        Stop once the batches in flight have been delivered (or failed).
+        """
+        self.stopping = True
+
+    def install_signal_handlers(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+    def has_pending(self) -> bool:
+        return OutboxDelivery.objects.filter(
+            endpoint__in=self.endpoints, status=OutboxDelivery.PENDING
+        ).exists()
+
+    def deliver(self, endpoint: str, batch: List[OutboxDelivery]) -> bool:
+        close_old_connections()
+        try:
+            return deliver_batch(endpoint, batch)
+        finally:
+            connection.close()
+
+    def purge(self) -> None:
+        if not settings.OUTBOX_RETENTION_DAYS:
+            return None
+        now = time.monotonic()
+        if self.purged_at is None or now - self.purged_at >= PURGE_INTERVAL:
+            purge_delivered(settings.OUTBOX_RETENTION_DAYS)
+            self.purged_at = now
+
+    def resolve(self) -> None:
+        now = time.monotonic()
+        if self.resolved_at is None or now - self.resolved_at >= RESOLVE_INTERVAL:
+            resolve_held()
+            self.resolved_at = now
+
+    def run(self, until: str = "forever", max_time: Optional[float] = None) -> None:
+        """
+        Deliver messages until stopped, or (when `until` is "idle") until no
+        deliveries are due, or (when `until` is "drained") until none are
+        pending at all, waiting for retries, or until `max_time` seconds
+        have passed.
+        """
+        deadline = None if max_time is None else time.monotonic() + max_time
+        # The endpoint and number of messages for each batch in flight
+        in_flight: Dict[Future, Tuple[str, int]] = {}
+        workers = max(len(self.endpoints) * self.concurrency, 1)
+        with ThreadPoolExecutor(workers, thread_name_prefix="outbox") as executor:
+            while True:
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.stop()
+                if not self.stopping:
+                    self.purge()
+                    self.resolve()
+                    for endpoint in self.endpoints:
+                        busy = sum(1 for e, _ in in_flight.values() if e == endpoint)
+                        for _ in range(self.concurrency - busy):
+                            batch = claim_batch(endpoint)
+                            if not batch:
+                                break
+                            future = executor.submit(self.deliver, endpoint, batch)
+                            in_flight[future] = (endpoint, len(batch))
+                if not in_flight:
+                    if self.stopping or until == "idle":
+                        break
+                    if until == "drained" and not self.has_pending():
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+                done, _ = wait(
+                    in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    endpoint, size = in_flight.pop(future)
+                    try:
+                        delivered = future.result()
+                    except Exception:
+                        logger.exception(f"Delivery to {endpoint} failed.")
+                        delivered = False
+                    if delivered:
+                        self.delivered += size
+                    else:
+                        self.failed_batches += 1
+                    if self.progress_callback is not None:
+                        self.progress_callback(endpoint, size, delivered)
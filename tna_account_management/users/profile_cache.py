@@ -0,0 +1,294 @@
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from auth0.v3.exceptions import Auth0Error
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.db import close_old_connections, connection
+
+from tna_account_management.utils import auth0
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "auth0-profile"
+# Present while the cached profile is fresh. Profiles are kept for longer
+# than that, so that a stale copy can be used while it is refreshed.
+FRESH_CACHE_KEY_PREFIX = "auth0-profile-fresh"
+# The version (see get_profile_version()) of the cached profile, stored
+# separately so that it can be used without fetching the whole profile
+VERSION_CACHE_KEY_PREFIX = "auth0-profile-version"
+
+# The number of profiles requested from the Management API's user search
+# endpoint at once, which keeps the query well within Auth0's length limit
+SEARCH_CHUNK_SIZE = 50
+
+# Template fragments that vary by user profile (rendered with the
+# `{% cache %}` tag, and varied on the release, `auth0_id` and profile version)
+PROFILE_FRAGMENT_NAMES = ["account-summary", "header"]
+
+
+def get_cache_key(auth0_id: str) -> str:
+    return f"{CACHE_KEY_PREFIX}:{auth0_id}"
+
+
+def get_fresh_cache_key(auth0_id: str) -> str:
+    return f"{FRESH_CACHE_KEY_PREFIX}:{auth0_id}"
+
+
+def get_version_cache_key(auth0_id: str) -> str:
+    return f"{VERSION_CACHE_KEY_PREFIX}:{auth0_id}"
+
+
+_executors = {}
+_executor_lock = threading.Lock()
+# The IDs of profiles being refreshed by this process
+_refreshing = set()
+
+
+def get_executor(name: str, max_workers: int) -> ThreadPoolExecutor:
+    with _executor_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix=f"profile-{name}"
+            )
+        return _executors[name]
+
+
+def get_profile(auth0_id: str) -> Dict[str, Any]:
+    """
+    Return the Auth0 profile for the user with the supplied `auth0_id`,
+    using a cached copy where available, and falling back to fetching
+    it from the Management API (and caching it) when not.
+
+    Cached copies older than AUTH0_PROFILE_CACHE_TIMEOUT are still returned
+    (for up to AUTH0_PROFILE_CACHE_STALE_TIMEOUT longer), but are refreshed
+    in the background, so requests don't wait for Auth0 when they expire.
+    """
+    profile = get_cached_profile(auth0_id)
+    if profile is None:
+        profile = fetch_profile(auth0_id)
+    return profile
+
+
+def get_cached_profile(auth0_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the cached profile for `auth0_id` (scheduling a refresh if it is
+    stale), or `None` if there isn't one.
+    """
+    key, fresh_key = get_cache_key(auth0_id), get_fresh_cache_key(auth0_id)
+    cached = cache.get_many([key, fresh_key])
+    profile = cached.get(key)
+    if profile is not None and fresh_key not in cached:
+        schedule_refresh(auth0_id)
+    return profile
+
+
+def fetch_profile(auth0_id: str) -> Dict[str, Any]:
+    profile = auth0.users_client.get(id=auth0_id)
+    set_profile(auth0_id, profile)
+    return profile
+
+
+def prefetch_profile(auth0_id: str) -> Future:
+    """
+    Return a future for the profile for `auth0_id`. If it isn't cached, it
+    is fetched on another thread, so that the request can get on with
+    other work in the meantime.
+    """
+    profile = get_cached_profile(auth0_id)
+    if profile is not None:
+        future = Future()
+        future.set_result(profile)
+        return future
+
+    def fetch():
+        close_old_connections()
+        try:
+            return fetch_profile(auth0_id)
+        finally:
+            connection.close()
+
+    executor = get_executor("prefetch", settings.AUTH0_PROFILE_PREFETCH_MAX_WORKERS)
+    return executor.submit(fetch)
+
+
+def schedule_refresh(auth0_id: str) -> None:
+    """
+    Refresh the cached profile for `auth0_id` in the background, unless
+    this process is already doing so.
+    """
+    with _executor_lock:
+        if auth0_id in _refreshing:
+            return None
+        _refreshing.add(auth0_id)
+    executor = get_executor("refresh", settings.AUTH0_PROFILE_REFRESH_MAX_WORKERS)
+    try:
+        executor.submit(refresh_profile, auth0_id)
+    except RuntimeError:
+        # The executor has been shut down, as the process is exiting
+        with _executor_lock:
+            _refreshing.discard(auth0_id)
+
+
+def refresh_profile(auth0_id: str) -> None:
+    # The cache may be database-backed
+    close_old_connections()
+    try:
+        profile = auth0.users_client.get(id=auth0_id)
+    except Auth0Error as e:
+        if e.status_code == 404:
+            evict_profile(auth0_id)
+        else:
+            logger.warning(f"Unable to refresh the profile for {auth0_id}: {e}")
+            # Keep using the stale copy for a while, rather than retrying on
+            # every request while Auth0 is struggling
+            cache.set(
+                get_fresh_cache_key(auth0_id),
+                True,
+                settings.AUTH0_PROFILE_REFRESH_RETRY_DELAY,
+            )
+    except Exception:
+        logger.exception(f"Unable to refresh the profile for {auth0_id}.")
+    else:
+        # Don't replace a newer copy saved (by User._update_auth0_user())
+        # while this one was being fetched
+        current = cache.get(get_cache_key(auth0_id)) or {}
+        if str(current.get("updated_at", "")) <= str(profile.get("updated_at", "")):
+            set_profile(auth0_id, profile)
+    finally:
+        with _executor_lock:
+            _refreshing.discard(auth0_id)
+        connection.close()
+
+
+def get_profiles(
+    auth0_ids: Iterable[str], cache_misses: bool = True
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Return a dict of Auth0 profiles for the supplied `auth0_ids`, keyed by
+    `auth0_id`. Cached copies are fetched in a single cache lookup, and the
+    rest are fetched from the Management API's user search endpoint (one
+    request per ``SEARCH_CHUNK_SIZE`` misses) and cached, unless
+    `cache_misses` is ``False``. IDs that Auth0 has no user for are left out.
+    """
+    keys = {get_cache_key(auth0_id): auth0_id for auth0_id in auth0_ids}
+    profiles = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = [auth0_id for auth0_id in keys.values() if auth0_id not in profiles]
+    fetched = {}
+    for i in range(0, len(missing), SEARCH_CHUNK_SIZE):
+        for profile in search_profiles(missing[i : i + SEARCH_CHUNK_SIZE]):
+            fetched[profile["user_id"]] = profile
+    if fetched and cache_misses:
+        cache.set_many(
+            {get_cache_key(auth0_id): value for auth0_id, value in fetched.items()},
+            timeout=get_max_age(),
+        )
+        cache.set_many(
+            {
+                get_version_cache_key(auth0_id): get_profile_version(value)
+                for auth0_id, value in fetched.items()
+            },
+            timeout=get_max_age(),
+        )
+        cache.set_many(
+            {get_fresh_cache_key(auth0_id): True for auth0_id in fetched},
+            timeout=settings.AUTH0_PROFILE_CACHE_TIMEOUT,
+        )
+    profiles.update(fetched)
+    return profiles
+
+
+def search_profiles(auth0_ids: List[str]) -> List[Dict[str, Any]]:
+    """
+    Fetch the profiles for up to ``SEARCH_CHUNK_SIZE`` users in a single
+    request to the Management API.
+    """
+    values = " OR ".join(
+        '"{}"'.format(value.replace("\\", "\\\\").replace('"', '\\"'))
+        for value in auth0_ids
+    )
+    return auth0.users_client.list(
+        q=f"user_id:({values})",
+        search_engine="v3",
+        per_page=len(auth0_ids),
+        include_totals=False,
+    )
+
+
+def get_max_age() -> int:
+    """
+    Return how long (in seconds) profiles are kept in the cache, including
+    the time they can be used while stale.
+    """
+    return (
+        settings.AUTH0_PROFILE_CACHE_TIMEOUT
+        + settings.AUTH0_PROFILE_CACHE_STALE_TIMEOUT
+    )
+
+
+def set_profile(auth0_id: str, profile: Dict[str, Any]) -> None:
+    cache.set_many(
+        {
+            get_cache_key(auth0_id): profile,
+            get_version_cache_key(auth0_id): get_profile_version(profile),
+        },
+        timeout=get_max_age(),
+    )
+    cache.set(
+        get_fresh_cache_key(auth0_id),
+        True,
+        timeout=settings.AUTH0_PROFILE_CACHE_TIMEOUT,
+    )
+
+
+def evict_profile(auth0_id: str) -> None:
+    cache.delete_many(
+        [
+            get_cache_key(auth0_id),
+            get_fresh_cache_key(auth0_id),
+            get_version_cache_key(auth0_id),
+        ]
+    )
+
+
+def get_profile_version(profile: Dict[str, Any]) -> str:
+    """
+    Return a short hash of the supplied profile's contents, which changes
+    whenever any part of the profile does.
+    """
+    data = json.dumps(profile, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(data.encode(), digest_size=12).hexdigest()
+
+
+def get_cached_profile_version(auth0_id: str) -> Optional[str]:
+    """
+    Return the version of the cached profile for `auth0_id`, or `None` if
+    it isn't known.
+    """
+    return cache.get(get_version_cache_key(auth0_id))
+
+
+def evict_profile_fragments(auth0_id: str, profile_version: str) -> None:
+    """
+    Delete template fragments rendered for the supplied version of a user's
+    profile. Fragments for other versions are never used, so this just
+    frees up space in the cache sooner.
+    """
+    fragment_cache = (
+        caches["template_fragments"]
+        if "template_fragments" in settings.CACHES
+        else cache
+    )
+    fragment_cache.delete_many(
+        [
+            make_template_fragment_key(
+                name, [settings.RELEASE_VERSION, auth0_id, profile_version]
+            )
+            for name in PROFILE_FRAGMENT_NAMES
+        ]
+    )
@@ -0,0 +1,197 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+from auth0.v3.exceptions import Auth0Error, RateLimitError
+from django.conf import settings
+from django.core.cache import cache
+
+from tna_account_management.utils import auth0
+
+logger = logging.getLogger(__name__)
+
+ROLES_CACHE_KEY = "auth0-roles"
+USER_ROLES_CACHE_KEY_PREFIX = "auth0-user-roles"
+
+# The identifier used with the shared Management API rate limiter
+RATE_LIMIT_IDENTIFIER = "role-lookup"
+
+# How long a bulk lookup (for a page of the admin) waits for turns from the
+# shared rate limiter, after which roles that haven't been fetched are left
+# unknown
+RATE_LIMIT_WAIT_TIMEOUT = 5
+
+# The number of times a request rejected by Auth0's own rate limiting is
+# retried, and the longest time to wait before retrying
+RATE_LIMIT_RETRIES = 1
+MAX_RATE_LIMIT_BACKOFF = 2
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.AUTH0_ROLE_LOOKUP_MAX_WORKERS,
+                thread_name_prefix="role-lookup",
+            )
+        return _executor
+
+
+def get_roles() -> List[Dict[str, str]]:
+    """
+    Return the roles defined in the Auth0 tenant, using a cached copy where
+    available.
+    """
+    roles = cache.get(ROLES_CACHE_KEY)
+    if roles is None:
+        roles = []
+        page = 0
+        while True:
+            result = auth0.roles_client.list(page=page, per_page=100)
+            roles.extend(
+                {
+                    "id": role["id"],
+                    "name": role["name"],
+                    "description": role.get("description", ""),
+                }
+                for role in result["roles"]
+            )
+            if not result["roles"] or len(roles) >= result["total"]:
+                break
+            page += 1
+        cache.set(ROLES_CACHE_KEY, roles, timeout=settings.AUTH0_ROLES_CACHE_TIMEOUT)
+    return roles
+
+
+def get_role_choices() -> List[Tuple[str, str]]:
+    if settings.AUTHENTICATION_PROVIDER != "auth0":
+        return []
+    try:
+        roles = get_roles()
+    except (Auth0Error, requests.RequestException):
+        logger.warning("Unable to fetch roles from Auth0.", exc_info=True)
+        return []
+    return [(role["id"], role["name"]) for role in roles]
+
+
+def get_role_name(role_id: str) -> str:
+    return dict(get_role_choices()).get(role_id, role_id)
+
+
+def get_user_roles_cache_key(auth0_id: str) -> str:
+    return f"{USER_ROLES_CACHE_KEY_PREFIX}:{auth0_id}"
+
+
+def fetch_user_roles(auth0_id: str) -> List[Dict[str, str]]:
+    try:
+        result = auth0.users_client.list_roles(
+            auth0_id, per_page=100, include_totals=False
+        )
+    except Auth0Error as e:
+        if e.status_code == 404:
+            # The user has been deleted from Auth0
+            return []
+        raise
+    return [{"id": role["id"], "name": role["name"]} for role in result]
+
+
+def fetch_user_roles_limited(
+    auth0_id: str, deadline: float
+) -> Optional[List[Dict[str, str]]]:
+    """
+    Fetch the roles for `auth0_id` once the shared rate limiter allows it.
+    Returns `None` if there wasn't a turn before `deadline` (a
+    ``time.monotonic()`` value).
+    """
+    limiter = auth0.get_management_api_limiter()
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        timeout = deadline - time.monotonic()
+        if not limiter.wait(RATE_LIMIT_IDENTIFIER, timeout=timeout):
+            return None
+        try:
+            return fetch_user_roles(auth0_id)
+        except RateLimitError as e:
+            if attempt == RATE_LIMIT_RETRIES:
+                raise
+            # Other clients have used up the tenant's limit, so wait until
+            # Auth0 says it will be reset (a reset time of -1 means unknown)
+            delay = e.reset_at - time.time() if e.reset_at > 0 else 1
+            delay = min(max(delay, 1), MAX_RATE_LIMIT_BACKOFF)
+            if time.monotonic() + delay >= deadline:
+                return None
+            time.sleep(delay)
+
+
+def get_user_roles(auth0_id: str) -> List[Dict[str, str]]:
+    """
+    Return the roles assigned to the Auth0 user with the supplied
+    `auth0_id` (as dicts with an 'id' and 'name'), using a cached copy where
+    available, and falling back to fetching them from the Management API
+    (and caching them) when not.
+    """
+    key = get_user_roles_cache_key(auth0_id)
+    user_roles = cache.get(key)
+    if user_roles is None:
+        user_roles = fetch_user_roles(auth0_id)
+        cache.set(key, user_roles, timeout=settings.AUTH0_USER_ROLES_CACHE_TIMEOUT)
+    return user_roles
+
+
+def get_many_user_roles(
+    auth0_ids: Iterable[str],
+) -> Dict[str, Optional[List[Dict[str, str]]]]:
+    """
+    Return a dict of the roles assigned to each of the supplied `auth0_ids`.
+    Cached roles are fetched in a single cache lookup. The Management API
+    can only return roles for one user at a time, so the rest are fetched
+    concurrently, paced by the shared rate limiter. Roles that couldn't be
+    fetched (including those that didn't get a turn from the limiter within
+    RATE_LIMIT_WAIT_TIMEOUT seconds) are `None`.
+    """
+    keys = {get_user_roles_cache_key(auth0_id): auth0_id for auth0_id in auth0_ids}
+    result = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = [auth0_id for auth0_id in keys.values() if auth0_id not in result]
+    deadline = time.monotonic() + RATE_LIMIT_WAIT_TIMEOUT
+    futures = {
+        auth0_id: get_executor().submit(fetch_user_roles_limited, auth0_id, deadline)
+        for auth0_id in missing
+    }
+    fetched = {}
+    for auth0_id, future in futures.items():
+        try:
+            user_roles = future.result()
+        except (Auth0Error, requests.RequestException):
+            logger.warning(f"Unable to fetch roles for {auth0_id}.", exc_info=True)
+            user_roles = None
+        if user_roles is None:
+            result[auth0_id] = None
+        else:
+            fetched[auth0_id] = user_roles
+    if fetched:
+        cache.set_many(
+            {get_user_roles_cache_key(key): value for key, value in fetched.items()},
+            timeout=settings.AUTH0_USER_ROLES_CACHE_TIMEOUT,
+        )
+        result.update(fetched)
+    return result
+
+
+def evict_user_roles(auth0_id: str) -> None:
+    cache.delete(get_user_roles_cache_key(auth0_id))
+
+
+def assign_role(auth0_id: str, role_id: str) -> None:
+    auth0.users_client.add_roles(auth0_id, [role_id])
+    evict_user_roles(auth0_id)
+
+
+def remove_role(auth0_id: str, role_id: str) -> None:
+    auth0.users_client.remove_roles(auth0_id, [role_id])
+    evict_user_roles(auth0_id)
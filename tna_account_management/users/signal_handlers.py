@@ -0,0 +1,29 @@
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+
+from tna_account_management.authentication.django.throttling import get_client_ip
+
+from .models import AuditEvent, UserSession
+
+
+def remove_session_record(sender, request, user, **kwargs):
+    if request is not None and request.session.session_key:
+        UserSession.objects.filter(session_key=request.session.session_key).delete()
+
+
+def record_login(sender, request, user, **kwargs):
+    user.record_event(
+        AuditEvent.LOGIN, ip_address=get_client_ip(request) if request else None
+    )
+
+
+def record_logout(sender, request, user, **kwargs):
+    if user is not None:
+        user.record_event(
+            AuditEvent.LOGOUT, ip_address=get_client_ip(request) if request else None
+        )
+
+
+def register_signal_handlers():
+    user_logged_in.connect(record_login)
+    user_logged_out.connect(remove_session_record)
+    user_logged_out.connect(record_logout)
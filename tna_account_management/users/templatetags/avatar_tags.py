@@ -0,0 +1,20 @@
+from django import template
+from django.urls import reverse
+
+from tna_account_management.users import avatars
+
+register = template.Library()
+
+
+@register.simple_tag
+def avatar_url(user, size: int) -> str:
+    """
+    Renders the URL of `user`'s avatar at `size` pixels square (which must be
+    one of AVATAR_SIZES), or of a default avatar if they don't have a picture.
+    """
+    picture = user.profile_view.picture if user.auth0_id else ""
+    if not picture:
+        return avatars.get_default_avatar_url(user)
+    return reverse(
+        "avatar", kwargs={"size": size, "key": avatars.get_avatar_key(picture)}
+    )
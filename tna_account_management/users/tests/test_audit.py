@@ -0,0 +1,215 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from tna_account_management.users import audit
+from tna_account_management.users.models import AuditEvent, User
+
+
+class AuditTestMixin:
+    def setUp(self):
+        super().setUp()
+        # Buffer events, rather than writing them in the test's transaction
+        settings_override = override_settings(AUDIT_LOG_SYNCHRONOUS=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Write events recorded by other tests, then start a new buffer (and
+        # writer) for each test, using its settings
+        audit.flush()
+        audit._writer_pid = None
+        for name, value in [("dropped_count", 0), ("_drop_logged_at", None)]:
+            patcher = mock.patch.object(audit, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, audit, "_writer_pid", None)
+        self.addCleanup(audit.flush)
+
+    def record(self, user_id=1):
+        return audit.record(AuditEvent.UPDATE_NAME, user_id, "auth0|1", fields=["name"])
+
+
+@override_settings(AUDIT_LOG_BUFFER_SIZE=2, AUDIT_LOG_BATCH_SIZE=1)
+class AuditBufferTestCase(AuditTestMixin, SimpleTestCase):
+    """
+    The writer is held up writing the first event, so that the buffer fills.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.writing = threading.Event()
+        self.resume = threading.Event()
+        self.written = []
+
+        def write_batch(batch):
+            self.writing.set()
+            self.resume.wait(5)
+            self.written.extend(batch)
+
+        patcher = mock.patch.object(audit, "write_batch", write_batch)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Let the writer finish before write_batch is restored
+        self.addCleanup(audit.flush)
+        self.addCleanup(self.resume.set)
+
+    def fill_buffer(self):
+        self.assertTrue(self.record(1))
+        self.assertTrue(self.writing.wait(5))
+        self.assertTrue(self.record(2))
+        self.assertTrue(self.record(3))
+
+    @override_settings(AUDIT_LOG_BLOCK_TIMEOUT=0)
+    def test_dropped_without_waiting(self):
+        self.fill_buffer()
+
+        start = time.monotonic()
+        with self.assertLogs(audit.logger, "ERROR") as logs:
+            self.assertFalse(self.record(4))
+        self.assertLess(time.monotonic() - start, 0.1)
+        self.assertEqual(
+            logs.output,
+            [
+                "ERROR:tna_account_management.users.audit:The audit log buffer is "
+                "full. 1 event(s) dropped so far."
+            ],
+        )
+
+        # Further drops are counted, but not logged again straight away
+        with mock.patch.object(audit.logger, "error") as log_error:
+            self.assertFalse(self.record(5))
+        log_error.assert_not_called()
+        self.assertEqual(audit.dropped_count, 2)
+
+        self.resume.set()
+        audit.flush()
+        self.assertEqual([event.user_id for event in self.written], [1, 2, 3])
+
+    @override_settings(AUDIT_LOG_BLOCK_TIMEOUT=0)
+    def test_drops_logged_again_after_interval(self):
+        self.fill_buffer()
+        with self.assertLogs(audit.logger, "ERROR"):
+            self.record(4)
+
+        audit._drop_logged_at -= audit.DROP_LOG_INTERVAL
+        with self.assertLogs(audit.logger, "ERROR") as logs:
+            self.record(5)
+
+        self.assertIn("2 event(s) dropped so far", logs.output[0])
+
+    @override_settings(AUDIT_LOG_BLOCK_TIMEOUT=0.2)
+    def test_dropped_after_waiting(self):
+        self.fill_buffer()
+
+        start = time.monotonic()
+        with self.assertLogs(audit.logger, "ERROR"):
+            self.assertFalse(self.record(4))
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertEqual(audit.dropped_count, 1)
+
+    @override_settings(AUDIT_LOG_BLOCK_TIMEOUT=5)
+    def test_waits_for_space(self):
+        self.fill_buffer()
+        threading.Timer(0.1, self.resume.set).start()
+
+        start = time.monotonic()
+        self.assertTrue(self.record(4))
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(audit.dropped_count, 0)
+
+        audit.flush()
+        self.assertEqual([event.user_id for event in self.written], [1, 2, 3, 4])
+
+
+# Without waiting for more events to write with each one
+@override_settings(AUDIT_LOG_BATCH_SIZE=1)
+class AuditWriteTestCase(AuditTestMixin, TransactionTestCase):
+    def test_written_in_background(self):
+        user = User.objects.create(username="user", auth0_id="auth0|1")
+
+        self.assertTrue(
+            user.record_event(AuditEvent.UPDATE_EMAIL, ["email"], actor_id=user.pk)
+        )
+        self.assertTrue(self.record(user.pk))
+        audit.flush()
+
+        self.assertEqual(
+            list(
+                AuditEvent.objects.order_by("pk").values_list(
+                    "action", "user_id", "auth0_id", "actor_id", "fields"
+                )
+            ),
+            [
+                (AuditEvent.UPDATE_EMAIL, user.pk, "auth0|1", user.pk, ["email"]),
+                (AuditEvent.UPDATE_NAME, user.pk, "auth0|1", None, ["name"]),
+            ],
+        )
+
+    @override_settings(AUDIT_LOG_BATCH_SIZE=3)
+    def test_written_in_batches(self):
+        with mock.patch.object(
+            AuditEvent.objects, "bulk_create", wraps=AuditEvent.objects.bulk_create
+        ) as bulk_create:
+            for i in range(7):
+                self.record(i)
+            audit.flush()
+
+        self.assertEqual(
+            [len(call.args[0]) for call in bulk_create.call_args_list], [3, 3, 1]
+        )
+        self.assertEqual(AuditEvent.objects.count(), 7)
+
+    def test_write_failed(self):
+        with mock.patch.object(
+            AuditEvent.objects, "bulk_create", side_effect=RuntimeError
+        ), self.assertLogs(audit.logger, "ERROR") as logs:
+            self.record()
+            audit.flush()
+
+        self.assertIn("Unable to write 1 audit events.", logs.output[0])
+
+        # The writer carries on
+        self.record()
+        audit.flush()
+        self.assertEqual(AuditEvent.objects.count(), 1)
+
+    def test_remaining_written_at_exit(self):
+        stop = threading.Event()
+        self.addCleanup(stop.set)
+        # The writer never gets round to writing anything
+        with mock.patch.object(audit, "write_events", lambda events: stop.wait(5)):
+            for i in range(3):
+                self.record(i)
+
+            audit.write_remaining()
+
+        self.assertEqual(AuditEvent.objects.count(), 3)
+
+    def test_stopped_writer_replaced(self):
+        # The writer stops without writing anything
+        with mock.patch.object(audit, "write_events", lambda events: None):
+            for i in range(3):
+                self.record(i)
+            audit._writer.join(5)
+
+        self.record(3)
+        audit.flush()
+
+        # The events left by the stopped writer are written by the new one
+        self.assertEqual(
+            sorted(AuditEvent.objects.values_list("user_id", flat=True)), [0, 1, 2, 3]
+        )
+
+
+class SynchronousAuditTestCase(TestCase):
+    def test_written_in_transaction(self):
+        with mock.patch.object(audit, "get_queue") as get_queue:
+            self.assertTrue(
+                audit.record(AuditEvent.LOGIN, None, "auth0|1", ip_address="")
+            )
+
+        get_queue.assert_not_called()
+        event = AuditEvent.objects.get()
+        self.assertEqual((event.action, event.auth0_id), (AuditEvent.LOGIN, "auth0|1"))
+        self.assertIsNone(event.ip_address)
@@ -0,0 +1,435 @@
+import io
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock, skipIf
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from tna_account_management.users import avatars, profile_cache
+from tna_account_management.users.avatars import AvatarError, Image
+from tna_account_management.users.models import User
+from tna_account_management.utils.fake_auth0 import make_user
+
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 16
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 16
+WEBP = b"RIFF\x00\x00\x00\x00WEBPVP8 " + b"\x00" * 16
+
+# Image data for each picture URL returned by `fetch_stub`
+PICTURES = {}
+# Set to make `fetch_stub` wait until `fetch_unblocked` is set
+fetch_blocked = threading.Event()
+fetch_unblocked = threading.Event()
+fetched_urls = []
+
+
+def fetch_stub(url):
+    fetched_urls.append(url)
+    if fetch_blocked.is_set():
+        fetch_unblocked.wait(5)
+    try:
+        return PICTURES[url]
+    except KeyError:
+        raise AvatarError(f"No picture at {url}.")
+
+
+def make_image(image_format, size=(300, 200)):
+    output = io.BytesIO()
+    Image.new("RGB", size, "#1a3c5e").save(output, image_format)
+    return output.getvalue()
+
+
+def make_picture():
+    return JPEG if Image is None else make_image("JPEG")
+
+
+class GetImageTypeTestCase(SimpleTestCase):
+    def test_supported_types(self):
+        for data, content_type in [
+            (JPEG, "image/jpeg"),
+            (PNG, "image/png"),
+            (b"GIF87a" + b"\x00" * 16, "image/gif"),
+            (b"GIF89a" + b"\x00" * 16, "image/gif"),
+            (WEBP, "image/webp"),
+        ]:
+            with self.subTest(content_type):
+                self.assertEqual(avatars.get_image_type(data), content_type)
+
+    def test_unsupported_types(self):
+        for data in [
+            b"",
+            b"<svg xmlns='http://www.w3.org/2000/svg'></svg>",
+            b"<html><script>alert(1)</script></html>",
+            b"RIFF\x00\x00\x00\x00WAVEfmt ",
+            b"RIFF",
+            b"\xff\xd8",
+        ]:
+            with self.subTest(data=data):
+                self.assertIsNone(avatars.get_image_type(data))
+
+
+@skipIf(Image is None, "Pillow is not installed.")
+@override_settings(AVATAR_SIZES=[32, 64])
+class MakeThumbnailsTestCase(SimpleTestCase):
+    def assertThumbnails(self, thumbnails):
+        self.assertEqual(list(thumbnails), [32, 64])
+        for size, data in thumbnails.items():
+            self.assertEqual(avatars.get_image_type(data), "image/jpeg")
+            self.assertEqual(Image.open(io.BytesIO(data)).size, (size, size))
+
+    def test_resized(self):
+        for image_format in ["PNG", "JPEG", "GIF", "WEBP"]:
+            with self.subTest(image_format):
+                self.assertThumbnails(avatars.make_thumbnails(make_image(image_format)))
+
+    def test_transparent(self):
+        output = io.BytesIO()
+        Image.new("RGBA", (10, 10), (0, 0, 0, 0)).save(output, "PNG")
+
+        self.assertThumbnails(avatars.make_thumbnails(output.getvalue()))
+
+    def test_unsupported_type(self):
+        output = io.BytesIO()
+        Image.new("RGB", (10, 10)).save(output, "BMP")
+
+        with self.assertRaises(AvatarError):
+            avatars.make_thumbnails(output.getvalue())
+
+    def test_invalid_image(self):
+        with self.assertRaises(AvatarError):
+            avatars.make_thumbnails(PNG)
+
+    def test_without_pillow(self):
+        with mock.patch.object(avatars, "Image", None):
+            self.assertEqual(avatars.make_thumbnails(WEBP), {0: WEBP})
+
+
+def make_response(status=200, content=b"", headers=None):
+    response = mock.MagicMock(status_code=status, headers=headers or {})
+    response.__enter__.return_value = response
+    response.iter_content.return_value = [content]
+    return response
+
+
+@override_settings(
+    AVATAR_ALLOWED_HOSTS=[".gravatar.com", "cdn.auth0.com"], AVATAR_MAX_BYTES=100
+)
+class FetchAvatarTestCase(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(avatars.requests, "get")
+        self.get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_allowed(self):
+        for url in [
+            "https://cdn.auth0.com/avatars/ab.png",
+            "https://s.gravatar.com/avatar/1",
+            "https://gravatar.com/avatar/1",
+            "https://CDN.auth0.com:443/avatars/ab.png",
+        ]:
+            with self.subTest(url):
+                self.assertTrue(avatars.is_allowed_url(url))
+
+    def test_not_allowed(self):
+        for url in [
+            "http://cdn.auth0.com/avatars/ab.png",
+            "ftp://cdn.auth0.com/avatars/ab.png",
+            "file:///etc/passwd",
+            "https://cdn.auth0.com.example.com/",
+            "https://evilgravatar.com/",
+            "https://169.254.169.254/latest/meta-data/",
+            "https://localhost/",
+            "https://cdn.auth0.com:8443/",
+            "https://user@cdn.auth0.com/",
+            "https://cdn.auth0.com:bad/",
+            "//cdn.auth0.com/",
+            "",
+        ]:
+            with self.subTest(url):
+                self.assertFalse(avatars.is_allowed_url(url))
+                with self.assertRaises(AvatarError):
+                    avatars.fetch_avatar(url)
+        self.get.assert_not_called()
+
+    def test_fetched(self):
+        self.get.return_value = make_response(content=JPEG)
+
+        self.assertEqual(avatars.fetch_avatar("https://cdn.auth0.com/a.png"), JPEG)
+        self.assertIs(self.get.call_args.kwargs["allow_redirects"], False)
+        self.assertIs(self.get.call_args.kwargs["stream"], True)
+
+    def test_redirect_not_followed(self):
+        self.get.return_value = make_response(
+            302, headers={"Location": "http://169.254.169.254/"}
+        )
+
+        with self.assertRaises(AvatarError):
+            avatars.fetch_avatar("https://cdn.auth0.com/a.png")
+
+    def test_error_status(self):
+        self.get.return_value = make_response(404)
+
+        with self.assertRaises(AvatarError):
+            avatars.fetch_avatar("https://cdn.auth0.com/a.png")
+
+    def test_too_large_by_content_length(self):
+        response = self.get.return_value = make_response(
+            content=JPEG, headers={"Content-Length": "101"}
+        )
+
+        with self.assertRaises(AvatarError):
+            avatars.fetch_avatar("https://cdn.auth0.com/a.png")
+        response.iter_content.assert_not_called()
+
+    def test_too_large_when_read(self):
+        self.get.return_value = make_response(content=b"x" * 101)
+
+        with self.assertRaises(AvatarError):
+            avatars.fetch_avatar("https://cdn.auth0.com/a.png")
+
+
+def drain_executor():
+    with avatars._executor_lock:
+        executor, avatars._executor = avatars._executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+class AvatarTestMixin:
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        PICTURES.clear()
+        fetched_urls.clear()
+        fetch_blocked.clear()
+        fetch_unblocked.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            AVATAR_FETCHER="tna_account_management.users.tests.test_avatars.fetch_stub",
+            AVATAR_SIZES=[32, 64],
+            DEFAULT_FILE_STORAGE="django.core.files.storage.FileSystemStorage",
+            MEDIA_ROOT=self.media_root,
+            STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+        )
+        self.settings_override.enable()
+        # The default fetcher must never be used, as it makes real requests
+        patcher = mock.patch.object(avatars, "fetch_avatar")
+        self.real_fetch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        fetch_unblocked.set()
+        # Let background fetches finish while the stub fetcher is installed
+        drain_executor()
+        self.real_fetch.assert_not_called()
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+        super().tearDown()
+
+    def wait_until_ready(self, key):
+        deadline = time.monotonic() + 5
+        while avatars.is_ready(key) is None:
+            if time.monotonic() > deadline:
+                self.fail(f"Avatar {key} was not stored.")
+            time.sleep(0.01)
+        return avatars.is_ready(key)
+
+
+class StoreAvatarTestCase(AvatarTestMixin, SimpleTestCase):
+    url = "https://pictures.example.com/1"
+
+    @skipIf(Image is None, "Pillow is not installed.")
+    def test_stored(self):
+        PICTURES[self.url] = make_image("PNG")
+        key = avatars.get_avatar_key(self.url)
+
+        self.assertTrue(avatars.store_avatar(self.url))
+
+        self.assertIs(avatars.is_ready(key), True)
+        for size in [32, 64]:
+            with default_storage.open(avatars.get_avatar_path(key, size)) as f:
+                self.assertEqual(Image.open(f).size, (size, size))
+
+        # Not fetched again
+        self.assertTrue(avatars.store_avatar(self.url))
+        self.assertEqual(fetched_urls, [self.url])
+
+    def test_stored_without_pillow(self):
+        PICTURES[self.url] = WEBP
+        key = avatars.get_avatar_key(self.url)
+
+        with mock.patch.object(avatars, "Image", None):
+            self.assertTrue(avatars.store_avatar(self.url))
+            path = avatars.get_avatar_path(key, 32)
+
+        with default_storage.open(path) as f:
+            self.assertEqual(f.read(), WEBP)
+
+    def test_fetch_failed(self):
+        key = avatars.get_avatar_key(self.url)
+
+        with self.assertLogs(avatars.logger, "WARNING"):
+            self.assertFalse(avatars.store_avatar(self.url))
+
+        self.assertIs(avatars.is_ready(key), False)
+        self.assertFalse(default_storage.exists(f"avatars/{key}"))
+
+    def test_unsupported_type(self):
+        PICTURES[self.url] = b"<svg xmlns='http://www.w3.org/2000/svg'></svg>"
+        key = avatars.get_avatar_key(self.url)
+
+        with self.assertLogs(avatars.logger, "WARNING"):
+            self.assertFalse(avatars.store_avatar(self.url))
+
+        self.assertIs(avatars.is_ready(key), False)
+        self.assertFalse(default_storage.exists(f"avatars/{key}"))
+
+
+class AvatarViewTestCase(AvatarTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.users = []
+        for i in range(2):
+            profile = {
+                **make_user(i),
+                "picture": f"https://pictures.example.com/{i}",
+            }
+            user = User.objects.create(
+                username=profile["nickname"], auth0_id=profile["user_id"]
+            )
+            profile_cache.set_profile(user.auth0_id, profile)
+            self.users.append(user)
+        self.user = self.users[0]
+        self.picture = "https://pictures.example.com/0"
+        self.key = avatars.get_avatar_key(self.picture)
+        self.client.force_login(self.user)
+
+    def get_avatar(self, size=32, key=None):
+        return self.client.get(
+            reverse("avatar", kwargs={"size": size, "key": key or self.key})
+        )
+
+    def assertDefaultAvatar(self, response):
+        self.assertRedirects(
+            response,
+            avatars.get_default_avatar_url(self.user),
+            fetch_redirect_response=False,
+        )
+        self.assertIn("max-age=60", response["Cache-Control"])
+
+    def test_served(self):
+        PICTURES[self.picture] = make_picture()
+        avatars.store_avatar(self.picture)
+
+        response = self.get_avatar()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_webp_served_without_pillow(self):
+        PICTURES[self.picture] = WEBP
+        with mock.patch.object(avatars, "Image", None):
+            avatars.store_avatar(self.picture)
+            response = self.get_avatar()
+
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertEqual(response.content, WEBP)
+
+    def test_default_while_fetching(self):
+        PICTURES[self.picture] = make_picture()
+        fetch_blocked.set()
+
+        # The response doesn't wait for the picture to be fetched
+        self.assertDefaultAvatar(self.get_avatar())
+        self.assertDefaultAvatar(self.get_avatar(size=64))
+
+        fetch_unblocked.set()
+        self.assertTrue(self.wait_until_ready(self.key))
+        self.assertEqual(fetched_urls, [self.picture])
+        self.assertEqual(self.get_avatar().status_code, 200)
+
+    def test_default_after_fetch_failed(self):
+        with self.assertLogs(avatars.logger, "WARNING"):
+            self.get_avatar()
+            self.assertFalse(self.wait_until_ready(self.key))
+
+        self.assertDefaultAvatar(self.get_avatar())
+        # Not retried until AVATAR_FAILURE_TIMEOUT has passed
+        self.assertEqual(fetched_urls, [self.picture])
+
+    def test_other_users_avatar(self):
+        other_picture = self.users[1].profile_view.picture
+        PICTURES[other_picture] = make_picture()
+        avatars.store_avatar(other_picture)
+
+        response = self.get_avatar(key=avatars.get_avatar_key(other_picture))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(fetched_urls, [other_picture])
+
+    def test_unknown_key(self):
+        self.assertEqual(self.get_avatar(key="0" * 32).status_code, 404)
+        self.assertEqual(fetched_urls, [])
+
+    def test_previous_picture(self):
+        PICTURES[self.picture] = make_picture()
+        avatars.store_avatar(self.picture)
+        profile_cache.set_profile(
+            self.user.auth0_id,
+            {**self.user.profile, "picture": "https://pictures.example.com/new"},
+        )
+
+        self.assertEqual(self.get_avatar().status_code, 404)
+
+    def test_unsupported_size(self):
+        self.assertEqual(self.get_avatar(size=128).status_code, 404)
+
+    def test_anonymous(self):
+        self.client.logout()
+
+        self.assertEqual(self.get_avatar().status_code, 302)
+        self.assertEqual(fetched_urls, [])
+
+
+class AvatarTagTestCase(AvatarTestMixin, TestCase):
+    def test_users_see_own_avatar_in_header(self):
+        # See also test_fragment_cache
+        users = []
+        for i in range(2):
+            profile = {**make_user(i), "picture": f"https://pictures.example.com/{i}"}
+            PICTURES[profile["picture"]] = make_picture()
+            user = User.objects.create(
+                username=profile["nickname"], auth0_id=profile["user_id"]
+            )
+            profile_cache.set_profile(user.auth0_id, profile)
+            users.append(user)
+
+        for user, other in [users, users[::-1]]:
+            with self.subTest(user=user.username):
+                self.client.force_login(user)
+                content = self.client.get(reverse("dashboard")).content.decode()
+
+                own_url = reverse(
+                    "avatar",
+                    kwargs={
+                        "size": 32,
+                        "key": avatars.get_avatar_key(user.profile_view.picture),
+                    },
+                )
+                self.assertIn(own_url, content)
+                self.assertNotIn(
+                    avatars.get_avatar_key(other.profile_view.picture), content
+                )
+                self.assertEqual(self.client.get(own_url).status_code, 302)
+
+        drain_executor()
+        self.assertEqual(
+            sorted(fetched_urls),
+            [user.profile_view.picture for user in users],
+        )
@@ -0,0 +1,206 @@
+from datetime import timedelta
+from unittest import mock
+
+from auth0.v3.exceptions import Auth0Error, RateLimitError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from tna_account_management.users import bulk
+from tna_account_management.users.models import AuditEvent, BulkAction, User
+from tna_account_management.utils import auth0, ratelimit
+
+
+@override_settings(AUTH0_MANAGEMENT_API_RATE_LIMIT=1000)
+class BulkActionTestCase(TestCase):
+    def setUp(self):
+        for patcher in [
+            mock.patch.object(ratelimit, "get_redis_client", return_value=None),
+            mock.patch.object(ratelimit, "_local_windows", {}),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(auth0.jobs_client, "send_verification_email")
+        self.send_verification_email = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.admin = User.objects.create(username="admin")
+        self.users = [
+            User.objects.create(username=f"user{i}", auth0_id=f"auth0|{i}")
+            for i in range(5)
+        ]
+
+    def start(self, action=BulkAction.RESEND_VERIFICATION_EMAIL):
+        return bulk.start_bulk_action(action, User.objects.order_by("pk"), self.admin)
+
+    def get_results(self, bulk_action):
+        bulk_action.refresh_from_db()
+        return {
+            result["auth0_id"]: (result["status"], result["error"])
+            for result in bulk_action.results
+        }
+
+    def test_results_recorded(self):
+        def send_verification_email(user_id):
+            if user_id == "auth0|1":
+                raise Auth0Error(400, "invalid_body", "Already verified")
+
+        self.send_verification_email.side_effect = send_verification_email
+
+        bulk_action = self.start()
+
+        self.assertIsNotNone(bulk_action.completed_at)
+        # The admin isn't connected to Auth0, so isn't included
+        self.assertEqual(
+            self.get_results(bulk_action),
+            {
+                "auth0|0": (BulkAction.SUCCEEDED, ""),
+                "auth0|1": (BulkAction.FAILED, "400: Already verified"),
+                "auth0|2": (BulkAction.SUCCEEDED, ""),
+                "auth0|3": (BulkAction.SUCCEEDED, ""),
+                "auth0|4": (BulkAction.SUCCEEDED, ""),
+            },
+        )
+        self.assertEqual(
+            sorted(
+                AuditEvent.objects.filter(
+                    action=AuditEvent.SEND_VERIFICATION_EMAIL, actor=self.admin
+                ).values_list("auth0_id", flat=True)
+            ),
+            ["auth0|0", "auth0|2", "auth0|3", "auth0|4"],
+        )
+
+    def test_nobody_connected_to_auth0(self):
+        self.assertIsNone(
+            bulk.start_bulk_action(
+                BulkAction.RESEND_VERIFICATION_EMAIL,
+                User.objects.filter(pk=self.admin.pk),
+                self.admin,
+            )
+        )
+        self.assertFalse(BulkAction.objects.exists())
+
+    @override_settings(BULK_ACTION_BACKGROUND_THRESHOLD=4)
+    def test_large_selections_run_in_background(self):
+        with mock.patch.object(bulk, "run_in_background") as run_in_background:
+            bulk_action = self.start()
+
+        run_in_background.assert_called_once_with(bulk_action)
+        self.assertEqual(bulk_action.pending_count, 5)
+
+    def test_paced_by_limiter(self):
+        limiter = mock.Mock()
+        limiter.wait.side_effect = [True, False, True, True, True]
+
+        with mock.patch.object(
+            auth0, "get_management_api_limiter", return_value=limiter
+        ):
+            bulk_action = self.start()
+
+        self.assertEqual(
+            limiter.wait.call_args_list,
+            [mock.call("bulk-action", timeout=bulk.RATE_LIMIT_WAIT_TIMEOUT)] * 5,
+        )
+        # The user that didn't get a turn isn't processed
+        self.assertEqual(self.send_verification_email.call_count, 4)
+        self.assertEqual(bulk_action.succeeded_count, 4)
+        self.assertEqual(
+            [r["error"] for r in bulk_action.results if r["error"]],
+            ["Timed out waiting to make a request to Auth0"],
+        )
+
+    def test_rate_limit_error_retried(self):
+        self.send_verification_email.side_effect = [
+            RateLimitError("too_many_requests", "Too many requests", -1),
+            None,
+        ]
+
+        with mock.patch.object(bulk.time, "sleep") as sleep:
+            result = bulk.perform_for_user(
+                BulkAction.RESEND_VERIFICATION_EMAIL, "auth0|0", ""
+            )
+
+        self.assertEqual(result, "")
+        self.assertEqual(self.send_verification_email.call_count, 2)
+        sleep.assert_called_once_with(1)
+
+    def test_rate_limit_error_after_retries(self):
+        error = RateLimitError("too_many_requests", "Too many requests", -1)
+        self.send_verification_email.side_effect = error
+
+        with mock.patch.object(bulk.time, "sleep"):
+            result = bulk.perform_for_user(
+                BulkAction.RESEND_VERIFICATION_EMAIL, "auth0|0", ""
+            )
+
+        self.assertEqual(result, str(error))
+        self.assertEqual(
+            self.send_verification_email.call_count, bulk.RATE_LIMIT_RETRIES + 1
+        )
+
+    def test_progress_saved(self):
+        bulk_action = bulk.create_bulk_action(
+            BulkAction.RESEND_VERIFICATION_EMAIL, User.objects.all(), self.admin
+        )
+
+        with mock.patch.object(bulk, "PROGRESS_INTERVAL", 2), mock.patch.object(
+            bulk_action, "save", wraps=bulk_action.save
+        ) as save:
+            bulk.run_bulk_action(bulk_action)
+
+        # When starting, after every two results, and when complete
+        self.assertEqual(
+            [call.kwargs["update_fields"] for call in save.call_args_list],
+            [
+                ["heartbeat_at"],
+                ["results", "heartbeat_at"],
+                ["results", "heartbeat_at"],
+                ["results", "completed_at", "heartbeat_at"],
+            ],
+        )
+        self.assertEqual(bulk_action.heartbeat_at, bulk_action.completed_at)
+
+    def test_expire_stale_bulk_actions(self):
+        old = timezone.now() - timedelta(seconds=bulk.STALE_AFTER + 1)
+        results = [
+            {
+                "user_id": user.pk,
+                "username": user.username,
+                "auth0_id": user.auth0_id,
+                "status": status,
+                "error": "",
+            }
+            for user, status in zip(
+                self.users, [BulkAction.SUCCEEDED, BulkAction.PENDING]
+            )
+        ]
+        stale, not_started, running, completed = [
+            BulkAction.objects.create(
+                action=BulkAction.RESEND_VERIFICATION_EMAIL,
+                results=results,
+                created_at=old,
+                **kwargs,
+            )
+            for kwargs in [
+                {"heartbeat_at": old},
+                {},
+                {"heartbeat_at": timezone.now()},
+                {"heartbeat_at": old, "completed_at": old},
+            ]
+        ]
+
+        with self.assertLogs(bulk.logger, "WARNING"):
+            self.assertEqual(bulk.expire_stale_bulk_actions(), 2)
+
+        for bulk_action in [stale, not_started]:
+            self.assertEqual(
+                self.get_results(bulk_action),
+                {
+                    "auth0|0": (BulkAction.SUCCEEDED, ""),
+                    "auth0|1": (BulkAction.FAILED, bulk.INTERRUPTED_ERROR),
+                },
+            )
+            self.assertIsNotNone(bulk_action.completed_at)
+        for bulk_action in [running, completed]:
+            bulk_action.refresh_from_db()
+            self.assertEqual(bulk_action.pending_count, 1)
+        running.refresh_from_db()
+        self.assertIsNone(running.completed_at)
@@ -0,0 +1,149 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from auth0.v3.exceptions import Auth0Error
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from tna_account_management.users import cache_warming, profile_cache
+from tna_account_management.users.models import User
+from tna_account_management.utils import auth0, ratelimit
+from tna_account_management.utils.fake_auth0 import make_user
+
+
+@override_settings(AUTH0_MANAGEMENT_API_RATE_LIMIT=1000)
+class WarmProfilesTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        for patcher in [
+            mock.patch.object(ratelimit, "get_redis_client", return_value=None),
+            mock.patch.object(ratelimit, "_local_windows", {}),
+            mock.patch.object(profile_cache, "SEARCH_CHUNK_SIZE", 2),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.profiles = {
+            profile["user_id"]: profile for profile in map(make_user, range(6))
+        }
+        self.auth0_ids = list(self.profiles)
+        patcher = mock.patch.object(auth0.users_client, "list", side_effect=self.search)
+        self.list = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def search(self, q, **kwargs):
+        # Users 4 and 5 have been deleted from Auth0
+        return [
+            profile
+            for auth0_id, profile in self.profiles.items()
+            if f'"{auth0_id}"' in q and auth0_id not in self.auth0_ids[4:]
+        ]
+
+    def test_warmed(self):
+        profile_cache.set_profile(self.auth0_ids[0], self.profiles[self.auth0_ids[0]])
+
+        progress = cache_warming.warm_profiles(self.auth0_ids, max_time=10)
+
+        self.assertEqual(
+            (
+                progress.total,
+                progress.already_cached,
+                progress.warmed,
+                progress.not_found,
+                progress.failed,
+                progress.skipped,
+            ),
+            (6, 1, 3, 2, 0, 0),
+        )
+        # Five uncached users, in batches of two
+        self.assertEqual(self.list.call_count, 3)
+        for auth0_id in self.auth0_ids[:4]:
+            self.assertEqual(
+                profile_cache.get_cached_profile(auth0_id), self.profiles[auth0_id]
+            )
+
+    def test_skipped_after_deadline(self):
+        progress = cache_warming.warm_profiles(self.auth0_ids, max_time=0)
+
+        self.assertEqual((progress.warmed, progress.skipped), (0, 6))
+        self.list.assert_not_called()
+
+    def test_skipped_without_limiter_turn(self):
+        with mock.patch.object(
+            ratelimit.SlidingWindowRateLimiter, "wait", return_value=False
+        ):
+            progress = cache_warming.warm_profiles(self.auth0_ids, max_time=10)
+
+        self.assertEqual((progress.warmed, progress.skipped), (0, 6))
+        self.list.assert_not_called()
+
+    def test_failed_batches_counted(self):
+        def search(q, **kwargs):
+            if f'"{self.auth0_ids[0]}"' in q:
+                raise Auth0Error(500, "server_error", "Unavailable")
+            return self.search(q)
+
+        self.list.side_effect = search
+        progress_updates = []
+
+        with self.assertLogs(cache_warming.logger, "WARNING"):
+            progress = cache_warming.warm_profiles(
+                self.auth0_ids,
+                max_time=10,
+                max_workers=1,
+                progress_callback=lambda p: progress_updates.append(p.done),
+            )
+
+        # The failed batch doesn't stop the others
+        self.assertEqual(
+            (progress.failed, progress.warmed, progress.not_found), (2, 2, 2)
+        )
+        self.assertEqual(progress_updates, [2, 4, 6])
+
+    def test_get_recent_auth0_ids(self):
+        now = timezone.now()
+        for i, days in enumerate([1, 3, 20]):
+            User.objects.create(
+                username=f"user{i}",
+                auth0_id=f"auth0|{i}",
+                last_login=now - timedelta(days=days),
+            )
+        User.objects.create(username="inactive", auth0_id="auth0|3", is_active=False)
+
+        self.assertEqual(cache_warming.get_recent_auth0_ids(14), ["auth0|0", "auth0|1"])
+        self.assertEqual(cache_warming.get_recent_auth0_ids(14, limit=1), ["auth0|0"])
+
+
+@override_settings(AUTHENTICATION_PROVIDER="auth0")
+class WarmProfileCacheCommandTestCase(TestCase):
+    def call_command(self):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command("warm_profile_cache", stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_failure_does_not_fail_command(self):
+        with mock.patch.object(
+            cache_warming.User.objects, "filter", side_effect=DatabaseError("Gone")
+        ), self.assertLogs(
+            "tna_account_management.utils.management.commands.warm_profile_cache",
+            "ERROR",
+        ):
+            stdout, stderr = self.call_command()
+
+        self.assertEqual(stderr, "Unable to warm the profile cache: Gone\n")
+
+    def test_nothing_to_warm(self):
+        stdout, stderr = self.call_command()
+
+        self.assertIn("Warming profiles for 0 users", stdout)
+        self.assertIn("0 warmed", stdout)
+        self.assertEqual(stderr, "")
+
+    @override_settings(AUTHENTICATION_PROVIDER="django")
+    def test_without_auth0(self):
+        stdout, stderr = self.call_command()
+
+        self.assertIn("nothing to warm", stdout)
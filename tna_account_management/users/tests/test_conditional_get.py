@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+from tna_account_management.users import profile_cache
+from tna_account_management.users.models import User
+from tna_account_management.utils.fake_auth0 import make_user
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class DashboardConditionalGetTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.profile = make_user(0)
+        self.user = User.objects.create(
+            username="user", auth0_id=self.profile["user_id"]
+        )
+        profile_cache.set_profile(self.user.auth0_id, self.profile)
+        self.client.force_login(self.user)
+        self.url = reverse("dashboard")
+
+    def test_etag_sent(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_not_modified_for_matching_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_etag_changes_with_profile(self):
+        etag = self.client.get(self.url)["ETag"]
+        profile_cache.set_profile(
+            self.user.auth0_id, {**self.profile, "name": "Changed"}
+        )
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_changes_with_release(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        with override_settings(RELEASE_VERSION="next-release"):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since_not_used(self):
+        # Nothing the view knows the modification time of reflects changes
+        # to the markup between releases
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=http_date(4102444800)
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Last-Modified", response)
@@ -0,0 +1,217 @@
+import threading
+import time
+from unittest import mock
+
+from auth0.v3.exceptions import Auth0Error
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from requests import ConnectionError
+
+from tna_account_management.users import email_availability, profile_cache
+from tna_account_management.users.models import User, UserEmail
+from tna_account_management.utils import auth0
+from tna_account_management.utils.fake_auth0 import make_user
+
+CONNECTION = "Username-Password-Authentication"
+
+
+class CountingLock:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def __enter__(self):
+        self.lock.acquire()
+        self.count += 1
+
+    def __exit__(self, *exc_info):
+        self.lock.release()
+
+
+def make_search_result(connection=CONNECTION):
+    return [{"user_id": "auth0|other", "identities": [{"connection": connection}]}]
+
+
+# Hits are tracked per process without Redis, so would otherwise accumulate
+@override_settings(AUTH0_MANAGEMENT_API_RATE_LIMIT=1000)
+class IsEmailTakenTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = []
+        for i in range(2):
+            profile = make_user(i)
+            user = User.objects.create(
+                username=profile["nickname"], auth0_id=profile["user_id"]
+            )
+            profile_cache.set_profile(user.auth0_id, profile)
+            UserEmail.record(user, profile["email"])
+            self.users.append(user)
+        self.user, self.other = self.users
+        search_patcher = mock.patch.object(
+            auth0.users_by_email_client, "search_users_by_email", return_value=[]
+        )
+        self.search = search_patcher.start()
+        self.addCleanup(search_patcher.stop)
+
+    def is_email_taken(self, email):
+        return email_availability.is_email_taken(
+            User.objects.get(pk=self.user.pk), email
+        )
+
+    def test_own_email(self):
+        self.assertIs(self.is_email_taken(" User0@Example.com "), False)
+        self.search.assert_not_called()
+
+    def test_indexed(self):
+        self.assertIs(self.is_email_taken("USER1@example.com"), True)
+        self.search.assert_not_called()
+
+    def test_indexed_but_changed(self):
+        # The other user changed their email elsewhere
+        profile_cache.set_profile(
+            self.other.auth0_id, {**make_user(1), "email": "new@example.com"}
+        )
+
+        self.assertIs(self.is_email_taken("user1@example.com"), False)
+
+        self.search.assert_called_once_with(
+            "user1@example.com", fields=["user_id", "identities"]
+        )
+        self.assertEqual(
+            UserEmail.objects.get(user=self.other).email, "new@example.com"
+        )
+
+    def test_indexed_but_not_cached(self):
+        profile_cache.evict_profile(self.other.auth0_id)
+
+        self.assertIs(self.is_email_taken("user1@example.com"), False)
+        self.search.assert_called_once()
+        # Left for the next login to correct
+        self.assertEqual(
+            UserEmail.objects.get(user=self.other).email, "user1@example.com"
+        )
+
+        email_availability.evict("user1@example.com", CONNECTION)
+        self.search.return_value = make_search_result()
+        self.assertIs(self.is_email_taken("user1@example.com"), True)
+
+    def test_social_users_not_indexed(self):
+        self.other.auth0_id = "google-oauth2|123"
+        self.other.save()
+        profile_cache.set_profile(
+            self.other.auth0_id, {**make_user(1), "user_id": "google-oauth2|123"}
+        )
+
+        self.assertIs(self.is_email_taken("user1@example.com"), False)
+        self.search.assert_called_once()
+
+    def test_taken_in_auth0(self):
+        self.search.return_value = make_search_result()
+
+        self.assertIs(self.is_email_taken("someone@example.com"), True)
+
+        # The result is cached
+        self.assertIs(self.is_email_taken("Someone@example.com"), True)
+        self.search.assert_called_once()
+
+    def test_taken_in_other_connection(self):
+        self.search.return_value = make_search_result("google-oauth2")
+
+        self.assertIs(self.is_email_taken("someone@example.com"), False)
+
+    def test_not_taken_cached_briefly(self):
+        with mock.patch.object(cache, "set", wraps=cache.set) as cache_set:
+            self.assertIs(self.is_email_taken("someone@example.com"), False)
+            self.assertIs(self.is_email_taken("someone@example.com"), False)
+
+        self.search.assert_called_once()
+        self.assertEqual(
+            cache_set.call_args.kwargs["timeout"],
+            settings.EMAIL_AVAILABILITY_NEGATIVE_CACHE_TIMEOUT,
+        )
+
+    def test_set_taken_and_evict(self):
+        email_availability.set_taken("someone@example.com", CONNECTION, True)
+
+        self.assertIs(self.is_email_taken("someone@example.com"), True)
+        self.search.assert_not_called()
+
+        email_availability.evict("someone@example.com", CONNECTION)
+
+        self.assertIs(self.is_email_taken("someone@example.com"), False)
+        self.search.assert_called_once()
+
+    def test_auth0_error(self):
+        for error in [
+            Auth0Error(429, "too_many_requests", "Too many requests"),
+            ConnectionError("Connection refused"),
+        ]:
+            with self.subTest(error=error):
+                self.search.reset_mock()
+                self.search.side_effect = error
+
+                with self.assertLogs(email_availability.logger, "WARNING"):
+                    self.assertIsNone(self.is_email_taken("someone@example.com"))
+
+                # Not cached
+                with self.assertLogs(email_availability.logger, "WARNING"):
+                    self.assertIsNone(self.is_email_taken("someone@example.com"))
+                self.assertEqual(self.search.call_count, 2)
+
+    def test_rate_limited(self):
+        with mock.patch.object(
+            auth0, "get_management_api_limiter"
+        ) as get_limiter, self.assertLogs(email_availability.logger, "WARNING"):
+            get_limiter.return_value.wait.return_value = False
+
+            self.assertIsNone(self.is_email_taken("someone@example.com"))
+
+        self.search.assert_not_called()
+
+    def test_concurrent_lookups_shared(self):
+        lock = CountingLock()
+        finish = threading.Event()
+        results = []
+
+        def search(*args, **kwargs):
+            finish.wait(5)
+            return make_search_result()
+
+        def lookup():
+            results.append(email_availability.lookup("someone@example.com", CONNECTION))
+
+        self.search.side_effect = search
+        threads = [threading.Thread(target=lookup) for i in range(3)]
+        with mock.patch.object(email_availability, "_lookups_lock", lock):
+            for thread in threads:
+                thread.start()
+            # Until each thread has either started the lookup or found it
+            deadline = time.monotonic() + 5
+            while lock.count < len(threads) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            finish.set()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(results, [True, True, True])
+        self.search.assert_called_once()
+        self.assertEqual(email_availability._lookups, {})
+
+
+class IsEmailExistsErrorTestCase(SimpleTestCase):
+    def test_email_exists(self):
+        error = Auth0Error(
+            400, "invalid_body", "The specified new email already exists"
+        )
+
+        self.assertTrue(email_availability.is_email_exists_error(error))
+
+    def test_other_errors(self):
+        for error in [
+            Auth0Error(400, "invalid_body", "Payload validation error"),
+            Auth0Error(500, "server_error", "The specified new email already exists"),
+            ValueError("The specified new email already exists"),
+        ]:
+            with self.subTest(error=error):
+                self.assertFalse(email_availability.is_email_exists_error(error))
@@ -0,0 +1,142 @@
+import csv
+import io
+import json
+
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from tna_account_management.users import profile_cache
+from tna_account_management.users.export import (
+    EXPORT_FIELDS,
+    escape_csv_value,
+    iter_export,
+)
+from tna_account_management.users.models import User
+from tna_account_management.utils.fake_auth0 import make_user
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Profiles are cached, so no requests are made to Auth0
+        for i in range(3):
+            profile = make_user(i)
+            User.objects.create(
+                username=profile["nickname"], auth0_id=profile["user_id"]
+            )
+            profile_cache.set_profile(profile["user_id"], profile)
+        self.local_user = User.objects.create(username="local")
+
+    def set_profile(self, index, **changes):
+        profile = make_user(index)
+        profile.update(changes.pop("profile", {}))
+        profile["user_metadata"]["addresses"][0].update(changes)
+        profile_cache.set_profile(profile["user_id"], profile)
+
+    def export_csv(self, chunk_size=2):
+        content = "".join(iter_export(User.objects.all(), "csv", chunk_size))
+        return list(csv.DictReader(io.StringIO(content)))
+
+    def test_csv(self):
+        rows = self.export_csv()
+
+        self.assertEqual(list(rows[0]), EXPORT_FIELDS)
+        self.assertEqual(
+            [row["username"] for row in rows], ["user0", "user1", "user2", "local"]
+        )
+        self.assertEqual(rows[1]["email"], "user1@example.com")
+        self.assertEqual(rows[1]["address_postcode"], "TW9 4DU")
+        self.assertEqual(rows[1]["email_verified"], "True")
+        # Users without an Auth0 profile are still exported
+        self.assertEqual(rows[3]["auth0_id"], "")
+        self.assertEqual(rows[3]["address_street"], "")
+
+    def test_csv_formulas_escaped(self):
+        self.set_profile(
+            0,
+            profile={"name": '=HYPERLINK("https://example.com", "Click")'},
+            Street="+44 Kew Road",
+            Town="-1",
+            County="@SUM(A1)",
+        )
+
+        row = self.export_csv()[0]
+
+        self.assertEqual(row["name"], '\'=HYPERLINK("https://example.com", "Click")')
+        self.assertEqual(row["address_street"], "'+44 Kew Road")
+        self.assertEqual(row["address_town"], "'-1")
+        self.assertEqual(row["address_county"], "'@SUM(A1)")
+
+    def test_escape_csv_value(self):
+        for value in ("=1", "+1", "-1", "@1", "\t1", "\r1"):
+            with self.subTest(value=value):
+                self.assertEqual(escape_csv_value(value), f"'{value}")
+        for value in ("", "1-1", "a=b", -1, True, None):
+            with self.subTest(value=value):
+                self.assertEqual(escape_csv_value(value), value)
+
+    def test_csv_other_values_unchanged(self):
+        self.set_profile(0, profile={"name": "Anne-Marie O'Brien = Smith"})
+
+        row = self.export_csv()[0]
+
+        self.assertEqual(row["name"], "Anne-Marie O'Brien = Smith")
+        self.assertEqual(row["id"], str(User.objects.get(username="user0").pk))
+
+    def test_ndjson(self):
+        self.set_profile(0, profile={"name": "=1+1"})
+
+        lines = list(iter_export(User.objects.all(), "ndjson", chunk_size=2))
+
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(all(line.endswith("\n") for line in lines))
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(list(rows[0]), EXPORT_FIELDS)
+        # Values are only escaped in CSV
+        self.assertEqual(rows[0]["name"], "=1+1")
+        self.assertIs(rows[0]["email_verified"], True)
+        self.assertIsNone(rows[3]["auth0_id"] or None)
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class ExportAdminActionTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create(username="staff", is_staff=True)
+        self.staff.user_permissions.add(Permission.objects.get(codename="view_user"))
+        self.client.force_login(self.staff)
+        self.url = reverse("admin:users_user_changelist")
+
+    def post_export(self):
+        return self.client.post(
+            self.url, {"action": "export_csv", "_selected_action": [self.staff.pk]}
+        )
+
+    def get_actions(self):
+        form = self.client.get(self.url).context["action_form"]
+        if form is None:
+            # There are no actions this user can use
+            return []
+        return [name for name, _ in form.fields["action"].choices]
+
+    def test_view_permission_not_enough(self):
+        self.assertNotIn("export_csv", self.get_actions())
+
+        response = self.post_export()
+
+        self.assertNotEqual(response.get("Content-Type"), "text/csv")
+
+    def test_export_permission(self):
+        self.staff.user_permissions.add(Permission.objects.get(codename="export_user"))
+
+        self.assertIn("export_csv", self.get_actions())
+        response = self.post_export()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        content = b"".join(response.streaming_content).decode()
+        self.assertIn("staff", content)
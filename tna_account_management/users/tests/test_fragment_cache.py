@@ -0,0 +1,119 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from tna_account_management.users import avatars, profile_cache
+from tna_account_management.users.models import User
+from tna_account_management.utils.fake_auth0 import make_user
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class ProfileFragmentCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = []
+        for i in range(2):
+            profile = {
+                **make_user(i),
+                "picture": f"https://pictures.example.com/{i}.png",
+            }
+            user = User.objects.create(
+                username=profile["nickname"], auth0_id=profile["user_id"]
+            )
+            profile_cache.set_profile(user.auth0_id, profile)
+            self.users.append(user)
+
+    def get_dashboard(self, user):
+        self.client.force_login(user)
+        return self.client.get(reverse("dashboard")).content.decode()
+
+    def get_avatar_key(self, user):
+        return avatars.get_avatar_key(user.profile_view.picture)
+
+    def test_header_not_shared_between_users(self):
+        first, second = self.users
+
+        self.assertIn(self.get_avatar_key(first), self.get_dashboard(first))
+        content = self.get_dashboard(second)
+
+        self.assertIn(self.get_avatar_key(second), content)
+        self.assertNotIn(self.get_avatar_key(first), content)
+
+    def test_header_shared_between_anonymous_users(self):
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        render_to_string("patterns/molecules/header.html", request=request)
+        key = make_template_fragment_key("header", [settings.RELEASE_VERSION, "", ""])
+
+        self.assertIsNotNone(cache.get(key))
+
+    def test_fragments_evicted_with_profile_version(self):
+        user = User.objects.get(pk=self.users[0].pk)
+        self.get_dashboard(user)
+        keys = [
+            make_template_fragment_key(
+                name, [settings.RELEASE_VERSION, user.auth0_id, user.profile_version]
+            )
+            for name in profile_cache.PROFILE_FRAGMENT_NAMES
+        ]
+        self.assertTrue(all(cache.get(key) is not None for key in keys))
+
+        profile_cache.evict_profile_fragments(user.auth0_id, user.profile_version)
+
+        self.assertEqual(cache.get_many(keys), {})
+
+    def test_profile_version_uses_stored_version(self):
+        user = User.objects.get(pk=self.users[0].pk)
+        expected = ":".join(
+            (
+                str(user.pk),
+                user.username,
+                profile_cache.get_profile_version(
+                    profile_cache.get_profile(user.auth0_id)
+                ),
+            )
+        )
+        with mock.patch.object(profile_cache, "get_profile") as get_profile:
+            self.assertEqual(user.profile_version, expected)
+        get_profile.assert_not_called()
+        self.assertNotIn("profile", user.__dict__)
+
+    def test_profile_version_without_stored_version(self):
+        user = User.objects.get(pk=self.users[0].pk)
+        cache.delete(profile_cache.get_version_cache_key(user.auth0_id))
+
+        self.assertEqual(
+            user.profile_version.rsplit(":", 1)[1],
+            profile_cache.get_profile_version(user.profile),
+        )
+
+    def test_profile_version_changes_with_profile(self):
+        user = User.objects.get(pk=self.users[0].pk)
+        version = user.profile_version
+
+        profile_cache.set_profile(
+            user.auth0_id, {**user.profile, "name": "Someone else"}
+        )
+
+        self.assertNotEqual(User.objects.get(pk=user.pk).profile_version, version)
+
+    def test_cached_header_rendered_without_profile(self):
+        user = User.objects.get(pk=self.users[0].pk)
+        self.get_dashboard(user)
+
+        request = RequestFactory().get("/")
+        request.user = User.objects.get(pk=user.pk)
+        with mock.patch.object(profile_cache, "get_profile") as get_profile:
+            content = render_to_string(
+                "patterns/molecules/header.html", request=request
+            )
+        get_profile.assert_not_called()
+        self.assertIn(self.get_avatar_key(user), content)
@@ -0,0 +1,142 @@
+from django.test import SimpleTestCase
+
+from tna_account_management.users.metadata import (
+    MISSING,
+    VERSION_KEY,
+    get_changes,
+    is_conflict,
+    merge,
+)
+
+
+def address(item_id, **values):
+    return {"Id": item_id, "Street": "Kew Road", "Town": "Richmond", **values}
+
+
+class GetChangesTestCase(SimpleTestCase):
+    def test_only_changed_values(self):
+        self.assertEqual(
+            get_changes({"a": 1, "b": [1]}, {"a": 1, "b": [1, 2], "c": 2}),
+            {"b": [1, 2], "c": 2},
+        )
+
+    def test_no_changes(self):
+        self.assertEqual(get_changes({"a": 1}, {"a": 1}), {})
+
+
+class IsConflictTestCase(SimpleTestCase):
+    def test_unchanged(self):
+        base = {VERSION_KEY: 3, "addresses": [], "other": 1}
+
+        self.assertFalse(is_conflict(base, dict(base), {"addresses": [address(1)]}))
+
+    def test_version_changed(self):
+        self.assertTrue(
+            is_conflict({VERSION_KEY: 3}, {VERSION_KEY: 4}, {"addresses": []})
+        )
+
+    def test_version_added(self):
+        self.assertTrue(is_conflict({}, {VERSION_KEY: 1}, {"addresses": []}))
+
+    def test_changed_key_modified_without_version(self):
+        # By a service that doesn't increment the version
+        self.assertTrue(
+            is_conflict(
+                {"addresses": [address(1)]},
+                {"addresses": [address(1, Town="Kew")]},
+                {"addresses": []},
+            )
+        )
+
+    def test_other_key_modified_without_version(self):
+        self.assertFalse(
+            is_conflict(
+                {"addresses": [], "other": 1},
+                {"addresses": [], "other": 2},
+                {"addresses": [address(1)]},
+            )
+        )
+
+
+class MergeTestCase(SimpleTestCase):
+    def test_one_side_changed(self):
+        self.assertEqual(merge(1, 2, 1), 2)
+        self.assertEqual(merge(1, 1, 3), 3)
+        self.assertEqual(merge(1, 2, 2), 2)
+
+    def test_both_sides_changed_ours_wins(self):
+        self.assertEqual(merge(1, 2, 3), 2)
+        self.assertEqual(merge("a", ["b"], {"c": 1}), ["b"])
+
+    def test_dicts_merged_by_key(self):
+        self.assertEqual(
+            merge(
+                {"a": 1, "b": 1, "c": 1, "d": 1},
+                {"a": 2, "b": 1, "c": 2, "d": 1, "e": 2},
+                {"a": 1, "b": 3, "c": 3, "f": 3},
+            ),
+            # 'a' and 'e' from ours, 'b' and 'f' from theirs, 'd' deleted by
+            # theirs, and 'c' changed by both
+            {"a": 2, "b": 3, "c": 2, "e": 2, "f": 3},
+        )
+
+    def test_deleted_by_ours(self):
+        self.assertEqual(merge({"a": 1, "b": 1}, {"b": 1}, {"a": 1, "b": 2}), {"b": 2})
+
+    def test_missing(self):
+        self.assertIs(merge(MISSING, MISSING, MISSING), MISSING)
+        self.assertEqual(merge(MISSING, 1, MISSING), 1)
+        self.assertIs(merge(1, MISSING, 1), MISSING)
+
+    def test_lists_merged_by_id(self):
+        base = [address(1), address(2)]
+        ours = [address(1, Town="Kew"), address(2)]
+        theirs = [address(2, Street="Other Road"), address(1), address(3)]
+
+        # Items keep the order of theirs
+        self.assertEqual(
+            merge(base, ours, theirs),
+            [address(2, Street="Other Road"), address(1, Town="Kew"), address(3)],
+        )
+
+    def test_list_items_merged_by_key(self):
+        self.assertEqual(
+            merge(
+                [address(1)],
+                [address(1, Town="Kew")],
+                [address(1, Postcode="TW9 4DU")],
+            ),
+            [address(1, Town="Kew", Postcode="TW9 4DU")],
+        )
+
+    def test_list_items_deleted(self):
+        base = [address(1), address(2)]
+
+        self.assertEqual(
+            merge(base, [address(2)], base + [address(3)]), [address(2), address(3)]
+        )
+        self.assertEqual(
+            merge(base, base + [address(3)], [address(1)]), [address(1), address(3)]
+        )
+
+    def test_lists_without_ids_not_merged(self):
+        self.assertEqual(merge([1], [1, 2], [1, 3]), [1, 2])
+        self.assertEqual(merge([{"a": 1}], [{"a": 2}], [{"a": 3}]), [{"a": 2}])
+
+    def test_nested_metadata(self):
+        base = {VERSION_KEY: 1, "addresses": [address(1)], "preferences": {"a": 1}}
+        ours = {
+            VERSION_KEY: 2,
+            "addresses": [address(1, Town="Kew")],
+            "preferences": {"a": 1},
+        }
+        theirs = {VERSION_KEY: 1, "addresses": [address(1)], "preferences": {"a": 2}}
+
+        self.assertEqual(
+            merge(base, ours, theirs),
+            {
+                VERSION_KEY: 2,
+                "addresses": [address(1, Town="Kew")],
+                "preferences": {"a": 2},
+            },
+        )
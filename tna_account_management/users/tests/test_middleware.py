@@ -0,0 +1,79 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from tna_account_management.users import profile_cache
+from tna_account_management.users.middleware import PROFILE_SESSION_KEY
+from tna_account_management.users.models import User
+from tna_account_management.utils import auth0
+from tna_account_management.utils.fake_auth0 import make_user
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class ProfilePrefetchMiddlewareTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.profile = make_user(0)
+        self.user = User.objects.create(
+            username="user", auth0_id=self.profile["user_id"]
+        )
+        self.client.force_login(self.user)
+        patcher = mock.patch.object(
+            auth0.users_client, "get", return_value=self.profile
+        )
+        self.get = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(
+            profile_cache, "prefetch_profile", wraps=profile_cache.prefetch_profile
+        )
+        self.prefetch_profile = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def set_session_auth0_id(self, auth0_id):
+        session = self.client.session
+        session[PROFILE_SESSION_KEY] = auth0_id
+        session.save()
+
+    def test_prefetched_for_view(self):
+        self.set_session_auth0_id(self.user.auth0_id)
+
+        response = self.client.get(reverse("dashboard"))
+
+        self.assertEqual(response.status_code, 200)
+        self.prefetch_profile.assert_called_once_with(self.user.auth0_id)
+        # The profile is fetched once, by the prefetch, and cached
+        self.get.assert_called_once_with(id=self.user.auth0_id)
+        self.assertEqual(
+            profile_cache.get_cached_profile(self.user.auth0_id), self.profile
+        )
+
+    def test_not_prefetched_for_other_views(self):
+        self.set_session_auth0_id(self.user.auth0_id)
+
+        self.client.get(reverse("auth_logout"))
+        with self.assertLogs("django.request", "WARNING"):
+            self.client.get("/not-a-page/")
+
+        self.prefetch_profile.assert_not_called()
+
+    def test_session_for_other_user_ignored(self):
+        # The session is from a user who has since logged in as someone else
+        self.set_session_auth0_id("auth0|other")
+
+        with mock.patch.object(User, "prefetch_profile") as user_prefetch:
+            self.client.get(reverse("dashboard"))
+
+        self.prefetch_profile.assert_called_once_with("auth0|other")
+        user_prefetch.assert_not_called()
+
+    def test_session_without_auth0_id(self):
+        # Sessions from before the middleware was added
+        response = self.client.get(reverse("dashboard"))
+
+        self.assertEqual(response.status_code, 200)
+        self.prefetch_profile.assert_called_once_with(self.user.auth0_id)
+        self.assertEqual(self.client.session[PROFILE_SESSION_KEY], self.user.auth0_id)
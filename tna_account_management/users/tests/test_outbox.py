@@ -0,0 +1,398 @@
+import hashlib
+import hmac
+import io
+from datetime import timedelta
+from unittest import mock
+
+from auth0.v3.exceptions import Auth0Error
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from tna_account_management.users import outbox, profile_cache
+from tna_account_management.users.models import (
+    Address,
+    OutboxDelivery,
+    OutboxMessage,
+    User,
+)
+from tna_account_management.utils import auth0
+from tna_account_management.utils.fake_auth0 import make_user
+from tna_account_management.utils.webhook_sink import WebhookSinkServer
+
+SECRET = "test-secret"  # pragma: allowlist secret
+
+
+class SignTestCase(SimpleTestCase):
+    @override_settings(OUTBOX_SIGNING_SECRET=SECRET)
+    def test_sign(self):
+        self.assertEqual(
+            outbox.sign(b'{"messages":[]}'),
+            hmac.new(SECRET.encode(), b'{"messages":[]}', hashlib.sha256).hexdigest(),
+        )
+
+    @override_settings(OUTBOX_RETRY_BASE_DELAY=10, OUTBOX_RETRY_MAX_DELAY=60)
+    def test_get_retry_delay(self):
+        self.assertEqual(
+            [outbox.get_retry_delay(attempts) for attempts in range(1, 6)],
+            [10, 20, 40, 60, 60],
+        )
+
+
+@override_settings(OUTBOX_ENDPOINTS={"first": "http://first/"})
+class HoldTestCase(TestCase):
+    """
+    Messages are recorded before changes are made in Auth0, and only
+    released for delivery once Auth0 has accepted them.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.profile = make_user(0)
+        self.user = User.objects.create(
+            username=self.profile["nickname"], auth0_id=self.profile["user_id"]
+        )
+        profile_cache.set_profile(self.user.auth0_id, self.profile)
+        patcher = mock.patch.object(auth0.users_client, "update")
+        self.update = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_statuses(self):
+        return list(OutboxDelivery.objects.values_list("status", flat=True))
+
+    def test_released_after_change(self):
+        def update(auth0_id, data):
+            # The message is recorded before the change is sent
+            self.assertEqual(self.get_statuses(), [OutboxDelivery.HELD])
+            return {**self.profile, **data}
+
+        self.update.side_effect = update
+
+        self.user.update_name("New Name")
+
+        self.update.assert_called_once()
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.event, OutboxMessage.NAME_CHANGED)
+        self.assertEqual(message.data, {"name": "New Name"})
+        self.assertEqual(self.get_statuses(), [OutboxDelivery.PENDING])
+
+    def test_deleted_when_change_fails(self):
+        self.update.side_effect = Auth0Error(500, "server_error", "Unavailable")
+
+        with self.assertRaises(Auth0Error):
+            self.user.update_email("new@example.com")
+
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertFalse(OutboxDelivery.objects.exists())
+
+    def test_held_not_claimed(self):
+        OutboxMessage.enqueue(
+            OutboxMessage.NAME_CHANGED, self.user.auth0_id, {"name": "A"}, held=True
+        )
+
+        self.assertEqual(outbox.claim_batch("first"), [])
+
+    def test_resolve_held(self):
+        applied, unapplied, recent = [
+            OutboxMessage.enqueue(
+                OutboxMessage.NAME_CHANGED,
+                self.user.auth0_id,
+                {"name": name},
+                held=True,
+            )
+            for name in ["Applied", "Unapplied", "Recent"]
+        ]
+        OutboxMessage.objects.exclude(pk=recent.pk).update(
+            created_at=timezone.now() - timedelta(hours=1)
+        )
+
+        with mock.patch.object(
+            auth0.users_client, "get", return_value={**self.profile, "name": "Applied"}
+        ):
+            self.assertEqual(outbox.resolve_held(), (1, 1))
+
+        self.assertEqual(
+            dict(OutboxDelivery.objects.values_list("message_id", "status")),
+            {applied.pk: OutboxDelivery.PENDING, recent.pk: OutboxDelivery.HELD},
+        )
+
+    def test_resolve_held_for_deleted_user(self):
+        message = OutboxMessage.enqueue(
+            OutboxMessage.EMAIL_CHANGED,
+            self.user.auth0_id,
+            {"email": "new@example.com"},
+            held=True,
+        )
+        message.created_at = timezone.now() - timedelta(hours=1)
+        message.save()
+
+        with mock.patch.object(
+            auth0.users_client,
+            "get",
+            side_effect=Auth0Error(404, "inexistent_user", "The user does not exist."),
+        ):
+            self.assertEqual(outbox.resolve_held(), (0, 1))
+
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_resolve_held_when_auth0_unavailable(self):
+        message = OutboxMessage.enqueue(
+            OutboxMessage.ADDRESS_CHANGED,
+            self.user.auth0_id,
+            {"address": None},
+            held=True,
+        )
+        message.created_at = timezone.now() - timedelta(hours=1)
+        message.save()
+
+        with mock.patch.object(
+            auth0.users_client,
+            "get",
+            side_effect=Auth0Error(503, "server_error", "Unavailable"),
+        ), self.assertLogs(outbox.logger, "WARNING"):
+            self.assertEqual(outbox.resolve_held(), (0, 0))
+
+        self.assertEqual(self.get_statuses(), [OutboxDelivery.HELD])
+
+    def test_is_applied(self):
+        address = {
+            "AddressType": 1,
+            "Address1": "1 High Street",
+        }
+        for event, data, profile, expected in [
+            (OutboxMessage.NAME_CHANGED, {"name": "A"}, {"name": "A"}, True),
+            (OutboxMessage.NAME_CHANGED, {"name": "A"}, {"name": "B"}, False),
+            # Auth0 uses the email address when there's no name
+            (
+                OutboxMessage.NAME_CHANGED,
+                {"name": ""},
+                {"name": "a@example.com", "email": "a@example.com"},
+                True,
+            ),
+            (
+                OutboxMessage.EMAIL_CHANGED,
+                {"email": "A@example.com"},
+                {"email": "a@example.com"},
+                True,
+            ),
+            (OutboxMessage.ADDRESS_CHANGED, {"address": None}, {}, True),
+            (
+                OutboxMessage.ADDRESS_CHANGED,
+                {"address": Address.from_auth0_json(address).to_auth0_json()},
+                {"user_metadata": {"addresses": [address]}},
+                True,
+            ),
+            (
+                OutboxMessage.ADDRESS_CHANGED,
+                {"address": None},
+                {"user_metadata": {"addresses": [address]}},
+                False,
+            ),
+        ]:
+            with self.subTest(event=event, data=data):
+                message = OutboxMessage(event=event, data=data)
+                self.assertEqual(message.is_applied(profile), expected)
+
+
+class DispatcherTestCase(TransactionTestCase):
+    """
+    Delivers messages to webhook sinks running in this process.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.sinks = {}
+        for name in ["first", "second"]:
+            cls.sinks[name] = WebhookSinkServer(port=0).start()
+            cls.addClassCleanup(cls.sinks[name].stop)
+
+    def setUp(self):
+        for sink in self.sinks.values():
+            sink.secret = SECRET
+            sink.error_rate = 0
+            sink.messages.clear()
+            sink.counts.clear()
+        self.settings_override = override_settings(
+            OUTBOX_ENDPOINTS={name: sink.url for name, sink in self.sinks.items()},
+            OUTBOX_SIGNING_SECRET=SECRET,
+            OUTBOX_BATCH_SIZE=3,
+            OUTBOX_ENDPOINT_CONCURRENCY=1,
+            OUTBOX_RETRY_BASE_DELAY=10,
+            OUTBOX_MAX_ATTEMPTS=3,
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def enqueue(self, count):
+        return [
+            OutboxMessage.enqueue(
+                OutboxMessage.NAME_CHANGED, f"auth0|{i}", {"name": f"User {i}"}
+            ).pk
+            for i in range(count)
+        ]
+
+    def dispatch(self, until="idle"):
+        dispatcher = outbox.Dispatcher(poll_interval=0.01)
+        dispatcher.run(until=until, max_time=10)
+        return dispatcher
+
+    def get_statuses(self, endpoint="first"):
+        return list(
+            OutboxDelivery.objects.filter(endpoint=endpoint)
+            .order_by("message_id")
+            .values_list("status", "attempts")
+        )
+
+    def test_delivered_to_every_endpoint(self):
+        message_ids = self.enqueue(7)
+
+        dispatcher = self.dispatch()
+
+        self.assertEqual(dispatcher.delivered, 14)
+        self.assertEqual(dispatcher.failed_batches, 0)
+        for sink in self.sinks.values():
+            self.assertEqual(sink.get_message_ids(), {pk: 1 for pk in message_ids})
+            # In batches of OUTBOX_BATCH_SIZE
+            self.assertEqual(sink.counts["accepted"], 3)
+        self.assertEqual(
+            set(OutboxDelivery.objects.values_list("status", "attempts")),
+            {(OutboxDelivery.DELIVERED, 1)},
+        )
+        self.assertEqual(
+            self.sinks["first"].messages[0],
+            OutboxMessage.objects.get(pk=message_ids[0]).to_json(),
+        )
+
+    def test_failure_retried_with_backoff(self):
+        self.sinks["second"].error_rate = 1
+        message_ids = self.enqueue(2)
+        start = timezone.now()
+
+        with self.assertLogs(outbox.logger, "WARNING") as logs:
+            dispatcher = self.dispatch()
+
+        self.assertEqual(dispatcher.failed_batches, 1)
+        self.assertIn("Unable to deliver 2 messages to second", logs.output[0])
+        # Other endpoints aren't held up
+        self.assertEqual(
+            self.sinks["first"].get_message_ids(), {pk: 1 for pk in message_ids}
+        )
+        deliveries = OutboxDelivery.objects.filter(endpoint="second")
+        self.assertEqual(
+            {(d.status, d.attempts) for d in deliveries}, {(OutboxDelivery.PENDING, 1)}
+        )
+        self.assertIn("503", deliveries[0].last_error)
+        # Between half and all of OUTBOX_RETRY_BASE_DELAY from now, and the
+        # same for the whole batch
+        retry_at = {d.next_attempt_at for d in deliveries}
+        self.assertEqual(len(retry_at), 1)
+        self.assertGreaterEqual(retry_at.pop(), start + timedelta(seconds=5))
+        self.assertLessEqual(
+            deliveries[0].next_attempt_at, timezone.now() + timedelta(seconds=10)
+        )
+
+        # Not retried until then
+        self.dispatch()
+        self.assertEqual(self.sinks["second"].counts["failed"], 1)
+
+        # Then delivered once the endpoint recovers
+        self.sinks["second"].error_rate = 0
+        deliveries.update(next_attempt_at=timezone.now())
+        self.dispatch()
+        self.assertEqual(
+            self.sinks["second"].get_message_ids(), {pk: 1 for pk in message_ids}
+        )
+        self.assertEqual(
+            self.get_statuses("second"), [(OutboxDelivery.DELIVERED, 2)] * 2
+        )
+
+    @override_settings(OUTBOX_RETRY_BASE_DELAY=0)
+    def test_failed_after_max_attempts(self):
+        self.sinks["first"].error_rate = 1
+        self.enqueue(1)
+
+        with self.assertLogs(outbox.logger, "WARNING"):
+            self.dispatch(until="drained")
+
+        self.assertEqual(self.sinks["first"].counts["failed"], 3)
+        self.assertEqual(self.get_statuses(), [(OutboxDelivery.FAILED, 3)])
+        self.assertEqual(self.get_statuses("second"), [(OutboxDelivery.DELIVERED, 1)])
+
+        # Not attempted again
+        self.dispatch(until="drained")
+        self.assertEqual(self.sinks["first"].counts["failed"], 3)
+
+    def test_claimed_batch_not_resent_during_lease(self):
+        self.enqueue(2)
+        start = timezone.now()
+        # Another dispatcher is delivering it
+        outbox.claim_batch("first")
+
+        self.dispatch()
+
+        self.assertEqual(self.sinks["first"].get_message_ids(), {})
+        self.assertEqual(self.get_statuses(), [(OutboxDelivery.PENDING, 0)] * 2)
+        lease = timedelta(seconds=settings.OUTBOX_REQUEST_TIMEOUT + outbox.LEASE_MARGIN)
+        for delivery in OutboxDelivery.objects.filter(endpoint="first"):
+            self.assertGreaterEqual(delivery.next_attempt_at, start + lease)
+
+    def test_claimed_batch_resent_after_lease_expires(self):
+        message_ids = self.enqueue(2)
+        # Claimed by a dispatcher that stopped before recording the outcome
+        self.assertEqual(len(outbox.claim_batch("first")), 2)
+        lease = timedelta(seconds=settings.OUTBOX_REQUEST_TIMEOUT + outbox.LEASE_MARGIN)
+        OutboxDelivery.objects.filter(endpoint="first").update(
+            next_attempt_at=F("next_attempt_at") - lease
+        )
+
+        self.dispatch()
+
+        self.assertEqual(
+            self.sinks["first"].get_message_ids(), {pk: 1 for pk in message_ids}
+        )
+        self.assertEqual(self.get_statuses(), [(OutboxDelivery.DELIVERED, 1)] * 2)
+
+    def test_invalid_signature_rejected(self):
+        self.sinks["first"].secret = "other-secret"  # pragma: allowlist secret
+        self.enqueue(1)
+
+        with self.assertLogs(outbox.logger, "WARNING"):
+            self.dispatch()
+
+        self.assertEqual(self.sinks["first"].counts, {"rejected": 1})
+        self.assertEqual(self.sinks["first"].messages, [])
+        self.assertEqual(self.get_statuses(), [(OutboxDelivery.PENDING, 1)])
+        self.assertIn("401", OutboxDelivery.objects.get(endpoint="first").last_error)
+        self.assertEqual(self.sinks["second"].counts, {"accepted": 1})
+
+    def test_command(self):
+        message_ids = self.enqueue(2)
+        stdout = io.StringIO()
+
+        call_command("dispatch_outbox", until="idle", stdout=stdout)
+
+        self.assertIn("Delivered 4 messages", stdout.getvalue())
+        for sink in self.sinks.values():
+            self.assertEqual(sink.get_message_ids(), {pk: 1 for pk in message_ids})
+
+    @override_settings(OUTBOX_SIGNING_SECRET="")
+    def test_command_without_secret(self):
+        self.enqueue(1)
+
+        with self.assertRaisesMessage(CommandError, "OUTBOX_SIGNING_SECRET"):
+            call_command("dispatch_outbox", until="idle", stdout=io.StringIO())
+
+        for sink in self.sinks.values():
+            self.assertEqual(sink.counts, {})
+
+    @override_settings(OUTBOX_ENDPOINTS={})
+    def test_command_without_endpoints(self):
+        stdout = io.StringIO()
+
+        call_command("dispatch_outbox", until="idle", stdout=stdout)
+
+        self.assertIn("OUTBOX_ENDPOINTS is not set", stdout.getvalue())
@@ -0,0 +1,187 @@
+from django.test import SimpleTestCase
+
+from tna_account_management.users.models import Address, Profile
+from tna_account_management.utils.fake_auth0 import make_user
+
+ADDRESS_JSON = {
+    "Id": 2,
+    "AddressType": 1,
+    "RecipientName": "Jane Smith",
+    "Title": "",
+    "Firstname": "",
+    "Lastname": "",
+    "Telephone": "020 8876 3444",
+    "HouseNameNo": "12",
+    "Street": "Kew Road",
+    "Town": "Richmond",
+    "County": "Surrey",
+    "Postcode": "TW9 4DU",
+    "Country": "United Kingdom",
+}
+
+
+class AddressTestCase(SimpleTestCase):
+    def test_round_trip(self):
+        address = Address.from_auth0_json(ADDRESS_JSON)
+
+        self.assertEqual(address.to_auth0_json(), ADDRESS_JSON)
+        self.assertEqual(Address.from_auth0_json(address.to_auth0_json()), address)
+
+    def test_from_auth0_json(self):
+        address = Address.from_auth0_json(
+            {"HouseNameNo": " Kew House ", "Street": "Kew Road\n", "Postcode": "TW9"}
+        )
+
+        self.assertEqual(address.house_name_no, "Kew House")
+        self.assertEqual(address.street, "Kew Road")
+        self.assertEqual(address.postcode, "TW9")
+        # Missing values have defaults
+        self.assertEqual(address.id, 1)
+        self.assertEqual(address.address_type, 1)
+        self.assertEqual(address.county, "")
+
+    def test_legacy_name_fields(self):
+        address = Address.from_auth0_json(
+            {**ADDRESS_JSON, "RecipientName": "", "Title": "Dr", "Lastname": "Smith"}
+        )
+
+        self.assertEqual(address.name, "Dr Smith")
+        # Saved back with the combined name
+        self.assertEqual(address.to_auth0_json()["RecipientName"], "Dr Smith")
+
+    def test_equality(self):
+        address = Address.from_auth0_json(ADDRESS_JSON)
+
+        self.assertEqual(address, Address.from_auth0_json(ADDRESS_JSON))
+        self.assertNotEqual(
+            address, Address.from_auth0_json({**ADDRESS_JSON, "Telephone": ""})
+        )
+        self.assertNotEqual(address, ADDRESS_JSON)
+        self.assertNotEqual(address, None)
+
+    def test_not_hashable(self):
+        with self.assertRaises(TypeError):
+            hash(Address())
+
+    def test_slots(self):
+        address = Address()
+
+        self.assertFalse(hasattr(address, "__dict__"))
+        with self.assertRaises(AttributeError):
+            address.unknown = "value"
+
+    def test_update(self):
+        address = Address.from_auth0_json(ADDRESS_JSON)
+
+        address.update(street="Other Road", unknown="value")
+
+        self.assertEqual(address.street, "Other Road")
+        self.assertFalse(hasattr(address, "unknown"))
+
+    def test_lines(self):
+        address = Address.from_auth0_json(ADDRESS_JSON)
+
+        self.assertEqual(
+            address.lines,
+            [
+                "Jane Smith",
+                "12 Kew Road",
+                "Richmond",
+                "Surrey",
+                "United Kingdom",
+                "TW9 4DU",
+                "Tel: 020 8876 3444",
+            ],
+        )
+
+    def test_lines_with_house_name(self):
+        address = Address.from_auth0_json(
+            {**ADDRESS_JSON, "HouseNameNo": "Kew House", "County": "", "Telephone": ""}
+        )
+
+        self.assertEqual(
+            address.lines,
+            [
+                "Jane Smith",
+                "Kew House",
+                "Kew Road",
+                "Richmond",
+                "United Kingdom",
+                "TW9 4DU",
+            ],
+        )
+
+    def test_looks_like_house_number(self):
+        for value in ["12", "12a", "12 A", "12  bc", "1"]:
+            with self.subTest(value=value):
+                self.assertTrue(Address.looks_like_house_number(value))
+        for value in ["", "a", "Kew House", "12abc", "12   a", "12-14", "12a "]:
+            with self.subTest(value=value):
+                self.assertFalse(Address.looks_like_house_number(value))
+
+    def test_looks_like_house_number_punctuation(self):
+        # The characters between "Z" and "a" were matched by the original
+        # pattern's [a-zA-z] range, which was a typo for [a-zA-Z]
+        for char in "[\\]^_`":
+            with self.subTest(char=char):
+                self.assertFalse(Address.looks_like_house_number(f"12{char}"))
+
+    def test_get_form_data(self):
+        self.assertEqual(
+            Address.from_auth0_json(ADDRESS_JSON).get_form_data(),
+            {
+                "recipient_name": "Jane Smith",
+                "house_name_no": "12",
+                "street": "Kew Road",
+                "town": "Richmond",
+                "county": "Surrey",
+                "country": "United Kingdom",
+                "postcode": "TW9 4DU",
+                "telephone": "020 8876 3444",
+            },
+        )
+
+
+class ProfileTestCase(SimpleTestCase):
+    def test_from_auth0_json(self):
+        data = {**make_user(0), "picture": "https://example.com/picture.png"}
+        data["user_metadata"]["addresses"] = [ADDRESS_JSON]
+
+        profile = Profile.from_auth0_json(data)
+
+        self.assertEqual(profile.user_id, "auth0|fake000000")
+        self.assertEqual(profile.email, "user0@example.com")
+        self.assertIs(profile.email_verified, True)
+        self.assertEqual(profile.name, "Fake User 0")
+        self.assertEqual(profile.nickname, "user0")
+        self.assertEqual(profile.updated_at, "2022-01-01T00:00:00.000Z")
+        self.assertEqual(profile.db_connection, "Username-Password-Authentication")
+        self.assertEqual(profile.address, Address.from_auth0_json(ADDRESS_JSON))
+        self.assertEqual(profile.picture, "https://example.com/picture.png")
+
+    def test_empty(self):
+        profile = Profile.from_auth0_json({})
+
+        self.assertEqual(profile.user_id, "")
+        self.assertIs(profile.email_verified, False)
+        self.assertIsNone(profile.db_connection)
+        self.assertIsNone(profile.address)
+
+    def test_email_as_name_ignored(self):
+        profile = Profile.from_auth0_json(
+            {"email": "user@example.com", "name": "user@example.com"}
+        )
+
+        self.assertEqual(profile.name, "")
+
+    def test_social_identity_has_no_db_connection(self):
+        profile = Profile.from_auth0_json(
+            {"identities": [{"connection": "google-oauth2", "isSocial": True}]}
+        )
+
+        self.assertIsNone(profile.db_connection)
+
+    def test_no_addresses(self):
+        profile = Profile.from_auth0_json({"user_metadata": {"addresses": []}})
+
+        self.assertIsNone(profile.address)
@@ -0,0 +1,138 @@
+import threading
+import time
+from unittest import mock
+
+from auth0.v3.exceptions import Auth0Error
+from django.core.cache import cache
+from django.core.cache.backends import locmem
+from django.test import SimpleTestCase, override_settings
+
+from tna_account_management.users import profile_cache
+from tna_account_management.utils import auth0
+from tna_account_management.utils.fake_auth0 import make_user
+
+
+def wait_for_refresh(auth0_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while auth0_id in profile_cache._refreshing:
+        if time.monotonic() >= deadline:
+            raise AssertionError(f"The profile for {auth0_id} wasn't refreshed.")
+        time.sleep(0.01)
+
+
+@override_settings(
+    AUTH0_PROFILE_CACHE_TIMEOUT=300, AUTH0_PROFILE_CACHE_STALE_TIMEOUT=600
+)
+class ProfileCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.profile = {**make_user(0), "updated_at": "2026-01-01T00:00:00.000Z"}
+        self.auth0_id = self.profile["user_id"]
+        self.fetched = {**self.profile, "updated_at": "2026-01-02T00:00:00.000Z"}
+        patcher = mock.patch.object(
+            auth0.users_client, "get", return_value=self.fetched
+        )
+        self.get = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(wait_for_refresh, self.auth0_id)
+
+    def make_stale(self):
+        profile_cache.set_profile(self.auth0_id, self.profile)
+        cache.delete(profile_cache.get_fresh_cache_key(self.auth0_id))
+
+    def test_fresh_hit(self):
+        profile_cache.set_profile(self.auth0_id, self.profile)
+
+        self.assertEqual(profile_cache.get_profile(self.auth0_id), self.profile)
+
+        self.assertNotIn(self.auth0_id, profile_cache._refreshing)
+        self.get.assert_not_called()
+
+    def test_stale_hit_refreshed_once(self):
+        self.make_stale()
+        release = threading.Event()
+        self.get.side_effect = lambda id: release.wait(5) and self.fetched
+
+        # The stale copy is served while a single refresh is in progress
+        for _ in range(3):
+            self.assertEqual(profile_cache.get_profile(self.auth0_id), self.profile)
+        release.set()
+        wait_for_refresh(self.auth0_id)
+
+        self.get.assert_called_once_with(id=self.auth0_id)
+        self.assertEqual(profile_cache.get_profile(self.auth0_id), self.fetched)
+        self.assertEqual(self.get.call_count, 1)
+
+    def test_refresh_does_not_overwrite_newer_profile(self):
+        self.make_stale()
+        fetching = threading.Event()
+        release = threading.Event()
+
+        def get(id):
+            fetching.set()
+            release.wait(5)
+            return self.fetched
+
+        self.get.side_effect = get
+        profile_cache.get_profile(self.auth0_id)
+        self.assertTrue(fetching.wait(5))
+        # Saved (as by User._update_auth0_user()) while the refresh is running
+        newer = {**self.profile, "updated_at": "2026-01-03T00:00:00.000Z"}
+        profile_cache.set_profile(self.auth0_id, newer)
+        release.set()
+        wait_for_refresh(self.auth0_id)
+
+        self.assertEqual(profile_cache.get_profile(self.auth0_id), newer)
+
+    def test_hard_ttl_miss(self):
+        profile_cache.set_profile(self.auth0_id, self.profile)
+        now = time.time()
+
+        # Still cached, but stale
+        with mock.patch.object(locmem.time, "time", return_value=now + 301):
+            self.assertIsNotNone(cache.get(profile_cache.get_cache_key(self.auth0_id)))
+            self.assertIsNone(
+                cache.get(profile_cache.get_fresh_cache_key(self.auth0_id))
+            )
+
+        # Gone altogether, so fetched before returning
+        with mock.patch.object(locmem.time, "time", return_value=now + 901):
+            self.assertIsNone(profile_cache.get_cached_profile(self.auth0_id))
+            with mock.patch.object(profile_cache, "schedule_refresh") as refresh:
+                self.assertEqual(profile_cache.get_profile(self.auth0_id), self.fetched)
+
+        refresh.assert_not_called()
+        self.get.assert_called_once_with(id=self.auth0_id)
+        self.assertEqual(profile_cache.get_cached_profile(self.auth0_id), self.fetched)
+
+    def test_refresh_failure_keeps_stale_copy(self):
+        self.make_stale()
+        self.get.side_effect = Auth0Error(503, "server_error", "Unavailable")
+
+        with self.assertLogs(profile_cache.logger, "WARNING"):
+            profile_cache.get_profile(self.auth0_id)
+            wait_for_refresh(self.auth0_id)
+
+        # The stale copy is used without retrying for a while
+        self.assertEqual(profile_cache.get_profile(self.auth0_id), self.profile)
+        self.assertNotIn(self.auth0_id, profile_cache._refreshing)
+        self.assertEqual(self.get.call_count, 1)
+
+    def test_refresh_for_deleted_user(self):
+        self.make_stale()
+        self.get.side_effect = Auth0Error(404, "inexistent_user", "Not found")
+
+        profile_cache.get_profile(self.auth0_id)
+        wait_for_refresh(self.auth0_id)
+
+        self.assertIsNone(profile_cache.get_cached_profile(self.auth0_id))
+
+    def test_prefetch_profile(self):
+        future = profile_cache.prefetch_profile(self.auth0_id)
+
+        self.assertEqual(future.result(5), self.fetched)
+        self.assertEqual(profile_cache.get_cached_profile(self.auth0_id), self.fetched)
+        # Cached profiles are returned without another fetch
+        future = profile_cache.prefetch_profile(self.auth0_id)
+        self.assertTrue(future.done())
+        self.assertEqual(self.get.call_count, 1)
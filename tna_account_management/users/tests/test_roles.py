@@ -0,0 +1,97 @@
+from unittest import mock
+
+from auth0.v3.exceptions import Auth0Error, RateLimitError
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from tna_account_management.users import roles
+from tna_account_management.utils import auth0, ratelimit
+
+ROLE = {"id": "rol_1", "name": "Editor"}
+
+
+@override_settings(AUTH0_MANAGEMENT_API_RATE_LIMIT=1000)
+class GetManyUserRolesTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        # Turns from the limiter are tracked in this process, from a clean slate
+        for patcher in [
+            mock.patch.object(ratelimit, "get_redis_client", return_value=None),
+            mock.patch.object(ratelimit, "_local_windows", {}),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(
+            auth0.users_client, "list_roles", return_value=[ROLE]
+        )
+        self.list_roles = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_fetched_ids(self):
+        return sorted(call.args[0] for call in self.list_roles.call_args_list)
+
+    def test_cached_and_fetched(self):
+        cache.set(roles.get_user_roles_cache_key("auth0|1"), [])
+
+        result = roles.get_many_user_roles(["auth0|1", "auth0|2", "auth0|3"])
+
+        self.assertEqual(result, {"auth0|1": [], "auth0|2": [ROLE], "auth0|3": [ROLE]})
+        self.assertEqual(self.get_fetched_ids(), ["auth0|2", "auth0|3"])
+        # The fetched roles are cached
+        self.list_roles.reset_mock()
+        roles.get_many_user_roles(["auth0|2", "auth0|3"])
+        self.list_roles.assert_not_called()
+
+    def test_deleted_user(self):
+        self.list_roles.side_effect = Auth0Error(404, "inexistent_user", "Not found")
+
+        self.assertEqual(roles.get_many_user_roles(["auth0|1"]), {"auth0|1": []})
+
+    def test_errors(self):
+        self.list_roles.side_effect = Auth0Error(500, "server_error", "Unavailable")
+
+        with self.assertLogs(roles.logger, "WARNING"):
+            result = roles.get_many_user_roles(["auth0|1"])
+
+        self.assertEqual(result, {"auth0|1": None})
+        self.assertIsNone(cache.get(roles.get_user_roles_cache_key("auth0|1")))
+
+    @override_settings(AUTH0_MANAGEMENT_API_RATE_LIMIT=2)
+    def test_paced_by_limiter(self):
+        auth0_ids = [f"auth0|{i}" for i in range(4)]
+
+        with mock.patch.object(roles, "RATE_LIMIT_WAIT_TIMEOUT", 0.2):
+            result = roles.get_many_user_roles(auth0_ids)
+
+        # Only two turns are available within the timeout
+        self.assertEqual(self.list_roles.call_count, 2)
+        self.assertEqual(sorted(map(bool, result.values())), [False, False, True, True])
+        # Roles that weren't fetched aren't cached
+        self.assertEqual(
+            len(cache.get_many(map(roles.get_user_roles_cache_key, auth0_ids))), 2
+        )
+
+    def test_rate_limit_error_retried(self):
+        self.list_roles.side_effect = [
+            RateLimitError("too_many_requests", "Too many requests", -1),
+            [ROLE],
+        ]
+
+        with mock.patch.object(roles.time, "sleep") as sleep:
+            result = roles.get_many_user_roles(["auth0|1"])
+
+        self.assertEqual(result, {"auth0|1": [ROLE]})
+        sleep.assert_called_once_with(1)
+
+    def test_rate_limit_error_after_retries(self):
+        self.list_roles.side_effect = RateLimitError(
+            "too_many_requests", "Too many requests", -1
+        )
+
+        with mock.patch.object(roles.time, "sleep"), self.assertLogs(
+            roles.logger, "WARNING"
+        ):
+            result = roles.get_many_user_roles(["auth0|1"])
+
+        self.assertEqual(result, {"auth0|1": None})
+        self.assertEqual(self.list_roles.call_count, roles.RATE_LIMIT_RETRIES + 1)
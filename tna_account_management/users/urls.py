@@ -5,6 +5,17 @@ from . import views
 urlpatterns = [
     path("update-name", views.UpdateNameView.as_view(), name="update_name"),
     path("update-address", views.UpdateAddressView.as_view(), name="update_address"),
+    path(
+        "address-lookup/postcode",
+        views.PostcodeLookupView.as_view(),
+        name="address_lookup_postcode",
+    ),
+    path(
+        "address-lookup/streets",
+        views.StreetSearchView.as_view(),
+        name="address_lookup_streets",
+    ),
+    path("avatar/<int:size>/<slug:key>", views.AvatarView.as_view(), name="avatar"),
     path("verify-your-email", views.VerifyEmailView.as_view(), name="verify_email"),
     path("change-email", views.ChangeEmailView.as_view(), name="change_email"),
     path("change-password", views.ChangePasswordView.as_view(), name="change_password"),
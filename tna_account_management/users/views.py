@@ -1,19 +1,32 @@
+import hashlib
 import logging
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import logout as auth_logout
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import redirect
 from django.urls import reverse, reverse_lazy
-from django.views.generic import FormView, TemplateView
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.generic import FormView, TemplateView, View
 
-from tna_account_management.users import forms
+from tna_account_management.users import (
+    address_lookup,
+    avatars,
+    email_availability,
+    forms,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class CommonContextMixin:
     title = ""
+    # Pages show details from the user's profile (see ProfilePrefetchMiddleware)
+    prefetch_profile = True
     main_heading = ""
     breadcrumbs_add_self = True
 
@@ -55,6 +68,41 @@ class CommonContextMixin:
         )
 
 
+class ConditionalGetMixin:
+    """
+    Adds an ETag header to GET responses, and responds to conditional
+    requests with a 304 (without rendering the template) when the page
+    hasn't changed since the client last fetched it.
+
+    No Last-Modified header is sent, as the markup also changes with each
+    release, which the ETag accounts for (by including RELEASE_VERSION) and
+    a modification time of the user's data wouldn't. Clients that only send
+    'If-Modified-Since' always get a full response.
+
+    Responses are marked as private, and must be revalidated before each use.
+    """
+
+    def get_etag(self):
+        return None
+
+    def get(self, request, *args, **kwargs):
+        # Pages displaying one-off messages can't be reused
+        if messages.get_messages(request):
+            return super().get(request, *args, **kwargs)
+
+        etag = self.get_etag()
+        if etag is not None:
+            etag = quote_etag(etag)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if etag is not None:
+            response.headers.setdefault("ETag", etag)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
 class NonSocialLoginRequiredMixin(LoginRequiredMixin):
     social_user_redirect_url = reverse_lazy("dashboard")
 
@@ -70,11 +118,17 @@ class NonSocialLoginRequiredMixin(LoginRequiredMixin):
         return super().dispatch(request, *args, **kwargs)
 
 
-class AccountDashboardView(LoginRequiredMixin, CommonContextMixin, TemplateView):
+class AccountDashboardView(
+    LoginRequiredMixin, ConditionalGetMixin, CommonContextMixin, TemplateView
+):
     title = "Manage your account"
     template_name = "patterns/pages/user/dashboard.html"
     breadcrumbs_add_self = False
 
+    def get_etag(self):
+        value = f"{settings.RELEASE_VERSION}:{self.request.user.profile_version}"
+        return hashlib.blake2b(value.encode(), digest_size=16).hexdigest()
+
 
 class VerifyEmailView(LoginRequiredMixin, CommonContextMixin, FormView):
     title = "Verify your email address"
@@ -170,11 +224,88 @@ class UpdateAddressView(LoginRequiredMixin, CommonContextMixin, FormView):
         return super().form_valid(form)
 
 
+class AddressLookupMixin(LoginRequiredMixin):
+    """
+    For views that return JSON from the address lookup index, which are
+    only available when ADDRESS_LOOKUP_INDEX_PATH is set.
+    """
+
+    # Results only change when the index is rebuilt
+    max_age = 60 * 60 * 24
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and not address_lookup.is_available():
+            raise Http404("Address lookup is not available.")
+        return super().dispatch(request, *args, **kwargs)
+
+    def json_response(self, data, status=200):
+        response = JsonResponse(data, status=status)
+        patch_cache_control(response, private=True, max_age=self.max_age)
+        return response
+
+
+class PostcodeLookupView(AddressLookupMixin, View):
+    def get(self, request):
+        result = address_lookup.lookup_postcode(request.GET.get("postcode", ""))
+        if result is None:
+            return self.json_response({"error": "Postcode not found."}, status=404)
+        return self.json_response(result)
+
+
+class StreetSearchView(AddressLookupMixin, View):
+    def get(self, request):
+        results = address_lookup.search_streets(
+            request.GET.get("q", ""), request.GET.get("postcode", "")
+        )
+        return self.json_response({"results": results})
+
+
+class AvatarView(LoginRequiredMixin, View):
+    """
+    Serves the current user's avatar at one of AVATAR_SIZES, from the copy
+    stored by ``users.avatars``. The URL includes a key derived from the
+    picture URL, so responses can be cached indefinitely. Until the avatar
+    has been stored, redirects to a default avatar.
+
+    Only the avatar for the user's current picture is served, so that other
+    users' avatars can't be viewed by guessing (or being sent) their URLs.
+    """
+
+    prefetch_profile = True
+
+    def get(self, request, size, key):
+        if size not in settings.AVATAR_SIZES:
+            raise Http404("Unsupported avatar size.")
+        picture = request.user.profile_view.picture if request.user.auth0_id else ""
+        if not picture or avatars.get_avatar_key(picture) != key:
+            raise Http404("Not the current user's avatar.")
+        if avatars.is_ready(key):
+            try:
+                with default_storage.open(avatars.get_avatar_path(key, size)) as f:
+                    data = f.read()
+            except OSError:
+                logger.warning(f"Stored avatar {key} is missing.")
+            else:
+                response = HttpResponse(data, content_type=avatars.get_image_type(data))
+                patch_cache_control(
+                    response, private=True, max_age=60 * 60 * 24 * 365, immutable=True
+                )
+                return response
+
+        if avatars.is_ready(key) is not False:
+            avatars.request_avatar(picture)
+        response = HttpResponseRedirect(avatars.get_default_avatar_url(request.user))
+        # Check again shortly, in case the avatar has been stored by then
+        patch_cache_control(response, private=True, max_age=60)
+        return response
+
+
 class ChangeEmailView(NonSocialLoginRequiredMixin, CommonContextMixin, FormView):
     title = "Change your email"
     form_class = forms.EmailForm
     template_name = "patterns/pages/user/change_email.html"
     success_url = reverse_lazy("auth_login")
+    email_taken_message = "An account with this email address already exists."
 
     def form_valid(self, form):
         user = self.request.user
@@ -185,15 +316,26 @@ class ChangeEmailView(NonSocialLoginRequiredMixin, CommonContextMixin, FormView)
             form.add_error("password", "The password you entered was invalid.")
             return self.form_invalid(form)
 
+        email = form.cleaned_data["email"]
+        if email_availability.is_email_taken(user, email):
+            form.add_error("email", self.email_taken_message)
+            return self.form_invalid(form)
+
+        previous_email = user.email
         try:
-            user.update_email(form.cleaned_data["email"])
-        except Exception:
+            user.update_email(email)
+        except Exception as e:
+            if email_availability.is_email_exists_error(e):
+                email_availability.set_taken(email, user.auth0_db, True)
+                form.add_error("email", self.email_taken_message)
+                return self.form_invalid(form)
             logger.exception("Failed to save changes to Auth0")
             form.add_error(
                 None,
                 "Failed to save changes. Please wait a moment, then try again.",
             )
             return self.form_invalid(form)
+        email_availability.evict(previous_email, user.auth0_db)
 
         # log the user out - they must log back in with their new email
         auth_logout(self.request)
@@ -3,14 +3,16 @@ from datetime import datetime, timedelta
 import requests
 from auth0.v3.authentication import GetToken
 from auth0.v3.exceptions import Auth0Error
-from auth0.v3.management import Jobs, Roles, Users
+from auth0.v3.management import Jobs, Roles, Users, UsersByEmail
 from auth0.v3.rest import RestClient
 from django.conf import settings
 from django.utils.functional import cached_property
 
+from tna_account_management.utils.ratelimit import SlidingWindowRateLimiter
+
 
 def check_credentials(username: str, password: str, realm: str):
-    get_token = GetToken(settings.AUTH0_DOMAIN)
+    get_token = GetToken(settings.AUTH0_DOMAIN, protocol=settings.AUTH0_PROTOCOL)
     try:
         get_token.login(
             client_id=settings.AUTH0_CLIENT_ID,
@@ -29,6 +31,18 @@ def check_credentials(username: str, password: str, realm: str):
         return True
 
 
+def get_management_api_limiter() -> SlidingWindowRateLimiter:
+    """
+    Return a limiter for requests to the Management API, shared by all
+    processes, for use by code that makes many requests in quick succession
+    (such as admin bulk actions), so that requests from individual users
+    aren't rejected by Auth0's rate limiting.
+    """
+    return SlidingWindowRateLimiter(
+        "auth0-management-api", settings.AUTH0_MANAGEMENT_API_RATE_LIMIT, 1
+    )
+
+
 class TokenGeneratingRestClient(RestClient):
     """
     An improved version of ``auth0.v3.rest.RestClient`` that lazily generates
@@ -55,7 +69,7 @@ class TokenGeneratingRestClient(RestClient):
 
         # There is not current token, or it will soon expire,
         # so generate a new one
-        get_token = GetToken(settings.AUTH0_DOMAIN)
+        get_token = GetToken(settings.AUTH0_DOMAIN, protocol=settings.AUTH0_PROTOCOL)
         result = get_token.client_credentials(
             settings.AUTH0_CLIENT_ID,
             settings.AUTH0_CLIENT_SECRET,
@@ -67,7 +81,9 @@ class TokenGeneratingRestClient(RestClient):
 
         # Caclulate a new expiry date, so that we know when to
         # generate a fresh token
-        self._jwt_token_expiry = datetime.now() + timedelta(result["expires_in"])
+        self._jwt_token_expiry = datetime.now() + timedelta(
+            seconds=result["expires_in"]
+        )
         return self._jwt_token
 
     def add_auth_header(self, custom_headers):
@@ -132,6 +148,20 @@ class TokenGeneratingRestClient(RestClient):
         )
         return self._process_response(response)
 
+    def delete(self, url, params=None, data=None):
+        """
+        Overrides RestClient.delete() to ensure the 'Authentication' header
+        is present.
+        """
+        response = requests.delete(
+            url,
+            params=params or {},
+            json=data,
+            headers=self.get_base_headers(),
+            timeout=self.options.timeout,
+        )
+        return self._process_response(response)
+
 
 class TokenGeneratingClient:
 
@@ -171,6 +201,16 @@ class TokenGeneratingUsersClient(TokenGeneratingClient, Users):
     pass
 
 
+class TokenGeneratingUsersByEmailClient(TokenGeneratingClient, UsersByEmail):
+    """
+    A custom version of the `UsersByEmail` client that lazily generates
+    a jwt token when needed and automatically refreshes it and retries
+    if it receives a "401: Invalid token" response from Auth0.
+    """
+
+    pass
+
+
 class TokenGeneratingRolesClient(TokenGeneratingClient, Roles):
     """
     A custom version of the `Roles` client that lazily generates
@@ -197,8 +237,18 @@ class TokenGeneratingJobsClient(TokenGeneratingClient, Jobs):
         super().send_verification_email(body)
 
 
-users_client = TokenGeneratingUsersClient(domain=getattr(settings, "AUTH0_DOMAIN", ""))
+users_client = TokenGeneratingUsersClient(
+    domain=getattr(settings, "AUTH0_DOMAIN", ""), protocol=settings.AUTH0_PROTOCOL
+)
+
+users_by_email_client = TokenGeneratingUsersByEmailClient(
+    domain=getattr(settings, "AUTH0_DOMAIN", ""), protocol=settings.AUTH0_PROTOCOL
+)
 
-roles_client = TokenGeneratingRolesClient(domain=getattr(settings, "AUTH0_DOMAIN", ""))
+roles_client = TokenGeneratingRolesClient(
+    domain=getattr(settings, "AUTH0_DOMAIN", ""), protocol=settings.AUTH0_PROTOCOL
+)
 
-jobs_client = TokenGeneratingJobsClient(domain=getattr(settings, "AUTH0_DOMAIN", ""))
+jobs_client = TokenGeneratingJobsClient(
+    domain=getattr(settings, "AUTH0_DOMAIN", ""), protocol=settings.AUTH0_PROTOCOL
+)
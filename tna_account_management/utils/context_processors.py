@@ -4,4 +4,5 @@ from django.conf import settings
 def global_vars(request):
     return {
         "SEO_NOINDEX": settings.SEO_NOINDEX,
+        "RELEASE_VERSION": settings.RELEASE_VERSION,
     }
@@ -0,0 +1,182 @@
+"""
+A compact, read-only set of fixed-width digests (e.g. password hashes),
+stored in a sorted binary file that is queried through ``mmap``, so that
+lookups are O(log n) and the file's pages are shared between all processes
+that have it open, rather than each holding its own copy in memory.
+
+File layout (all integers are little-endian):
+
+    header         magic (8 bytes), record size (uint16), prefix bits (uint8),
+                   5 bytes of padding, record count (uint64)
+    prefix table   (2 ** prefix bits) + 1 uint64 record indexes, where entry
+                   `p` is the index of the first record whose leading bits
+                   are >= `p`
+    records        record count * record size bytes, in ascending order
+"""
+import mmap
+import os
+import struct
+from typing import Iterable, Optional, Union
+
+MAGIC = b"TNADIGX1"
+HEADER = struct.Struct("<8sHB5xQ")
+OFFSET = struct.Struct("<Q")
+RANGE = struct.Struct("<2Q")
+
+
+class InvalidDigestIndex(Exception):
+    pass
+
+
+def get_prefix(digest: bytes, prefix_bits: int) -> int:
+    if not prefix_bits:
+        return 0
+    return int.from_bytes(digest[:4], "big") >> (32 - prefix_bits)
+
+
+class DigestIndex:
+    def __init__(self, buffer: Union[bytes, mmap.mmap], file=None):
+        if len(buffer) < HEADER.size:
+            raise InvalidDigestIndex("The index is too small to be valid.")
+        magic, record_size, prefix_bits, count = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise InvalidDigestIndex("The index does not have the expected header.")
+        self.buffer = buffer
+        self.file = file
+        self.record_size = record_size
+        self.prefix_bits = prefix_bits
+        self.count = count
+        self.table_offset = HEADER.size
+        self.records_offset = HEADER.size + ((2**prefix_bits) + 1) * OFFSET.size
+        if len(buffer) != self.records_offset + count * record_size:
+            raise InvalidDigestIndex("The index is truncated or has trailing data.")
+
+    @classmethod
+    def open(cls, path: Union[str, os.PathLike]) -> "DigestIndex":
+        """
+        Return an index for the file at `path`, memory-mapped read-only.
+        """
+        f = open(path, "rb")
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be memory-mapped
+            f.close()
+            raise InvalidDigestIndex("The index file is empty.")
+        return cls(buffer, file=f)
+
+    @classmethod
+    def from_digests(
+        cls, digests: Iterable[bytes], record_size: int, prefix_bits: int = 0
+    ) -> "DigestIndex":
+        """
+        Return an in-memory index of the supplied (not necessarily sorted or
+        unique) digests.
+        """
+        data = bytearray()
+        write_index(data, sorted(set(digests)), record_size, prefix_bits)
+        return cls(bytes(data))
+
+    def close(self) -> None:
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        if self.file is not None:
+            self.file.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, digest: bytes) -> bool:
+        if len(digest) != self.record_size:
+            return False
+        buffer = self.buffer
+        size = self.record_size
+        prefix = get_prefix(digest, self.prefix_bits)
+        # The range of records that share the digest's prefix
+        lo, hi = RANGE.unpack_from(buffer, self.table_offset + prefix * OFFSET.size)
+        base = self.records_offset
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = base + mid * size
+            record = buffer[start : start + size]
+            if record < digest:
+                lo = mid + 1
+            elif record > digest:
+                hi = mid
+            else:
+                return True
+        return False
+
+
+def write_index(
+    out, digests: Iterable[bytes], record_size: int, prefix_bits: int = 0
+) -> int:
+    """
+    Write an index containing `digests` (which must already be sorted, and
+    all be `record_size` bytes long) to `out`, which can be a ``bytearray``
+    or a seekable binary file. Duplicate digests are dropped. Returns the
+    number of records written.
+    """
+    if not 0 <= prefix_bits <= 24:
+        raise ValueError("prefix_bits must be between 0 and 24.")
+
+    is_file = not isinstance(out, bytearray)
+    table_size = (2**prefix_bits) + 1
+    start = out.tell() if is_file else len(out)
+    placeholder = bytes(HEADER.size + table_size * OFFSET.size)
+    if is_file:
+        out.write(placeholder)
+    else:
+        out.extend(placeholder)
+
+    table = [0] * table_size
+    count = 0
+    previous: Optional[bytes] = None
+    for digest in digests:
+        if len(digest) != record_size:
+            raise ValueError(f"Digest {digest.hex()} is not {record_size} bytes long.")
+        if previous is not None:
+            if digest == previous:
+                continue
+            if digest < previous:
+                raise ValueError("Digests must be supplied in ascending order.")
+        # Records with a prefix greater than this one start later
+        table[get_prefix(digest, prefix_bits) + 1] += 1
+        if is_file:
+            out.write(digest)
+        else:
+            out.extend(digest)
+        previous = digest
+        count += 1
+
+    # Convert per-prefix counts to cumulative start indexes
+    for i in range(1, table_size):
+        table[i] += table[i - 1]
+
+    header = HEADER.pack(MAGIC, record_size, prefix_bits, count)
+    header += b"".join(OFFSET.pack(value) for value in table)
+    if is_file:
+        end = out.tell()
+        out.seek(start)
+        out.write(header)
+        out.seek(end)
+    else:
+        out[start : start + len(header)] = header
+    return count
+
+
+def build_index_file(
+    path: Union[str, os.PathLike],
+    digests: Iterable[bytes],
+    record_size: int,
+    prefix_bits: int = 0,
+) -> int:
+    """
+    Write an index containing `digests` to `path`, replacing any existing
+    file atomically, so that processes with the old file open are unaffected.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        count = write_index(f, digests, record_size, prefix_bits)
+    os.replace(tmp_path, path)
+    return count
@@ -0,0 +1,549 @@
+"""
+A small, self-contained stand-in for the parts of Auth0 that this project
+talks to (OIDC discovery, JWKS, authorization, token, userinfo and the
+Management API 'users', 'users-by-email', 'roles' and 'jobs' endpoints), for
+use in benchmarks and local testing.
+
+It is NOT a faithful reimplementation of Auth0. Every authorization request
+is approved without a login screen, and tokens are only loosely checked.
+"""
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from copy import deepcopy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, unquote, urlencode, urlparse
+
+from authlib.jose import JsonWebKey, jwt
+
+PASSWORD_REALM_GRANT = "http://auth0.com/oauth/grant-type/password-realm"
+
+DEFAULT_PASSWORD = "password"
+
+# Matches the quoted values in a user search query, such as
+# 'user_id:("auth0|1" OR "auth0|2")'
+QUOTED_VALUE_RE = re.compile(r'"((?:[^"\\]|\\.)*)"')
+
+
+def make_user(index: int) -> Dict[str, Any]:
+    return {
+        "user_id": f"auth0|fake{index:06d}",
+        "email": f"user{index}@example.com",
+        "email_verified": True,
+        "name": f"Fake User {index}",
+        "nickname": f"user{index}",
+        "picture": "",
+        "identities": [
+            {
+                "connection": "Username-Password-Authentication",
+                "provider": "auth0",
+                "user_id": f"fake{index:06d}",
+                "isSocial": False,
+            }
+        ],
+        "user_metadata": {
+            "addresses": [
+                {
+                    "Id": 1,
+                    "AddressType": 1,
+                    "RecipientName": f"Fake User {index}",
+                    "HouseNameNo": str(index),
+                    "Street": "Kew Road",
+                    "Town": "Richmond",
+                    "County": "Surrey",
+                    "Postcode": "TW9 4DU",
+                    "Country": "United Kingdom",
+                }
+            ]
+        },
+        "created_at": "2022-01-01T00:00:00.000Z",
+        "updated_at": "2022-01-01T00:00:00.000Z",
+    }
+
+
+class FakeAuth0Server(ThreadingHTTPServer):
+    """
+    A threaded HTTP server that behaves enough like an Auth0 tenant for the
+    login and account management journeys in this project to complete.
+
+    `latency` (seconds, plus up to `latency_jitter` seconds) is added to every
+    response, and `error_rate` (0-1) of Auth0 requests fail with
+    `error_status`, allowing slow or unreliable upstreams to be simulated.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        *,
+        user_count: int = 100,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        token_expires_in: int = 86400,
+    ):
+        super().__init__((host, port), FakeAuth0RequestHandler)
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.token_expires_in = token_expires_in
+        self.signing_key = JsonWebKey.generate_key(
+            "RSA", 2048, is_private=True, options={"kid": uuid.uuid4().hex}
+        )
+        self.users = {}
+        self.passwords = {}
+        for i in range(user_count):
+            self.add_user(make_user(i))
+        self.authorization_codes = {}
+        self.roles = {
+            f"rol_fake{i}": {"id": f"rol_fake{i}", "name": name, "description": ""}
+            for i, name in enumerate(["Staff", "Researcher", "Volunteer"])
+        }
+        self.user_roles = defaultdict(set)
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._next_user = 0
+        self._thread = None
+
+    @property
+    def domain(self) -> str:
+        return f"{self.server_address[0]}:{self.server_address[1]}"
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.domain}"
+
+    @property
+    def issuer(self) -> str:
+        return f"https://{self.domain}/"
+
+    def start(self) -> "FakeAuth0Server":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def add_user(self, user: Dict[str, Any], password: str = DEFAULT_PASSWORD):
+        self.users[user["user_id"]] = user
+        self.passwords[user["email"]] = (user["user_id"], password)
+
+    def next_user_id(self, login_hint: Optional[str] = None) -> str:
+        if login_hint and login_hint in self.passwords:
+            return self.passwords[login_hint][0]
+        with self._lock:
+            user_ids = list(self.users)
+            user_id = user_ids[self._next_user % len(user_ids)]
+            self._next_user += 1
+        return user_id
+
+    def count(self, endpoint: str) -> None:
+        with self._lock:
+            self.counts[endpoint] += 1
+
+    def reset_counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self.counts)
+            self.counts.clear()
+        return counts
+
+    def sign(self, claims: Dict[str, Any]) -> str:
+        header = {
+            "alg": "RS256",
+            "typ": "JWT",
+            "kid": self.signing_key.as_dict()["kid"],
+        }
+        return jwt.encode(header, claims, self.signing_key).decode()
+
+    def make_id_token(self, user_id: str, client_id: str, nonce: str = None) -> str:
+        user = self.users[user_id]
+        now = int(time.time())
+        claims = {
+            "iss": self.issuer,
+            "aud": client_id,
+            "sub": user_id,
+            "sid": uuid.uuid4().hex,
+            "iat": now,
+            "exp": now + 36000,
+            "email": user["email"],
+            "email_verified": user["email_verified"],
+            "name": user["name"],
+            "nickname": user["nickname"],
+        }
+        if nonce:
+            claims["nonce"] = nonce
+        return self.sign(claims)
+
+    def make_logout_token(self, client_id: str, sub: str = None, sid: str = None):
+        """
+        Return a signed OIDC back-channel logout token, for exercising the
+        'auth_backchannel_logout' view.
+        """
+        claims = {
+            "iss": self.issuer,
+            "aud": client_id,
+            "iat": int(time.time()),
+            "jti": uuid.uuid4().hex,
+            "events": {"http://schemas.openid.net/event/backchannel-logout": {}},
+        }
+        if sub:
+            claims["sub"] = sub
+        if sid:
+            claims["sid"] = sid
+        return self.sign(claims)
+
+
+class FakeAuth0RequestHandler(BaseHTTPRequestHandler):
+    server: FakeAuth0Server
+
+    def log_message(self, format, *args):
+        pass
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+
+    def read_body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if not raw:
+            return {}
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            return json.loads(raw)
+        return {k: v[0] for k, v in parse_qs(raw.decode()).items()}
+
+    def send_json(self, data: Any, status: int = 200) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_no_content(self) -> None:
+        self.send_response(204)
+        self.end_headers()
+
+    def send_redirect(self, location: str) -> None:
+        self.send_response(302)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def simulate_conditions(self, endpoint: str) -> bool:
+        """
+        Count the request, apply the configured latency and, if an error is
+        to be injected, send the error response and return False.
+        """
+        server = self.server
+        server.count(endpoint)
+        delay = server.latency + random.uniform(0, server.latency_jitter)
+        if delay:
+            time.sleep(delay)
+        if server.error_rate and random.random() < server.error_rate:
+            self.send_json(
+                {
+                    "statusCode": server.error_status,
+                    "error": "Injected error",
+                    "message": "An error was injected by the fake Auth0 server",
+                },
+                status=server.error_status,
+            )
+            return False
+        return True
+
+    # -------------------------------------------------------------------------
+    # Routing
+    # -------------------------------------------------------------------------
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/__stats__":
+            return self.send_json(dict(self.server.counts))
+        if url.path == "/.well-known/openid-configuration":
+            return self.discovery()
+        if url.path == "/.well-known/jwks.json":
+            return self.jwks()
+        if url.path == "/authorize":
+            return self.authorize(query)
+        if url.path == "/userinfo":
+            return self.userinfo()
+        if url.path == "/v2/logout":
+            return self.logout(query)
+        if url.path == "/api/v2/users":
+            return self.list_users(query)
+        if url.path == "/api/v2/users-by-email":
+            return self.users_by_email(query)
+        if url.path == "/api/v2/roles":
+            return self.list_roles(query)
+        if url.path.startswith("/api/v2/users/") and url.path.endswith("/roles"):
+            user_id = unquote(url.path[len("/api/v2/users/") : -len("/roles")])
+            return self.list_user_roles(user_id)
+        if url.path.startswith("/api/v2/users/"):
+            return self.get_user(unquote(url.path[len("/api/v2/users/") :]))
+        self.send_json({"error": "Not found"}, status=404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path == "/__reset__":
+            return self.send_json(self.server.reset_counts())
+        if url.path == "/oauth/token":
+            return self.token(self.read_body())
+        if url.path == "/api/v2/jobs/verification-email":
+            return self.verification_email(self.read_body())
+        if url.path.startswith("/api/v2/users/") and url.path.endswith("/roles"):
+            user_id = unquote(url.path[len("/api/v2/users/") : -len("/roles")])
+            return self.add_user_roles(user_id, self.read_body())
+        self.send_json({"error": "Not found"}, status=404)
+
+    def do_PATCH(self):
+        url = urlparse(self.path)
+        if url.path.startswith("/api/v2/users/"):
+            user_id = unquote(url.path[len("/api/v2/users/") :])
+            return self.update_user(user_id, self.read_body())
+        self.send_json({"error": "Not found"}, status=404)
+
+    def do_DELETE(self):
+        url = urlparse(self.path)
+        if url.path.startswith("/api/v2/users/") and url.path.endswith("/roles"):
+            user_id = unquote(url.path[len("/api/v2/users/") : -len("/roles")])
+            return self.remove_user_roles(user_id, self.read_body())
+        self.send_json({"error": "Not found"}, status=404)
+
+    # -------------------------------------------------------------------------
+    # Authentication API
+    # -------------------------------------------------------------------------
+
+    def discovery(self):
+        if not self.simulate_conditions("discovery"):
+            return
+        base_url = self.server.base_url
+        self.send_json(
+            {
+                "issuer": self.server.issuer,
+                "authorization_endpoint": f"{base_url}/authorize",
+                "token_endpoint": f"{base_url}/oauth/token",
+                "userinfo_endpoint": f"{base_url}/userinfo",
+                "jwks_uri": f"{base_url}/.well-known/jwks.json",
+                "end_session_endpoint": f"{base_url}/v2/logout",
+                "response_types_supported": ["code"],
+                "subject_types_supported": ["public"],
+                "id_token_signing_alg_values_supported": ["RS256"],
+                "backchannel_logout_supported": True,
+            }
+        )
+
+    def jwks(self):
+        if not self.simulate_conditions("jwks"):
+            return
+        self.send_json({"keys": [self.server.signing_key.as_dict(is_private=False)]})
+
+    def authorize(self, query: Dict[str, str]):
+        if not self.simulate_conditions("authorize"):
+            return
+        code = uuid.uuid4().hex
+        self.server.authorization_codes[code] = {
+            "user_id": self.server.next_user_id(query.get("login_hint")),
+            "client_id": query.get("client_id", ""),
+            "nonce": query.get("nonce"),
+        }
+        params = {"code": code}
+        if "state" in query:
+            params["state"] = query["state"]
+        self.send_redirect(f"{query['redirect_uri']}?{urlencode(params)}")
+
+    def token(self, data: Dict[str, str]):
+        if not self.simulate_conditions(f"token:{data.get('grant_type')}"):
+            return
+        server = self.server
+        grant_type = data.get("grant_type")
+        response = {
+            "access_token": uuid.uuid4().hex,
+            "token_type": "Bearer",
+            "expires_in": server.token_expires_in,
+        }
+        if grant_type == "authorization_code":
+            details = server.authorization_codes.pop(data.get("code"), None)
+            if details is None:
+                return self.send_json({"error": "invalid_grant"}, status=403)
+            client_id = data.get("client_id") or details["client_id"]
+            response["id_token"] = server.make_id_token(
+                details["user_id"], client_id, details["nonce"]
+            )
+            response["scope"] = "openid profile email"
+        elif grant_type == PASSWORD_REALM_GRANT:
+            user_id, password = server.passwords.get(data.get("username"), (None, None))
+            if user_id is None or data.get("password") != password:
+                return self.send_json(
+                    {
+                        "error": "invalid_grant",
+                        "error_description": "Wrong email or password.",
+                    },
+                    status=403,
+                )
+        elif grant_type != "client_credentials":
+            return self.send_json({"error": "unsupported_grant_type"}, status=400)
+        self.send_json(response)
+
+    def userinfo(self):
+        if not self.simulate_conditions("userinfo"):
+            return
+        # Access tokens aren't tracked, so just return the first user
+        user = next(iter(self.server.users.values()))
+        self.send_json(
+            {
+                "sub": user["user_id"],
+                "email": user["email"],
+                "email_verified": user["email_verified"],
+                "name": user["name"],
+                "nickname": user["nickname"],
+            }
+        )
+
+    def logout(self, query: Dict[str, str]):
+        if not self.simulate_conditions("logout"):
+            return
+        self.send_redirect(query.get("returnTo", "/"))
+
+    # -------------------------------------------------------------------------
+    # Management API
+    # -------------------------------------------------------------------------
+
+    def get_user(self, user_id: str):
+        if not self.simulate_conditions("users:get"):
+            return
+        try:
+            self.send_json(self.server.users[user_id])
+        except KeyError:
+            self.send_json({"statusCode": 404, "error": "Not Found"}, status=404)
+
+    def list_users(self, query: Dict[str, str]):
+        """
+        Supports searching by 'user_id' only, with a query such as
+        'user_id:("auth0|1" OR "auth0|2")'.
+        """
+        if not self.simulate_conditions("users:list"):
+            return
+        user_ids = [
+            re.sub(r"\\(.)", r"\1", value)
+            for value in QUOTED_VALUE_RE.findall(query.get("q", ""))
+        ]
+        users = [self.server.users[i] for i in user_ids if i in self.server.users]
+        per_page = int(query.get("per_page", 50))
+        start = int(query.get("page", 0)) * per_page
+        page = users[start : start + per_page]
+        if query.get("include_totals") == "false":
+            return self.send_json(page)
+        self.send_json(
+            {
+                "start": start,
+                "limit": per_page,
+                "length": len(page),
+                "total": len(users),
+                "users": page,
+            }
+        )
+
+    def users_by_email(self, query: Dict[str, str]):
+        if not self.simulate_conditions("users:by-email"):
+            return
+        user_id, _ = self.server.passwords.get(query.get("email"), (None, None))
+        user = self.server.users.get(user_id)
+        self.send_json([user] if user else [])
+
+    def update_user(self, user_id: str, data: Dict[str, Any]):
+        if not self.simulate_conditions("users:update"):
+            return
+        server = self.server
+        try:
+            user = deepcopy(server.users[user_id])
+        except KeyError:
+            return self.send_json({"statusCode": 404, "error": "Not Found"}, 404)
+        owner, _ = server.passwords.get(data.get("email"), (user_id, None))
+        if owner != user_id:
+            return self.send_json(
+                {
+                    "statusCode": 400,
+                    "error": "Bad Request",
+                    "message": "The specified new email already exists",
+                    "errorCode": "auth0_idp_error",
+                },
+                400,
+            )
+        _, current_password = server.passwords.pop(user["email"], (None, None))
+        password = data.pop("password", None) or current_password
+        # Like Auth0, merge metadata at the top level only
+        user.setdefault("user_metadata", {}).update(data.pop("user_metadata", {}))
+        user.update(data)
+        user["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())
+        server.add_user(user, password or DEFAULT_PASSWORD)
+        self.send_json(user)
+
+    def list_roles(self, query: Dict[str, str]):
+        if not self.simulate_conditions("roles:list"):
+            return
+        roles = list(self.server.roles.values())
+        per_page = int(query.get("per_page", 50))
+        start = int(query.get("page", 0)) * per_page
+        page = roles[start : start + per_page]
+        if query.get("include_totals") == "false":
+            return self.send_json(page)
+        self.send_json(
+            {
+                "start": start,
+                "limit": per_page,
+                "length": len(page),
+                "total": len(roles),
+                "roles": page,
+            }
+        )
+
+    def list_user_roles(self, user_id: str):
+        if not self.simulate_conditions("users:list-roles"):
+            return
+        if user_id not in self.server.users:
+            return self.send_json({"statusCode": 404, "error": "Not Found"}, 404)
+        self.send_json(
+            [self.server.roles[role_id] for role_id in self.server.user_roles[user_id]]
+        )
+
+    def add_user_roles(self, user_id: str, data: Dict[str, Any]):
+        if not self.simulate_conditions("users:add-roles"):
+            return
+        if user_id not in self.server.users:
+            return self.send_json({"statusCode": 404, "error": "Not Found"}, 404)
+        self.server.user_roles[user_id].update(data.get("roles", ()))
+        self.send_no_content()
+
+    def remove_user_roles(self, user_id: str, data: Dict[str, Any]):
+        if not self.simulate_conditions("users:remove-roles"):
+            return
+        if user_id not in self.server.users:
+            return self.send_json({"statusCode": 404, "error": "Not Found"}, 404)
+        self.server.user_roles[user_id].difference_update(data.get("roles", ()))
+        self.send_no_content()
+
+    def verification_email(self, data: Dict[str, Any]):
+        if not self.simulate_conditions("jobs:verification-email"):
+            return
+        self.send_json(
+            {
+                "id": f"job_{uuid.uuid4().hex[:16]}",
+                "type": "verification_email",
+                "status": "pending",
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+            },
+            status=201,
+        )
@@ -1,17 +1,68 @@
+import copy
+from typing import Dict, Hashable, Tuple
+
 from django.utils.translation import gettext_lazy as _
 from tbxforms import forms as tbxforms_forms
+from tbxforms.helper import FormHelper
 from tbxforms.layout import Button, Size
 
+# Helpers built by HelperMixin, shared by all instances of a form class
+_helpers: Dict[Tuple[type, Hashable], FormHelper] = {}
+
+# Attributes of a FormHelper copied for each form instance
+HELPER_MUTABLE_ATTRIBUTES = ("layout", "attrs", "inputs")
 
-class BaseForm(tbxforms_forms.BaseForm):
+
+class HelperMixin(tbxforms_forms.BaseForm):
+    """
+    A drop-in replacement for tbxforms' ``BaseForm``, which builds the
+    ``FormHelper`` (and its layout) once per form class, instead of on every
+    access of ``helper`` (which crispy accesses several times per render).
+
+    Subclasses should customise the helper by overriding ``build_helper()``
+    rather than ``helper``. If the helper depends on anything other than the
+    form's field names, ``get_helper_cache_key()`` should be overridden too.
+    """
+
+    def build_helper(self) -> FormHelper:
+        return tbxforms_forms.BaseForm.helper.fget(self)
+
+    def get_helper_cache_key(self) -> Hashable:
+        return tuple(self.fields)
+
+    @property
+    def helper(self) -> FormHelper:
+        try:
+            return self.__dict__["_helper"]
+        except KeyError:
+            pass
+        key = (type(self), self.get_helper_cache_key())
+        shared = _helpers.get(key)
+        if shared is None:
+            shared = self.build_helper()
+            # Avoid keeping the first instance (and its data) alive
+            shared.form = None
+            _helpers[key] = shared
+        # The layout, attrs and inputs may be modified by views (to add a
+        # field or change the action, say), so each instance gets its own
+        # copy of them, rather than one shared with every other request
+        helper = copy.copy(shared)
+        for name in HELPER_MUTABLE_ATTRIBUTES:
+            if name in shared.__dict__:
+                setattr(helper, name, copy.deepcopy(shared.__dict__[name]))
+        helper.form = self
+        self.__dict__["_helper"] = helper
+        return helper
+
+
+class BaseForm(HelperMixin):
     """
     A base class that should be used/inherited by all forms.
     Outputs a standard form with the <form> tag.
     """
 
-    @property
-    def helper(self):
-        fh = super().helper
+    def build_helper(self) -> FormHelper:
+        fh = super().build_helper()
         fh.html5_required = True
         fh.label_size = Size.MEDIUM
         fh.legend_size = Size.MEDIUM
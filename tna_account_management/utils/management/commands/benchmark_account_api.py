@@ -0,0 +1,156 @@
+import json
+import time
+import timeit
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+
+from tna_account_management.api import encoding
+from tna_account_management.users.models import User
+from tna_account_management.utils.fake_auth0 import FakeAuth0Server, make_user
+
+API_KEY = "benchmark"
+
+
+class Command(BaseCommand):
+    """
+    Compares fetching account data from the account API one user at a time
+    with fetching it in batches, with a cold and a warm profile cache, and
+    reports the time taken and the number of Auth0 requests made for each.
+    Also reports the cost of revalidating a batch with 'If-None-Match', and
+    of encoding a full batch with each JSON encoder.
+
+    The project must be configured to use a stand-in for Auth0, as for
+    ``benchmark_login_flow``. Users are created in a throwaway test database,
+    which is created and destroyed by the command.
+    """
+
+    help = "Benchmarks single and batched reads from the account API"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=500)
+        parser.add_argument(
+            "--start-fake-auth0",
+            action="store_true",
+            help="Start a fake Auth0 server at AUTH0_DOMAIN for the duration of the run",
+        )
+        parser.add_argument("--latency", type=float, default=0.02)
+
+    def handle(self, *args, **options):
+        if settings.AUTHENTICATION_PROVIDER != "auth0":
+            raise CommandError("AUTH0_DOMAIN must be set to run this benchmark.")
+        self.auth0_url = f"{settings.AUTH0_PROTOCOL}://{settings.AUTH0_DOMAIN}"
+
+        server = None
+        if options["start_fake_auth0"]:
+            host, _, port = settings.AUTH0_DOMAIN.partition(":")
+            server = FakeAuth0Server(
+                host,
+                int(port or 80),
+                user_count=options["users"],
+                latency=options["latency"],
+            ).start()
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        call_command("createcachetable")
+        try:
+            with override_settings(
+                ACCOUNT_API_KEYS=[API_KEY],
+                CACHES={
+                    "default": {
+                        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                        "OPTIONS": {"MAX_ENTRIES": options["users"] * 2},
+                    }
+                },
+            ):
+                self.run_benchmark(options["users"])
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+            if server is not None:
+                server.stop()
+
+    def run_benchmark(self, user_count):
+        profiles = [make_user(i) for i in range(user_count)]
+        User.objects.bulk_create(
+            User(username=profile["nickname"], auth0_id=profile["user_id"])
+            for profile in profiles
+        )
+        auth0_ids = [profile["user_id"] for profile in profiles]
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {API_KEY}")
+        batch_size = settings.ACCOUNT_API_BATCH_SIZE
+        batches = [
+            auth0_ids[i : i + batch_size] for i in range(0, user_count, batch_size)
+        ]
+
+        def fetch_individually():
+            for auth0_id in auth0_ids:
+                response = client.get(reverse("api_account_detail", args=[auth0_id]))
+                assert response.status_code == 200, response.status_code
+
+        def fetch_batches(headers=None):
+            responses = []
+            for batch, etag in zip(batches, headers or [None] * len(batches)):
+                kwargs = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+                response = client.get(
+                    reverse("api_account_list"), {"id": batch}, **kwargs
+                )
+                assert response.status_code in (200, 304), response.status_code
+                responses.append(response)
+            return responses
+
+        self.stdout.write(
+            f"{'Method':<22} {'Cache':<6} {'Total (ms)':>11} {'Auth0 requests':>15}"
+        )
+        for label, func in (
+            ("One user per request", fetch_individually),
+            (f"Batches of {batch_size}", fetch_batches),
+        ):
+            cache.clear()
+            for state in ("cold", "warm"):
+                self.measure(label, state, func)
+
+        etags = [response["ETag"] for response in fetch_batches()]
+        self.measure("Revalidate batches", "warm", lambda: fetch_batches(etags))
+
+        payload = json.loads(fetch_batches()[0].content)
+        encoders = [
+            ("json", lambda: json.dumps(payload, separators=(",", ":")).encode())
+        ]
+        if encoding.orjson is not None:
+            encoders.append(("orjson", lambda: encoding.orjson.dumps(payload)))
+        for label, func in encoders:
+            seconds = timeit.timeit(func, number=1000)
+            self.stdout.write(
+                f"Encoding a batch of {len(payload['accounts'])} with {label}: "
+                f"{seconds:.3f}ms"
+            )
+
+    def measure(self, label, state, func):
+        requests.post(f"{self.auth0_url}/__reset__", timeout=5)
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        auth0_calls = requests.post(f"{self.auth0_url}/__reset__", timeout=5).json()
+        # Management API tokens are reused between requests, so aren't counted
+        management_calls = sum(
+            count
+            for endpoint, count in auth0_calls.items()
+            if not endpoint.startswith("token:")
+        )
+        self.stdout.write(
+            f"{label:<22} {state:<6} {elapsed:>11.1f} {management_calls:>15}"
+        )
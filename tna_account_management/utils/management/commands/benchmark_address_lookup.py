@@ -0,0 +1,188 @@
+import csv
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from tna_account_management.users import address_lookup
+from tna_account_management.utils.management.commands.benchmark_password_validation import (
+    get_rss,
+)
+from tna_account_management.utils.string_index import build_index_file, sort_items
+
+ROAD_WORDS = [
+    "Kew",
+    "Church",
+    "Station",
+    "Mill",
+    "Park",
+    "Victoria",
+    "Queen's",
+    "St. John's",
+    "Manor",
+    "Green",
+    "Orchard",
+    "Chestnut",
+    "Ferry",
+    "Bridge",
+    "Meadow",
+]
+ROAD_SUFFIXES = ["Road", "Street", "Lane", "Avenue", "Close", "Way", "Gardens"]
+DISTRICT_SIZE = 5000
+
+
+def make_open_names_rows(postcodes, seed=0):
+    """
+    Yield rows of synthetic OS Open Names data, with roughly one named road
+    for every ten postcodes, spread across districts of about 2,500
+    postcodes each (similar proportions to the real dataset).
+    """
+    rng = random.Random(seed)
+    district_count = max(postcodes // 2500, 1)
+    for d in range(district_count):
+        area = string.ascii_uppercase[d // 26 % 26] + string.ascii_uppercase[d % 26]
+        district = f"{area}{d // 676 + 1}"
+        town = f"Town {d}"
+        x0, y0 = (d % 100) * DISTRICT_SIZE, (d // 100) * DISTRICT_SIZE
+        for r in range(postcodes // district_count // 10):
+            name = f"{rng.choice(ROAD_WORDS)} {rng.choice(ROAD_SUFFIXES)}"
+            if r >= len(ROAD_WORDS) * len(ROAD_SUFFIXES):
+                name = f"{name} {r}"
+            x = x0 + rng.uniform(0, DISTRICT_SIZE)
+            y = y0 + rng.uniform(0, DISTRICT_SIZE)
+            row = dict.fromkeys(address_lookup.OPEN_NAMES_FIELDS, "")
+            row.update(
+                NAME1=name,
+                TYPE="transportNetwork",
+                LOCAL_TYPE=address_lookup.ROAD_TYPE,
+                GEOMETRY_X=x,
+                GEOMETRY_Y=y,
+                MBR_XMIN=x - 100,
+                MBR_YMIN=y - 20,
+                MBR_XMAX=x + 100,
+                MBR_YMAX=y + 20,
+                POSTCODE_DISTRICT=district,
+                POPULATED_PLACE=town,
+                COUNTY_UNITARY="Surrey",
+                COUNTRY="England",
+            )
+            yield row
+        for p in range(postcodes // district_count):
+            inward = (
+                f"{p // 676 % 10}{string.ascii_uppercase[p // 26 % 26]}"
+                f"{string.ascii_uppercase[p % 26]}"
+            )
+            row = dict.fromkeys(address_lookup.OPEN_NAMES_FIELDS, "")
+            row.update(
+                NAME1=f"{district} {inward}",
+                TYPE="other",
+                LOCAL_TYPE=address_lookup.POSTCODE_TYPE,
+                GEOMETRY_X=x0 + rng.uniform(0, DISTRICT_SIZE),
+                GEOMETRY_Y=y0 + rng.uniform(0, DISTRICT_SIZE),
+                POSTCODE_DISTRICT=district,
+                POPULATED_PLACE=town,
+                COUNTY_UNITARY="Surrey",
+                COUNTRY="England",
+            )
+            yield row
+
+
+class Command(BaseCommand):
+    """
+    Measures the latency of postcode lookups and street autocomplete
+    searches against an address lookup index, along with the growth in RSS
+    caused by the pages that lookups touch.
+
+    With no --index, a synthetic OS Open Names dataset of --postcodes
+    postcodes (1.7 million is about the size of the real one) is written
+    to a temporary directory, and an index is built from it first.
+    """
+
+    help = "Benchmarks postcode lookup and street autocomplete"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--index")
+        parser.add_argument("--postcodes", type=int, default=200_000)
+        parser.add_argument("--lookups", type=int, default=20_000)
+
+    def handle(self, *args, **options):
+        if options["index"]:
+            self.run_benchmark(options["index"], options["lookups"])
+            return
+        with tempfile.TemporaryDirectory() as directory:
+            index_path = self.build_synthetic_index(directory, options["postcodes"])
+            self.run_benchmark(index_path, options["lookups"])
+
+    def build_synthetic_index(self, directory, postcodes):
+        source = os.path.join(directory, "open_names.csv")
+        with open(source, "w", newline="") as f:
+            writer = csv.writer(f)
+            for row in make_open_names_rows(postcodes):
+                writer.writerow(row.values())
+        index_path = os.path.join(directory, "addresses.idx")
+        start = time.perf_counter()
+        build_index_file(index_path, sort_items(address_lookup.build_items([source])))
+        self.stdout.write(
+            f"Built a synthetic index of {postcodes:,} postcodes in "
+            f"{time.perf_counter() - start:.1f}s"
+        )
+        return index_path
+
+    def run_benchmark(self, index_path, lookups):
+        rss_before = get_rss()
+        with override_settings(ADDRESS_LOOKUP_INDEX_PATH=index_path):
+            address_lookup.open_index.cache_clear()
+            index = address_lookup.get_index()
+            self.stdout.write(
+                f"Index: {len(index):,} entries, "
+                f"{os.path.getsize(index_path) / 1024 / 1024:.1f}MiB on disk"
+            )
+
+            rng = random.Random(0)
+            postcodes, districts, streets = [], [], []
+            for _ in range(min(lookups, 10_000)):
+                key, value = index.get_record(rng.randrange(len(index)))
+                if key.startswith(address_lookup.POSTCODE_KEY):
+                    postcodes.append(key[len(address_lookup.POSTCODE_KEY) :].decode())
+                else:
+                    street, _, _, district = address_lookup.decode_fields(value)
+                    # Autocomplete searches for partially typed names
+                    query = street[: rng.randint(3, len(street))]
+                    districts.append((query, district))
+                    streets.append((query, ""))
+            absent = ["ZZ99 9ZZ"] * min(lookups, 10_000)
+
+            cases = [
+                ("Postcode (present)", address_lookup.lookup_postcode, postcodes),
+                ("Postcode (absent)", address_lookup.lookup_postcode, absent),
+                ("Street in district", address_lookup.search_streets, districts),
+                ("Street (national)", address_lookup.search_streets, streets),
+            ]
+            self.stdout.write(f"{'Lookup':<20} {'Median (µs)':>12} {'p99 (µs)':>10}")
+            for label, func, samples in cases:
+                if not samples:
+                    continue
+                times = []
+                for i in range(lookups):
+                    args = samples[i % len(samples)]
+                    args = args if isinstance(args, tuple) else (args,)
+                    start = time.perf_counter()
+                    func(*args)
+                    times.append(time.perf_counter() - start)
+                times.sort()
+                self.stdout.write(
+                    f"{label:<20} {statistics.median(times) * 1_000_000:>12.1f} "
+                    f"{times[int(len(times) * 0.99)] * 1_000_000:>10.1f}"
+                )
+            address_lookup.open_index.cache_clear()
+            index.close()
+
+        self.stdout.write(
+            f"RSS after {lookups * len(cases):,} lookups: "
+            f"+{(get_rss() - rss_before) / 1024 / 1024:.1f}MiB"
+        )
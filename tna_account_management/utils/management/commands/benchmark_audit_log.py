@@ -0,0 +1,93 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.runner import DiscoverRunner
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from tna_account_management.users import audit
+from tna_account_management.users.models import AuditEvent, User
+
+
+class Command(BaseCommand):
+    """
+    Compares the time a request spends recording an audit event with a
+    synchronous insert, and with ``users.audit.record()`` (which buffers the
+    event for a background thread to write in batches), then reports how
+    long the buffered events took to be written, and how many events are
+    dropped when a burst overflows a small buffer.
+
+    Events are written to a throwaway test database, which is created and
+    destroyed by the command, so the figures reflect the local database
+    rather than a networked one (where the difference is larger).
+    """
+
+    help = "Benchmarks synchronous and buffered audit logging"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=5000)
+        parser.add_argument("--small-buffer", type=int, default=100)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            self.run_benchmark(options["events"], options["small_buffer"])
+        finally:
+            audit.flush()
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def run_benchmark(self, event_count, small_buffer):
+        user = User.objects.create(username="audit-benchmark", auth0_id="auth0|1")
+
+        def create(i):
+            AuditEvent.objects.create(
+                action=AuditEvent.UPDATE_NAME,
+                user_id=user.pk,
+                auth0_id=user.auth0_id,
+                fields=["name"],
+            )
+
+        def record(i):
+            return user.record_event(AuditEvent.UPDATE_NAME, ["name"])
+
+        self.stdout.write(f"{'Mode':<12} {'Median (µs)':>12} {'p99 (µs)':>10}")
+        for label, func in (("Synchronous", create), ("Buffered", record)):
+            times = []
+            for i in range(event_count):
+                start = time.perf_counter()
+                func(i)
+                times.append((time.perf_counter() - start) * 1_000_000)
+            times.sort()
+            self.stdout.write(
+                f"{label:<12} {statistics.median(times):>12.1f} "
+                f"{times[int(len(times) * 0.99)]:>10.1f}"
+            )
+
+        start = time.perf_counter()
+        audit.flush()
+        self.stdout.write(
+            f"Buffered events written {(time.perf_counter() - start) * 1000:.0f}ms "
+            f"after the last was recorded ({AuditEvent.objects.count():,} in total)"
+        )
+
+        for block_timeout in (0, 0.01):
+            with override_settings(
+                AUDIT_LOG_BUFFER_SIZE=small_buffer,
+                AUDIT_LOG_BLOCK_TIMEOUT=block_timeout,
+            ):
+                # Start a new buffer, using the settings above
+                audit._writer_pid = None
+                dropped = sum(not record(i) for i in range(event_count))
+                audit.flush()
+            self.stdout.write(
+                f"Burst of {event_count:,} events with a buffer of {small_buffer} "
+                f"and a {block_timeout}s wait: {dropped:,} dropped"
+            )
+        audit._writer_pid = None
@@ -0,0 +1,62 @@
+import hashlib
+import os
+import random
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from tna_account_management.utils.digest_index import DigestIndex
+from tna_account_management.utils.management.commands.benchmark_password_validation import (
+    get_rss,
+)
+
+
+class Command(BaseCommand):
+    """
+    Measures lookup latency for a breached password index (built with the
+    ``build_breached_password_index`` command), for hashes that are present
+    (sampled from the index itself) and absent (random passwords), along with
+    the growth in RSS caused by the pages that lookups touch.
+    """
+
+    help = "Benchmarks lookups in a breached password index"
+
+    def add_arguments(self, parser):
+        parser.add_argument("index")
+        parser.add_argument("--lookups", type=int, default=100_000)
+
+    def handle(self, *args, **options):
+        lookups = options["lookups"]
+        rss_before = get_rss()
+        index = DigestIndex.open(options["index"])
+        size = index.record_size
+        self.stdout.write(
+            f"Index: {len(index):,} hashes of {size} bytes, "
+            f"{2 ** index.prefix_bits:,} prefixes, "
+            f"{os.path.getsize(options['index']) / 1024 / 1024:.1f}MiB on disk"
+        )
+
+        present = []
+        for _ in range(min(lookups, 10_000)):
+            start = index.records_offset + random.randrange(len(index)) * size
+            present.append(index.buffer[start : start + size])
+        absent = [
+            hashlib.sha1(os.urandom(16)).digest()[:size]
+            for _ in range(min(lookups, 10_000))
+        ]
+
+        for label, digests in (("present", present), ("absent", absent)):
+            seconds = timeit.timeit(
+                lambda: [digest in index for digest in digests],
+                number=max(lookups // len(digests), 1),
+            )
+            per_lookup = seconds / max(lookups // len(digests), 1) / len(digests)
+            self.stdout.write(
+                f"Lookup ({label}): {per_lookup * 1_000_000:.2f}µs per hash"
+            )
+
+        self.stdout.write(
+            f"RSS after {lookups * 2:,} lookups: "
+            f"+{(get_rss() - rss_before) / 1024 / 1024:.1f}MiB"
+        )
+        index.close()
@@ -0,0 +1,162 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from auth0.v3.exceptions import Auth0Error
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from tna_account_management.users import email_availability
+from tna_account_management.users.models import User, UserEmail
+from tna_account_management.utils.fake_auth0 import FakeAuth0Server, make_user
+
+
+class Command(BaseCommand):
+    """
+    Compares finding out that a new email address is already in use by
+    attempting the update (as ``ChangeEmailView`` used to), with checking
+    it first with ``email_availability.is_email_taken()``: for addresses in
+    the local ``UserEmail`` index, for others looked up in Auth0, and for
+    repeat lookups served from the cache. Also checks that concurrent
+    lookups of the same address result in a single request to Auth0.
+
+    The project must be configured to use a stand-in for Auth0, as for
+    ``benchmark_login_flow``. Users are created in a throwaway test database,
+    which is created and destroyed by the command.
+    """
+
+    help = "Benchmarks checking whether email addresses are already in use"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument(
+            "--start-fake-auth0",
+            action="store_true",
+            help="Start a fake Auth0 server at AUTH0_DOMAIN for the duration of the run",
+        )
+        parser.add_argument("--latency", type=float, default=0.05)
+
+    def handle(self, *args, **options):
+        if settings.AUTHENTICATION_PROVIDER != "auth0":
+            raise CommandError("AUTH0_DOMAIN must be set to run this benchmark.")
+        self.auth0_url = f"{settings.AUTH0_PROTOCOL}://{settings.AUTH0_DOMAIN}"
+
+        server = None
+        if options["start_fake_auth0"]:
+            host, _, port = settings.AUTH0_DOMAIN.partition(":")
+            server = FakeAuth0Server(
+                host,
+                int(port or 80),
+                user_count=options["users"],
+                latency=options["latency"],
+            ).start()
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        call_command("createcachetable")
+        try:
+            with override_settings(
+                CACHES={
+                    "default": {
+                        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                        "OPTIONS": {"MAX_ENTRIES": options["users"] * 10},
+                    }
+                },
+                # Don't let pacing affect the measurements
+                AUTH0_MANAGEMENT_API_RATE_LIMIT=options["users"] * 10,
+            ):
+                self.run_benchmark(options["users"], options["concurrency"])
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+            if server is not None:
+                server.stop()
+
+    def run_benchmark(self, user_count, concurrency):
+        profiles = [make_user(i) for i in range(user_count)]
+        users = [
+            User.objects.create(username=p["nickname"], auth0_id=p["user_id"])
+            for p in profiles
+        ]
+        # Only the first half have logged in since the index was added
+        indexed = user_count // 2
+        for user, profile in zip(users[:indexed], profiles):
+            UserEmail.record(user, profile["email"])
+
+        # Each user tries to take the email address of the next user
+        def attempt_update(i):
+            user = User.objects.get(pk=users[i].pk)
+            try:
+                user.update_email(profiles[(i + 1) % user_count]["email"])
+            except Auth0Error as e:
+                assert email_availability.is_email_exists_error(e)
+
+        def check(i):
+            user = User.objects.get(pk=users[i].pk)
+            assert email_availability.is_email_taken(
+                user, profiles[(i + 1) % user_count]["email"]
+            )
+
+        cases = [
+            ("Update rejected by Auth0", attempt_update, range(user_count)),
+            ("Check (indexed)", check, range(indexed - 1)),
+            ("Check (Auth0 lookup)", check, range(indexed, user_count)),
+            ("Check (cached lookup)", check, range(indexed, user_count)),
+        ]
+        self.stdout.write(
+            f"{'Case':<26} {'Median (ms)':>12} {'Max (ms)':>9} {'Auth0 requests':>15}"
+        )
+        cache.clear()
+        for label, func, indexes in cases:
+            # Load each user's profile first, as the view would have done
+            for i in indexes:
+                User.objects.get(pk=users[i].pk).profile
+            self.reset_auth0_counts()
+            times = []
+            for i in indexes:
+                start = time.perf_counter()
+                func(i)
+                times.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(
+                f"{label:<26} {statistics.median(times):>12.2f} {max(times):>9.2f} "
+                f"{self.reset_auth0_counts():>15}"
+            )
+
+        # Many users checking the same (unindexed, uncached) address at once
+        cache.clear()
+        for user in users:
+            user.profile
+        self.reset_auth0_counts()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(
+                executor.map(
+                    lambda user: email_availability.is_email_taken(
+                        user, profiles[-1]["email"]
+                    ),
+                    users[:concurrency],
+                )
+            )
+        assert all(results), results
+        self.stdout.write(
+            f"{concurrency} concurrent checks of one address: "
+            f"{self.reset_auth0_counts()} Auth0 request(s)"
+        )
+
+    def reset_auth0_counts(self):
+        counts = requests.post(f"{self.auth0_url}/__reset__", timeout=5).json()
+        return sum(
+            count
+            for endpoint, count in counts.items()
+            if not endpoint.startswith(("token:", "users:get"))
+        )
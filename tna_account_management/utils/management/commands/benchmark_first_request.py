@@ -0,0 +1,122 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+from argparse import SUPPRESS
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+
+from tna_account_management.users.models import User
+from tna_account_management.utils.fake_auth0 import make_user
+from tna_account_management.utils.startup import preload
+
+VIEWS = [
+    "dashboard",
+    "update_name",
+    "update_address",
+    "change_email",
+    "change_password",
+    "auth_login",
+]
+
+
+class Command(BaseCommand):
+    """
+    Measures the latency of the first request to each view in a fresh
+    process (as after a deploy or worker restart), with and without the
+    startup work done by ``utils.startup.preload()``, which gunicorn runs
+    in the master process before forking workers.
+
+    Each measurement is taken in a new Python process, which renders the
+    view for an unsaved user with a fake profile, so neither the database
+    nor Auth0 are needed. Templates are only cached when DEBUG is off.
+    """
+
+    help = "Benchmarks the first request to each view in a fresh worker"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3)
+        parser.add_argument("--view", choices=VIEWS, help=SUPPRESS)
+        parser.add_argument("--preload", action="store_true", help=SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options["view"]:
+            with override_settings(
+                CACHES={
+                    "default": {
+                        "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+                    }
+                },
+                STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+            ):
+                result = self.measure_view(options["view"], options["preload"])
+            self.stdout.write(json.dumps(result))
+            return
+
+        if settings.DEBUG:
+            self.stderr.write(
+                self.style.WARNING(
+                    "DEBUG is enabled, so templates won't be cached between requests."
+                )
+            )
+        self.stdout.write(
+            f"{'View':<18} {'Cold first (ms)':>16} {'Preloaded first (ms)':>21} "
+            f"{'Warm (ms)':>10}"
+        )
+        preload_times = []
+        for view in VIEWS:
+            cold = [self.run_child(view, False) for _ in range(options["runs"])]
+            warm = [self.run_child(view, True) for _ in range(options["runs"])]
+            preload_times.extend(r["preload"] for r in warm)
+            self.stdout.write(
+                f"{view:<18} "
+                f"{statistics.median(r['first'] for r in cold):>16.2f} "
+                f"{statistics.median(r['first'] for r in warm):>21.2f} "
+                f"{statistics.median(r['subsequent'] for r in cold):>10.2f}"
+            )
+        self.stdout.write(
+            f"Startup preload (once per deploy, in the master process): "
+            f"{statistics.median(preload_times):.0f}ms"
+        )
+
+    def run_child(self, view, preload):
+        args = [sys.executable, sys.argv[0], "benchmark_first_request", "--view", view]
+        if preload:
+            args.append("--preload")
+        args.append(f"--settings={settings.SETTINGS_MODULE}")
+        output = subprocess.run(args, check=True, capture_output=True, text=True)
+        return json.loads(output.stdout.strip().splitlines()[-1])
+
+    def measure_view(self, view_name, run_preload):
+        preload_time = 0.0
+        if run_preload:
+            start = time.perf_counter()
+            preload()
+            preload_time = (time.perf_counter() - start) * 1000
+
+        profile = make_user(0)
+        user = User(pk=1, username=profile["nickname"], auth0_id=profile["user_id"])
+        user.profile = profile
+        factory = RequestFactory()
+        url = reverse(view_name)
+        match = resolve(url)
+
+        def request_view():
+            request = factory.get(url)
+            request.user = user
+            request._messages = CookieStorage(request)
+            start = time.perf_counter()
+            response = match.func(request, *match.args, **match.kwargs)
+            if hasattr(response, "render"):
+                response.render()
+            return (time.perf_counter() - start) * 1000
+
+        first = request_view()
+        subsequent = statistics.median(request_view() for _ in range(20))
+        return {"preload": preload_time, "first": first, "subsequent": subsequent}
@@ -0,0 +1,72 @@
+import gc
+import timeit
+import tracemalloc
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+
+from tna_account_management.authentication.django.forms import CrispyAuthenticationForm
+from tna_account_management.users import forms
+from tna_account_management.utils.forms import HelperMixin
+
+FORMS = {
+    "VerifyEmailForm": lambda: forms.VerifyEmailForm(user_email="a@example.com"),
+    "NameForm": lambda: forms.NameForm(initial={"name": "Jo Bloggs"}),
+    "AddressForm": lambda: forms.AddressForm(data={"street": "Kew Road"}),
+    "EmailForm": lambda: forms.EmailForm(),
+    "ChangePasswordForm": lambda: forms.ChangePasswordForm(),
+    "CrispyAuthenticationForm": lambda: CrispyAuthenticationForm(),
+}
+
+TEMPLATE = Template("{% load crispy_forms_tags %}{% crispy form %}")
+
+
+def render(factory):
+    return TEMPLATE.render(Context({"form": factory()}))
+
+
+class Command(BaseCommand):
+    """
+    Reports the time taken and peak memory allocated to create and render each
+    of the project's crispy forms (as happens once per request), both with
+    helpers shared between instances of each form class, and with a new
+    helper built on every access of ``helper`` (as tbxforms does).
+    """
+
+    help = "Benchmarks crispy form rendering with and without shared helpers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=500)
+
+    def measure(self, factory, iterations):
+        # Warm up template and helper caches
+        render(factory)
+        seconds = timeit.timeit(lambda: render(factory), number=iterations)
+        gc.collect()
+        tracemalloc.start()
+        peaks = []
+        for _ in range(10):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            render(factory)
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        tracemalloc.stop()
+        return seconds / iterations * 1000, max(peaks)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        uncached_helper = property(lambda form: form.build_helper())
+
+        self.stdout.write(
+            f"{'Form':<26} {'Uncached (ms)':>14} {'Shared (ms)':>12} "
+            f"{'Uncached peak KiB':>18} {'Shared peak KiB':>16}"
+        )
+        for name, factory in FORMS.items():
+            with mock.patch.object(HelperMixin, "helper", uncached_helper):
+                before = self.measure(factory, iterations)
+            after = self.measure(factory, iterations)
+            self.stdout.write(
+                f"{name:<26} {before[0]:>14.3f} {after[0]:>12.3f} "
+                f"{before[1] / 1024:>18.1f} {after[1] / 1024:>16.1f}"
+            )
@@ -0,0 +1,210 @@
+import logging
+import os
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+
+from tna_account_management.utils.fake_auth0 import FakeAuth0Server
+
+
+class JourneyFailed(Exception):
+    pass
+
+
+def expect_status(response, status: int):
+    if response.status_code != status:
+        raise JourneyFailed(
+            f"Expected a {status} response from {response.request['PATH_INFO']}, "
+            f"but got {response.status_code}."
+        )
+    return response
+
+
+def login(client: Client):
+    response = expect_status(client.get(reverse("auth_login")), 302)
+    # Visit the 'Universal login' page, which the fake server always approves
+    auth0_response = requests.get(
+        response["Location"], allow_redirects=False, timeout=10
+    )
+    if auth0_response.status_code != 302:
+        raise JourneyFailed(f"Auth0 responded with {auth0_response.status_code}.")
+    callback = urlparse(auth0_response.headers["Location"])
+    response = expect_status(client.get(f"{callback.path}?{callback.query}"), 302)
+    expect_status(client.get(response["Location"]), 200)
+
+
+def login_journey(client: Client):
+    login(client)
+
+
+def edit_journey(client: Client):
+    login(client)
+    expect_status(client.get(reverse("update_name")), 200)
+    expect_status(
+        client.post(reverse("update_name"), {"name": f"Benchmark {uuid.uuid4()}"}),
+        302,
+    )
+    expect_status(client.get(reverse("update_address")), 200)
+    expect_status(
+        client.post(
+            reverse("update_address"),
+            {
+                "recipient_name": "Benchmark User",
+                "house_name_no": "1",
+                "street": "Kew Road",
+                "town": "Richmond",
+                "country": "United Kingdom",
+                "postcode": "TW9 4DU",
+            },
+        ),
+        302,
+    )
+    expect_status(client.get(reverse("dashboard")), 200)
+
+
+JOURNEYS = {
+    "login": login_journey,
+    "edit": edit_journey,
+}
+
+
+class Command(BaseCommand):
+    """
+    Drives complete login (and optionally, account editing) journeys through
+    the Auth0 authentication views against a local stand-in for Auth0, and
+    reports throughput, latency percentiles and the number of database
+    queries and Auth0 requests made per journey.
+
+    The project must be configured to use the stand-in, for example:
+
+    AUTH0_DOMAIN=127.0.0.1:8765 AUTH0_PROTOCOL=http AUTH0_CLIENT_ID=benchmark \\
+    AUTH0_CLIENT_SECRET=benchmark ./manage.py benchmark_login_flow --start-fake-auth0
+
+    Journeys are run against a throwaway test database, which is created
+    and destroyed by the command.
+    """
+
+    help = "Benchmarks login and account editing journeys against a fake Auth0"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--journey", choices=sorted(JOURNEYS), default="login")
+        parser.add_argument("--journeys", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument(
+            "--start-fake-auth0",
+            action="store_true",
+            help="Start a fake Auth0 server at AUTH0_DOMAIN for the duration of the run",
+        )
+        parser.add_argument("--latency", type=float, default=0.0)
+        parser.add_argument("--latency-jitter", type=float, default=0.0)
+        parser.add_argument("--error-rate", type=float, default=0.0)
+
+    def handle(self, *args, **options):
+        if settings.AUTHENTICATION_PROVIDER != "auth0":
+            raise CommandError("AUTH0_DOMAIN must be set to run this benchmark.")
+        if settings.AUTH0_PROTOCOL == "http":
+            os.environ.setdefault("AUTHLIB_INSECURE_TRANSPORT", "1")
+        self.auth0_url = f"{settings.AUTH0_PROTOCOL}://{settings.AUTH0_DOMAIN}"
+
+        server = None
+        if options["start_fake_auth0"]:
+            host, _, port = settings.AUTH0_DOMAIN.partition(":")
+            server = FakeAuth0Server(
+                host,
+                int(port or 80),
+                latency=options["latency"],
+                latency_jitter=options["latency_jitter"],
+                error_rate=options["error_rate"],
+            ).start()
+
+        # Failed journeys are reported in the summary instead
+        logging.getLogger("django.request").setLevel(logging.CRITICAL)
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        call_command("createcachetable")
+        try:
+            # Avoid the need to run 'collectstatic' before benchmarking
+            with override_settings(
+                STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+            ):
+                self.run_benchmark(JOURNEYS[options["journey"]], options)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+            if server is not None:
+                server.stop()
+
+    def run_journey(self, journey):
+        client = Client(secure=True, raise_request_exception=False)
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            try:
+                journey(client)
+            except (JourneyFailed, requests.RequestException, KeyError) as e:
+                return None, str(e)
+            duration = time.perf_counter() - start
+        return duration, len(queries)
+
+    def run_benchmark(self, journey, options):
+        for _ in range(options["warmup"]):
+            self.run_journey(journey)
+
+        requests.post(f"{self.auth0_url}/__reset__", timeout=5)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            results = list(
+                executor.map(
+                    lambda _: self.run_journey(journey), range(options["journeys"])
+                )
+            )
+        elapsed = time.perf_counter() - started
+        auth0_calls = requests.post(f"{self.auth0_url}/__reset__", timeout=5).json()
+
+        durations = [d * 1000 for d, _ in results if d is not None]
+        query_counts = [q for d, q in results if d is not None]
+        errors = [e for d, e in results if d is None]
+        total = len(results)
+
+        self.stdout.write(
+            f"Journey: {options['journey']} ({len(durations)} completed, "
+            f"{len(errors)} failed, concurrency {options['concurrency']})"
+        )
+        self.stdout.write(f"Throughput: {len(durations) / elapsed:.2f} journeys/sec")
+        if len(durations) > 1:
+            q = statistics.quantiles(durations, n=100, method="inclusive")
+            self.stdout.write(
+                f"Latency (ms): p50 {q[49]:.1f}, p95 {q[94]:.1f}, p99 {q[98]:.1f}, "
+                f"max {max(durations):.1f}"
+            )
+        if query_counts:
+            self.stdout.write(
+                f"DB queries per journey: mean {statistics.mean(query_counts):.1f}, "
+                f"max {max(query_counts)}"
+            )
+        self.stdout.write(
+            f"Auth0 requests per journey: {sum(auth0_calls.values()) / total:.2f}"
+        )
+        for endpoint, count in sorted(auth0_calls.items()):
+            self.stdout.write(f"  {endpoint}: {count / total:.2f}")
+        for error in sorted(set(errors)):
+            self.stdout.write(self.style.WARNING(f"Failure: {error}"))
@@ -0,0 +1,105 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.test.runner import DiscoverRunner
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from tna_account_management.authentication.django import views
+
+
+class Command(BaseCommand):
+    """
+    Simulates a password guessing attack against the 'django' provider's
+    login view, and reports the CPU time spent on each attempt that was
+    checked against the password hash, compared with each attempt that was
+    rejected by login throttling.
+
+    Django's default (deliberately slow) password hasher is used regardless
+    of the project's settings, and attempts are made against a throwaway
+    test database, which is created and destroyed by the command.
+    """
+
+    help = "Benchmarks the cost of rejected login attempts under attack"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--attempts", type=int, default=500)
+        parser.add_argument(
+            "--ip-addresses",
+            type=int,
+            default=1,
+            help="The number of addresses the attack is spread across",
+        )
+
+    def handle(self, *args, **options):
+        if settings.AUTHENTICATION_PROVIDER != "django":
+            raise CommandError("AUTH0_DOMAIN must be unset to run this benchmark.")
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        call_command("createcachetable")
+        try:
+            with override_settings(
+                PASSWORD_HASHERS=["django.contrib.auth.hashers.PBKDF2PasswordHasher"],
+                STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+            ):
+                self.run_benchmark(options)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def attempt(self, factory, username, ip_address):
+        request = factory.post(
+            "/auth/login/",
+            {"username": username, "password": "not-the-password"},
+            REMOTE_ADDR=ip_address,
+        )
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        start = time.process_time()
+        response = views.login(request)
+        return response.status_code, time.process_time() - start
+
+    def run_benchmark(self, options):
+        username = "victim"
+        # NOTE: create_user() can't be used, because 'email' isn't a field
+        user = get_user_model()(username=username)
+        user.set_password("correct-password")
+        user.save()
+        cache.clear()
+
+        factory = RequestFactory()
+        checked, rejected = [], []
+        started = time.process_time()
+        for i in range(options["attempts"]):
+            ip_address = f"198.51.100.{i % options['ip_addresses'] + 1}"
+            status, cpu_time = self.attempt(factory, username, ip_address)
+            (rejected if status == 429 else checked).append(cpu_time * 1000)
+        total = time.process_time() - started
+
+        self.stdout.write(
+            f"Attempts: {options['attempts']} from {options['ip_addresses']} "
+            f"address(es), {len(checked)} checked, {len(rejected)} rejected"
+        )
+        self.stdout.write(f"Total CPU time: {total:.2f}s")
+        for label, times in (("Checked", checked), ("Rejected", rejected)):
+            if times:
+                self.stdout.write(
+                    f"{label}: median {statistics.median(times):.2f}ms CPU, "
+                    f"mean {statistics.mean(times):.2f}ms CPU per attempt"
+                )
+        if checked and rejected:
+            saving = statistics.median(checked) / statistics.median(rejected)
+            self.stdout.write(f"Rejected attempts are {saving:.0f}x cheaper")
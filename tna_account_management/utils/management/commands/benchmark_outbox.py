@@ -0,0 +1,127 @@
+import logging
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from tna_account_management.users.models import OutboxDelivery, OutboxMessage
+from tna_account_management.users.outbox import Dispatcher
+from tna_account_management.utils.webhook_sink import WebhookSinkServer
+
+
+class Command(BaseCommand):
+    """
+    Delivers outbox messages end to end to two local webhook sinks (one of
+    which fails a proportion of requests, so that retries are exercised),
+    sending one message per request and then batches of them, and checks
+    that every message reached every endpoint. Messages that were sent more
+    than once (which at-least-once delivery allows) are reported separately
+    from ones that are missing (which it doesn't).
+
+    Messages are created in a throwaway test database, which is created and
+    destroyed by the command.
+    """
+
+    help = "Benchmarks delivering outbox messages to local webhook sinks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=1000)
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=2)
+        parser.add_argument("--latency", type=float, default=0.02)
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.3,
+            help="The proportion of requests the 'flaky' endpoint fails",
+        )
+        parser.add_argument("--port", type=int, default=8766)
+
+    def handle(self, *args, **options):
+        secret = "benchmark"
+        sinks = {
+            "reliable": WebhookSinkServer(
+                port=options["port"], secret=secret, latency=options["latency"]
+            ),
+            "flaky": WebhookSinkServer(
+                port=options["port"] + 1,
+                secret=secret,
+                latency=options["latency"],
+                error_rate=options["error_rate"],
+            ),
+        }
+        for sink in sinks.values():
+            sink.start()
+
+        if connection.vendor == "sqlite":
+            # SQLite's in-memory test databases can't be written to from
+            # several threads at once, so use a temporary file instead
+            temp_dir = tempfile.TemporaryDirectory()
+            test_settings = connection.settings_dict["TEST"]
+            test_settings["NAME"] = os.path.join(temp_dir.name, "outbox.sqlite3")
+
+        # Don't report every failure of the 'flaky' endpoint
+        logging.getLogger("tna_account_management.users.outbox").setLevel(logging.ERROR)
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            with override_settings(
+                OUTBOX_ENDPOINTS={name: sink.url for name, sink in sinks.items()},
+                OUTBOX_SIGNING_SECRET=secret,
+                OUTBOX_ENDPOINT_CONCURRENCY=options["concurrency"],
+                # Retry quickly, so that the run doesn't take minutes
+                OUTBOX_RETRY_BASE_DELAY=0.05,
+                OUTBOX_RETRY_MAX_DELAY=0.5,
+                OUTBOX_MAX_ATTEMPTS=1000,
+            ):
+                self.stdout.write(
+                    f"{'Batch size':>10} {'Time (s)':>9} {'Messages/s':>11} "
+                    f"{'Requests':>9} {'Failed':>7} {'Duplicates':>11} {'Missing':>8}"
+                )
+                for batch_size in sorted({1, options["batch_size"]}):
+                    with override_settings(OUTBOX_BATCH_SIZE=batch_size):
+                        self.run_benchmark(options["messages"], batch_size, sinks)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+            for sink in sinks.values():
+                sink.stop()
+
+    def run_benchmark(self, message_count, batch_size, sinks):
+        OutboxMessage.objects.all().delete()
+        for sink in sinks.values():
+            sink.messages.clear()
+            sink.counts.clear()
+        ids = {
+            OutboxMessage.enqueue(
+                OutboxMessage.NAME_CHANGED, f"auth0|{i}", {"name": f"User {i}"}
+            ).pk
+            for i in range(message_count)
+        }
+
+        dispatcher = Dispatcher(poll_interval=0.01)
+        start = time.perf_counter()
+        dispatcher.run(until="drained", max_time=300)
+        elapsed = time.perf_counter() - start
+
+        if OutboxDelivery.objects.exclude(status=OutboxDelivery.DELIVERED).exists():
+            raise CommandError("Some messages were not delivered in time.")
+        for name, sink in sinks.items():
+            received = sink.get_message_ids()
+            self.stdout.write(
+                f"{batch_size:>10} {elapsed:>9.2f} "
+                f"{message_count * len(sinks) / elapsed:>11,.0f} "
+                f"{sum(sink.counts.values()):>9,} {sink.counts['failed']:>7,} "
+                f"{sum(n - 1 for n in received.values()):>11,} "
+                f"{len(ids - set(received)):>8,}  ({name})"
+            )
@@ -0,0 +1,104 @@
+import gc
+import os
+import resource
+import timeit
+import tracemalloc
+
+from django.contrib.auth import password_validation as django_password_validation
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+
+from tna_account_management.users.forms import ChangePasswordForm
+from tna_account_management.utils import password_validation
+
+CANDIDATES = ["password1", "Tr0ub4dor&3", "correct horse battery staple", "qwerty"]
+
+
+def get_rss() -> int:
+    """
+    Return the resident set size of the current process in bytes.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Not Linux; fall back to the peak RSS (reported in bytes on macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Command(BaseCommand):
+    """
+    Compares the load time, memory use and per-password validation cost of
+    Django's ``CommonPasswordValidator`` with the project's index-backed
+    replacement, and reports the cost of validating ``ChangePasswordForm``
+    with the configured validators.
+
+    Memory is measured as both Python heap allocations (via tracemalloc) and
+    the change in RSS. Pages of the memory-mapped index are shared between
+    processes, so only count once per server rather than once per worker.
+    """
+
+    help = "Benchmarks common password validation"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20000)
+
+    def measure_load(self, label, factory):
+        gc.collect()
+        rss_before = get_rss()
+        tracemalloc.start()
+        start = timeit.default_timer()
+        validator = factory()
+        load_time = timeit.default_timer() - start
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss_after = get_rss()
+        self.stdout.write(
+            f"{label}: loaded in {load_time * 1000:.1f}ms, "
+            f"{allocated / 1024:.0f}KiB allocated, "
+            f"RSS +{(rss_after - rss_before) / 1024:.0f}KiB"
+        )
+        return validator
+
+    def measure_validation(self, label, validator, iterations):
+        def validate_all():
+            for candidate in CANDIDATES:
+                try:
+                    validator.validate(candidate)
+                except ValidationError:
+                    pass
+
+        seconds = timeit.timeit(validate_all, number=iterations)
+        per_call = seconds / (iterations * len(CANDIDATES)) * 1_000_000
+        self.stdout.write(f"{label}: {per_call:.2f}µs per password")
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+
+        # The index is measured first, so that memory freed after building
+        # Django's set of passwords doesn't hide its footprint
+        index_validator = self.measure_load(
+            "Index", password_validation.CommonPasswordValidator
+        )
+        django_validator = self.measure_load(
+            "Django", django_password_validation.CommonPasswordValidator
+        )
+        self.measure_validation("Index", index_validator, iterations)
+        self.measure_validation("Django", django_validator, iterations)
+
+        # Validate the form with all configured validators, which are
+        # loaded in advance to exclude their setup cost
+        django_password_validation.get_default_password_validators()
+        data = {
+            "password": "Tr0ub4dor&3-x",
+            "confirm_password": "Tr0ub4dor&3-x",
+            "existing_password": "old-password",
+        }
+        form_iterations = max(iterations // 10, 1)
+        seconds = timeit.timeit(
+            lambda: ChangePasswordForm(data=data).is_valid(), number=form_iterations
+        )
+        self.stdout.write(
+            f"ChangePasswordForm: {seconds / form_iterations * 1_000_000:.1f}µs "
+            "per submission"
+        )
@@ -0,0 +1,84 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from tna_account_management.users.models import User
+from tna_account_management.utils import query
+
+
+class Command(BaseCommand):
+    """
+    Compares the ``CASE``-based and (on Postgres) array-based implementations
+    of ``order_by_pk_position``, reporting the size of the generated SQL,
+    the time taken to compile it, and the time taken to execute it, for
+    increasing numbers of PKs.
+
+    Users are created in a throwaway test database, which is created and
+    destroyed by the command. Run with DATABASE_URL pointing at a Postgres
+    server to include the array-based implementation.
+    """
+
+    help = "Benchmarks ordering querysets by the position of PKs in a list"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 50000])
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            self.run_benchmark(options["sizes"], options["repeat"])
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def run_benchmark(self, sizes, repeat):
+        User.objects.bulk_create(
+            (User(username=f"user{i}") for i in range(max(sizes))), batch_size=5000
+        )
+        all_pks = list(User.objects.values_list("pk", flat=True))
+        implementations = [("CASE", query._order_by_pk_position_case)]
+        if connection.vendor == "postgresql":
+            implementations.append(("array", query._order_by_pk_position_array))
+
+        self.stdout.write(f"Database: {connection.vendor}")
+        self.stdout.write(
+            f"{'PKs':>7} {'Method':<7} {'SQL (KiB)':>10} {'Compile (ms)':>13} "
+            f"{'Execute (ms)':>13}"
+        )
+        rng = random.Random(0)
+        for size in sizes:
+            pks = rng.sample(all_pks, size)
+            for label, func in implementations:
+                queryset = func(User.objects.all(), pks, True).values_list(
+                    "pk", flat=True
+                )
+                try:
+                    self.measure(label, size, queryset, pks, repeat)
+                except DatabaseError as e:
+                    self.stdout.write(f"{size:>7} {label:<7} failed: {e}")
+
+    def measure(self, label, size, queryset, pks, repeat):
+        compile_times, execute_times = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+            compile_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            result = list(queryset._chain())
+            execute_times.append(time.perf_counter() - start)
+        if result != pks:
+            self.stdout.write(self.style.ERROR(f"{label} returned the wrong order"))
+        self.stdout.write(
+            f"{size:>7} {label:<7} {len(sql) / 1024:>10.1f} "
+            f"{statistics.median(compile_times) * 1000:>13.1f} "
+            f"{statistics.median(execute_times) * 1000:>13.1f}"
+        )
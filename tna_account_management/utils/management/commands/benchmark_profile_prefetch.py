@@ -0,0 +1,126 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+
+from tna_account_management.users import profile_cache
+from tna_account_management.users.middleware import PROFILE_SESSION_KEY
+from tna_account_management.users.models import User
+from tna_account_management.utils.fake_auth0 import FakeAuth0Server, make_user
+
+MIDDLEWARE_PATH = "tna_account_management.users.middleware.ProfilePrefetchMiddleware"
+VIEWS = ["dashboard", "update_name", "update_address"]
+
+
+class Command(BaseCommand):
+    """
+    Measures the latency of account pages for users whose profile isn't
+    cached, with and without ``ProfilePrefetchMiddleware``, which overlaps
+    fetching the profile from Auth0 with the rest of the request.
+
+    The project must be configured to use a stand-in for Auth0, as for
+    ``benchmark_login_flow``. Users are created in a throwaway test database,
+    which is created and destroyed by the command.
+    """
+
+    help = "Benchmarks account pages with and without profile prefetching"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=30)
+        parser.add_argument(
+            "--start-fake-auth0",
+            action="store_true",
+            help="Start a fake Auth0 server at AUTH0_DOMAIN for the duration of the run",
+        )
+        parser.add_argument("--latency", type=float, default=0.05)
+
+    def handle(self, *args, **options):
+        if settings.AUTHENTICATION_PROVIDER != "auth0":
+            raise CommandError("AUTH0_DOMAIN must be set to run this benchmark.")
+
+        server = None
+        if options["start_fake_auth0"]:
+            host, _, port = settings.AUTH0_DOMAIN.partition(":")
+            server = FakeAuth0Server(
+                host,
+                int(port or 80),
+                user_count=options["users"],
+                latency=options["latency"],
+            ).start()
+
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        call_command("createcachetable")
+        try:
+            with override_settings(
+                CACHES={
+                    "default": {
+                        "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+                    }
+                },
+                STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+            ):
+                self.run_benchmark(options["users"])
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+            if server is not None:
+                server.stop()
+
+    def run_benchmark(self, user_count):
+        clients = []
+        for i in range(user_count):
+            profile = make_user(i)
+            user = User.objects.create(
+                username=profile["nickname"], auth0_id=profile["user_id"]
+            )
+            client = Client()
+            client.force_login(user)
+            # As set by the login view
+            session = client.session
+            session[PROFILE_SESSION_KEY] = user.auth0_id
+            session.save()
+            clients.append((user.auth0_id, client))
+
+        without_middleware = [m for m in settings.MIDDLEWARE if m != MIDDLEWARE_PATH]
+        with_middleware = list(without_middleware)
+        with_middleware.insert(
+            with_middleware.index(
+                "django.contrib.sessions.middleware.SessionMiddleware"
+            )
+            + 1,
+            MIDDLEWARE_PATH,
+        )
+
+        self.stdout.write(
+            f"{'View':<16} {'Without prefetch (ms)':>22} {'With prefetch (ms)':>19}"
+        )
+        for view in VIEWS:
+            url = reverse(view)
+            results = []
+            for middleware in (without_middleware, with_middleware):
+                with override_settings(MIDDLEWARE=middleware):
+                    # Render once first, so templates are loaded
+                    self.request(*clients[0], url)
+                    times = [self.request(*item, url) for item in clients]
+                results.append(statistics.median(times))
+            self.stdout.write(f"{view:<16} {results[0]:>22.1f} {results[1]:>19.1f}")
+
+    def request(self, auth0_id, client, url):
+        profile_cache.evict_profile(auth0_id)
+        start = time.perf_counter()
+        response = client.get(url)
+        elapsed = (time.perf_counter() - start) * 1000
+        assert response.status_code == 200, response.status_code
+        return elapsed
@@ -0,0 +1,111 @@
+import random
+import statistics
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from tna_account_management.users import profile_cache
+from tna_account_management.utils.fake_auth0 import FakeAuth0Server, make_user
+
+
+class Command(BaseCommand):
+    """
+    Measures the latency of ``profile_cache.get_profile()`` (as used by
+    ``User.profile`` on every logged-in page) while cached profiles keep
+    expiring, with stale-while-revalidate disabled and enabled, and reports
+    latency percentiles along with the number of Auth0 requests made.
+
+    Profiles expire after --fresh seconds, so a short run covers many
+    expiries. The project must be configured to use a stand-in for Auth0,
+    as for ``benchmark_login_flow``.
+    """
+
+    help = "Benchmarks profile lookups with and without background refresh"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--duration", type=float, default=5)
+        parser.add_argument("--fresh", type=int, default=1)
+        parser.add_argument(
+            "--start-fake-auth0",
+            action="store_true",
+            help="Start a fake Auth0 server at AUTH0_DOMAIN for the duration of the run",
+        )
+        parser.add_argument("--latency", type=float, default=0.1)
+
+    def handle(self, *args, **options):
+        if settings.AUTHENTICATION_PROVIDER != "auth0":
+            raise CommandError("AUTH0_DOMAIN must be set to run this benchmark.")
+        self.auth0_url = f"{settings.AUTH0_PROTOCOL}://{settings.AUTH0_DOMAIN}"
+
+        server = None
+        if options["start_fake_auth0"]:
+            host, _, port = settings.AUTH0_DOMAIN.partition(":")
+            server = FakeAuth0Server(
+                host,
+                int(port or 80),
+                user_count=options["users"],
+                latency=options["latency"],
+            ).start()
+        try:
+            self.stdout.write(
+                f"{'Mode':<24} {'p50 (ms)':>9} {'p99 (ms)':>9} {'Max (ms)':>9} "
+                f"{'Lookups':>8} {'Auth0 requests':>15}"
+            )
+            for label, stale_timeout in (
+                ("Fetch on expiry", 0),
+                ("Stale-while-revalidate", 3600),
+            ):
+                with override_settings(
+                    CACHES={
+                        "default": {
+                            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                            "OPTIONS": {"MAX_ENTRIES": options["users"] * 4},
+                        }
+                    },
+                    AUTH0_PROFILE_CACHE_TIMEOUT=options["fresh"],
+                    AUTH0_PROFILE_CACHE_STALE_TIMEOUT=stale_timeout,
+                ):
+                    self.measure(label, options["users"], options["duration"])
+        finally:
+            if server is not None:
+                server.stop()
+
+    def measure(self, label, user_count, duration):
+        auth0_ids = [make_user(i)["user_id"] for i in range(user_count)]
+        cache.clear()
+        # Warm the cache, so that only expiries are measured
+        for auth0_id in auth0_ids:
+            profile_cache.get_profile(auth0_id)
+        requests.post(f"{self.auth0_url}/__reset__", timeout=5)
+
+        rng = random.Random(0)
+        times = []
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            auth0_id = rng.choice(auth0_ids)
+            start = time.perf_counter()
+            profile_cache.get_profile(auth0_id)
+            times.append(time.perf_counter() - start)
+            # Leave some time between requests, as a real site would
+            time.sleep(0.001)
+        # Let background refreshes finish, so that they're counted
+        while profile_cache._refreshing:
+            time.sleep(0.01)
+
+        auth0_calls = requests.post(f"{self.auth0_url}/__reset__", timeout=5).json()
+        management_calls = sum(
+            count
+            for endpoint, count in auth0_calls.items()
+            if not endpoint.startswith("token:")
+        )
+        times.sort()
+        self.stdout.write(
+            f"{label:<24} {statistics.median(times) * 1000:>9.2f} "
+            f"{times[int(len(times) * 0.99)] * 1000:>9.2f} {times[-1] * 1000:>9.2f} "
+            f"{len(times):>8} {management_calls:>15}"
+        )
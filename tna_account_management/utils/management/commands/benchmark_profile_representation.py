@@ -0,0 +1,154 @@
+import gc
+import json
+import re
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+from django.core.management.base import BaseCommand
+
+from tna_account_management.users.models import Address, Profile
+from tna_account_management.utils.fake_auth0 import make_user
+
+
+@dataclass
+class DataclassAddress:
+    """
+    The previous, dataclass-based implementation of ``Address``, for
+    comparison.
+    """
+
+    house_name_no: str
+    street: str
+    town: str
+    country: str
+    postcode: str
+    id: int = 1
+    address_type: int = 1
+    county: str = ""
+    recipient_name: str = ""
+    title: str = ""
+    first_name: str = ""
+    last_name: str = ""
+    telephone: str = ""
+
+    @classmethod
+    def from_auth0_json(cls, data):
+        kwargs = {
+            "id": data.get("Id", 1),
+            "address_type": data.get("AddressType", 1),
+            "telephone": data.get("Telephone", "").strip(),
+            "title": data.get("Title", "").strip(),
+            "first_name": data.get("Firstname", "").strip(),
+            "last_name": data.get("Lastname", "").strip(),
+            "recipient_name": data.get("RecipientName", "").strip(),
+            "house_name_no": data.get("HouseNameNo", "").strip(),
+            "street": data.get("Street", "").strip(),
+            "town": data.get("Town", "").strip(),
+            "county": data.get("County", "").strip(),
+            "country": data.get("Country", "").strip(),
+            "postcode": data.get("Postcode", "").strip(),
+        }
+        return cls(**kwargs)
+
+    to_auth0_json = Address.to_auth0_json
+    name = Address.name
+
+    @staticmethod
+    def looks_like_house_number(value):
+        return bool(re.match(r"^[0-9]+\s{0,2}[a-zA-z]{0,2}$", value))
+
+
+class Command(BaseCommand):
+    """
+    Compares the memory needed to hold a large number of addresses and
+    profiles (as in a bulk export or sync) as raw Auth0 JSON, as
+    dataclass-based addresses (the previous implementation) and as the
+    slotted ``Address`` and ``Profile`` classes, along with the cost of
+    converting to and from Auth0's JSON representation.
+    """
+
+    help = "Benchmarks the memory use and conversion cost of addresses and profiles"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=100_000)
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        profiles = [make_user(i) for i in range(count)]
+        profiles_json = json.dumps(profiles)
+        addresses_json = json.dumps(
+            [profile["user_metadata"]["addresses"][0] for profile in profiles]
+        )
+        del profiles
+
+        self.stdout.write(f"{count} addresses")
+        self.stdout.write(
+            f"{'Representation':<16} {'Memory (MiB)':>13} {'From JSON (ms)':>15} "
+            f"{'To JSON (ms)':>13} {'House no. (ms)':>15}"
+        )
+        for label, cls in (
+            ("Raw JSON", None),
+            ("Dataclass", DataclassAddress),
+            ("Slotted", Address),
+        ):
+            self.measure_addresses(label, cls, addresses_json)
+
+        self.stdout.write(f"\n{count} profiles")
+        self.stdout.write(
+            f"{'Representation':<16} {'Memory (MiB)':>13} {'From JSON (ms)':>15}"
+        )
+        for label, cls in (("Raw JSON", None), ("Slotted view", Profile)):
+            self.measure_profiles(label, cls, profiles_json)
+
+    def measure_memory(self, payload, cls):
+        """
+        Return the memory retained after parsing `payload` and (if `cls` is
+        supplied) converting each item with `cls.from_auth0_json()` and
+        discarding the JSON.
+        """
+        gc.collect()
+        tracemalloc.start()
+        items = json.loads(payload)
+        if cls is not None:
+            items = [cls.from_auth0_json(data) for data in items]
+        gc.collect()
+        memory = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+        tracemalloc.stop()
+        return memory
+
+    def measure_conversion(self, payload, cls):
+        # Timed separately, as tracing memory allocations slows everything down
+        items = json.loads(payload)
+        start = time.perf_counter()
+        converted = [cls.from_auth0_json(data) for data in items]
+        return (time.perf_counter() - start) * 1000, converted
+
+    def measure_profiles(self, label, cls, payload):
+        memory = self.measure_memory(payload, cls)
+        if cls is None:
+            self.stdout.write(f"{label:<16} {memory:>13.1f}")
+            return
+        from_time, _ = self.measure_conversion(payload, cls)
+        self.stdout.write(f"{label:<16} {memory:>13.1f} {from_time:>15.1f}")
+
+    def measure_addresses(self, label, cls, payload):
+        memory = self.measure_memory(payload, cls)
+        if cls is None:
+            self.stdout.write(f"{label:<16} {memory:>13.1f}")
+            return
+        from_time, items = self.measure_conversion(payload, cls)
+
+        start = time.perf_counter()
+        for address in items:
+            address.to_auth0_json()
+        to_time = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for address in items:
+            cls.looks_like_house_number(address.house_name_no)
+        house_number_time = (time.perf_counter() - start) * 1000
+        self.stdout.write(
+            f"{label:<16} {memory:>13.1f} {from_time:>15.1f} {to_time:>13.1f} "
+            f"{house_number_time:>15.1f}"
+        )
@@ -0,0 +1,96 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.http import QueryDict
+from django.test import RequestFactory
+
+from tna_account_management.utils.templatetags import querystring_modify as tag
+
+
+def reference_querystring_modify(base, remove_blanks, remove_utm, modifiers):
+    """
+    A straightforward ``QueryDict``-based implementation of the tag's
+    documented behaviour, to compare its performance with.
+    """
+    querydict = QueryDict(base, mutable=True)
+    for key, value in modifiers.items():
+        if value is not None and not isinstance(value, (str, list)):
+            value = str(value)
+        for mode in tag.MODIFIERS:
+            if key.endswith(mode):
+                key = key[: -len(mode)]
+                values = querydict.getlist(key)
+                present = value in values
+                if present and mode in (tag.MODE_REMOVE, tag.MODE_TOGGLE):
+                    values = [v for v in values if v != value]
+                elif not present and mode in (tag.MODE_ADD, tag.MODE_TOGGLE):
+                    values.append(value)
+                querydict.setlist(key, values)
+                break
+        else:
+            if value is None:
+                querydict.pop(key, None)
+            elif isinstance(value, str):
+                querydict[key] = value
+            else:
+                querydict.setlist(key, list(value))
+
+    remove_vals = {None, ""} if remove_blanks else {None}
+    for key in list(querydict.keys()):
+        if remove_utm and key.lower().startswith("utm_"):
+            del querydict[key]
+    for key, values in list(querydict.lists()):
+        cleaned_values = [v for v in values if v not in remove_vals]
+        if cleaned_values:
+            querydict.setlist(key, cleaned_values)
+        else:
+            del querydict[key]
+    return f"?{querydict.urlencode()}"
+
+
+class Command(BaseCommand):
+    """
+    Compares the cost of generating a page of pagination links with
+    ``querystring_modify`` and with a straightforward ``QueryDict``-based
+    implementation of its documented behaviour (which is how the tag used
+    to work). The tag's behaviour is checked by the tests in
+    ``utils/tests/test_querystring_modify.py``.
+    """
+
+    help = "Benchmarks the querystring_modify template tag"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--links", type=int, default=50)
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        self.benchmark(options["links"], options["iterations"])
+
+    def benchmark(self, links, iterations):
+        request = RequestFactory().get(
+            "/?q=archives&tags=tag1&tags=tag2&page=3&utm_source=newsletter"
+        )
+        pages = list(range(1, links + 1))
+
+        def render_reference():
+            base = request.GET.urlencode()
+            for page in pages:
+                reference_querystring_modify(
+                    base, False, True, {"page": page, "tags__toggle": "tag2"}
+                )
+
+        def render_tag():
+            # Simulate a new request each time, as the base is parsed once per
+            # request, rather than once per link
+            request.__dict__.pop(tag.REQUEST_CACHE_ATTR, None)
+            context = {"request": request}
+            for page in pages:
+                tag.querystring_modify(context, page=page, tags__toggle="tag2")
+
+        for label, func in (("QueryDict", render_reference), ("Tag", render_tag)):
+            seconds = timeit.timeit(func, number=iterations)
+            self.stdout.write(
+                f"{label}: {seconds / iterations * 1000:.3f}ms per page of "
+                f"{links} links ({seconds / (iterations * links) * 1_000_000:.1f}µs "
+                "per link)"
+            )
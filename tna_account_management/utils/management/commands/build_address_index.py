@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tna_account_management.users import address_lookup
+from tna_account_management.utils.string_index import build_index_file, sort_items
+
+
+class Command(BaseCommand):
+    """
+    Converts OS Open Names (https://osdatahub.os.uk/downloads/open/OpenNames)
+    into the binary index used for postcode lookup and street autocomplete
+    on the address form (see ``tna_account_management.users.address_lookup``).
+
+    Sources can be the downloaded zip file, the CSV files it contains, or a
+    directory of them. The sources are read twice, and the index items are
+    sorted in memory, so building an index for the whole of Great Britain
+    needs a couple of gigabytes of memory.
+
+    Once built, set ADDRESS_LOOKUP_INDEX_PATH to the output path to enable
+    the lookups.
+    """
+
+    help = "Builds an address lookup index from OS Open Names"
+
+    def add_arguments(self, parser):
+        parser.add_argument("sources", nargs="+")
+        parser.add_argument("output")
+
+    def handle(self, *args, **options):
+        try:
+            items = sort_items(address_lookup.build_items(options["sources"]))
+        except OSError as e:
+            raise CommandError(e)
+        count = build_index_file(options["output"], items)
+        postcodes = sum(
+            1 for key, _ in items if key.startswith(address_lookup.POSTCODE_KEY)
+        )
+        self.stdout.write(
+            f"Wrote {count:,} entries ({postcodes:,} postcodes) to {options['output']}"
+        )
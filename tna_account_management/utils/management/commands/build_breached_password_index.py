@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tna_account_management.utils.digest_index import build_index_file
+
+
+class Command(BaseCommand):
+    """
+    Converts a text dump of SHA-1 password hashes into the binary index used
+    by ``tna_account_management.utils.password_validation.BreachedPasswordValidator``.
+
+    The source should have one hex-encoded hash per line, optionally followed
+    by ":<count>", which is the format of the Have I Been Pwned "ordered by
+    hash" download. Lines are streamed, so sources of any size can be
+    converted, provided they are already sorted. Smaller, unsorted sources
+    can be sorted in memory with --sort.
+
+    Once built, set BREACHED_PASSWORD_INDEX_PATH to the output path to enable
+    the validator.
+    """
+
+    help = "Builds a breached password index from a text dump of SHA-1 hashes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("source")
+        parser.add_argument("output")
+        parser.add_argument(
+            "--digest-size",
+            type=int,
+            default=20,
+            help=(
+                "Store only the first N bytes of each hash (10 or more keeps "
+                "false positives negligible, and halves the size of the index)"
+            ),
+        )
+        parser.add_argument(
+            "--prefix-bits",
+            type=int,
+            default=16,
+            help=(
+                "The size of the prefix-offset table used to narrow down "
+                "searches (20 suits the full Have I Been Pwned corpus)"
+            ),
+        )
+        parser.add_argument(
+            "--sort", action="store_true", help="Sort the source in memory first"
+        )
+
+    def read_digests(self, path, digest_size):
+        with open(path, "rb") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.split(b":", 1)[0].strip()
+                if not line:
+                    continue
+                try:
+                    digest = bytes.fromhex(line.decode("ascii"))
+                except ValueError:
+                    raise CommandError(f"Line {line_number} is not a valid hash.")
+                if len(digest) != 20:
+                    raise CommandError(f"Line {line_number} is not a SHA-1 hash.")
+                if line_number % 10_000_000 == 0:
+                    self.stdout.write(f"Read {line_number:,} lines...")
+                yield digest[:digest_size]
+
+    def handle(self, *args, **options):
+        if not 4 <= options["digest_size"] <= 20:
+            raise CommandError("--digest-size must be between 4 and 20.")
+
+        digests = self.read_digests(options["source"], options["digest_size"])
+        if options["sort"]:
+            digests = sorted(digests)
+        try:
+            count = build_index_file(
+                options["output"],
+                digests,
+                options["digest_size"],
+                options["prefix_bits"],
+            )
+        except ValueError as e:
+            raise CommandError(
+                f"{e} Use --sort, or the 'ordered by hash' version of the source."
+            )
+        self.stdout.write(f"Wrote {count:,} hashes to {options['output']}")
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from tna_account_management.utils.digest_index import build_index_file
+from tna_account_management.utils.password_validation import (
+    COMMON_PASSWORD_DIGEST_SIZE,
+    COMMON_PASSWORD_PREFIX_BITS,
+    CommonPasswordValidator,
+    get_common_password_digest,
+    read_password_list,
+)
+
+
+class Command(BaseCommand):
+    """
+    Builds the index of common password digests used by
+    ``tna_account_management.utils.password_validation.CommonPasswordValidator``
+    from a list of passwords (by default, the one that ships with Django).
+    This is run when building the Docker image.
+    """
+
+    help = "Builds the common password index used for password validation"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--source",
+            default=CommonPasswordValidator.DEFAULT_PASSWORD_LIST_PATH,
+            help="A (optionally gzipped) file with one password per line",
+        )
+        parser.add_argument(
+            "--output", default=CommonPasswordValidator.DEFAULT_INDEX_PATH
+        )
+
+    def handle(self, *args, **options):
+        digests = sorted(
+            get_common_password_digest(password)
+            for password in read_password_list(options["source"])
+        )
+        count = build_index_file(
+            options["output"],
+            digests,
+            COMMON_PASSWORD_DIGEST_SIZE,
+            COMMON_PASSWORD_PREFIX_BITS,
+        )
+        self.stdout.write(f"Wrote {count} password digests to {options['output']}")
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tna_account_management.users.outbox import Dispatcher
+
+
+class Command(BaseCommand):
+    """
+    Delivers notifications of profile changes to the endpoints in
+    ``OUTBOX_ENDPOINTS`` (see ``users.outbox``). By default, it runs until
+    stopped (with SIGTERM or CTRL+C, after which batches in flight are
+    finished), so can be run as a worker process. With --until idle, it
+    exits once nothing is due, so can be run on a schedule instead.
+    """
+
+    help = "Delivers outbox messages to downstream systems"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--until",
+            choices=["forever", "idle", "drained"],
+            default="forever",
+            help=(
+                "'idle' exits when no deliveries are due, and 'drained' when "
+                "none are pending (waiting for retries)"
+            ),
+        )
+        parser.add_argument(
+            "--max-time", type=float, help="Stop after this many seconds"
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1,
+            help="Seconds to wait between checks for new messages",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.OUTBOX_ENDPOINTS:
+            self.stdout.write("OUTBOX_ENDPOINTS is not set, so there is nothing to do.")
+            return
+        if not settings.OUTBOX_SIGNING_SECRET:
+            # Messages would be signed with an empty key, so endpoints
+            # couldn't tell them apart from anyone else's
+            raise CommandError(
+                "OUTBOX_SIGNING_SECRET must be set to deliver to OUTBOX_ENDPOINTS."
+            )
+        dispatcher = Dispatcher(
+            poll_interval=options["poll_interval"],
+            progress_callback=self.report_progress
+            if options["verbosity"] > 1
+            else None,
+        )
+        dispatcher.install_signal_handlers()
+        self.stdout.write(
+            f"Delivering to {', '.join(dispatcher.endpoints)} "
+            f"({dispatcher.concurrency} request(s) at once to each)"
+        )
+        dispatcher.run(until=options["until"], max_time=options["max_time"])
+        self.stdout.write(
+            f"Delivered {dispatcher.delivered:,} messages "
+            f"({dispatcher.failed_batches:,} failed batches will be retried)"
+        )
+
+    def report_progress(self, endpoint, size, delivered):
+        outcome = "Delivered" if delivered else "Failed to deliver"
+        self.stdout.write(f"{outcome} {size} message(s) to {endpoint}")
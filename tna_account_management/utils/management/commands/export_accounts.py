@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+
+from tna_account_management.users.export import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_FORMATS,
+    iter_export,
+)
+from tna_account_management.users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Writes an export of all user accounts (including their Auth0 profile
+    data) to a file, or to stdout. The export is written as it is generated,
+    so memory use stays the same regardless of the number of users.
+    """
+
+    help = "Exports user accounts as CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+        parser.add_argument(
+            "--output", help="The file to write to. Defaults to stdout."
+        )
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument(
+            "--active-only", action="store_true", help="Exclude inactive users"
+        )
+
+    def handle(self, *args, **options):
+        queryset = User.objects.all()
+        if options["active_only"]:
+            queryset = queryset.filter(is_active=True)
+        lines = iter_export(queryset, options["format"], options["chunk_size"])
+
+        if not options["output"]:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        # The csv module handles line endings itself
+        with open(options["output"], "w", newline="", encoding="utf-8") as f:
+            line_count = 0
+            for line in lines:
+                f.write(line)
+                line_count += 1
+        # CSV exports start with a header row
+        user_count = line_count - 1 if options["format"] == "csv" else line_count
+        self.stderr.write(f"Exported {user_count} users to {options['output']}")
@@ -0,0 +1,174 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.template.base import Template
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+
+from tna_account_management.users import profile_cache
+from tna_account_management.users.models import User
+
+DUMMY_CACHE = {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+LOCAL_CACHE = {
+    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    "LOCATION": "template-fragments",
+}
+
+PAGES = [
+    "dashboard",
+    "update_name",
+    "update_address",
+    "change_email",
+    "change_password",
+]
+
+PROFILE = {
+    "user_id": "auth0|report",
+    "email": "report@example.com",
+    "email_verified": True,
+    "name": "Report User",
+    "nickname": "report",
+    "updated_at": "2022-01-01T00:00:00.000Z",
+    "identities": [{"connection": "Username-Password-Authentication"}],
+    "user_metadata": {
+        "addresses": [
+            {
+                "RecipientName": "Report User",
+                "HouseNameNo": "1",
+                "Street": "Kew Road",
+                "Town": "Richmond",
+                "Country": "United Kingdom",
+                "Postcode": "TW9 4DU",
+            }
+        ]
+    },
+}
+
+
+class RenderTimer:
+    """
+    Records the time spent rendering each template, both including
+    (inclusive) and excluding (exclusive) the time spent in templates that
+    it includes or extends.
+    """
+
+    def __init__(self):
+        self.inclusive = defaultdict(float)
+        self.exclusive = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.stack = []
+
+    @contextmanager
+    def patch(self):
+        timer = self
+        original_render = Template._render
+
+        def _render(template, context):
+            name = template.origin.template_name or "<string>"
+            timer.stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return original_render(template, context)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = timer.stack.pop()
+                if timer.stack:
+                    timer.stack[-1] += elapsed
+                timer.inclusive[name] += elapsed
+                timer.exclusive[name] += elapsed - children
+                timer.counts[name] += 1
+
+        with mock.patch.object(Template, "_render", _render):
+            yield self
+
+
+class Command(BaseCommand):
+    """
+    Renders each account management page repeatedly for a logged-in user
+    (whose Auth0 profile is seeded into the cache, so Auth0 isn't called)
+    and reports the time spent rendering each template. Pages are rendered
+    with template fragment caching disabled, then again with it enabled, so
+    the report shows both where time is spent, and what caching saves.
+
+    Pages are rendered against a throwaway test database, which is created
+    and destroyed by the command.
+    """
+
+    help = "Reports the time spent rendering each template"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=100)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        call_command("createcachetable")
+        try:
+            with override_settings(
+                STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+            ):
+                self.run_report(options["iterations"])
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def render_pages(self, client, iterations):
+        timer = RenderTimer()
+        urls = [reverse(name) for name in PAGES]
+        with timer.patch():
+            for _ in range(iterations):
+                for url in urls:
+                    client.get(url)
+        return timer
+
+    def run_report(self, iterations):
+        user = User.objects.create(username="report", auth0_id=PROFILE["user_id"])
+        profile_cache.set_profile(user.auth0_id, PROFILE)
+        client = Client()
+        client.force_login(user)
+
+        # Fragments are stored in a separate cache when one is configured as
+        # 'template_fragments', which is swapped to toggle fragment caching
+        with override_settings(
+            CACHES={**settings.CACHES, "template_fragments": DUMMY_CACHE}
+        ):
+            uncached = self.render_pages(client, iterations)
+        with override_settings(
+            CACHES={**settings.CACHES, "template_fragments": LOCAL_CACHE}
+        ):
+            # Prime the fragment cache before measuring
+            self.render_pages(client, 1)
+            cached = self.render_pages(client, iterations)
+
+        self.stdout.write(
+            f"{'Template':<50} {'Renders':>8} {'Incl. (ms)':>11} {'Excl. (ms)':>11} "
+            f"{'Cached incl.':>13}"
+        )
+        for name in sorted(
+            uncached.inclusive, key=uncached.exclusive.get, reverse=True
+        ):
+            count = uncached.counts[name]
+            cached_count = cached.counts.get(name, 0)
+            cached_time = (
+                f"{cached.inclusive[name] / cached_count * 1000:.3f}"
+                if cached_count
+                else "skipped"
+            )
+            self.stdout.write(
+                f"{name:<50} {count:>8} "
+                f"{uncached.inclusive[name] / count * 1000:>11.3f} "
+                f"{uncached.exclusive[name] / count * 1000:>11.3f} "
+                f"{cached_time:>13}"
+            )
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+
+from tna_account_management.utils.fake_auth0 import FakeAuth0Server
+
+
+class Command(BaseCommand):
+    """
+    Runs a local stand-in for Auth0 in the foreground, for benchmarking and
+    local testing. To point the project at it, set the following environment
+    variables when running the site:
+
+    AUTH0_DOMAIN=127.0.0.1:8765 AUTH0_PROTOCOL=http AUTHLIB_INSECURE_TRANSPORT=1
+    """
+
+    help = "Runs a local stand-in for the Auth0 Authentication and Management APIs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="Seconds to wait before responding to each request",
+        )
+        parser.add_argument(
+            "--latency-jitter",
+            type=float,
+            default=0.0,
+            help="Up to this many extra seconds are added to --latency at random",
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="The proportion (0-1) of requests that should fail",
+        )
+        parser.add_argument("--error-status", type=int, default=503)
+
+    def handle(self, *args, **options):
+        server = FakeAuth0Server(
+            options["host"],
+            options["port"],
+            user_count=options["users"],
+            latency=options["latency"],
+            latency_jitter=options["latency_jitter"],
+            error_rate=options["error_rate"],
+            error_status=options["error_status"],
+        )
+        self.stdout.write(
+            f"Fake Auth0 server running at {server.base_url} "
+            f"with {options['users']} users. Press CTRL+C to stop."
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from tna_account_management.utils.webhook_sink import WebhookSinkServer
+
+
+class Command(BaseCommand):
+    """
+    Runs a local HTTP server in the foreground that accepts (and prints) the
+    notifications sent by the 'dispatch_outbox' command, for local testing.
+    To deliver to it, set the following environment variables:
+
+    OUTBOX_ENDPOINTS=local=http://127.0.0.1:8766/ OUTBOX_SIGNING_SECRET=<secret>
+    """
+
+    help = "Runs a local endpoint for outbox notifications"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8766)
+        parser.add_argument(
+            "--secret", default="", help="Reject requests not signed with this"
+        )
+        parser.add_argument("--latency", type=float, default=0.0)
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="The proportion (0-1) of requests that should fail",
+        )
+        parser.add_argument("--error-status", type=int, default=503)
+
+    def handle(self, *args, **options):
+        stdout = self.stdout
+
+        class PrintingWebhookSinkServer(WebhookSinkServer):
+            def received(self, messages):
+                for message in messages:
+                    stdout.write(json.dumps(message))
+
+        server = PrintingWebhookSinkServer(
+            options["host"],
+            options["port"],
+            secret=options["secret"],
+            latency=options["latency"],
+            error_rate=options["error_rate"],
+            error_status=options["error_status"],
+        )
+        self.stdout.write(
+            f"Webhook sink running at {server.url}. Press CTRL+C to stop."
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(
+                f"Accepted {server.counts['accepted']} request(s), failed "
+                f"{server.counts['failed']} and rejected {server.counts['rejected']}."
+            )
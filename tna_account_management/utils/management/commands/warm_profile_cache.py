@@ -0,0 +1,87 @@
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tna_account_management.users.cache_warming import (
+    get_recent_auth0_ids,
+    warm_profiles,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Caches the Auth0 profiles of users who have logged in recently, so that
+    their first visit after a deploy (or after the cache has been flushed)
+    doesn't have to wait for the Management API. Run from the release phase
+    in ``heroku.yml``, or from a one-off dyno.
+
+    Requests to Auth0 are paced by the shared Management API rate limiter,
+    and the command gives up after --max-time seconds. Failures are
+    reported, but don't cause the command to fail, so they never block a
+    release.
+    """
+
+    help = "Caches the Auth0 profiles of recently active users"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=14,
+            help="Warm profiles for users who have logged in within this many days",
+        )
+        parser.add_argument(
+            "--limit", type=int, help="The maximum number of profiles to warm"
+        )
+        parser.add_argument(
+            "--max-time",
+            type=float,
+            default=60,
+            help="Stop after this many seconds, leaving any remaining profiles",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="The number of requests to make to Auth0 at once",
+        )
+
+    def handle(self, *args, **options):
+        if settings.AUTHENTICATION_PROVIDER != "auth0":
+            self.stdout.write("AUTH0_DOMAIN is not set, so there is nothing to warm.")
+            return
+        # Nothing here should ever fail a release (for example, because the
+        # database or cache is unavailable)
+        try:
+            self.warm(options)
+        except Exception as e:
+            logger.exception("Unable to warm the profile cache.")
+            self.stderr.write(f"Unable to warm the profile cache: {e}")
+
+    def warm(self, options):
+        auth0_ids = get_recent_auth0_ids(options["days"], options["limit"])
+        self.stdout.write(
+            f"Warming profiles for {len(auth0_ids):,} users who have logged in "
+            f"within the last {options['days']} days"
+        )
+        progress = warm_profiles(
+            auth0_ids,
+            max_time=options["max_time"],
+            max_workers=options["workers"],
+            progress_callback=self.report_progress,
+        )
+        self.stdout.write(
+            f"Finished in {progress.elapsed:.1f}s: {progress.warmed:,} warmed, "
+            f"{progress.already_cached:,} already cached, "
+            f"{progress.not_found:,} not found in Auth0, {progress.failed:,} failed, "
+            f"{progress.skipped:,} skipped (out of time)"
+        )
+
+    def report_progress(self, progress):
+        self.stdout.write(
+            f"{progress.done:,}/{progress.total:,} "
+            f"({progress.warmed:,} warmed) after {progress.elapsed:.1f}s"
+        )
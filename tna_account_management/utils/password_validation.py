@@ -0,0 +1,116 @@
+import gzip
+import hashlib
+import logging
+from pathlib import Path
+
+from django.contrib.auth import password_validation
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext as _
+
+from .digest_index import DigestIndex, InvalidDigestIndex
+
+logger = logging.getLogger(__name__)
+
+COMMON_PASSWORD_DIGEST_SIZE = 8
+COMMON_PASSWORD_PREFIX_BITS = 8
+
+
+def get_common_password_digest(password: str) -> bytes:
+    return hashlib.blake2b(
+        password.lower().strip().encode(), digest_size=COMMON_PASSWORD_DIGEST_SIZE
+    ).digest()
+
+
+def read_password_list(path):
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return [x.strip() for x in f]
+    except OSError:
+        with open(path) as f:
+            return [x.strip() for x in f]
+
+
+class CommonPasswordValidator(password_validation.CommonPasswordValidator):
+    """
+    A drop-in replacement for Django's ``CommonPasswordValidator``, which
+    checks passwords against a prebuilt index of password digests (see the
+    ``build_common_password_index`` management command) instead of loading
+    and decompressing the password list into a ``set`` in every process.
+
+    The index is memory-mapped, so when the validator is created before
+    gunicorn forks its workers (see ``utils.startup``), all workers share a
+    single copy. If the index has not been built, the password list is
+    indexed in memory instead.
+    """
+
+    DEFAULT_INDEX_PATH = Path(__file__).resolve().parent / "common-passwords.idx"
+
+    def __init__(
+        self,
+        password_list_path=password_validation.CommonPasswordValidator.DEFAULT_PASSWORD_LIST_PATH,
+        index_path=DEFAULT_INDEX_PATH,
+    ):
+        # NOTE: super().__init__() is not called, because it loads the list
+        self.password_list_path = password_list_path
+        self.index_path = index_path
+        try:
+            self.index = DigestIndex.open(index_path)
+        except (OSError, InvalidDigestIndex):
+            logger.warning(
+                f"Common password index could not be loaded from {index_path}. "
+                "Run the 'build_common_password_index' command to create it."
+            )
+            self.index = DigestIndex.from_digests(
+                (
+                    get_common_password_digest(password)
+                    for password in read_password_list(password_list_path)
+                ),
+                COMMON_PASSWORD_DIGEST_SIZE,
+                COMMON_PASSWORD_PREFIX_BITS,
+            )
+
+    def validate(self, password, user=None):
+        if get_common_password_digest(password) in self.index:
+            raise ValidationError(
+                _("This password is too common."),
+                code="password_too_common",
+            )
+
+
+class BreachedPasswordValidator:
+    """
+    Validate that the password does not appear in a corpus of breached
+    passwords, such as the one published by Have I Been Pwned, without
+    calling any external service. Passwords are checked against a local
+    index of SHA-1 digests (see the ``build_breached_password_index``
+    management command), which is memory-mapped so that only the pages
+    touched by lookups are ever read into memory.
+    """
+
+    def __init__(self, index_path=None):
+        self.index_path = index_path
+        self.index = None
+        if index_path:
+            try:
+                self.index = DigestIndex.open(index_path)
+            except (OSError, InvalidDigestIndex):
+                logger.exception(
+                    f"Breached password index could not be loaded from {index_path}. "
+                    "Passwords will not be checked against it."
+                )
+
+    def validate(self, password, user=None):
+        if self.index is None:
+            return
+        # Indexes may be built with truncated digests to save space
+        digest = hashlib.sha1(password.encode()).digest()[: self.index.record_size]
+        if digest in self.index:
+            raise ValidationError(
+                _(
+                    "This password has appeared in a data breach, so is not safe to use."
+                ),
+                code="password_breached",
+            )
+
+    def get_help_text(self):
+        return _("Your password can’t be one that has appeared in a data breach.")
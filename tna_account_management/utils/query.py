@@ -1,6 +1,48 @@
 from typing import Optional, Union
 
-from django.db.models import Case, IntegerField, QuerySet, When
+from django.db import connections
+from django.db.models import (
+    BigIntegerField,
+    BooleanField,
+    Case,
+    F,
+    Func,
+    IntegerField,
+    QuerySet,
+    SmallIntegerField,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+
+# Serial types can't be used in casts, so arrays of auto-incrementing PKs
+# use the underlying integer type
+AUTO_FIELD_TYPES = {
+    "AutoField": IntegerField,
+    "BigAutoField": BigIntegerField,
+    "SmallAutoField": SmallIntegerField,
+}
+
+
+class ArrayPosition(Func):
+    """
+    Postgres' ``array_position(array, value)``, which returns the (1-based)
+    position of `value` in `array`, or ``NULL`` if it isn't present.
+    """
+
+    function = "array_position"
+    output_field = IntegerField()
+
+
+class AnyOf(Func):
+    """
+    Postgres' ``value = ANY(array)``, the equivalent of ``IN`` for an array
+    supplied as a single parameter.
+    """
+
+    arg_joiner = " = ANY("
+    template = "(%(expressions)s))"
+    output_field = BooleanField()
 
 
 def order_by_pk_position(
@@ -14,7 +56,19 @@ def order_by_pk_position(
 
     Use the `exclude_non_matches` option to exclude items with
     a PK value not in `pks`.
+
+    On Postgres, `pks` is passed to the database as a single array
+    parameter, so the size of the query doesn't grow with the number of PKs.
+    Other databases are sent a ``CASE`` expression with a condition per PK.
     """
+    if pks and connections[queryset.db].vendor == "postgresql":
+        return _order_by_pk_position_array(queryset, pks, exclude_non_matches)
+    return _order_by_pk_position_case(queryset, pks, exclude_non_matches)
+
+
+def _order_by_pk_position_case(
+    queryset: QuerySet, pks: Union[list, tuple], exclude_non_matches: bool
+) -> QuerySet:
     if exclude_non_matches:
         queryset = queryset.filter(pk__in=pks)
 
@@ -22,3 +76,26 @@ def order_by_pk_position(
     return queryset.annotate(
         pk_pos_order=Case(*cases, default=len(pks), output_field=IntegerField())
     ).order_by("pk_pos_order")
+
+
+def _order_by_pk_position_array(
+    queryset: QuerySet, pks: Union[list, tuple], exclude_non_matches: bool
+) -> QuerySet:
+    from django.contrib.postgres.fields import ArrayField
+
+    pk_field = queryset.model._meta.pk
+    field_class = AUTO_FIELD_TYPES.get(pk_field.get_internal_type())
+    if field_class is not None:
+        pk_field = field_class()
+    array = Value(list(pks), output_field=ArrayField(pk_field))
+    if exclude_non_matches:
+        queryset = queryset.filter(AnyOf(F("pk"), array))
+
+    # Positions are 0-based, with non-matches last, as for other databases
+    return queryset.annotate(
+        pk_pos_order=Coalesce(
+            ArrayPosition(array, F("pk")) - 1,
+            Value(len(pks)),
+            output_field=IntegerField(),
+        )
+    ).order_by("pk_pos_order")
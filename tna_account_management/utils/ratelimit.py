@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Atomically drops hits that have left the window, then records a new hit
+# if doing so would not exceed the limit. Returns 1 if the hit was recorded,
+# or 0 if the limit has already been reached.
+SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+if redis.call('ZCARD', key) >= limit then
+    return 0
+end
+redis.call('ZADD', key, now, ARGV[4])
+redis.call('PEXPIRE', key, math.ceil(window * 1000))
+return 1
+"""
+
+# Hits recorded in this process when Redis is unavailable
+_local_windows: Dict[str, Deque[float]] = {}
+_local_lock = threading.Lock()
+LOCAL_MAX_KEYS = 10000
+
+
+def get_redis_client():
+    """
+    Return a client for the Redis instance behind the default cache, or
+    `None` if the default cache isn't backed by Redis.
+    """
+    try:
+        from django_redis import get_redis_connection
+
+        return get_redis_connection("default")
+    except (ImportError, NotImplementedError):
+        return None
+
+
+class SlidingWindowRateLimiter:
+    """
+    Limits the number of hits allowed for any single identifier (e.g. an IP
+    address) within a sliding window of `window` seconds.
+
+    Hits are tracked in Redis (when the default cache uses it), so limits
+    apply across all processes. If Redis isn't in use, or can't be reached,
+    hits are tracked in the current process only.
+    """
+
+    def __init__(self, name: str, limit: int, window: float):
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+    def get_key(self, identifier: str) -> str:
+        digest = hashlib.sha256(identifier.encode()).hexdigest()[:32]
+        return f"ratelimit:{self.name}:{digest}"
+
+    def hit(self, identifier: str) -> bool:
+        """
+        Record a hit for `identifier` and return `True`, or return `False`
+        (without recording anything) if the limit has already been reached.
+        """
+        key = self.get_key(identifier)
+        now = time.time()
+        client = get_redis_client()
+        if client is not None:
+            try:
+                script = client.register_script(SLIDING_WINDOW_SCRIPT)
+                return bool(
+                    script(
+                        keys=[client_key(key)],
+                        args=[now, self.window, self.limit, uuid.uuid4().hex],
+                    )
+                )
+            except Exception:
+                logger.warning(
+                    "Redis is unavailable. Falling back to per-process rate limiting.",
+                    exc_info=True,
+                )
+        return self.local_hit(key, now)
+
+    def wait(self, identifier: str, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a hit can be recorded for `identifier` without exceeding
+        the limit, then record it and return `True`. Returns `False` if that
+        isn't possible within `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # Hits are spread evenly across the window when under constant load
+        interval = self.window / self.limit
+        while not self.hit(identifier):
+            if deadline is None:
+                delay = interval
+            else:
+                delay = min(interval, deadline - time.monotonic())
+                if delay <= 0:
+                    return False
+            time.sleep(delay)
+        return True
+
+    def local_hit(self, key: str, now: float) -> bool:
+        with _local_lock:
+            hits = _local_windows.get(key)
+            if hits is None:
+                if len(_local_windows) >= LOCAL_MAX_KEYS:
+                    prune_local_windows(now - self.window)
+                hits = _local_windows[key] = deque()
+            while hits and hits[0] <= now - self.window:
+                hits.popleft()
+            if len(hits) >= self.limit:
+                return False
+            hits.append(now)
+            return True
+
+    def reset(self, identifier: str) -> None:
+        key = self.get_key(identifier)
+        with _local_lock:
+            _local_windows.pop(key, None)
+        client = get_redis_client()
+        if client is not None:
+            try:
+                client.delete(client_key(key))
+            except Exception:
+                logger.warning("Redis is unavailable.", exc_info=True)
+
+
+def client_key(key: str) -> str:
+    # Apply the cache's key prefix/version, to avoid collisions with other
+    # sites using the same Redis instance
+    return cache.make_key(key)
+
+
+def prune_local_windows(cutoff: float) -> None:
+    """
+    Remove windows whose most recent hit is older than `cutoff`, or if that
+    isn't enough, the oldest half of them. Must be called with the lock held.
+    """
+    for key in [
+        k for k, hits in _local_windows.items() if not hits or hits[-1] <= cutoff
+    ]:
+        del _local_windows[key]
+    if len(_local_windows) >= LOCAL_MAX_KEYS:
+        for key in list(_local_windows)[: LOCAL_MAX_KEYS // 2]:
+            del _local_windows[key]
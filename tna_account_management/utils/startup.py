@@ -0,0 +1,78 @@
+import logging
+import os
+from typing import Iterable, Iterator
+
+from django.contrib.auth.password_validation import get_default_password_validators
+from django.forms.renderers import get_default_renderer
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CachedLoader
+
+from tna_account_management.users import address_lookup
+
+logger = logging.getLogger(__name__)
+
+# Templates under these directories are compiled at startup: the site's own
+# templates, the tbxforms template pack used by crispy, and Django's form
+# widget templates (loaded by the form renderer's engine)
+PRELOAD_TEMPLATE_PREFIXES = ("patterns/", "tbx/", "django/forms/")
+
+
+def preload():
+    """
+    Load resources that would otherwise be loaded lazily by each worker
+    process on first use. Called from ``wsgi.py``, so that when gunicorn is
+    run with ``preload_app``, this happens once in the master process.
+    """
+    # Validators are instantiated once and cached; the common password
+    # validator memory-maps its index when instantiated
+    get_default_password_validators()
+
+    # Likewise for the address lookup index, if one has been configured
+    address_lookup.get_index()
+
+    warm_template_cache()
+
+
+def get_template_names(directories: Iterable[str]) -> Iterator[str]:
+    for directory in directories:
+        for root, _, filenames in os.walk(directory):
+            for filename in filenames:
+                if not filename.endswith((".html", ".txt")):
+                    continue
+                name = os.path.relpath(os.path.join(root, filename), directory)
+                name = name.replace(os.sep, "/")
+                if name.startswith(PRELOAD_TEMPLATE_PREFIXES):
+                    yield name
+
+
+def warm_template_cache() -> int:
+    """
+    Compile the site's templates into the cached template loader of each
+    template engine that uses one (those with ``debug`` disabled), so that
+    the first request to each view doesn't pay the cost of parsing them.
+    Returns the number of templates compiled.
+    """
+    backends = [
+        backend
+        for backend in [*engines.all(), get_default_renderer().engine]
+        if isinstance(backend, DjangoTemplates)
+        and any(
+            isinstance(loader, CachedLoader)
+            for loader in backend.engine.template_loaders
+        )
+    ]
+    count = 0
+    for backend in backends:
+        # Only the first match for each name is ever used, so earlier
+        # directories take precedence, as when loading
+        for name in set(get_template_names(backend.template_dirs)):
+            try:
+                backend.get_template(name)
+            except TemplateSyntaxError:
+                # Templates that are never used on their own (such as
+                # fragments with unbalanced tags) are left to load lazily
+                logger.debug(f"Unable to precompile template {name}.")
+                continue
+            count += 1
+    return count
@@ -0,0 +1,215 @@
+"""
+A compact, read-only mapping of byte-string keys to byte-string values,
+stored in a sorted binary file that is queried through ``mmap``, so that
+exact and prefix lookups are O(log n), and the file's pages are shared
+between all processes that have it open (see also ``digest_index``).
+
+Keys may be repeated (each occurrence is a separate record), and can't
+contain null bytes. Records with the same key are kept in the order that
+they were supplied.
+
+File layout (all integers are little-endian):
+
+    header         magic (8 bytes), record count (uint64)
+    offset table   record count + 1 uint64 offsets of each record from the
+                   start of the records section (the last being its length)
+    records        key, a null byte, then value, in ascending order of key
+"""
+import mmap
+import os
+import struct
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+MAGIC = b"TNASTRX1"
+HEADER = struct.Struct("<8sQ")
+OFFSET = struct.Struct("<Q")
+RANGE = struct.Struct("<2Q")
+SEPARATOR = b"\x00"
+
+
+class InvalidStringIndex(Exception):
+    pass
+
+
+class StringIndex:
+    def __init__(self, buffer: Union[bytes, mmap.mmap], file=None):
+        if len(buffer) < HEADER.size:
+            raise InvalidStringIndex("The index is too small to be valid.")
+        magic, count = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise InvalidStringIndex("The index does not have the expected header.")
+        self.buffer = buffer
+        self.file = file
+        self.count = count
+        self.table_offset = HEADER.size
+        self.records_offset = HEADER.size + (count + 1) * OFFSET.size
+        if len(buffer) < self.records_offset:
+            raise InvalidStringIndex("The index is truncated.")
+        (records_size,) = OFFSET.unpack_from(
+            buffer, self.table_offset + count * OFFSET.size
+        )
+        if len(buffer) != self.records_offset + records_size:
+            raise InvalidStringIndex("The index is truncated or has trailing data.")
+
+    @classmethod
+    def open(cls, path: Union[str, os.PathLike]) -> "StringIndex":
+        """
+        Return an index for the file at `path`, memory-mapped read-only.
+        """
+        f = open(path, "rb")
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be memory-mapped
+            f.close()
+            raise InvalidStringIndex("The index file is empty.")
+        return cls(buffer, file=f)
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[bytes, bytes]]) -> "StringIndex":
+        """
+        Return an in-memory index of the supplied (not necessarily sorted)
+        key/value pairs.
+        """
+        data = bytearray()
+        write_index(data, sort_items(items))
+        return cls(bytes(data))
+
+    def close(self) -> None:
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        if self.file is not None:
+            self.file.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def get_record(self, position: int) -> Tuple[bytes, bytes]:
+        start, end = RANGE.unpack_from(
+            self.buffer, self.table_offset + position * OFFSET.size
+        )
+        record = self.buffer[self.records_offset + start : self.records_offset + end]
+        key, _, value = record.partition(SEPARATOR)
+        return key, value
+
+    def get_key(self, position: int) -> bytes:
+        start, end = RANGE.unpack_from(
+            self.buffer, self.table_offset + position * OFFSET.size
+        )
+        base = self.records_offset
+        end = self.buffer.find(SEPARATOR, base + start, base + end)
+        return self.buffer[base + start : end]
+
+    def bisect_left(self, key: bytes) -> int:
+        """
+        Return the position of the first record with a key >= `key`.
+        """
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.get_key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def get(self, key: bytes) -> List[bytes]:
+        """
+        Return the values of all records with the supplied `key`.
+        """
+        values = []
+        for found, value in self.iter_prefix(key):
+            if found != key:
+                break
+            values.append(value)
+        return values
+
+    def iter_prefix(
+        self, prefix: bytes, limit: Optional[int] = None
+    ) -> Iterator[Tuple[bytes, bytes]]:
+        """
+        Yield the (key, value) pairs of records whose key starts with
+        `prefix`, in order, stopping after `limit` records if supplied.
+        """
+        position = self.bisect_left(prefix)
+        end = self.count if limit is None else min(position + limit, self.count)
+        while position < end:
+            key, value = self.get_record(position)
+            if not key.startswith(prefix):
+                return
+            yield key, value
+            position += 1
+
+
+def sort_items(items: Iterable[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """
+    Return `items` sorted by key, keeping records with the same key in the
+    order they were supplied.
+    """
+    return sorted(items, key=lambda item: item[0])
+
+
+def write_index(out, items: Iterable[Tuple[bytes, bytes]]) -> int:
+    """
+    Write an index containing `items` (key/value pairs, which must already
+    be sorted by key) to `out`, which can be a ``bytearray`` or a seekable
+    binary file. Returns the number of records written.
+
+    The offset table is written after the records have been counted, so
+    when writing to a file, the records are first spooled to a temporary
+    file alongside it, rather than being held in memory.
+    """
+    if isinstance(out, bytearray):
+        records = bytearray()
+        offsets = write_records(records, items)
+        out.extend(HEADER.pack(MAGIC, len(offsets) - 1))
+        out.extend(b"".join(OFFSET.pack(offset) for offset in offsets))
+        out.extend(records)
+        return len(offsets) - 1
+
+    spool_path = f"{out.name}.records"
+    try:
+        with open(spool_path, "w+b") as spool:
+            offsets = write_records(spool, items)
+            out.write(HEADER.pack(MAGIC, len(offsets) - 1))
+            for offset in offsets:
+                out.write(OFFSET.pack(offset))
+            spool.seek(0)
+            while chunk := spool.read(1024 * 1024):
+                out.write(chunk)
+    finally:
+        if os.path.exists(spool_path):
+            os.remove(spool_path)
+    return len(offsets) - 1
+
+
+def write_records(out, items: Iterable[Tuple[bytes, bytes]]) -> List[int]:
+    # An array would be more compact, but even tens of millions of offsets
+    # are manageable when building the index offline
+    offsets = [0]
+    previous: Optional[bytes] = None
+    write = out.extend if isinstance(out, bytearray) else out.write
+    for key, value in items:
+        if SEPARATOR in key:
+            raise ValueError(f"Key {key!r} contains a null byte.")
+        if previous is not None and key < previous:
+            raise ValueError("Items must be supplied in ascending order of key.")
+        record = key + SEPARATOR + value
+        write(record)
+        offsets.append(offsets[-1] + len(record))
+        previous = key
+    return offsets
+
+
+def build_index_file(
+    path: Union[str, os.PathLike], items: Iterable[Tuple[bytes, bytes]]
+) -> int:
+    """
+    Write an index containing `items` to `path`, replacing any existing
+    file atomically, so that processes with the old file open are unaffected.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        count = write_index(f, items)
+    os.replace(tmp_path, path)
+    return count
@@ -1,3 +1,7 @@
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import quote_plus
+
 from django import template
 from django.db.models import Model
 from django.http.request import QueryDict
@@ -7,6 +11,7 @@ register = template.Library()
 MODE_ADD = "__add"
 MODE_REMOVE = "__remove"
 MODE_TOGGLE = "__toggle"
+MODIFIERS = (MODE_ADD, MODE_REMOVE, MODE_TOGGLE)
 
 
 @register.simple_tag(takes_context=True)
@@ -100,78 +105,137 @@ def querystring_modify(
 
     Modifiers always fail gracefully if the value you're trying to add is already
     present, or a value you're trying to remove is not, or the named parameter isn't
-    present at all.
+    present at all. Values added by modifiers appear after any existing values.
+
+    The base value is parsed and cleaned once per request (or distinct querystring),
+    rather than once per use of the tag, so the tag is cheap to use many times on
+    the same page (e.g. for pagination or filter links).
     """
-    querydict = get_base_querydict(context, base)
+    items = get_base_items(context, base, remove_blanks, remove_utm)
+    modified = set()
     for key, value in kwargs.items():
-
-        if isinstance(value, Model):
-            value = str(value.pk)
-        elif not hasattr(value, "__iter__"):
-            value = str(value)
-
-        if key.endswith(MODE_TOGGLE):
-            key = key[: -len(MODE_TOGGLE)]
-            values = set(querydict.get_list(key))
-            if value in values:
-                values.remove(value)
-            else:
-                values.add(value)
-            querydict.set_list(key, list(values))
-
-        elif key.endswith(MODE_ADD):
-            key = key[: -len(MODE_ADD)]
-            values = set(querydict.get_list(key))
-            if value not in values:
-                values.add(value)
-                querydict.set_list(key, list(values))
-
-        elif key.endswith(MODE_REMOVE):
-            key = key[: -len(MODE_REMOVE)]
-            values = set(querydict.get_list(key))
-            if value in values:
-                values.remove(value)
-                querydict.set_list(key, list(values))
-
+        mode = next((m for m in MODIFIERS if key.endswith(m)), None)
+        if mode is not None:
+            key = key[: -len(mode)]
+            items[key] = apply_modifier(mode, items.get(key, ()), to_values(value))
         elif value is None:
-            querydict.pop(key, None)
+            items.pop(key, None)
+            modified.discard(key)
+            continue
+        else:
+            items[key] = to_values(value)
+        modified.add(key)
+
+    # The base value is already clean, so only modified values need cleaning
+    for key in modified:
+        values = clean_values(key, items[key], remove_blanks, remove_utm)
+        if values is None:
+            del items[key]
         else:
-            if isinstance(value, (str, bytes)):
-                querydict[key] = value
-            elif hasattr(value, "__iter__"):
-                querydict.setlist(key, list(value))
+            items[key] = values
+
+    return f"?{urlencode(items)}"
 
-    clean_querydict(querydict, remove_blanks, remove_utm)
 
-    return f"?{querydict.urlencode()}"
+# A cleaned querystring, as an ordered mapping of keys to (possibly empty)
+# tuples of values, which is copied (but not the tuples) for each use of the tag
+Items = Dict[str, Tuple]
 
+# The attribute used to store items parsed from 'request.GET' on the request
+REQUEST_CACHE_ATTR = "_querystring_modify_items"
 
-def get_base_querydict(context, base):
+
+def get_base_items(context, base, remove_blanks=False, remove_utm=True) -> Items:
     if base is None and "request" in context:
-        return context["request"].GET.copy()
+        return dict(get_request_items(context["request"], remove_blanks, remove_utm))
     if isinstance(base, QueryDict):
-        return base.copy()
+        return clean_items(base.lists(), remove_blanks, remove_utm)
     if isinstance(base, dict):
-        return QueryDict.fromkeys(base, mutable=True)
+        return clean_items(
+            ((key, to_values(value)) for key, value in base.items()),
+            remove_blanks,
+            remove_utm,
+        )
     if isinstance(base, str):
-        return QueryDict(base, mutable=True)
+        return dict(parse_querystring(base, remove_blanks, remove_utm))
     # request not present or base value unsupported
-    return QueryDict("", mutable=True)
+    return {}
 
 
-def clean_querydict(querydict, remove_blanks=False, remove_utm=True):
-    remove_vals = {None}
+def get_request_items(request, remove_blanks=False, remove_utm=True) -> Items:
+    """
+    Return the cleaned items for the querystring of the supplied request,
+    parsing them from ``request.GET`` only once per request.
+    """
+    cache = getattr(request, REQUEST_CACHE_ATTR, None)
+    if cache is None or cache[0] is not request.GET:
+        cache = (request.GET, {})
+        setattr(request, REQUEST_CACHE_ATTR, cache)
+    options = (bool(remove_blanks), bool(remove_utm))
+    try:
+        return cache[1][options]
+    except KeyError:
+        items = clean_items(request.GET.lists(), remove_blanks, remove_utm)
+        cache[1][options] = items
+        return items
+
+
+@lru_cache(maxsize=256)
+def parse_querystring(value: str, remove_blanks=False, remove_utm=True) -> Items:
+    return clean_items(QueryDict(value).lists(), remove_blanks, remove_utm)
+
+
+def to_values(value) -> Tuple:
+    if isinstance(value, Model):
+        return (str(value.pk),)
+    if value is None or isinstance(value, (str, bytes)):
+        return (value,)
+    if hasattr(value, "__iter__"):
+        return tuple(value)
+    return (str(value),)
+
+
+def apply_modifier(mode: str, values: Tuple, modifier_values: Tuple) -> Tuple:
+    values = list(values)
+    for value in modifier_values:
+        present = value in values
+        if present and mode in (MODE_REMOVE, MODE_TOGGLE):
+            values = [v for v in values if v != value]
+        elif not present and mode in (MODE_ADD, MODE_TOGGLE):
+            values.append(value)
+    return tuple(values)
+
+
+def clean_items(
+    items: Iterable[Tuple[str, Iterable]], remove_blanks=False, remove_utm=True
+) -> Items:
+    cleaned = {}
+    for key, values in items:
+        values = clean_values(key, values, remove_blanks, remove_utm)
+        # Keys left without values are kept (and output nothing), so that
+        # they retain their position if values are added by modifiers
+        if values is not None:
+            cleaned[key] = values
+    return cleaned
+
+
+def clean_values(
+    key: str, values: Iterable, remove_blanks=False, remove_utm=True
+) -> Optional[Tuple]:
+    if remove_utm and key.lower().startswith("utm_"):
+        return None
     if remove_blanks:
-        remove_vals.add("")
+        return tuple(v for v in values if v is not None and v != "")
+    return tuple(v for v in values if v is not None)
 
-    if remove_utm:
-        for key in querydict.keys():
-            if key.lower().startswith("utm_"):
-                querydict.pop(key)
 
-    for key, values in querydict.lists():
-        cleaned_values = [v for v in values if v not in remove_vals]
-        if cleaned_values:
-            querydict.setlist(key, cleaned_values)
-        else:
-            del querydict[key]
+def urlencode(items: Items) -> str:
+    """
+    Return an encoded querystring for the supplied items, matching the
+    output of ``QueryDict.urlencode()``.
+    """
+    return "&".join(
+        f"{quote_plus(key)}={quote_plus(str(value))}"
+        for key, values in items.items()
+        for value in values
+    )
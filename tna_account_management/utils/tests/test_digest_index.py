@@ -0,0 +1,150 @@
+import os
+import random
+import tempfile
+
+from django.test import SimpleTestCase
+
+from tna_account_management.utils.digest_index import (
+    OFFSET,
+    DigestIndex,
+    InvalidDigestIndex,
+    build_index_file,
+    get_prefix,
+)
+
+# Four-byte digests, with prefix_bits=4 giving the buckets 0x0 to 0xf
+DIGESTS = [
+    # The first possible digest, in the first bucket
+    b"\x00\x00\x00\x00",
+    b"\x00\x00\x00\x01",
+    b"\x0f\xff\xff\xff",
+    b"\x12\x34\x56\x78",
+    b"\x12\x34\x56\x79",
+    # Buckets 0x2 to 0xe are empty
+    # The last possible digest, in the last bucket
+    b"\xf0\x00\x00\x00",
+    b"\xff\xff\xff\xff",
+]
+
+MISSING = [
+    b"\x00\x00\x00\x02",
+    b"\x12\x34\x56\x77",
+    b"\x12\x34\x56\x7a",
+    # In the empty buckets
+    b"\x20\x00\x00\x00",
+    b"\x80\x00\x00\x00",
+    b"\xef\xff\xff\xff",
+    b"\xff\xff\xff\xfe",
+]
+
+
+class DigestIndexTestCase(SimpleTestCase):
+    def test_contains(self):
+        for prefix_bits in [0, 1, 4, 8, 12]:
+            index = DigestIndex.from_digests(DIGESTS, 4, prefix_bits)
+            self.assertEqual(len(index), len(DIGESTS))
+            for digest in DIGESTS:
+                with self.subTest(prefix_bits=prefix_bits, digest=digest):
+                    self.assertIn(digest, index)
+            for digest in MISSING:
+                with self.subTest(prefix_bits=prefix_bits, digest=digest):
+                    self.assertNotIn(digest, index)
+
+    def test_prefix_table(self):
+        index = DigestIndex.from_digests(DIGESTS, 4, 4)
+
+        table = [
+            OFFSET.unpack_from(index.buffer, offset)[0]
+            for offset in range(index.table_offset, index.records_offset, OFFSET.size)
+        ]
+
+        # Where each bucket starts, then the number of records
+        self.assertEqual(table, [0, 3, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 7])
+
+    def test_get_prefix(self):
+        self.assertEqual(get_prefix(b"\xff\xff\xff\xff", 0), 0)
+        self.assertEqual(get_prefix(b"\x12\x34\x56\x78", 4), 0x1)
+        self.assertEqual(get_prefix(b"\x12\x34\x56\x78", 12), 0x123)
+        self.assertEqual(get_prefix(b"\xff\xff\xff\xff", 24), 2**24 - 1)
+
+    def test_wrong_length(self):
+        index = DigestIndex.from_digests(DIGESTS, 4, 4)
+
+        self.assertNotIn(b"\x00\x00\x00", index)
+        self.assertNotIn(b"\x00\x00\x00\x00\x00", index)
+
+    def test_duplicates_dropped(self):
+        index = DigestIndex.from_digests(DIGESTS * 2, 4)
+
+        self.assertEqual(len(index), len(DIGESTS))
+
+    def test_empty_index(self):
+        index = DigestIndex.from_digests([], 4, 4)
+
+        self.assertEqual(len(index), 0)
+        self.assertNotIn(DIGESTS[0], index)
+        self.assertNotIn(DIGESTS[-1], index)
+
+    def test_invalid_digests(self):
+        with self.assertRaises(ValueError):
+            DigestIndex.from_digests([b"\x00\x00\x00"], 4)
+        with self.assertRaises(ValueError):
+            DigestIndex.from_digests(DIGESTS, 4, prefix_bits=25)
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(0)
+        digests = [rng.randbytes(8) for _ in range(2000)]
+        index = DigestIndex.from_digests(digests[:1000], 8, 8)
+
+        for digest in digests:
+            with self.subTest(digest=digest):
+                self.assertEqual(digest in index, digest in digests[:1000])
+
+
+class DigestIndexFileTestCase(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "index")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_build_and_open(self):
+        self.assertEqual(build_index_file(self.path, DIGESTS, 4, 4), len(DIGESTS))
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["index"])
+
+        index = DigestIndex.open(self.path)
+        try:
+            for digest in DIGESTS:
+                self.assertIn(digest, index)
+            for digest in MISSING:
+                self.assertNotIn(digest, index)
+            with open(self.path, "rb") as f:
+                self.assertEqual(
+                    f.read(), DigestIndex.from_digests(DIGESTS, 4, 4).buffer
+                )
+        finally:
+            index.close()
+
+    def test_unsorted_digests(self):
+        with self.assertRaises(ValueError):
+            build_index_file(self.path, list(reversed(DIGESTS)), 4)
+
+    def test_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            DigestIndex.open(self.path)
+
+    def test_invalid_files(self):
+        valid = DigestIndex.from_digests(DIGESTS, 4, 4).buffer
+        for name, data in [
+            ("empty", b""),
+            ("too small", b"TNADIGX1"),
+            ("wrong magic", b"X" + valid[1:]),
+            ("truncated", valid[:-1]),
+            ("trailing data", valid + b"x"),
+        ]:
+            with self.subTest(name):
+                with open(self.path, "wb") as f:
+                    f.write(data)
+                with self.assertRaises(InvalidDigestIndex):
+                    DigestIndex.open(self.path)
@@ -0,0 +1,77 @@
+from crispy_forms.utils import render_crispy_form
+from django import forms
+from django.test import SimpleTestCase
+from tbxforms.layout import HTML, Button
+
+from tna_account_management.utils import forms as forms_utils
+from tna_account_management.utils.forms import BaseForm, HelperMixin
+
+
+class ExampleForm(HelperMixin, forms.Form):
+    name = forms.CharField()
+
+    def build_helper(self):
+        fh = super().build_helper()
+        fh.layout.append(Button.primary(name="submit", type="submit", value="Save"))
+        return fh
+
+
+class ExampleBaseForm(BaseForm, forms.Form):
+    name = forms.CharField()
+
+
+class HelperMixinTestCase(SimpleTestCase):
+    def setUp(self):
+        forms_utils._helpers.clear()
+        self.addCleanup(forms_utils._helpers.clear)
+
+    def test_helper_is_built_once_per_form_class(self):
+        ExampleForm().helper
+        ExampleForm().helper
+        self.assertEqual(len(forms_utils._helpers), 1)
+
+    def test_helper_is_cached_on_instance(self):
+        form = ExampleForm()
+        self.assertIs(form.helper, form.helper)
+
+    def test_helper_form_is_instance(self):
+        first = ExampleForm()
+        second = ExampleForm()
+        self.assertIs(first.helper.form, first)
+        self.assertIs(second.helper.form, second)
+        self.assertIsNone(
+            forms_utils._helpers[(ExampleForm, ("name",))].form,
+        )
+
+    def test_layout_changes_are_isolated(self):
+        first = ExampleForm()
+        first.helper.layout.append(HTML("<p>Only for the first form</p>"))
+        first.helper.layout[1].value = "Changed"
+
+        second = ExampleForm()
+        self.assertEqual(len(second.helper.layout), 2)
+        self.assertEqual(second.helper.layout[1].value, "Save")
+        self.assertNotIn("Only for the first form", render_crispy_form(second))
+
+    def test_attrs_and_inputs_changes_are_isolated(self):
+        first = ExampleForm()
+        first.helper.attrs["data-first"] = "true"
+        first.helper.inputs.append(Button.secondary(name="extra", value="Extra"))
+        first.helper.form_action = "/first/"
+
+        second = ExampleForm()
+        self.assertEqual(second.helper.attrs, {})
+        self.assertEqual(second.helper.inputs, [])
+        self.assertEqual(second.helper.form_action, "")
+
+    def test_helper_is_rebuilt_for_different_fields(self):
+        first = ExampleForm()
+        second = ExampleForm()
+        second.fields["email"] = forms.EmailField()
+        self.assertEqual(len(first.helper.layout), 2)
+        self.assertEqual(len(second.helper.layout), 3)
+
+    def test_base_form_helper(self):
+        form = ExampleBaseForm()
+        self.assertTrue(form.helper.html5_required)
+        self.assertIn('name="name"', render_crispy_form(form))
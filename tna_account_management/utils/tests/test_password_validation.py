@@ -0,0 +1,124 @@
+import gzip
+import hashlib
+import os
+import tempfile
+
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase
+
+from tna_account_management.utils import password_validation
+from tna_account_management.utils.digest_index import build_index_file
+from tna_account_management.utils.password_validation import (
+    COMMON_PASSWORD_DIGEST_SIZE,
+    COMMON_PASSWORD_PREFIX_BITS,
+    BreachedPasswordValidator,
+    CommonPasswordValidator,
+    get_common_password_digest,
+)
+
+COMMON_PASSWORDS = ["password", "123456", "letmein"]
+
+
+class ValidatorTestMixin:
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def get_path(self, name):
+        return os.path.join(self.tmp_dir.name, name)
+
+    def assertAccepted(self, validator, password):
+        validator.validate(password)
+
+    def assertRejected(self, validator, password, code):
+        with self.assertRaises(ValidationError) as cm:
+            validator.validate(password)
+        self.assertEqual(cm.exception.code, code)
+
+
+class CommonPasswordValidatorTestCase(ValidatorTestMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.list_path = self.get_path("passwords.txt.gz")
+        with gzip.open(self.list_path, "wt") as f:
+            f.write("\n".join(COMMON_PASSWORDS))
+        self.index_path = self.get_path("passwords.idx")
+
+    def build_index(self):
+        build_index_file(
+            self.index_path,
+            sorted(
+                {get_common_password_digest(password) for password in COMMON_PASSWORDS}
+            ),
+            COMMON_PASSWORD_DIGEST_SIZE,
+            COMMON_PASSWORD_PREFIX_BITS,
+        )
+
+    def check(self, validator):
+        for password in COMMON_PASSWORDS + ["PassWord", " letmein "]:
+            with self.subTest(password=password):
+                self.assertRejected(validator, password, "password_too_common")
+        for password in ["correct horse battery staple", "passwords", ""]:
+            with self.subTest(password=password):
+                self.assertAccepted(validator, password)
+
+    def test_with_index(self):
+        self.build_index()
+        # The list isn't read when the index is available
+        os.remove(self.list_path)
+
+        validator = CommonPasswordValidator(self.list_path, self.index_path)
+        self.addCleanup(validator.index.close)
+
+        self.assertIsNotNone(validator.index.file)
+        self.check(validator)
+
+    def test_without_index(self):
+        with self.assertLogs(password_validation.logger, "WARNING"):
+            validator = CommonPasswordValidator(self.list_path, self.index_path)
+
+        self.assertIsNone(validator.index.file)
+        self.check(validator)
+
+    def test_bundled_index(self):
+        # The index shipped with the project matches Django's list
+        validator = CommonPasswordValidator()
+        self.addCleanup(validator.index.close)
+
+        self.assertIsNotNone(validator.index.file)
+        self.assertRejected(validator, "password", "password_too_common")
+
+
+class BreachedPasswordValidatorTestCase(ValidatorTestMixin, SimpleTestCase):
+    def test_rejects_breached_passwords(self):
+        path = self.get_path("breached.idx")
+        # Built with digests truncated to 10 bytes
+        build_index_file(
+            path,
+            sorted(
+                hashlib.sha1(password.encode()).digest()[:10]
+                for password in ["hunter2", "Tr0ub4dor&3"]
+            ),
+            10,
+            8,
+        )
+        validator = BreachedPasswordValidator(path)
+        self.addCleanup(validator.index.close)
+
+        for password in ["hunter2", "Tr0ub4dor&3"]:
+            with self.subTest(password=password):
+                self.assertRejected(validator, password, "password_breached")
+        # Passwords are case-sensitive, unlike common ones
+        for password in ["Hunter2", "hunter3", ""]:
+            with self.subTest(password=password):
+                self.assertAccepted(validator, password)
+
+    def test_without_index(self):
+        self.assertAccepted(BreachedPasswordValidator(), "hunter2")
+
+    def test_missing_index(self):
+        with self.assertLogs(password_validation.logger, "ERROR"):
+            validator = BreachedPasswordValidator(self.get_path("missing.idx"))
+
+        self.assertIsNone(validator.index)
+        self.assertAccepted(validator, "hunter2")
@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.db import connection
+from django.db.backends.postgresql.base import DatabaseWrapper
+from django.test import SimpleTestCase, TestCase
+
+from tna_account_management.users.models import User
+from tna_account_management.utils import query
+from tna_account_management.utils.query import order_by_pk_position
+
+
+class OrderByPkPositionTestCase(TestCase):
+    def setUp(self):
+        self.pks = [User.objects.create(username=f"user{i}").pk for i in range(4)]
+
+    def test_ordered(self):
+        pks = [self.pks[2], self.pks[0], self.pks[1]]
+
+        self.assertEqual(
+            list(
+                order_by_pk_position(User.objects.all(), pks).values_list(
+                    "pk", flat=True
+                )
+            ),
+            pks + [self.pks[3]],
+        )
+
+    def test_exclude_non_matches(self):
+        pks = [self.pks[2], self.pks[0]]
+
+        self.assertEqual(
+            list(
+                order_by_pk_position(
+                    User.objects.all(), pks, exclude_non_matches=True
+                ).values_list("pk", flat=True)
+            ),
+            pks,
+        )
+
+    def test_no_pks(self):
+        self.assertEqual(
+            order_by_pk_position(User.objects.all(), [], exclude_non_matches=True)
+            .values_list("pk", flat=True)
+            .count(),
+            0,
+        )
+
+
+class PostgresOrderByPkPositionTestCase(SimpleTestCase):
+    """
+    Compiles the queries that would be sent to Postgres, without connecting.
+    """
+
+    def setUp(self):
+        self.connection = DatabaseWrapper(
+            {**connection.settings_dict, "ENGINE": "django.db.backends.postgresql"},
+            alias="default",
+        )
+        patcher = mock.patch.object(query, "connections", {"default": self.connection})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def compile(self, queryset):
+        return queryset.query.get_compiler(connection=self.connection).as_sql()
+
+    def test_array_parameter(self):
+        queryset = order_by_pk_position(User.objects.only("pk"), [3, 1, 2])
+
+        self.assertEqual(
+            self.compile(queryset),
+            (
+                'SELECT "users_user"."id", COALESCE((array_position(%s::integer[], '
+                '"users_user"."id") - %s), %s) AS "pk_pos_order" FROM "users_user" '
+                'ORDER BY "pk_pos_order" ASC',
+                ([3, 1, 2], 1, 3),
+            ),
+        )
+
+    def test_exclude_non_matches(self):
+        queryset = order_by_pk_position(
+            User.objects.only("pk"), [3, 1, 2], exclude_non_matches=True
+        )
+
+        sql, params = self.compile(queryset)
+
+        self.assertIn('WHERE ("users_user"."id" = ANY(%s::integer[]))', sql)
+        self.assertEqual(params, ([3, 1, 2], 1, 3, [3, 1, 2]))
+
+    def test_query_size_independent_of_pks(self):
+        queries = set()
+        for count in [1, 10, 1000]:
+            queryset = order_by_pk_position(User.objects.all(), list(range(count)))
+            sql, params = self.compile(queryset)
+            queries.add(sql)
+
+        self.assertEqual(len(queries), 1)
+
+    def test_no_pks(self):
+        # Without any PKs, the CASE expression is used
+        sql, params = self.compile(order_by_pk_position(User.objects.only("pk"), []))
+
+        self.assertNotIn("array_position", sql)
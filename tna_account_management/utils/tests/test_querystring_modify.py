@@ -0,0 +1,298 @@
+import random
+
+from django.db.models import Model
+from django.http import QueryDict
+from django.test import RequestFactory, SimpleTestCase
+
+from tna_account_management.utils.templatetags.querystring_modify import (
+    querystring_modify,
+)
+
+KEYS = ["page", "tags", "q", "utm_source", "UTM_Medium", "sort", "é", "a&b"]
+VALUES = ["", "1", "2", "tag1", "tag2", "hello world", "ü", "a=b", "None"]
+
+
+# The tag as it was before it was optimised (without the template tag
+# registration and docstring), which the current version is checked against
+
+
+def original_querystring_modify(
+    context, base=None, remove_blanks=False, remove_utm=True, **kwargs
+):
+    querydict = original_get_base_querydict(context, base)
+    for key, value in kwargs.items():
+
+        if isinstance(value, Model):
+            value = str(value.pk)
+        elif not hasattr(value, "__iter__"):
+            value = str(value)
+
+        if key.endswith("__toggle"):
+            key = key[: -len("__toggle")]
+            values = set(querydict.get_list(key))
+            if value in values:
+                values.remove(value)
+            else:
+                values.add(value)
+            querydict.set_list(key, list(values))
+
+        elif key.endswith("__add"):
+            key = key[: -len("__add")]
+            values = set(querydict.get_list(key))
+            if value not in values:
+                values.add(value)
+                querydict.set_list(key, list(values))
+
+        elif key.endswith("__remove"):
+            key = key[: -len("__remove")]
+            values = set(querydict.get_list(key))
+            if value in values:
+                values.remove(value)
+                querydict.set_list(key, list(values))
+
+        elif value is None:
+            querydict.pop(key, None)
+        else:
+            if isinstance(value, (str, bytes)):
+                querydict[key] = value
+            elif hasattr(value, "__iter__"):
+                querydict.setlist(key, list(value))
+
+    original_clean_querydict(querydict, remove_blanks, remove_utm)
+
+    return f"?{querydict.urlencode()}"
+
+
+def original_get_base_querydict(context, base):
+    if base is None and "request" in context:
+        return context["request"].GET.copy()
+    if isinstance(base, QueryDict):
+        return base.copy()
+    if isinstance(base, dict):
+        return QueryDict.fromkeys(base, mutable=True)
+    if isinstance(base, str):
+        return QueryDict(base, mutable=True)
+    return QueryDict("", mutable=True)
+
+
+def original_clean_querydict(querydict, remove_blanks=False, remove_utm=True):
+    remove_vals = {None}
+    if remove_blanks:
+        remove_vals.add("")
+
+    if remove_utm:
+        for key in querydict.keys():
+            if key.lower().startswith("utm_"):
+                querydict.pop(key)
+
+    for key, values in querydict.lists():
+        cleaned_values = [v for v in values if v not in remove_vals]
+        if cleaned_values:
+            querydict.setlist(key, cleaned_values)
+        else:
+            del querydict[key]
+
+
+def random_querystring(rng):
+    querydict = QueryDict(mutable=True)
+    for _ in range(rng.randint(0, 6)):
+        querydict.appendlist(rng.choice(KEYS), rng.choice(VALUES))
+    return querydict.urlencode()
+
+
+def random_value(rng):
+    roll = rng.random()
+    if roll < 0.2:
+        return rng.sample(VALUES, rng.randint(1, 3))
+    if roll < 0.3:
+        return rng.randint(0, 3)
+    return rng.choice(VALUES)
+
+
+class QuerystringModifyEquivalenceTestCase(SimpleTestCase):
+    """
+    Checks the tag against the original implementation for randomly
+    generated querystrings and replacement values, where the original
+    behaved as documented. Differences that were intentional are covered
+    by ``QuerystringModifyChangesTestCase``.
+    """
+
+    cases = 2000
+
+    def test_matches_original(self):
+        rng = random.Random(0)
+        factory = RequestFactory()
+        compared = 0
+        for _ in range(self.cases):
+            base = random_querystring(rng)
+            options = {
+                "remove_blanks": rng.random() < 0.5,
+                "remove_utm": rng.random() < 0.5,
+            }
+            modifiers = {
+                rng.choice(KEYS): random_value(rng) for _ in range(rng.randint(0, 4))
+            }
+            try:
+                expected = original_querystring_modify({}, base, **options, **modifiers)
+            except RuntimeError:
+                # The original removed keys while iterating over them
+                continue
+            compared += 1
+            request = factory.get(f"/?{base}")
+            for context, base_value in (
+                ({"request": request}, None),
+                ({}, base),
+                ({}, QueryDict(base)),
+            ):
+                with self.subTest(base=base_value, options=options, **modifiers):
+                    self.assertEqual(
+                        querystring_modify(context, base_value, **options, **modifiers),
+                        expected,
+                    )
+        # Most cases should have been comparable
+        self.assertGreater(compared, self.cases / 2)
+
+    def test_modifier_properties(self):
+        rng = random.Random(0)
+
+        def get_values(querystring, key):
+            return QueryDict(querystring[1:]).getlist(key)
+
+        for _ in range(self.cases):
+            base = random_querystring(rng)
+            key, value = rng.choice(["page", "tags", "q"]), rng.choice(VALUES[1:])
+            with self.subTest(base=base, key=key, value=value):
+                added = querystring_modify({}, base, **{f"{key}__add": value})
+                self.assertIn(value, get_values(added, key))
+                # Adding a value that is already present changes nothing
+                self.assertEqual(
+                    querystring_modify({}, added[1:], **{f"{key}__add": value}),
+                    added,
+                )
+
+                removed = querystring_modify(
+                    {}, base, remove_utm=False, **{f"{key}__remove": value}
+                )
+                # Every copy of the value is removed, and nothing else
+                expected = [
+                    (k, [v for v in values if (k, v) != (key, value)])
+                    for k, values in QueryDict(base).lists()
+                ]
+                self.assertEqual(
+                    list(QueryDict(removed[1:]).lists()),
+                    [(k, values) for k, values in expected if values],
+                )
+
+                toggled = querystring_modify({}, base, **{f"{key}__toggle": value})
+                self.assertNotEqual(
+                    value in get_values(toggled, key),
+                    value in QueryDict(base).getlist(key),
+                )
+                # Toggling again restores the original set of values
+                toggled_again = querystring_modify(
+                    {}, toggled[1:], **{f"{key}__toggle": value}
+                )
+                self.assertEqual(
+                    set(get_values(toggled_again, key)),
+                    set(QueryDict(base).getlist(key)),
+                )
+
+
+class QuerystringModifyChangesTestCase(SimpleTestCase):
+    """
+    Cases where the tag intentionally differs from the original, which
+    didn't behave as documented.
+    """
+
+    def test_modifiers(self):
+        # The original called non-existent QueryDict methods
+        with self.assertRaises(AttributeError):
+            original_querystring_modify({}, "tags=a", tags__add="b")
+
+        self.assertEqual(
+            querystring_modify({}, "tags=a", tags__add="b"), "?tags=a&tags=b"
+        )
+        self.assertEqual(querystring_modify({}, "tags=a", tags__add="a"), "?tags=a")
+        self.assertEqual(
+            querystring_modify({}, "tags=a&tags=b&tags=c", tags__remove="b"),
+            "?tags=a&tags=c",
+        )
+        self.assertEqual(querystring_modify({}, "tags=a", tags__remove="b"), "?tags=a")
+        self.assertEqual(querystring_modify({}, "tags=a", tags__toggle="a"), "?")
+        self.assertEqual(
+            querystring_modify({}, "tags=a", tags__toggle="b"), "?tags=a&tags=b"
+        )
+        self.assertEqual(querystring_modify({}, "", tags__add="a"), "?tags=a")
+
+    def test_modifier_values_follow_existing_values(self):
+        # The original rebuilt the values from a set, in an arbitrary order
+        self.assertEqual(
+            querystring_modify({}, "tags=c&tags=a&page=1", tags__add="b", page=2),
+            "?tags=c&tags=a&tags=b&page=2",
+        )
+
+    def test_combined_modifiers(self):
+        self.assertEqual(
+            querystring_modify(
+                {}, "page=3&tags=old", page=None, tags__add="new", tags__remove="old"
+            ),
+            "?tags=new",
+        )
+
+    def test_removing_keys(self):
+        # The original removed keys while iterating over them
+        for base, options in (
+            ("utm_source=x&a=1&UTM_Medium=y", {}),
+            ("a=&b=1", {"remove_blanks": True}),
+        ):
+            with self.assertRaises(RuntimeError):
+                original_querystring_modify({}, base, **options)
+
+        self.assertEqual(
+            querystring_modify({}, "utm_source=x&a=1&UTM_Medium=y"), "?a=1"
+        )
+        self.assertEqual(
+            querystring_modify({}, "utm_source=x&a=1", remove_utm=False),
+            "?utm_source=x&a=1",
+        )
+        self.assertEqual(querystring_modify({}, "a=&b=1", remove_blanks=True), "?b=1")
+        self.assertEqual(querystring_modify({}, "a=&b=1"), "?a=&b=1")
+
+    def test_none_removes_key(self):
+        # The original converted None to 'None'
+        self.assertEqual(
+            original_querystring_modify({}, "a=1&b=2", a=None), "?a=None&b=2"
+        )
+
+        self.assertEqual(querystring_modify({}, "a=1&b=2", a=None), "?b=2")
+        self.assertEqual(querystring_modify({}, "a=1", b=None), "?a=1")
+
+    def test_dict_base_keeps_values(self):
+        # The original used QueryDict.fromkeys(), which discarded the values
+        self.assertEqual(original_querystring_modify({}, {"a": "1"}), "?a=")
+
+        self.assertEqual(
+            querystring_modify({}, {"a": "1", "b": ["2", "3"], "c": None}),
+            "?a=1&b=2&b=3",
+        )
+
+
+class QuerystringModifyRequestTestCase(SimpleTestCase):
+    def test_request_parsed_once(self):
+        request = RequestFactory().get("/?q=archives&page=3&utm_source=newsletter")
+        context = {"request": request}
+
+        links = [querystring_modify(context, page=page) for page in (1, 2)]
+
+        self.assertEqual(links, ["?q=archives&page=1", "?q=archives&page=2"])
+        # Modifications made for one link don't affect the next
+        self.assertEqual(querystring_modify(context), "?q=archives&page=3")
+
+    def test_request_get_replaced(self):
+        request = RequestFactory().get("/?page=3")
+        context = {"request": request}
+        self.assertEqual(querystring_modify(context), "?page=3")
+
+        request.GET = QueryDict("page=4")
+
+        self.assertEqual(querystring_modify(context), "?page=4")
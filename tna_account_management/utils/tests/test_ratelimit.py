@@ -0,0 +1,141 @@
+import os
+import unittest
+import uuid
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from tna_account_management.utils import ratelimit
+from tna_account_management.utils.ratelimit import SlidingWindowRateLimiter
+
+
+class RateLimiterTestMixin:
+    def setUp(self):
+        self.limiter = SlidingWindowRateLimiter(f"test-{uuid.uuid4().hex}", 3, 60)
+        self.now = 1000.0
+        patcher = mock.patch.object(ratelimit.time, "time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_limit(self):
+        self.assertEqual(
+            [self.limiter.hit("a") for _ in range(4)], [True] * 3 + [False]
+        )
+        # Other identifiers have their own limit
+        self.assertTrue(self.limiter.hit("b"))
+
+    def test_window_slides(self):
+        for offset in [0, 20, 40]:
+            self.now = 1000.0 + offset
+            self.assertTrue(self.limiter.hit("a"))
+        self.now = 1059.0
+        self.assertFalse(self.limiter.hit("a"))
+        # The first hit has left the window, but not the second
+        self.now = 1061.0
+        self.assertTrue(self.limiter.hit("a"))
+        self.assertFalse(self.limiter.hit("a"))
+
+    def test_refused_hits_not_recorded(self):
+        for _ in range(10):
+            self.limiter.hit("a")
+        self.now = 1061.0
+        self.assertEqual(
+            [self.limiter.hit("a") for _ in range(4)], [True] * 3 + [False]
+        )
+
+    def test_reset(self):
+        for _ in range(3):
+            self.limiter.hit("a")
+        self.limiter.reset("a")
+        self.assertTrue(self.limiter.hit("a"))
+
+
+class LocalRateLimiterTestCase(RateLimiterTestMixin, SimpleTestCase):
+    """
+    Hits tracked in this process, as when Redis isn't in use.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for patcher in [
+            mock.patch.object(ratelimit, "get_redis_client", return_value=None),
+            mock.patch.object(ratelimit, "_local_windows", {}),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_falls_back_when_redis_unavailable(self):
+        client = mock.Mock()
+        client.register_script.return_value.side_effect = ConnectionError
+        with mock.patch.object(
+            ratelimit, "get_redis_client", return_value=client
+        ), self.assertLogs(ratelimit.logger, "WARNING"):
+            self.assertEqual(
+                [self.limiter.hit("a") for _ in range(4)], [True] * 3 + [False]
+            )
+
+    def test_script_arguments(self):
+        client = mock.Mock()
+        script = client.register_script.return_value
+        script.return_value = 0
+        with mock.patch.object(ratelimit, "get_redis_client", return_value=client):
+            self.assertFalse(self.limiter.hit("a"))
+        client.register_script.assert_called_once_with(ratelimit.SLIDING_WINDOW_SCRIPT)
+        kwargs = script.call_args.kwargs
+        self.assertEqual(
+            kwargs["keys"], [ratelimit.client_key(self.limiter.get_key("a"))]
+        )
+        self.assertEqual(kwargs["args"][:3], [self.now, 60, 3])
+        # Nothing is tracked locally while Redis is in use
+        self.assertNotIn(self.limiter.get_key("a"), ratelimit._local_windows)
+
+    def test_prune_local_windows(self):
+        with mock.patch.object(ratelimit, "LOCAL_MAX_KEYS", 4):
+            for identifier in "abcd":
+                self.limiter.hit(identifier)
+            self.now = 1061.0
+            self.limiter.hit("e")
+            keys = {self.limiter.get_key(identifier) for identifier in "abcde"}
+            self.assertEqual(
+                keys & set(ratelimit._local_windows), {self.limiter.get_key("e")}
+            )
+
+    def test_wait(self):
+        for _ in range(3):
+            self.limiter.hit("a")
+
+        def sleep(delay):
+            self.now += delay
+
+        with mock.patch.object(ratelimit.time, "sleep", side_effect=sleep) as sleeps:
+            self.assertTrue(self.limiter.wait("a"))
+        # Hits are spaced by window / limit seconds
+        self.assertEqual(self.now, 1060.0)
+        self.assertEqual(sleeps.call_count, 3)
+
+    def test_wait_timeout(self):
+        for _ in range(3):
+            self.limiter.hit("a")
+        with mock.patch.object(ratelimit.time, "sleep"):
+            self.assertFalse(self.limiter.wait("a", timeout=0))
+
+
+@unittest.skipUnless(
+    os.environ.get("TEST_REDIS_URL"), "TEST_REDIS_URL is needed to run the script"
+)
+class RedisRateLimiterTestCase(RateLimiterTestMixin, SimpleTestCase):
+    """
+    Hits tracked by the Lua script, in the Redis instance at TEST_REDIS_URL.
+    """
+
+    def setUp(self):
+        super().setUp()
+        import redis
+
+        client = redis.Redis.from_url(os.environ["TEST_REDIS_URL"])
+        self.addCleanup(client.close)
+        patcher = mock.patch.object(ratelimit, "get_redis_client", return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.limiter.reset, "a")
+        self.addCleanup(self.limiter.reset, "b")
@@ -0,0 +1,73 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CachedLoader
+from django.test import SimpleTestCase
+
+from tna_account_management.utils import startup
+
+
+def get_cached_loader():
+    for loader in engines["django"].engine.template_loaders:
+        if isinstance(loader, CachedLoader):
+            return loader
+
+
+class PreloadTestCase(SimpleTestCase):
+    def test_preload(self):
+        with mock.patch.object(
+            startup, "warm_template_cache", wraps=startup.warm_template_cache
+        ) as warm_template_cache:
+            startup.preload()
+        warm_template_cache.assert_called_once_with()
+
+    def test_warm_template_cache(self):
+        loader = get_cached_loader()
+        loader.reset()
+        self.assertNotIn("patterns/base.html", loader.get_template_cache)
+
+        self.assertGreater(startup.warm_template_cache(), 0)
+
+        self.assertIn("patterns/base.html", loader.get_template_cache)
+        self.assertIn("tbx/layout/baseinput.html", loader.get_template_cache)
+
+    def test_warm_template_cache_skips_invalid_templates(self):
+        with mock.patch.object(
+            startup, "get_template_names", return_value=["patterns/base.html"]
+        ), mock.patch.object(
+            DjangoTemplates, "get_template", side_effect=TemplateSyntaxError("Invalid")
+        ), self.assertLogs(
+            startup.logger, "DEBUG"
+        ) as logs:
+            self.assertEqual(startup.warm_template_cache(), 0)
+        self.assertIn(
+            "Unable to precompile template patterns/base.html.", logs.output[0]
+        )
+
+
+class GetTemplateNamesTestCase(SimpleTestCase):
+    def test_get_template_names(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for name in [
+                "patterns/base.html",
+                "patterns/pages/email.txt",
+                "patterns/pages/style.css",
+                "tbx/layout/field.html",
+                "admin/base.html",
+                "other.html",
+            ]:
+                path = os.path.join(directory, *name.split("/"))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                open(path, "w").close()
+
+            self.assertEqual(
+                sorted(startup.get_template_names([directory])),
+                [
+                    "patterns/base.html",
+                    "patterns/pages/email.txt",
+                    "tbx/layout/field.html",
+                ],
+            )
@@ -0,0 +1,160 @@
+import os
+import random
+import tempfile
+
+from django.test import SimpleTestCase
+
+from tna_account_management.utils.string_index import (
+    InvalidStringIndex,
+    StringIndex,
+    build_index_file,
+    sort_items,
+)
+
+ITEMS = [
+    (b"kew", b"1"),
+    (b"kew road", b"2"),
+    (b"kew", b"3"),
+    (b"kensington", b"4"),
+    (b"richmond", b"5"),
+    (b"k", b"6"),
+    (b"\xc3\xa9cosse", b"7"),
+    (b"", b"8"),
+]
+
+
+class StringIndexTestCase(SimpleTestCase):
+    def setUp(self):
+        self.index = StringIndex.from_items(ITEMS)
+
+    def test_len(self):
+        self.assertEqual(len(self.index), len(ITEMS))
+
+    def test_get(self):
+        self.assertEqual(self.index.get(b"kew"), [b"1", b"3"])
+        self.assertEqual(self.index.get(b"richmond"), [b"5"])
+        self.assertEqual(self.index.get(b"k"), [b"6"])
+        self.assertEqual(self.index.get(b""), [b"8"])
+        self.assertEqual(self.index.get(b"\xc3\xa9cosse"), [b"7"])
+
+    def test_get_missing(self):
+        for key in [b"ke", b"kew r", b"kews", b"a", b"zzz", b"\xff"]:
+            with self.subTest(key=key):
+                self.assertEqual(self.index.get(key), [])
+
+    def test_iter_prefix(self):
+        self.assertEqual(
+            list(self.index.iter_prefix(b"ke")),
+            [
+                (b"kensington", b"4"),
+                (b"kew", b"1"),
+                (b"kew", b"3"),
+                (b"kew road", b"2"),
+            ],
+        )
+        self.assertEqual(list(self.index.iter_prefix(b"kew ")), [(b"kew road", b"2")])
+        self.assertEqual(list(self.index.iter_prefix(b"kx")), [])
+        self.assertEqual(list(self.index.iter_prefix(b"\xff")), [])
+
+    def test_iter_prefix_empty(self):
+        self.assertEqual(list(self.index.iter_prefix(b"")), sort_items(ITEMS))
+
+    def test_iter_prefix_limit(self):
+        self.assertEqual(
+            list(self.index.iter_prefix(b"ke", limit=2)),
+            [(b"kensington", b"4"), (b"kew", b"1")],
+        )
+        self.assertEqual(
+            list(self.index.iter_prefix(b"r", limit=5)), [(b"richmond", b"5")]
+        )
+        self.assertEqual(list(self.index.iter_prefix(b"ke", limit=0)), [])
+
+    def test_empty_index(self):
+        index = StringIndex.from_items([])
+
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.get(b"kew"), [])
+        self.assertEqual(list(index.iter_prefix(b"")), [])
+
+    def test_values_can_contain_null_bytes(self):
+        index = StringIndex.from_items([(b"a", b"\x00b\x00")])
+
+        self.assertEqual(index.get(b"a"), [b"\x00b\x00"])
+
+    def test_key_with_null_byte(self):
+        with self.assertRaises(ValueError):
+            StringIndex.from_items([(b"a\x00b", b"")])
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(0)
+        alphabet = b"abc "
+        items = [
+            (
+                bytes(rng.choice(alphabet) for _ in range(rng.randint(0, 5))),
+                str(i).encode(),
+            )
+            for i in range(500)
+        ]
+        index = StringIndex.from_items(items)
+        expected = sort_items(items)
+
+        for _ in range(200):
+            key = bytes(rng.choice(alphabet) for _ in range(rng.randint(0, 4)))
+            with self.subTest(key=key):
+                self.assertEqual(
+                    index.get(key), [value for k, value in expected if k == key]
+                )
+                self.assertEqual(
+                    list(index.iter_prefix(key)),
+                    [(k, value) for k, value in expected if k.startswith(key)],
+                )
+
+
+class StringIndexFileTestCase(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "index")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_build_and_open(self):
+        self.assertEqual(build_index_file(self.path, sort_items(ITEMS)), len(ITEMS))
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["index"])
+
+        index = StringIndex.open(self.path)
+        try:
+            self.assertEqual(index.get(b"kew"), [b"1", b"3"])
+            self.assertEqual(list(index.iter_prefix(b"r")), [(b"richmond", b"5")])
+            with open(self.path, "rb") as f:
+                self.assertEqual(f.read(), StringIndex.from_items(ITEMS).buffer)
+        finally:
+            index.close()
+
+    def test_unsorted_items(self):
+        build_index_file(self.path, [(b"kew", b"1")])
+
+        with self.assertRaises(ValueError):
+            build_index_file(self.path, ITEMS)
+
+        # The existing index isn't replaced
+        index = StringIndex.open(self.path)
+        try:
+            self.assertEqual(list(index.iter_prefix(b"")), [(b"kew", b"1")])
+        finally:
+            index.close()
+
+    def test_invalid_files(self):
+        valid = StringIndex.from_items(ITEMS).buffer
+        for name, data in [
+            ("empty", b""),
+            ("too small", b"TNASTRX1"),
+            ("wrong magic", b"X" + valid[1:]),
+            ("truncated", valid[:-1]),
+            ("trailing data", valid + b"x"),
+        ]:
+            with self.subTest(name):
+                with open(self.path, "wb") as f:
+                    f.write(data)
+                with self.assertRaises(InvalidStringIndex):
+                    StringIndex.open(self.path)
@@ -0,0 +1,117 @@
+"""
+A small HTTP server that accepts the webhooks sent by the 'dispatch_outbox'
+command (see ``users.outbox``) and records the messages it receives, for
+testing delivery end to end without a real downstream system.
+
+Like the fake Auth0 server, it can add latency to every response and fail a
+proportion of requests, so that retries can be exercised.
+"""
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+
+class WebhookSinkServer(ThreadingHTTPServer):
+    """
+    A threaded HTTP server that records the messages POSTed to it. Requests
+    are rejected with a 401 if `secret` is set and their signature doesn't
+    match, and `error_rate` (0-1) of requests fail with `error_status`.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8766,
+        secret: str = "",
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+    ):
+        super().__init__((host, port), WebhookSinkRequestHandler)
+        self.secret = secret
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.messages: List[Dict[str, Any]] = []
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "WebhookSinkServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def received(self, messages: List[Dict[str, Any]]) -> None:
+        """
+        Called with the messages in each request that is accepted.
+        """
+        pass
+
+    def get_message_ids(self) -> Counter:
+        """
+        Return the number of times each message ID has been received.
+        """
+        with self._lock:
+            return Counter(message["id"] for message in self.messages)
+
+
+class WebhookSinkRequestHandler(BaseHTTPRequestHandler):
+    server: WebhookSinkServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_status(self, status: int) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if server.latency:
+            time.sleep(server.latency)
+        if server.secret:
+            expected = hmac.new(
+                server.secret.encode(), body, hashlib.sha256
+            ).hexdigest()
+            if not hmac.compare_digest(
+                expected, self.headers.get("X-Account-Signature", "")
+            ):
+                server.count("rejected")
+                return self.send_status(401)
+        if server.error_rate and random.random() < server.error_rate:
+            server.count("failed")
+            return self.send_status(server.error_status)
+        try:
+            messages = json.loads(body)["messages"]
+        except (ValueError, KeyError):
+            server.count("rejected")
+            return self.send_status(400)
+        with server._lock:
+            server.messages.extend(messages)
+            server.counts["accepted"] += 1
+        server.received(messages)
+        self.send_status(204)
@@ -16,3 +16,9 @@ os.environ.setdefault(
 )
 
 application = get_wsgi_application()
+
+# When gunicorn is run with 'preload_app', this runs once in the master
+# process, and the results are shared with all workers (copy-on-write)
+from tna_account_management.utils.startup import preload  # noqa: E402
+
+preload()